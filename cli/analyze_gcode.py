@@ -5,20 +5,22 @@ Analyzes multi-color G-code to provide statistics about segments,
 color distribution, and estimated splice performance.
 
 Usage:
-    python analyze_gcode.py model.gcode [--output stats.json]
+    python analyze_gcode.py model.gcode [--output stats.json] [--buckets 5,20,100,500]
 """
 
 import argparse
 import json
 import sys
 from pathlib import Path
-from collections import Counter
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
+from typing import Optional, Sequence
 
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "postprocessor"))
 
 from gcode_parser import GCodeParser
+from segment_stats import DEFAULT_BUCKETS, compute_stats
+from splice_estimator import SimConfig, estimate
 
 
 @dataclass
@@ -30,6 +32,12 @@ class SegmentStats:
     max_mm: float = 0.0
     avg_mm: float = 0.0
     median_mm: float = 0.0
+    p50_mm: float = 0.0
+    p90_mm: float = 0.0
+    p99_mm: float = 0.0
+    
+    # Length histogram over the configured buckets, e.g. {"<5mm": 3, ...}
+    histogram: dict = field(default_factory=dict)
     
     # Distribution buckets
     very_short: int = 0   # <5mm
@@ -50,19 +58,25 @@ class AnalysisResult:
     estimated_splice_time_hours: float
     estimated_waste_reduction_percent: float
     warnings: list
+    color_length_mm: dict = field(default_factory=dict)
+    splice_density: dict = field(default_factory=dict)
+    splice_time_breakdown_s: dict = field(default_factory=dict)   # Seconds per machine phase
 
 
-def analyze_gcode(filepath: str) -> AnalysisResult:
+def analyze_gcode(filepath: str, buckets: Sequence[float] = DEFAULT_BUCKETS,
+                  timing: Optional[SimConfig] = None) -> AnalysisResult:
     """
     Analyze G-code file and return statistics.
     
     Args:
         filepath: Path to G-code file
+        buckets: Upper bounds (mm) of the length histogram buckets
+        timing: Machine timing for the splice time estimate (default: SimConfig())
         
     Returns:
         AnalysisResult with all statistics
     """
-    parser = GCodeParser()
+    parser = GCodeParser(columnar=True)
     result = parser.parse_file(filepath)
     
     warnings = list(result.warnings)
@@ -79,42 +93,57 @@ def analyze_gcode(filepath: str) -> AnalysisResult:
             warnings=warnings + ["No segments found"]
         )
     
-    # Calculate segment statistics
-    lengths = [s.length_mm for s in result.segments]
-    lengths_sorted = sorted(lengths)
+    # Calculate segment statistics (one sweep over the segment columns),
+    # with the fixed distribution buckets counted alongside the histogram
+    engine = compute_stats(result.segments, buckets=buckets,
+                           extra_buckets=(DEFAULT_BUCKETS,))
     
     stats = SegmentStats(
-        count=len(lengths),
-        total_mm=sum(lengths),
-        min_mm=min(lengths),
-        max_mm=max(lengths),
-        avg_mm=sum(lengths) / len(lengths),
-        median_mm=lengths_sorted[len(lengths) // 2]
+        count=engine.count,
+        total_mm=engine.total_mm,
+        min_mm=engine.min_mm,
+        max_mm=engine.max_mm,
+        avg_mm=engine.mean_mm,
+        median_mm=engine.median_mm,
+        p50_mm=engine.percentiles[50],
+        p90_mm=engine.percentiles[90],
+        p99_mm=engine.percentiles[99],
+        histogram=engine.histogram()
     )
     
-    # Distribution buckets
-    for length in lengths:
-        if length < 5:
-            stats.very_short += 1
-        elif length < 20:
-            stats.short += 1
-        elif length < 100:
-            stats.medium += 1
-        elif length < 500:
-            stats.long += 1
-        else:
-            stats.very_long += 1
+    # Fixed distribution buckets (<5, <20, <100, <500mm)
+    (stats.very_short, stats.short, stats.medium,
+     stats.long, stats.very_long) = engine.extra_bucket_counts[0]
     
     # Color distribution
-    color_counts = Counter(s.color_index for s in result.segments)
     color_distribution = {
         f"T{color}": count 
-        for color, count in sorted(color_counts.items())
+        for color, count in sorted(engine.color_counts.items())
+    }
+    color_length_mm = {
+        f"T{color}": round(length, 2)
+        for color, length in sorted(engine.color_length_mm.items())
+    }
+    
+    # Splices started per layer
+    per_layer = engine.splices_per_layer
+    busiest = max(per_layer, key=per_layer.get, default=None)
+    splice_density = {
+        "mean_per_layer": round(sum(per_layer.values()) / max(1, result.layer_count), 2),
+        "max_per_layer": per_layer.get(busiest, 0),
+        "busiest_layer": busiest,
+        "layers_with_splices": len(per_layer),
+        "per_layer": {str(layer): count for layer, count in per_layer.items()}
     }
     
     # Estimates
-    # Assume 45 seconds per splice on average
-    splice_time_hours = (stats.count * 45) / 3600
+    # Machine time from the length and color columns
+    segments = result.segments
+    splice_time = estimate(segments.length_mm, segments.color_index, timing)
+    splice_time_breakdown_s = {
+        phase: round(seconds, 1)
+        for phase, seconds in splice_time.phase_s.items()
+    }
     
     # Traditional purge: ~50mm per change
     # Splice3D: ~10mm buffer per splice
@@ -135,9 +164,12 @@ def analyze_gcode(filepath: str) -> AnalysisResult:
         color_count=result.color_count,
         color_distribution=color_distribution,
         layer_count=result.layer_count,
-        estimated_splice_time_hours=round(splice_time_hours, 1),
+        estimated_splice_time_hours=round(splice_time.total_time_hours, 1),
         estimated_waste_reduction_percent=round(waste_reduction, 1),
-        warnings=warnings
+        warnings=warnings,
+        color_length_mm=color_length_mm,
+        splice_density=splice_density,
+        splice_time_breakdown_s=splice_time_breakdown_s
     )
 
 
@@ -161,26 +193,32 @@ def print_analysis(result: AnalysisResult):
     print(f"  Max: {stats.max_mm:.1f}mm")
     print(f"  Average: {stats.avg_mm:.1f}mm")
     print(f"  Median: {stats.median_mm:.1f}mm")
+    print(f"  p50 / p90 / p99: {stats.p50_mm:.1f} / {stats.p90_mm:.1f} / {stats.p99_mm:.1f}mm")
     print()
     
     print(f"LENGTH DISTRIBUTION")
-    print(f"  Very short (<5mm): {stats.very_short} ({100*stats.very_short/max(1,stats.count):.1f}%)")
-    print(f"  Short (5-20mm): {stats.short} ({100*stats.short/max(1,stats.count):.1f}%)")
-    print(f"  Medium (20-100mm): {stats.medium} ({100*stats.medium/max(1,stats.count):.1f}%)")
-    print(f"  Long (100-500mm): {stats.long} ({100*stats.long/max(1,stats.count):.1f}%)")
-    print(f"  Very long (>500mm): {stats.very_long} ({100*stats.very_long/max(1,stats.count):.1f}%)")
+    for label, count in stats.histogram.items():
+        print(f"  {label}: {count} ({100*count/max(1,stats.count):.1f}%)")
     print()
     
     print(f"COLORS")
     print(f"  Color count: {result.color_count}")
     for tool, count in result.color_distribution.items():
         pct = 100 * count / max(1, stats.count)
-        print(f"    {tool}: {count} segments ({pct:.1f}%)")
+        length = result.color_length_mm.get(tool, 0.0)
+        print(f"    {tool}: {count} segments ({pct:.1f}%), {length:.1f}mm")
     print()
     
+    density = result.splice_density
     print(f"ESTIMATES")
     print(f"  Layers: {result.layer_count}")
+    if density:
+        print(f"  Splices per layer: {density['mean_per_layer']:.2f} average, "
+              f"{density['max_per_layer']} max (layer {density['busiest_layer']})")
     print(f"  Splice prep time: ~{result.estimated_splice_time_hours:.1f} hours")
+    for phase, seconds in result.splice_time_breakdown_s.items():
+        if seconds:
+            print(f"    {phase.lower()}: {seconds / 60:.1f} min")
     print(f"  Waste reduction vs traditional: ~{result.estimated_waste_reduction_percent:.0f}%")
     print()
     
@@ -205,6 +243,11 @@ def main():
         "-o", "--output",
         help="Save results to JSON file"
     )
+    parser.add_argument(
+        "--buckets",
+        default=",".join(f"{bound:g}" for bound in DEFAULT_BUCKETS),
+        help="Comma-separated histogram bucket bounds in mm (default: 5,20,100,500)"
+    )
     parser.add_argument(
         "-q", "--quiet",
         action="store_true",
@@ -217,7 +260,13 @@ def main():
         print(f"Error: File not found: {args.gcode}", file=sys.stderr)
         return 1
     
-    result = analyze_gcode(args.gcode)
+    try:
+        buckets = sorted(float(bound) for bound in args.buckets.split(",") if bound.strip())
+    except ValueError:
+        print(f"Error: Invalid --buckets: {args.buckets}", file=sys.stderr)
+        return 1
+    
+    result = analyze_gcode(args.gcode, buckets=buckets)
     
     if not args.quiet:
         print_analysis(result)
@@ -232,7 +281,9 @@ def main():
             "layer_count": result.layer_count,
             "estimated_splice_time_hours": result.estimated_splice_time_hours,
             "estimated_waste_reduction_percent": result.estimated_waste_reduction_percent,
-            "warnings": result.warnings
+            "warnings": result.warnings,
+            "color_length_mm": result.color_length_mm,
+            "splice_density": result.splice_density
         }
         
         with open(args.output, 'w') as f:
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Splice3D Monte Carlo Throughput Simulation
+
+Capacity planning for a splicer: runs a queue of recipes through the
+firmware simulator thousands of times, each trial on a machine whose
+timing is drawn from a distribution (heater and cooler rates vary from
+unit to unit and with the ambient) and whose welds fail at random and
+are redone, as the firmware's retry-after-cool recovery does. Trials are
+independent, so they are spread over a process pool.
+
+Every trial draws from its own generator, seeded from (seed, trial), so
+a report depends only on the seed and the trial count, not on the
+number of worker processes.
+
+Usage:
+    python monte_carlo.py recipe1.json recipe2.json [--trials 2000] [--workers N]
+    python monte_carlo.py queue/*.json --weld-failure-rate 0.03 --heat-cv 0.15
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from itertools import repeat
+from pathlib import Path
+from typing import Optional, Sequence
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "postprocessor"))
+
+from segment_stats import percentile
+from simulator import FirmwareSimulator, SimConfig
+
+# Trial chunks per worker, so that uneven chunks still balance
+CHUNKS_PER_WORKER = 4
+# Sampled rates are kept above this fraction of their mean
+MIN_RATE_FRACTION = 0.1
+
+
+@dataclass
+class Variation:
+    """Spread of the machine timing between trials."""
+    heat_rate_cv: float = 0.10        # Coefficient of variation of heat_rate_c_s
+    cool_rate_cv: float = 0.15        # Coefficient of variation of cool_rate_c_s
+    feed_rate_cv: float = 0.0         # Coefficient of variation of feed_rate_mm_s
+    weld_failure_rate: float = 0.02   # Probability that a weld fails and is redone
+
+    def sample(self, config: SimConfig, rng: random.Random) -> SimConfig:
+        """Machine timing of one trial."""
+        def draw(mean: float, cv: float) -> float:
+            if cv <= 0:
+                return mean
+            return max(mean * MIN_RATE_FRACTION, rng.gauss(mean, mean * cv))
+
+        return replace(
+            config,
+            heat_rate_c_s=draw(config.heat_rate_c_s, self.heat_rate_cv),
+            cool_rate_c_s=draw(config.cool_rate_c_s, self.cool_rate_cv),
+            feed_rate_mm_s=draw(config.feed_rate_mm_s, self.feed_rate_cv),
+            weld_failure_rate=self.weld_failure_rate,
+        )
+
+
+@dataclass
+class TrialResult:
+    """One pass of the queue."""
+    time_s: float                     # Machine time for the whole queue
+    splices: int                      # Splices completed
+    weld_retries: int
+    failed_recipes: int               # Recipes stopped by exhausted retries
+    recipe_times_s: list[float] = field(default_factory=list)
+
+
+@dataclass
+class ThroughputReport:
+    """Distribution of queue completion over all trials."""
+    trials: int
+    recipes: int
+    splices: int                      # Splices in the queue
+    completion_p50_s: float
+    completion_p95_s: float
+    completion_mean_s: float
+    splices_per_hour_p50: float       # Throughput at the median completion time
+    splices_per_hour_p95: float       # Throughput at the p95 completion time
+    weld_retries_mean: float          # Redone welds per trial
+    failed_trials: int                # Trials with at least one failed recipe
+    recipe_p50_s: list[float] = field(default_factory=list)
+    recipe_p95_s: list[float] = field(default_factory=list)
+
+
+def trial_rng(seed: int, trial: int) -> random.Random:
+    """Generator of one trial."""
+    return random.Random(f"{seed}:{trial}")
+
+
+def run_trial(recipes: Sequence[list[dict]], config: SimConfig, variation: Variation,
+              seed: int, trial: int) -> TrialResult:
+    """
+    Run the queue once on one sampled machine.
+
+    A recipe whose retries run out counts with the time spent until the
+    error; the queue moves on to the next recipe.
+    """
+    rng = trial_rng(seed, trial)
+    machine = variation.sample(config, rng)
+    result = TrialResult(time_s=0.0, splices=0, weld_retries=0, failed_recipes=0)
+    for segments in recipes:
+        sim = FirmwareSimulator(machine, rng=rng)
+        sim.load_segments(segments)
+        if not sim.run():
+            result.failed_recipes += 1
+        result.time_s += sim.total_time_s
+        result.splices += sim.splices_completed
+        result.weld_retries += sim.weld_retries
+        result.recipe_times_s.append(sim.total_time_s)
+    return result
+
+
+def run_trials(recipes: Sequence[list[dict]], config: SimConfig, variation: Variation,
+               seed: int, start: int, stop: int) -> list[TrialResult]:
+    """Run trials start..stop-1 (the unit of work of a pool worker)."""
+    return [run_trial(recipes, config, variation, seed, trial) for trial in range(start, stop)]
+
+
+def summarize(results: Sequence[TrialResult], splices: int) -> ThroughputReport:
+    """Percentiles of a set of trials."""
+    times = sorted(result.time_s for result in results)
+    p50 = percentile(times, 50)
+    p95 = percentile(times, 95)
+    per_recipe = [sorted(column) for column in zip(*(r.recipe_times_s for r in results))]
+    return ThroughputReport(
+        trials=len(results),
+        recipes=len(per_recipe),
+        splices=splices,
+        completion_p50_s=p50,
+        completion_p95_s=p95,
+        completion_mean_s=sum(times) / len(times),
+        splices_per_hour_p50=splices * 3600 / p50 if p50 else 0.0,
+        splices_per_hour_p95=splices * 3600 / p95 if p95 else 0.0,
+        weld_retries_mean=sum(r.weld_retries for r in results) / len(results),
+        failed_trials=sum(1 for r in results if r.failed_recipes),
+        recipe_p50_s=[percentile(column, 50) for column in per_recipe],
+        recipe_p95_s=[percentile(column, 95) for column in per_recipe],
+    )
+
+
+def run_monte_carlo(recipes: Sequence[list[dict]],
+                    trials: int = 1000,
+                    config: Optional[SimConfig] = None,
+                    variation: Optional[Variation] = None,
+                    seed: int = 0,
+                    workers: Optional[int] = None) -> ThroughputReport:
+    """
+    Simulate a queue of recipes many times.
+
+    Args:
+        recipes: Segment lists ({"color", "length_mm"}) in queue order
+        trials: Number of queue passes
+        config: Mean machine timing (default: SimConfig())
+        variation: Timing spread and weld failure rate (default: Variation())
+        seed: Base seed of the trial generators
+        workers: Worker processes (default: os.cpu_count(); 1 runs inline)
+
+    Returns:
+        ThroughputReport
+    """
+    if trials < 1:
+        raise ValueError("trials must be at least 1")
+    config = config or SimConfig()
+    variation = variation or Variation()
+    workers = min(workers or os.cpu_count() or 1, trials)
+    recipes = [list(segments) for segments in recipes]
+    splices = sum(len(segments) for segments in recipes)
+
+    if workers == 1:
+        return summarize(run_trials(recipes, config, variation, seed, 0, trials), splices)
+
+    chunk = -(-trials // (workers * CHUNKS_PER_WORKER))
+    starts = range(0, trials, chunk)
+    stops = [min(start + chunk, trials) for start in starts]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = pool.map(run_trials, repeat(recipes), repeat(config), repeat(variation),
+                          repeat(seed), starts, stops)
+        results = [result for chunk_results in chunks for result in chunk_results]
+    return summarize(results, splices)
+
+
+def load_recipe_segments(path: str) -> list[dict]:
+    """Segments of a JSON recipe file."""
+    with open(path, 'r') as f:
+        return json.load(f).get('segments', [])
+
+
+def print_report(report: ThroughputReport, names: Sequence[str]):
+    """Print a report in a readable format."""
+    print(f"\n{'='*60}")
+    print("SPLICE3D THROUGHPUT (MONTE CARLO)")
+    print(f"{'='*60}")
+    print(f"  Trials: {report.trials}")
+    print(f"  Queue: {report.recipes} recipes, {report.splices} splices")
+    print(f"  Completion p50: {report.completion_p50_s / 3600:.2f} h")
+    print(f"  Completion p95: {report.completion_p95_s / 3600:.2f} h")
+    print(f"  Splices/hour: {report.splices_per_hour_p50:.1f} (p50), "
+          f"{report.splices_per_hour_p95:.1f} (p95)")
+    print(f"  Weld retries per queue: {report.weld_retries_mean:.1f}")
+    if report.failed_trials:
+        print(f"  Trials with a failed recipe: {report.failed_trials} "
+              f"({100 * report.failed_trials / report.trials:.1f}%)")
+    print()
+    for name, p50, p95 in zip(names, report.recipe_p50_s, report.recipe_p95_s):
+        print(f"  {name}: p50 {p50 / 60:.1f} min, p95 {p95 / 60:.1f} min")
+    print(f"{'='*60}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Splice3D Monte Carlo throughput simulation"
+    )
+    parser.add_argument("recipes", nargs="+", help="Splice recipe JSON files, in queue order")
+    parser.add_argument("--trials", "-n", type=int, default=1000, help="Queue passes (default: 1000)")
+    parser.add_argument("--workers", "-j", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--heat-cv", type=float, default=0.10,
+                        help="Relative spread of the heating rate (default: 0.10)")
+    parser.add_argument("--cool-cv", type=float, default=0.15,
+                        help="Relative spread of the cooling rate (default: 0.15)")
+    parser.add_argument("--weld-failure-rate", type=float, default=0.02,
+                        help="Probability that a weld fails and is redone (default: 0.02)")
+    parser.add_argument("--max-retries", type=int, default=3,
+                        help="Weld retries before a recipe errors (default: 3)")
+    parser.add_argument("--temp", type=float, default=210.0, help="Weld temperature in Celsius")
+    parser.add_argument("--feed-rate", type=float, default=50.0, help="Feed rate in mm/s")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    args = parser.parse_args()
+
+    try:
+        recipes = [load_recipe_segments(path) for path in args.recipes]
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error: Failed to load recipe: {e}", file=sys.stderr)
+        return 1
+
+    config = SimConfig(weld_temp_c=args.temp, feed_rate_mm_s=args.feed_rate,
+                       max_weld_retries=args.max_retries)
+    variation = Variation(heat_rate_cv=args.heat_cv, cool_rate_cv=args.cool_cv,
+                          weld_failure_rate=args.weld_failure_rate)
+    report = run_monte_carlo(recipes, trials=args.trials, config=config,
+                             variation=variation, seed=args.seed, workers=args.workers)
+
+    if args.json:
+        print(json.dumps(asdict(report), indent=2))
+    else:
+        print_report(report, [Path(path).name for path in args.recipes])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
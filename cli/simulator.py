@@ -5,17 +5,36 @@ Splice3D Firmware Simulator
 Simulates the firmware state machine for testing without hardware.
 Reads a splice recipe and logs what the machine would do.
 
+The simulation is discrete-event: every state schedules its completion
+on a virtual clock (EventScheduler) and the scheduler jumps from event
+to event, so a recipe runs at full CPU speed however long it would take
+on the machine. --realtime paces the events against the wall clock
+(divided by --speed) for demos.
+
+Logging is optional: the simulator passes SimEvent records to a callback,
+which the command line prints as text or JSON lines.
+
 Usage:
-    python simulator.py recipe.json [--speed FACTOR]
+    python simulator.py recipe.json [--log text|json|none]
+    python simulator.py recipe.json --realtime [--speed FACTOR]
 """
 
 import argparse
+import heapq
+import itertools
 import json
+import random
 import sys
 import time
-from dataclasses import dataclass
+from bisect import insort
+from dataclasses import asdict, dataclass, field, replace
 from enum import Enum
-from typing import Optional
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "postprocessor"))
+
+from splice_estimator import SimConfig
 
 
 class State(Enum):
@@ -36,179 +55,672 @@ class State(Enum):
 
 
 @dataclass
-class SimConfig:
-    """Simulation configuration."""
-    feed_rate_mm_s: float = 50.0      # Filament feed speed
-    weld_temp_c: float = 210.0        # Weld temperature
-    heat_rate_c_s: float = 5.0        # Heating rate
-    cool_rate_c_s: float = 10.0       # Cooling rate
-    cut_time_s: float = 0.5           # Cutter actuation time
-    position_time_s: float = 1.0      # Position alignment time
-    weld_hold_s: float = 3.0          # Weld hold time
-    cool_target_c: float = 50.0       # Cooling target
-    speed_factor: float = 1.0         # Simulation speed multiplier
+class SimEvent:
+    """One structured log record of the simulation."""
+    time_s: float                     # Simulated time
+    kind: str                         # "load", "start", "state", "segment", "retry", "done", "error"
+    state: str
+    segment: int                      # Index of the current segment
+    duration_s: float = 0.0           # Time the state will take
+    detail: dict = field(default_factory=dict)
+
+
+@dataclass
+class SimResult:
+    """Outcome of a simulation run."""
+    completed: bool
+    total_time_s: float
+    total_filament_mm: float
+    splices_completed: int
+    segments: int
+    events: int                       # Scheduler events processed
+    wall_time_s: float
+    time_in_state: dict[str, float]   # Simulated seconds per state
+    weld_retries: int = 0             # Failed welds that were redone
+    preheats: int = 0                 # Splices whose heater was preheated
+    preheat_s: float = 0.0            # Heating overlapped with other states
+    thermal_cycles_avoided: int = 0   # Cool-downs cut short by heat reuse
+
+
+@dataclass
+class ThermalModel:
+    """
+    Heater strategy of the firmware's thermal optimizer.
+
+    With both options off (the default) every splice heats from the
+    cooling target, as without the optimizer.
+    """
+    preheat: bool = False             # Heat for the next splice during spool/feed/cut/position
+    preheat_lead_s: Optional[float] = 5.0   # Preheat at most this long before HEATING (None: no limit)
+    heat_reuse: bool = False          # Cool only partly when the next weld temperature is close
+    reuse_threshold_c: float = 15.0   # "Close": next weld temperature within this many degrees
+    reuse_cool_c: float = 40.0        # Partial cool-down below the weld temperature
+    weld_temps_c: dict[int, float] = field(default_factory=dict)   # Weld temperature by color
+
+
+@dataclass
+class ThermalSavings:
+    """Cycle time of a recipe with and without a thermal strategy."""
+    baseline_s: float
+    optimized_s: float
+    heating_saved_s: float
+    cooling_saved_s: float
+    preheats: int
+    thermal_cycles_avoided: int
+
+    @property
+    def saved_s(self) -> float:
+        return self.baseline_s - self.optimized_s
+
+    @property
+    def saved_percent(self) -> float:
+        return 100 * self.saved_s / self.baseline_s if self.baseline_s else 0.0
+
+
+# Operations of one splice cycle in machine order (firmware OpType names,
+# plus the winder), which is also the order they are scheduled in
+PIPELINE_OPS = ("FEEDING", "CUTTING", "POSITIONING", "HEATING", "SPLICING", "COOLING", "SPOOLING")
+
+# Predecessors of each operation: (operation, cycle offset)
+PIPELINE_DEPENDENCIES = {
+    "FEEDING": (("SPLICING", -1),),                   # Filament path is free after the weld
+    "CUTTING": (("FEEDING", 0),),
+    "POSITIONING": (("SPLICING", -1),),               # Stages the incoming filament once
+                                                      # the weld point is free
+    "HEATING": (("COOLING", -1),),                    # One heater
+    "SPLICING": (("CUTTING", 0), ("POSITIONING", 0), ("HEATING", 0)),
+    "COOLING": (("SPLICING", 0),),
+    "SPOOLING": (("COOLING", 0),),
+}
+
+# speed_optimizer.cpp overlapAllowed()
+FIRMWARE_OVERLAPS = frozenset({
+    frozenset(("HEATING", "FEEDING")),
+    frozenset(("COOLING", "POSITIONING")),
+    frozenset(("HEATING", "POSITIONING")),
+})
+
+
+def can_overlap(a: str, b: str, overlaps: frozenset = FIRMWARE_OVERLAPS) -> bool:
+    """Whether two operations may run at the same time (canOverlap())."""
+    return a != b and frozenset((a, b)) in overlaps
+
+
+def parse_overlaps(text: str) -> frozenset:
+    """
+    Overlap matrix from "none", "firmware" or pairs like "HEATING+FEEDING,COOLING+SPOOLING".
+
+    Raises:
+        ValueError: On unknown operations or malformed pairs
+    """
+    text = text.strip()
+    if text.lower() == "none":
+        return frozenset()
+    if text.lower() == "firmware":
+        return FIRMWARE_OVERLAPS
+    pairs = set()
+    for item in text.split(","):
+        names = [name.strip().upper() for name in item.split("+")]
+        if len(names) != 2 or names[0] == names[1] or not set(names) <= set(PIPELINE_OPS):
+            raise ValueError(f"Invalid overlap pair: {item!r}")
+        pairs.add(frozenset(names))
+    return frozenset(pairs)
+
+
+@dataclass
+class CycleBreakdown:
+    """Operation times of one splice cycle (speed_optimizer CycleBreakdown)."""
+    cycle: int
+    heating_s: float = 0.0
+    feeding_s: float = 0.0
+    cutting_s: float = 0.0
+    positioning_s: float = 0.0
+    splicing_s: float = 0.0
+    cooling_s: float = 0.0
+    spooling_s: float = 0.0
+    total_s: float = 0.0              # Time the cycle added to the recipe
+    overlap_saved_s: float = 0.0      # Operation time hidden behind other operations
+
+
+@dataclass
+class PipelineResult:
+    """Outcome of an overlapped-operation schedule."""
+    total_time_s: float
+    sequential_time_s: float          # Same operations one after another
+    cycles: list[CycleBreakdown] = field(default_factory=list)
+
+    @property
+    def overlap_saved_s(self) -> float:
+        return self.sequential_time_s - self.total_time_s
+
+    @property
+    def overlap_ratio(self) -> float:
+        """Saved time per second of cycle time, as the firmware reports it."""
+        return self.overlap_saved_s / self.total_time_s if self.total_time_s else 0.0
+
+    @property
+    def speedup(self) -> float:
+        return self.sequential_time_s / self.total_time_s if self.total_time_s else 1.0
+
+    @property
+    def splices_per_hour(self) -> float:
+        return len(self.cycles) * 3600 / self.total_time_s if self.total_time_s else 0.0
+
+
+def earliest_gap(placed: list[tuple[float, float, str]], conflicting: list[str],
+                 ready: float, duration: float) -> float:
+    """
+    Earliest start at or after ready for which [start, start + duration]
+    meets none of the placed conflicting operations.
+
+    Args:
+        placed: (start, end, operation) intervals sorted by start
+        conflicting: Operations that may not run at the same time
+        ready: Time the predecessors have finished
+        duration: Length of the operation
+    """
+    start = ready
+    for other_start, other_end, other in placed:
+        if other_end <= start or other not in conflicting:
+            continue
+        if other_start >= start + duration:
+            break
+        start = other_end
+    return start
+
+
+class PipelineSimulator:
+    """
+    Schedules splice cycles with overlapping operations.
+
+    Operations are placed in PIPELINE_OPS order, cycle after cycle, each
+    in the earliest gap after its predecessors have finished in which no
+    operation it cannot overlap with runs. So a preheat that fits fills
+    the feed before the cut, and a longer one follows the cut rather than
+    holding it back. With an empty overlap matrix this is the sequential
+    FirmwareSimulator schedule.
+    """
+
+    def __init__(self, config: Optional[SimConfig] = None,
+                 overlaps: frozenset = FIRMWARE_OVERLAPS):
+        """
+        Args:
+            config: Machine timing
+            overlaps: Pairs of operations that may run concurrently
+        """
+        self.config = config or SimConfig()
+        self.overlaps = overlaps
+        # Operation types each operation must wait for (itself included)
+        self._conflicts = {
+            op: [other for other in PIPELINE_OPS if not can_overlap(op, other, overlaps)]
+            for op in PIPELINE_OPS
+        }
+
+    def durations(self, index: int, segment: dict) -> dict[str, float]:
+        """Operation times of one cycle, as in the sequential simulator."""
+        config = self.config
+        length = segment['length_mm']
+        start_c = config.ambient_temp_c if index == 0 else config.cool_target_c
+        return {
+            "HEATING": config.heat_time_s(start_c),
+            "FEEDING": length / config.feed_rate_mm_s,
+            "CUTTING": config.cut_time_s,
+            "POSITIONING": config.position_time_s,
+            "SPLICING": config.weld_hold_s,
+            "COOLING": config.cool_time_s(),
+            "SPOOLING": length / (config.feed_rate_mm_s * config.spool_speedup),
+        }
+
+    def run(self, segments: list[dict]) -> PipelineResult:
+        """Schedule every segment of a recipe."""
+        conflicts = self._conflicts
+        placed: list[tuple[float, float, str]] = []   # (start, end, operation), by start
+        previous: dict[str, float] = {}               # End times of the previous cycle
+        finished = 0.0
+        sequential = 0.0
+        cycles = []
+
+        for index, segment in enumerate(segments):
+            durations = self.durations(index, segment)
+            ends: dict[str, float] = {}
+            # No operation of this cycle or later starts before the last weld ends
+            horizon = previous.get("SPLICING", 0.0)
+            placed = [interval for interval in placed if interval[1] > horizon]
+            for op in PIPELINE_OPS:
+                start = 0.0
+                for dependency, offset in PIPELINE_DEPENDENCIES[op]:
+                    start = max(start, (ends if offset == 0 else previous).get(dependency, 0.0))
+                start = earliest_gap(placed, conflicts[op], start, durations[op])
+                end = start + durations[op]
+                ends[op] = end
+                insort(placed, (start, end, op))
+
+            busy = sum(durations.values())
+            done = max(finished, max(ends.values()))
+            cycles.append(CycleBreakdown(
+                cycle=index,
+                heating_s=durations["HEATING"],
+                feeding_s=durations["FEEDING"],
+                cutting_s=durations["CUTTING"],
+                positioning_s=durations["POSITIONING"],
+                splicing_s=durations["SPLICING"],
+                cooling_s=durations["COOLING"],
+                spooling_s=durations["SPOOLING"],
+                total_s=done - finished,
+                overlap_saved_s=busy - (done - finished),
+            ))
+            sequential += busy
+            finished = done
+            previous = ends
+
+        return PipelineResult(total_time_s=finished, sequential_time_s=sequential, cycles=cycles)
+
+
+class RealtimePacer:
+    """
+    Holds the scheduler back so virtual time runs speed_factor times
+    faster than the wall clock.
+    """
+
+    def __init__(self, speed_factor: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if speed_factor <= 0:
+            raise ValueError("speed_factor must be positive")
+        self.speed_factor = speed_factor
+        self.clock = clock
+        self.sleep = sleep
+        self._origin: Optional[float] = None
+
+    def wait_until(self, virtual_time: float):
+        if self._origin is None:
+            self._origin = self.clock() - virtual_time / self.speed_factor
+        delay = self._origin + virtual_time / self.speed_factor - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+
+
+class EventScheduler:
+    """
+    Event queue on a virtual clock: actions run in time order (ties in
+    the order they were scheduled) and now jumps to each event's time.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.events = 0                   # Events processed
+        self._queue: list[tuple[float, int, Callable, tuple]] = []
+        self._order = itertools.count()
+
+    def schedule(self, delay: float, action: Callable, *args):
+        """Run action(*args) delay simulated seconds from now."""
+        heapq.heappush(self._queue, (self.now + max(0.0, delay), next(self._order), action, args))
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def run(self, until: Optional[float] = None,
+            pacer: Optional[RealtimePacer] = None) -> int:
+        """
+        Process events until the queue is empty (or until the given time).
+
+        Args:
+            until: Stop before the first event after this simulated time
+            pacer: Optional RealtimePacer for wall-clock pacing
+
+        Returns:
+            Number of events processed
+        """
+        queue = self._queue
+        processed = 0
+        while queue:
+            if until is not None and queue[0][0] > until:
+                self.now = until
+                break
+            when, _, action, args = heapq.heappop(queue)
+            if pacer is not None:
+                pacer.wait_until(when)
+            self.now = when
+            action(*args)
+            processed += 1
+        self.events += processed
+        return processed
 
 
 class FirmwareSimulator:
     """Simulates Splice3D firmware behavior."""
-    
-    def __init__(self, config: Optional[SimConfig] = None):
+
+    def __init__(self, config: Optional[SimConfig] = None,
+                 log: Optional[Callable[[SimEvent], Any]] = None,
+                 scheduler: Optional[EventScheduler] = None,
+                 rng: Optional[random.Random] = None,
+                 thermal: Optional[ThermalModel] = None):
+        """
+        Initialize the simulator.
+
+        Args:
+            config: Machine timing
+            log: Optional callback receiving a SimEvent per step
+            scheduler: Event scheduler to run on (default: a new one)
+            rng: Random source for weld failures (default: a new one)
+            thermal: Heater strategy (default: ThermalModel(), no optimization)
+        """
         self.config = config or SimConfig()
+        self.log = log
+        self.scheduler = scheduler or EventScheduler()
+        self.rng = rng or random.Random()
+        self.thermal = thermal or ThermalModel()
         self.state = State.IDLE
         self.segments = []
         self.current_segment = 0
-        self.current_temp = 25.0
+        self.current_temp = self.config.ambient_temp_c
         self.total_filament_mm = 0.0
         self.total_time_s = 0.0
         self.splices_completed = 0
-    
+        self.weld_retries = 0
+        self.preheats = 0
+        self.preheat_s = 0.0
+        self.thermal_cycles_avoided = 0
+        self._weld_temp_c = self.config.weld_temp_c       # Temperature of the current weld
+        self._cool_to_c = self.config.cool_target_c       # Target of the next cool-down
+        self._heater_idle_since = 0.0                     # Time the heater was last left idle
+        self._retries = 0                 # Retries of the current splice
+        self._redo = False                # Last weld failed
+        self._time_in_state: dict[State, float] = {}
+        self.result: Optional[SimResult] = None
+        self._started_at = 0.0
+
     def load_recipe(self, recipe_path: str) -> bool:
         """Load a splice recipe from JSON file."""
         try:
             with open(recipe_path, 'r') as f:
                 data = json.load(f)
-            
-            self.segments = data.get('segments', [])
-            self.current_segment = 0
-            self.state = State.READY
-            
-            print(f"[LOAD] Recipe loaded: {len(self.segments)} segments")
-            return True
         except Exception as e:
-            print(f"[ERROR] Failed to load recipe: {e}")
             self.state = State.ERROR
+            self._emit("error", detail={"message": f"Failed to load recipe: {e}"})
             return False
-    
-    def run(self) -> bool:
-        """Run the full simulation."""
+        self.load_segments(data.get('segments', []))
+        return True
+
+    def load_segments(self, segments: list[dict]):
+        """Load recipe segments ({"color": ..., "length_mm": ...})."""
+        self.segments = segments
+        self.current_segment = 0
+        self.state = State.READY
+        self._emit("load", detail={"segments": len(segments)})
+
+    def run(self, realtime: bool = False, pacer: Optional[RealtimePacer] = None) -> bool:
+        """
+        Run the full simulation.
+
+        Args:
+            realtime: Pace simulated time at config.speed_factor x wall clock
+            pacer: Pacer to use instead (implies realtime)
+
+        Returns:
+            True if every segment was completed
+        """
         if self.state != State.READY:
-            print("[ERROR] Not ready - load recipe first")
+            self._emit("error", detail={"message": "Not ready - load recipe first"})
             return False
-        
-        print(f"\n{'='*60}")
-        print("SPLICE3D SIMULATION")
-        print(f"{'='*60}\n")
-        
-        start_time = time.time()
-        
-        while self.state not in [State.COMPLETE, State.ERROR]:
-            self._step()
-        
-        elapsed = time.time() - start_time
-        
-        print(f"\n{'='*60}")
-        print("SIMULATION COMPLETE")
-        print(f"{'='*60}")
-        print(f"  Real time elapsed: {elapsed:.1f}s")
-        print(f"  Simulated time: {self.total_time_s:.1f}s ({self.total_time_s/60:.1f} min)")
-        print(f"  Total filament: {self.total_filament_mm:.1f}mm ({self.total_filament_mm/1000:.2f}m)")
-        print(f"  Splices completed: {self.splices_completed}")
-        
+
+        wall_start = time.perf_counter()
+        self._started_at = self.scheduler.now
+        events_before = self.scheduler.events
+        self.scheduler.schedule(0.0, self._start)
+        if pacer is None and realtime:
+            pacer = RealtimePacer(self.config.speed_factor)
+        self.scheduler.run(pacer=pacer)
+
+        self.result = SimResult(
+            completed=self.state == State.COMPLETE,
+            total_time_s=self.total_time_s,
+            total_filament_mm=self.total_filament_mm,
+            splices_completed=self.splices_completed,
+            segments=len(self.segments),
+            events=self.scheduler.events - events_before,
+            wall_time_s=time.perf_counter() - wall_start,
+            time_in_state={state.value: seconds
+                           for state, seconds in self._time_in_state.items()},
+            weld_retries=self.weld_retries,
+            preheats=self.preheats,
+            preheat_s=self.preheat_s,
+            thermal_cycles_avoided=self.thermal_cycles_avoided,
+        )
         return self.state == State.COMPLETE
-    
-    def _step(self):
-        """Execute one state machine step."""
-        if self.state == State.READY:
-            print("[START] Beginning splice sequence")
-            self._transition_to_feeding()
-        
-        elif self.state == State.FEEDING_A:
-            seg = self.segments[self.current_segment]
-            length = seg['length_mm']
-            feed_time = length / self.config.feed_rate_mm_s
-            
-            print(f"[FEED_A] Feeding {length:.1f}mm of color 0 ({feed_time:.1f}s)")
-            self._simulate_time(feed_time)
-            self.total_filament_mm += length
-            
-            self.state = State.CUTTING
-        
-        elif self.state == State.FEEDING_B:
-            seg = self.segments[self.current_segment]
-            length = seg['length_mm']
-            feed_time = length / self.config.feed_rate_mm_s
-            
-            print(f"[FEED_B] Feeding {length:.1f}mm of color 1 ({feed_time:.1f}s)")
-            self._simulate_time(feed_time)
-            self.total_filament_mm += length
-            
-            self.state = State.CUTTING
-        
-        elif self.state == State.CUTTING:
-            print(f"[CUT] Activating cutter ({self.config.cut_time_s}s)")
-            self._simulate_time(self.config.cut_time_s)
-            self.state = State.POSITIONING
-        
-        elif self.state == State.POSITIONING:
-            print(f"[POSITION] Aligning filaments ({self.config.position_time_s}s)")
-            self._simulate_time(self.config.position_time_s)
-            self.state = State.HEATING
-        
-        elif self.state == State.HEATING:
-            temp_diff = self.config.weld_temp_c - self.current_temp
-            heat_time = temp_diff / self.config.heat_rate_c_s
-            
-            print(f"[HEAT] Heating to {self.config.weld_temp_c}°C ({heat_time:.1f}s)")
-            self._simulate_time(heat_time)
-            self.current_temp = self.config.weld_temp_c
-            
-            self.state = State.WELDING
-        
-        elif self.state == State.WELDING:
-            print(f"[WELD] Compressing and holding ({self.config.weld_hold_s}s)")
-            self._simulate_time(self.config.weld_hold_s)
-            self.splices_completed += 1
-            
-            self.state = State.COOLING
-        
-        elif self.state == State.COOLING:
-            temp_diff = self.current_temp - self.config.cool_target_c
-            cool_time = temp_diff / self.config.cool_rate_c_s
-            
-            print(f"[COOL] Cooling to {self.config.cool_target_c}°C ({cool_time:.1f}s)")
-            self._simulate_time(cool_time)
-            self.current_temp = self.config.cool_target_c
-            
-            self.state = State.SPOOLING
-        
-        elif self.state == State.SPOOLING:
-            seg = self.segments[self.current_segment]
-            length = seg['length_mm']
-            spool_time = length / (self.config.feed_rate_mm_s * 1.5)  # Winder is faster
-            
-            print(f"[SPOOL] Winding {length:.1f}mm ({spool_time:.1f}s)")
-            self._simulate_time(spool_time)
-            
-            self.state = State.NEXT_SEGMENT
-        
-        elif self.state == State.NEXT_SEGMENT:
-            self.current_segment += 1
-            
-            if self.current_segment >= len(self.segments):
-                print(f"[DONE] All segments complete!")
-                self.state = State.COMPLETE
+
+    # --- State machine ------------------------------------------------------
+
+    def _start(self):
+        self._heater_idle_since = self.scheduler.now
+        self._emit("start")
+        if not self.segments:
+            self.state = State.COMPLETE
+            self._emit("done")
+            return
+        self._enter(self._feeding_state())
+
+    def _enter(self, state: State):
+        """Enter a state and schedule its completion."""
+        self.state = state
+        config = self.config
+        segment = self.segments[self.current_segment]
+
+        if state in (State.FEEDING_A, State.FEEDING_B):
+            duration = segment['length_mm'] / config.feed_rate_mm_s
+            detail = {"length_mm": segment['length_mm'], "color": segment.get('color', 0)}
+        elif state == State.CUTTING:
+            duration = config.cut_time_s
+            detail = None
+        elif state == State.POSITIONING:
+            duration = config.position_time_s
+            detail = None
+        elif state == State.HEATING:
+            self._weld_temp_c = self._segment_weld_temp(segment)
+            duration = (self._weld_temp_c - self._preheated_temp()) / config.heat_rate_c_s
+            detail = {"target_c": self._weld_temp_c}
+        elif state == State.WELDING:
+            duration = config.weld_hold_s
+            detail = None
+        elif state == State.COOLING:
+            duration = (self.current_temp - self._cool_to_c) / config.cool_rate_c_s
+            detail = {"target_c": self._cool_to_c}
+        elif state == State.SPOOLING:
+            duration = segment['length_mm'] / (config.feed_rate_mm_s * config.spool_speedup)
+            detail = {"length_mm": segment['length_mm']}
+        else:
+            raise ValueError(f"No timing for state {state.value}")
+
+        if duration < 0.0:
+            duration = 0.0
+        self._time_in_state[state] = self._time_in_state.get(state, 0.0) + duration
+        if self.log is not None:
+            self._emit("state", duration, detail or {})
+        self.scheduler.schedule(duration, self._complete, state, duration)
+
+    def _complete(self, state: State, duration: float):
+        """Apply the effect of a finished state and move on."""
+        self.total_time_s += duration
+        segment = self.segments[self.current_segment]
+
+        if state in (State.FEEDING_A, State.FEEDING_B):
+            self.total_filament_mm += segment['length_mm']
+            self._enter(State.CUTTING)
+        elif state == State.CUTTING:
+            self._enter(State.POSITIONING)
+        elif state == State.POSITIONING:
+            self._enter(State.HEATING)
+        elif state == State.HEATING:
+            self.current_temp = self._weld_temp_c
+            self._enter(State.WELDING)
+        elif state == State.WELDING:
+            self._redo = self._weld_failed()
+            if self._redo:
+                if self._retries >= self.config.max_weld_retries:
+                    self.state = State.ERROR
+                    self._emit("error", detail={
+                        "message": f"Weld failed after {self._retries} retries"})
+                    return
+                self._retries += 1
+                self.weld_retries += 1
             else:
-                print(f"\n--- Segment {self.current_segment + 1}/{len(self.segments)} ---")
-                self._transition_to_feeding()
-    
-    def _transition_to_feeding(self):
-        """Transition to appropriate feeding state based on color."""
-        seg = self.segments[self.current_segment]
-        color = seg.get('color', 0)
-        
-        if color == 0:
-            self.state = State.FEEDING_A
+                self.splices_completed += 1
+            self._cool_to_c = self._cool_down_target()
+            self._enter(State.COOLING)
+        elif state == State.COOLING:
+            self.current_temp = self._cool_to_c
+            self._heater_idle_since = self.scheduler.now
+            if self._redo:
+                # Failed weld: cool down, cut the joint off and splice again
+                self._emit("retry", detail={"retry": self._retries,
+                                            "max": self.config.max_weld_retries})
+                self._enter(State.CUTTING)
+            else:
+                self._enter(State.SPOOLING)
+        elif state == State.SPOOLING:
+            self._next_segment()
+
+    def _segment_weld_temp(self, segment: dict) -> float:
+        return self.thermal.weld_temps_c.get(segment.get('color', 0), self.config.weld_temp_c)
+
+    def _preheated_temp(self) -> float:
+        """Heater temperature at the start of HEATING."""
+        thermal = self.thermal
+        if not thermal.preheat or self.current_temp >= self._weld_temp_c:
+            return self.current_temp
+        # The heater ramps from when it was left idle, at most preheat_lead_s
+        window = self.scheduler.now - self._heater_idle_since
+        if thermal.preheat_lead_s is not None:
+            window = min(window, thermal.preheat_lead_s)
+        if window <= 0:
+            return self.current_temp
+        gained = min(self._weld_temp_c - self.current_temp, window * self.config.heat_rate_c_s)
+        self.preheats += 1
+        self.preheat_s += gained / self.config.heat_rate_c_s
+        return self.current_temp + gained
+
+    def _cool_down_target(self) -> float:
+        """Cool fully, unless the next splice can reuse the heat."""
+        thermal = self.thermal
+        following = self.current_segment + 1
+        if not thermal.heat_reuse or self._redo or following >= len(self.segments):
+            return self.config.cool_target_c
+        next_temp = self._segment_weld_temp(self.segments[following])
+        if abs(next_temp - self._weld_temp_c) > thermal.reuse_threshold_c:
+            return self.config.cool_target_c
+        target = max(self.config.cool_target_c, self._weld_temp_c - thermal.reuse_cool_c)
+        if target > self.config.cool_target_c:
+            self.thermal_cycles_avoided += 1
+        return target
+
+    def _weld_failed(self) -> bool:
+        rate = self.config.weld_failure_rate
+        return rate > 0 and self.rng.random() < rate
+
+    def _next_segment(self):
+        self.state = State.NEXT_SEGMENT
+        self.current_segment += 1
+        self._retries = 0
+        if self.current_segment >= len(self.segments):
+            self.state = State.COMPLETE
+            self._emit("done")
         else:
-            self.state = State.FEEDING_B
-    
-    def _simulate_time(self, seconds: float):
-        """Simulate time passing (optionally with real delays)."""
-        adjusted = seconds / self.config.speed_factor
-        self.total_time_s += seconds
-        
-        # Add small real delay for visual effect (capped at 0.1s)
-        if adjusted > 0:
-            time.sleep(min(adjusted, 0.1))
+            if self.log is not None:
+                self._emit("segment", detail={"total": len(self.segments)})
+            self._enter(self._feeding_state())
+
+    def _feeding_state(self) -> State:
+        """Feeding state for the current segment's color."""
+        if self.segments[self.current_segment].get('color', 0) == 0:
+            return State.FEEDING_A
+        return State.FEEDING_B
+
+    def _emit(self, kind: str, duration: float = 0.0, detail: Optional[dict] = None):
+        if self.log is not None:
+            self.log(SimEvent(self.scheduler.now - self._started_at, kind, self.state.value,
+                              self.current_segment, duration, detail or {}))
+
+
+def compare_thermal(segments: list[dict], config: Optional[SimConfig] = None,
+                    thermal: Optional[ThermalModel] = None) -> ThermalSavings:
+    """
+    Cycle time saved on a recipe by a thermal strategy.
+
+    The baseline runs with the same weld temperatures and neither
+    preheating nor heat reuse.
+
+    Args:
+        segments: Recipe segments ({"color": ..., "length_mm": ...})
+        config: Machine timing (weld failures should be off)
+        thermal: Strategy to evaluate (default: preheat and heat reuse)
+
+    Returns:
+        ThermalSavings
+    """
+    thermal = thermal or ThermalModel(preheat=True, heat_reuse=True)
+    results = []
+    for model in (replace(thermal, preheat=False, heat_reuse=False), thermal):
+        sim = FirmwareSimulator(config, thermal=model)
+        sim.load_segments(segments)
+        sim.run()
+        results.append(sim.result)
+    baseline, optimized = results
+    return ThermalSavings(
+        baseline_s=baseline.total_time_s,
+        optimized_s=optimized.total_time_s,
+        heating_saved_s=(baseline.time_in_state.get("HEATING", 0.0)
+                         - optimized.time_in_state.get("HEATING", 0.0)),
+        cooling_saved_s=(baseline.time_in_state.get("COOLING", 0.0)
+                         - optimized.time_in_state.get("COOLING", 0.0)),
+        preheats=optimized.preheats,
+        thermal_cycles_avoided=optimized.thermal_cycles_avoided,
+    )
+
+
+def format_event(event: SimEvent) -> str:
+    """Human-readable line for a SimEvent."""
+    d = event.detail
+    if event.kind == "load":
+        return f"[LOAD] Recipe loaded: {d['segments']} segments"
+    if event.kind == "start":
+        return "[START] Beginning splice sequence"
+    if event.kind == "segment":
+        return f"\n--- Segment {event.segment + 1}/{d['total']} ---"
+    if event.kind == "done":
+        return "[DONE] All segments complete!"
+    if event.kind == "error":
+        return f"[ERROR] {d['message']}"
+    if event.kind == "retry":
+        return f"[RETRY] Weld failed, splicing again ({d['retry']}/{d['max']})"
+
+    state, seconds = event.state, f"{event.duration_s:.1f}s"
+    if state == "FEEDING_A" or state == "FEEDING_B":
+        return (f"[FEED_{state[-1]}] Feeding {d['length_mm']:.1f}mm of color "
+                f"{d['color']} ({seconds})")
+    if state == "CUTTING":
+        return f"[CUT] Activating cutter ({seconds})"
+    if state == "POSITIONING":
+        return f"[POSITION] Aligning filaments ({seconds})"
+    if state == "HEATING":
+        return f"[HEAT] Heating to {d['target_c']}°C ({seconds})"
+    if state == "WELDING":
+        return f"[WELD] Compressing and holding ({seconds})"
+    if state == "COOLING":
+        return f"[COOL] Cooling to {d['target_c']}°C ({seconds})"
+    if state == "SPOOLING":
+        return f"[SPOOL] Winding {d['length_mm']:.1f}mm ({seconds})"
+    return f"[{state}] ({seconds})"
+
+
+def print_pipeline(result: PipelineResult):
+    """Print the summary of an overlapped schedule."""
+    cycles = [cycle.total_s for cycle in result.cycles]
+    print(f"  Overlapped schedule: {result.total_time_s:.1f}s "
+          f"({result.speedup:.3f}x, {result.overlap_saved_s:.1f}s saved, "
+          f"overlap ratio {result.overlap_ratio:.2f})")
+    if cycles:
+        print(f"    Cycle: {sum(cycles) / len(cycles):.1f}s average, {min(cycles):.1f}s best, "
+              f"{max(cycles):.1f}s worst; {result.splices_per_hour:.1f} splices/hour")
 
 
 def main():
@@ -223,7 +735,18 @@ def main():
         "--speed", "-s",
         type=float,
         default=100.0,
-        help="Simulation speed factor (default: 100x)"
+        help="Speed factor of --realtime (default: 100x)"
+    )
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="Pace the simulation against the wall clock instead of running at full speed"
+    )
+    parser.add_argument(
+        "--log",
+        choices=["text", "json", "none"],
+        default="text",
+        help="Step log: text, JSON lines or none (default: text)"
     )
     parser.add_argument(
         "--temp",
@@ -237,23 +760,97 @@ def main():
         default=50.0,
         help="Feed rate in mm/s"
     )
-    
+    parser.add_argument(
+        "--preheat",
+        action="store_true",
+        help="Preheat for the next splice while spooling and feeding"
+    )
+    parser.add_argument(
+        "--preheat-lead",
+        type=float,
+        default=5.0,
+        help="Longest preheat before a splice in seconds, 0 for no limit (default: 5)"
+    )
+    parser.add_argument(
+        "--heat-reuse",
+        action="store_true",
+        help="Cool only partly when the next weld temperature is within 15°C"
+    )
+    parser.add_argument(
+        "--overlap",
+        metavar="MATRIX",
+        help="Also schedule the recipe with overlapping operations: 'firmware' "
+             "(speed_optimizer rules), 'none' or pairs like HEATING+FEEDING,COOLING+SPOOLING"
+    )
+    parser.add_argument(
+        "--color-temp",
+        action="append",
+        default=[],
+        metavar="COLOR=TEMP",
+        help="Weld temperature of a color's material (repeatable)"
+    )
+
     args = parser.parse_args()
-    
+
     config = SimConfig(
         speed_factor=args.speed,
         weld_temp_c=args.temp,
         feed_rate_mm_s=args.feed_rate
     )
-    
-    sim = FirmwareSimulator(config)
-    
+    try:
+        weld_temps = {int(color): float(temp) for color, temp in
+                      (item.split("=", 1) for item in args.color_temp)}
+    except ValueError:
+        parser.error("--color-temp expects COLOR=TEMP, e.g. 1=240")
+    try:
+        overlaps = parse_overlaps(args.overlap) if args.overlap else None
+    except ValueError as e:
+        parser.error(str(e))
+    thermal = ThermalModel(preheat=args.preheat, preheat_lead_s=args.preheat_lead or None,
+                           heat_reuse=args.heat_reuse, weld_temps_c=weld_temps)
+
+    log = None
+    if args.log == "text":
+        log = lambda event: print(format_event(event))  # noqa: E731
+    elif args.log == "json":
+        log = lambda event: print(json.dumps(asdict(event)))  # noqa: E731
+
+    sim = FirmwareSimulator(config, log=log, thermal=thermal)
+
     if not sim.load_recipe(args.recipe):
+        if log is None:
+            print(f"[ERROR] Failed to load recipe: {args.recipe}")
         return 1
-    
-    if not sim.run():
+
+    if args.log == "text":
+        print(f"\n{'='*60}")
+        print("SPLICE3D SIMULATION")
+        print(f"{'='*60}\n")
+
+    if not sim.run(realtime=args.realtime):
         return 1
-    
+
+    result = sim.result
+    if args.log != "json":
+        print(f"\n{'='*60}")
+        print("SIMULATION COMPLETE")
+        print(f"{'='*60}")
+        print(f"  Real time elapsed: {result.wall_time_s:.3f}s ({result.events} events)")
+        print(f"  Simulated time: {result.total_time_s:.1f}s ({result.total_time_s/60:.1f} min)")
+        print(f"  Total filament: {result.total_filament_mm:.1f}mm "
+              f"({result.total_filament_mm/1000:.2f}m)")
+        print(f"  Splices completed: {result.splices_completed}")
+        if args.preheat or args.heat_reuse:
+            savings = compare_thermal(sim.segments, config, thermal)
+            print(f"  Thermal optimization: {savings.saved_s:.1f}s saved "
+                  f"({savings.saved_percent:.1f}% of {savings.baseline_s:.1f}s)")
+            print(f"    Heating: {savings.heating_saved_s:.1f}s less "
+                  f"({savings.preheats} preheats)")
+            print(f"    Cooling: {savings.cooling_saved_s:.1f}s less "
+                  f"({savings.thermal_cycles_avoided} thermal cycles avoided)")
+        if overlaps is not None:
+            print_pipeline(PipelineSimulator(config, overlaps).run(sim.segments))
+
     return 0
 
 
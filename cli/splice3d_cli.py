@@ -8,12 +8,16 @@ Usage:
     python splice3d_cli.py --port /dev/ttyUSB0 --recipe recipe.json
     python splice3d_cli.py --port /dev/ttyUSB0 --monitor
     python splice3d_cli.py --port /dev/ttyUSB0 --command STATUS
+    python splice3d_cli.py --port /dev/ttyUSB0 --record telemetry/ --stream verbose
 """
 
 import argparse
 import json
 import sys
+import threading
 import time
+from pathlib import Path
+from typing import Optional
 
 try:
     import serial
@@ -22,6 +26,15 @@ except ImportError:
     print("Error: pyserial not installed. Run: pip install pyserial")
     sys.exit(1)
 
+# Add parent to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "postprocessor"))
+
+from recipe_binary import decode_recipe, is_binary_recipe
+from recipe_generator import SpliceRecipe
+from recipe_upload import RecipeUploader
+from serial_reader import SerialReader
+from telemetry_recorder import TelemetryRecorder
+
 
 class Splice3DCli:
     """CLI interface for Splice3D machine."""
@@ -31,6 +44,7 @@ class Splice3DCli:
         self.baud = baud
         self.timeout = timeout
         self.serial = None
+        self.reader: Optional[SerialReader] = None
     
     def connect(self) -> bool:
         """Connect to the Splice3D machine."""
@@ -48,6 +62,7 @@ class Splice3DCli:
                 line = self.serial.readline().decode('utf-8', errors='replace').strip()
                 print(f"< {line}")
             
+            self.reader = SerialReader(self.serial).start()
             return True
         except serial.SerialException as e:
             print(f"Error connecting to {self.port}: {e}")
@@ -55,47 +70,64 @@ class Splice3DCli:
     
     def disconnect(self):
         """Disconnect from the machine."""
+        if self.reader:
+            self.reader.stop()
+            self.reader = None
         if self.serial:
             self.serial.close()
             self.serial = None
     
     def send_command(self, command: str) -> list[str]:
         """Send a command and return response lines."""
-        if not self.serial:
+        if not self.reader:
             return []
         
-        self.serial.write(f"{command}\n".encode('utf-8'))
-        self.serial.flush()
-        
-        responses = []
-        start_time = time.time()
-        
-        while time.time() - start_time < self.timeout:
-            if self.serial.in_waiting:
-                line = self.serial.readline().decode('utf-8', errors='replace').strip()
-                if line:
-                    responses.append(line)
-                    # Break on terminal responses
-                    if line.startswith('OK') or line.startswith('ERROR'):
-                        break
-            else:
-                time.sleep(0.01)
-        
-        return responses
+        return self.reader.command(command, timeout=self.timeout)
     
     def send_recipe(self, recipe_path: str) -> bool:
-        """Send a splice recipe to the machine."""
+        """
+        Send a splice recipe (JSON or binary .s3dr) to the machine.
+        
+        Uses the chunked upload of recipe_upload; firmware without it gets
+        the legacy single-line RECIPE command.
+        """
         try:
-            with open(recipe_path, 'r') as f:
-                recipe = json.load(f)
-        except (IOError, json.JSONDecodeError) as e:
+            with open(recipe_path, 'rb') as f:
+                data = f.read()
+            if is_binary_recipe(data):
+                recipe = decode_recipe(data)
+            else:
+                recipe = SpliceRecipe(**json.loads(data))
+        except (IOError, ValueError, TypeError) as e:
             print(f"Error reading recipe: {e}")
             return False
+        if not self.reader:
+            return False
+        
+        print(f"Sending recipe ({len(recipe.segments)} segments)...")
         
-        # Convert to compact JSON for transmission
-        compact = json.dumps(recipe, separators=(',', ':'))
+        def progress(acked: int, total: int):
+            print(f"\r  {acked}/{total} segments", end='', flush=True)
         
-        print(f"Sending recipe ({len(recipe.get('segments', []))} segments)...")
+        with self.reader.exclusive(self.timeout) as channel:
+            result = RecipeUploader(channel, progress=progress).upload(recipe)
+        if result.segments:
+            print()
+        
+        if result.unsupported:
+            print("Firmware has no chunked upload (update it to enable it), "
+                  "sending single RECIPE line")
+            return self._send_recipe_line(recipe)
+        
+        print(f"< {result.message}")
+        if result.ok:
+            print(f"Uploaded {result.payload_bytes} bytes in {result.elapsed_s:.2f}s "
+                  f"({result.throughput_bps:.0f} B/s, {result.resent_chunks} chunks resent)")
+        return result.ok
+    
+    def _send_recipe_line(self, recipe: SpliceRecipe) -> bool:
+        """Send a recipe as one RECIPE <json> line (firmware before chunked upload)."""
+        compact = json.dumps({"segments": recipe.segments}, separators=(',', ':'))
         responses = self.send_command(f"RECIPE {compact}")
         
         for line in responses:
@@ -118,22 +150,45 @@ class Splice3DCli:
     def monitor(self, interval: float = 0.5):
         """Monitor machine progress until complete or interrupted."""
         print("Monitoring progress (Ctrl+C to stop)...")
+        finished = threading.Event()
+        
+        def show(line: str):
+            print(f"< {line}")
+            if line.startswith('DONE') or line.startswith('ERROR'):
+                finished.set()
         
+        unsubscribe = self.reader.subscribe(show)
         try:
-            while True:
-                # Check for any incoming data
-                while self.serial.in_waiting:
-                    line = self.serial.readline().decode('utf-8', errors='replace').strip()
-                    if line:
-                        print(f"< {line}")
-                        if line.startswith('DONE'):
-                            return
-                        if line.startswith('ERROR'):
-                            return
-                
-                time.sleep(interval)
+            # Lines arrive on the reader thread; wake up only for Ctrl+C
+            while not finished.wait(interval):
+                pass
         except KeyboardInterrupt:
             print("\nMonitoring stopped.")
+        finally:
+            unsubscribe()
+    
+    def record(self, directory: str, mode: str = "VERBOSE", interval_ms: Optional[int] = None):
+        """Turn on the telemetry stream and record it until interrupted."""
+        responses = self.send_command(f"STREAM {mode.upper()}")
+        if interval_ms is not None and responses and responses[-1].startswith("OK"):
+            responses = self.send_command(f"STREAM INTERVAL {interval_ms}")
+        if not responses or not responses[-1].startswith("OK"):
+            print(f"Could not start telemetry stream: {responses}")
+            return False
+        
+        print(f"Recording telemetry to {directory} (Ctrl+C to stop)...")
+        with TelemetryRecorder(Path(directory)) as recorder:
+            unsubscribe = self.reader.subscribe(recorder.feed)
+            try:
+                while True:
+                    time.sleep(1.0)
+                    print(f"\r{recorder.samples} samples", end="", flush=True)
+            except KeyboardInterrupt:
+                print("\nRecording stopped.")
+            finally:
+                unsubscribe()
+                self.send_command("STREAM OFF")
+        return True
 
 
 def list_ports():
@@ -163,7 +218,7 @@ def main():
     )
     parser.add_argument(
         "-r", "--recipe",
-        help="Path to splice recipe JSON file"
+        help="Path to splice recipe (JSON or binary .s3dr)"
     )
     parser.add_argument(
         "-c", "--command",
@@ -179,6 +234,22 @@ def main():
         action="store_true",
         help="Start splicing after sending recipe"
     )
+    parser.add_argument(
+        "--record",
+        metavar="DIR",
+        help="Record the telemetry stream to a directory"
+    )
+    parser.add_argument(
+        "--stream",
+        choices=["summary", "verbose"],
+        default="verbose",
+        help="Telemetry stream mode for --record (default: verbose)"
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        help="Telemetry stream interval in ms for --record"
+    )
     parser.add_argument(
         "-l", "--list-ports",
         action="store_true",
@@ -220,6 +291,10 @@ def main():
         elif args.monitor:
             cli.monitor()
         
+        elif args.record:
+            if not cli.record(args.record, args.stream, args.interval):
+                return 1
+        
         else:
             # Interactive mode
             print("Interactive mode. Type 'help' for commands, 'quit' to exit.")
@@ -23,6 +23,7 @@
 // ============================================================
 #define SERIAL_BAUD 115200
 #define SERIAL_BUFFER_SIZE 512  // More RAM = bigger buffer
+#define RECIPE_UPLOAD_WINDOW 4  // RCHUNK lines the host may send ahead of ACKs
 
 // ============================================================
 // PIN MAPPINGS - BTT SKR Mini E3 v2.0
@@ -77,6 +77,18 @@ void SerialHandler::processLine(const char* line) {
     if (strcmp(cmd, "RECIPE") == 0) {
         handleRecipe(args);
     }
+    else if (strcmp(cmd, "RBEGIN") == 0) {
+        handleRecipeBegin(args);
+    }
+    else if (strcmp(cmd, "RCHUNK") == 0) {
+        handleRecipeChunk(line);
+    }
+    else if (strcmp(cmd, "REND") == 0) {
+        handleRecipeEnd(args);
+    }
+    else if (strcmp(cmd, "RABORT") == 0) {
+        handleRecipeAbort();
+    }
     else if (strcmp(cmd, "START") == 0) {
         handleStart();
     }
@@ -242,6 +254,7 @@ void SerialHandler::handleStatus() {
 void SerialHandler::handleHelp() {
     Serial.println(F("Splice3D Commands:"));
     Serial.println(F("  RECIPE <json>  - Load splice recipe"));
+    Serial.println(F("  RBEGIN/RCHUNK/REND/RABORT - Chunked recipe upload"));
     Serial.println(F("  START          - Begin splicing"));
     Serial.println(F("  PAUSE          - Pause operation"));
     Serial.println(F("  RESUME         - Resume from pause"));
@@ -5,6 +5,10 @@
  * 
  * Protocol:
  *   RECIPE <json>     - Load a splice recipe
+ *   RBEGIN <n> <encoding> <scale> - Start a chunked recipe upload
+ *   RCHUNK <seq> <base64> <crc>   - Upload chunk (answered with ACK/NAK)
+ *   REND <crc>        - Finish the chunked upload and load the recipe
+ *   RABORT            - Discard the chunked upload
  *   START             - Begin splicing
  *   PAUSE             - Pause operation
  *   RESUME            - Resume from pause
@@ -43,6 +47,10 @@ private:
     
     // Command handlers
     void handleRecipe(const char* args);
+    void handleRecipeBegin(const char* args);
+    void handleRecipeChunk(const char* line);
+    void handleRecipeEnd(const char* args);
+    void handleRecipeAbort();
     void handleStart();
     void handlePause();
     void handleResume();
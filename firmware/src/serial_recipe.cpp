@@ -0,0 +1,228 @@
+/**
+ * Splice3D serial chunked recipe upload (RBEGIN / RCHUNK / REND / RABORT).
+ *
+ * The host side and the protocol are documented in
+ * postprocessor/recipe_upload.py. Segments arrive as base64-encoded
+ * 5-byte records (uint8 color, uint32 little-endian length in 1/scale mm),
+ * each line protected by a CRC-32 of its text, and the whole recipe by a
+ * CRC-32 of all records checked at REND.
+ */
+
+#include "serial_handler.h"
+#include "config.h"
+#include "state_machine.h"
+
+#include <stdlib.h>
+#include <string.h>
+
+extern StateMachine stateMachine;
+
+namespace {
+const uint8_t LENGTH_SCALED = 1;
+const uint8_t RECORD_SIZE = 5;
+// Decoded bytes of one RCHUNK line (the line buffer holds 255 characters)
+const size_t MAX_CHUNK_BYTES = 192;
+
+struct RecipeUpload {
+    bool active;
+    bool nakSent;          // A NAK was sent for the current run of bad chunks
+    uint16_t count;        // Segments announced by RBEGIN
+    uint16_t received;     // Segments stored so far
+    uint16_t expected;     // Sequence number of the next chunk
+    uint32_t scale;        // Length units per mm
+    uint32_t crc;          // CRC-32 of the records stored so far
+};
+
+RecipeUpload upload = {};
+SpliceSegment uploadSegments[MAX_SEGMENTS];
+// Segments of the last completed upload, to answer a repeated REND
+uint16_t loadedCount = 0;
+
+// CRC-32 as computed by zlib.crc32(); chain calls to extend a CRC
+uint32_t crc32Update(uint32_t crc, const uint8_t* data, size_t length) {
+    crc = ~crc;
+    while (length--) {
+        crc ^= *data++;
+        for (uint8_t bit = 0; bit < 8; bit++) {
+            crc = (crc >> 1) ^ (0xEDB88320UL & (0UL - (crc & 1UL)));
+        }
+    }
+    return ~crc;
+}
+
+int8_t base64Value(char c) {
+    if (c >= 'A' && c <= 'Z') return c - 'A';
+    if (c >= 'a' && c <= 'z') return c - 'a' + 26;
+    if (c >= '0' && c <= '9') return c - '0' + 52;
+    if (c == '+') return 62;
+    if (c == '/') return 63;
+    return -1;
+}
+
+// Decode padded base64; returns the decoded length, or -1 if invalid
+int base64Decode(const char* text, size_t length, uint8_t* out, size_t capacity) {
+    if (length % 4) return -1;
+    size_t written = 0;
+    for (size_t i = 0; i < length; i += 4) {
+        const bool last = i + 4 == length;
+        const uint8_t padding = last ? (text[i + 3] == '=') + (text[i + 2] == '=') : 0;
+        uint32_t quad = 0;
+        for (uint8_t j = 0; j < 4; j++) {
+            const int8_t value = j >= 4 - padding ? 0 : base64Value(text[i + j]);
+            if (value < 0) return -1;
+            quad = (quad << 6) | value;
+        }
+        const uint8_t bytes = 3 - padding;
+        if (written + bytes > capacity) return -1;
+        for (uint8_t j = 0; j < bytes; j++) {
+            out[written++] = quad >> (16 - 8 * j);
+        }
+    }
+    return written;
+}
+
+void printLoaded(uint16_t count) {
+    Serial.print(F("OK RECIPE_LOADED "));
+    Serial.print(count);
+    Serial.println(F(" segments"));
+}
+
+// NAK the first bad chunk of a run; later ones are dropped silently
+void nak(const __FlashStringHelper* reason) {
+    if (upload.nakSent) return;
+    upload.nakSent = true;
+    Serial.print(F("NAK "));
+    Serial.print(upload.expected);
+    Serial.print(' ');
+    Serial.println(reason);
+}
+}  // namespace
+
+void SerialHandler::handleRecipeBegin(const char* args) {
+    char* end = nullptr;
+    const unsigned long count = args ? strtoul(args, &end, 10) : 0;
+    const long encoding = end && *end == ' ' ? strtol(end + 1, &end, 10) : -1;
+    const long scale = end && *end == ' ' ? strtol(end + 1, &end, 10) : -1;
+    if (!end || *end != '\0' || encoding < 0 || scale < 0) {
+        Serial.println(F("ERROR Invalid RBEGIN"));
+        return;
+    }
+    if (encoding != LENGTH_SCALED || scale < 1) {
+        Serial.println(F("ERROR Unsupported encoding"));
+        return;
+    }
+    if (count > MAX_SEGMENTS) {
+        Serial.print(F("ERROR RECIPE_TOO_LARGE max="));
+        Serial.println(MAX_SEGMENTS);
+        return;
+    }
+
+    upload = {};
+    upload.active = true;
+    upload.count = count;
+    upload.scale = scale;
+    loadedCount = 0;
+    Serial.print(F("OK RBEGIN "));
+    Serial.println(RECIPE_UPLOAD_WINDOW);
+}
+
+void SerialHandler::handleRecipeChunk(const char* line) {
+    if (!upload.active) {
+        Serial.println(F("ERROR No upload in progress"));
+        return;
+    }
+
+    // "RCHUNK <seq> <base64 records> <crc>"; the CRC covers the text before it
+    const char* crcText = strrchr(line, ' ');
+    char* end = nullptr;
+    const uint32_t crc = crcText ? strtoul(crcText + 1, &end, 16) : 0;
+    if (!crcText || strlen(crcText + 1) != 8 || *end != '\0'
+            || crc32Update(0, reinterpret_cast<const uint8_t*>(line), crcText - line) != crc) {
+        nak(F("BAD_CRC"));
+        return;
+    }
+
+    const char* seqText = strchr(line, ' ');
+    const unsigned long seq = strtoul(seqText + 1, &end, 10);
+    if (end == seqText + 1 || *end != ' ' || end >= crcText) {
+        nak(F("BAD_FORMAT"));
+        return;
+    }
+    uint8_t records[MAX_CHUNK_BYTES];
+    const int length = base64Decode(end + 1, crcText - (end + 1), records, sizeof(records));
+    if (length < 0 || length % RECORD_SIZE) {
+        nak(F("BAD_FORMAT"));
+        return;
+    }
+
+    if (seq < upload.expected) {
+        // Duplicate after a lost ACK
+        Serial.print(F("ACK "));
+        Serial.println(upload.expected - 1);
+        return;
+    }
+    if (seq > upload.expected) {
+        nak(F("OUT_OF_ORDER"));
+        return;
+    }
+    const uint16_t segments = length / RECORD_SIZE;
+    if (upload.received + segments > upload.count) {
+        nak(F("OVERFLOW"));
+        return;
+    }
+
+    for (uint16_t i = 0; i < segments; i++) {
+        const uint8_t* record = records + i * RECORD_SIZE;
+        const uint32_t units = static_cast<uint32_t>(record[1])
+            | static_cast<uint32_t>(record[2]) << 8
+            | static_cast<uint32_t>(record[3]) << 16
+            | static_cast<uint32_t>(record[4]) << 24;
+        uploadSegments[upload.received + i].colorIndex = record[0];
+        uploadSegments[upload.received + i].lengthMm =
+            static_cast<float>(units) / static_cast<float>(upload.scale);
+    }
+    upload.received += segments;
+    upload.crc = crc32Update(upload.crc, records, length);
+    upload.expected++;
+    upload.nakSent = false;
+    Serial.print(F("ACK "));
+    Serial.println(seq);
+}
+
+void SerialHandler::handleRecipeEnd(const char* args) {
+    if (!upload.active) {
+        // REND repeated after a lost OK: the recipe is already loaded
+        if (loadedCount > 0) {
+            printLoaded(loadedCount);
+        } else {
+            Serial.println(F("ERROR No upload in progress"));
+        }
+        return;
+    }
+    if (upload.received != upload.count) {
+        Serial.print(F("ERROR Incomplete recipe "));
+        Serial.print(upload.received);
+        Serial.print('/');
+        Serial.println(upload.count);
+        return;
+    }
+
+    char* end = nullptr;
+    const uint32_t crc = args ? strtoul(args, &end, 16) : 0;
+    upload.active = false;
+    if (!args || end == args || *end != '\0' || crc != upload.crc) {
+        Serial.println(F("ERROR Recipe checksum mismatch"));
+        return;
+    }
+    if (!stateMachine.loadRecipe(uploadSegments, upload.count)) {
+        Serial.println(F("ERROR Failed to load recipe"));
+        return;
+    }
+    loadedCount = upload.count;
+    printLoaded(loadedCount);
+}
+
+void SerialHandler::handleRecipeAbort() {
+    upload.active = false;
+    Serial.println(F("OK RABORT"));
+}
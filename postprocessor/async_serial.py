@@ -0,0 +1,407 @@
+"""
+Asyncio Serial Transport for Splice3D
+
+The Splice3D line protocol (RECIPE, START, STATUS, STREAM, TEMP, ...) on
+top of an asyncio stream pair, for hosts that run other asyncio services
+next to the machine connection. It speaks the same protocol as the
+thread-based serial_reader.SerialReader:
+
+- command() sends a command and awaits its response lines. Any number
+  of tasks can issue commands concurrently; responses are matched to
+  commands in the order they were sent.
+- lines() and telemetry() are async iterators over the lines that are
+  not part of a response (status, DONE, STREAM JSON; the JSON records
+  arrive even while commands are pending). Every iterator gets its own
+  bounded queue, so a slow consumer loses its oldest lines instead of
+  stalling the connection.
+- wait_for() lets any number of tasks wait for a particular line.
+
+The streams come from pyserial-asyncio (open_serial(), optional extra
+"asyncio"), or from anything else that provides an asyncio
+StreamReader/StreamWriter pair, such as a TCP serial server
+(asyncio.open_connection) or fake_firmware.open_fake_connection().
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional, Sequence, Union
+
+try:
+    from .recipe_generator import SpliceRecipe
+    from .recipe_upload import RecipeUploader, UploadResult
+    from .serial_reader import LineChannel, is_unsolicited, response_prefixes
+except ImportError:  # Imported as a top-level module
+    from recipe_generator import SpliceRecipe
+    from recipe_upload import RecipeUploader, UploadResult
+    from serial_reader import LineChannel, is_unsolicited, response_prefixes
+
+logger = logging.getLogger(__name__)
+
+# Lines kept per iterator before the oldest are dropped
+DEFAULT_QUEUE_SIZE = 1000
+
+_CLOSED = object()
+
+
+class _Pending:
+    """A command waiting for its response lines."""
+
+    def __init__(self, expect: Sequence[str], future: asyncio.Future):
+        self.expect = tuple(expect)
+        self.lines: list[str] = []
+        self.future = future
+
+
+class LineSubscription:
+    """
+    Async iterator over unsolicited lines, returned by AsyncSplice3D.lines().
+    """
+
+    def __init__(self, client: "AsyncSplice3D", maxsize: int):
+        self._client = client
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def _put(self, item):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    def __aiter__(self) -> "LineSubscription":
+        return self
+
+    async def __anext__(self) -> str:
+        item = await self._queue.get()
+        if item is _CLOSED:
+            raise StopAsyncIteration
+        return item
+
+    def close(self):
+        """Stop receiving lines; the iterator ends after the queued ones."""
+        self._client._subscriptions.discard(self)
+        self._put(_CLOSED)
+
+
+class AsyncSplice3D:
+    """
+    Asyncio connection to one Splice3D machine.
+    """
+
+    def __init__(self,
+                 reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter,
+                 timeout: float = 2.0,
+                 name: str = "splice3d"):
+        """
+        Initialize the connection (call start() or use async with).
+
+        Args:
+            reader: Stream of lines from the machine
+            writer: Stream to the machine
+            timeout: Default command timeout in seconds
+            name: Name used in log messages
+        """
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.name = name
+
+        self._pending: deque[_Pending] = deque()
+        self._subscriptions: set[LineSubscription] = set()
+        self._waiters: list[tuple[Callable[[str], bool], asyncio.Future]] = []
+        self._channel: Optional[LineChannel] = None
+        self._channel_done: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @classmethod
+    async def open_serial(cls, port: str, baud: int = 115200, **kwargs) -> "AsyncSplice3D":
+        """
+        Open a serial port with pyserial-asyncio and start reading.
+
+        Raises:
+            ImportError: If pyserial-asyncio is not installed
+        """
+        try:
+            import serial_asyncio
+        except ImportError:
+            raise ImportError("The asyncio transport needs pyserial-asyncio. "
+                              "Run: pip install pyserial-asyncio") from None
+        reader, writer = await serial_asyncio.open_serial_connection(url=port, baudrate=baud)
+        return cls(reader, writer, name=port, **kwargs).start()
+
+    # --- Lifecycle ----------------------------------------------------------
+
+    @property
+    def connected(self) -> bool:
+        return self._task is not None and not self._closed
+
+    def start(self) -> "AsyncSplice3D":
+        """Start the read task (from within the event loop)."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._read_loop())
+        return self
+
+    async def close(self):
+        """Stop reading, close the writer and end all iterators and waiters."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._shutdown(ConnectionError(f"{self.name}: connection closed"))
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+    async def __aenter__(self) -> "AsyncSplice3D":
+        return self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # --- Commands -----------------------------------------------------------
+
+    async def command(self, command: str,
+                      timeout: Optional[float] = None,
+                      expect: Optional[Sequence[str]] = None) -> list[str]:
+        """
+        Send a command and await its response.
+
+        Args:
+            command: Command line without newline
+            timeout: Seconds to wait (default: the connection's timeout)
+            expect: Prefixes of the line that completes the response
+                (default: serial_reader.response_prefixes(command))
+
+        Returns:
+            The response lines, the terminal line last. On timeout, the
+            lines received so far (possibly none).
+
+        Raises:
+            ConnectionError: If the connection is closed
+        """
+        if not self.connected:
+            raise ConnectionError(f"{self.name}: not connected")
+        while self._channel_done is not None:
+            await asyncio.shield(self._channel_done)
+        pending = _Pending(expect or response_prefixes(command),
+                           asyncio.get_running_loop().create_future())
+        # No await between queueing and writing keeps both in the same order
+        self._pending.append(pending)
+        self.writer.write(f"{command}\n".encode('utf-8'))
+        await self.writer.drain()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(pending.future),
+                                          self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            if pending in self._pending:
+                self._pending.remove(pending)
+            return list(pending.lines)
+
+    async def status(self) -> str:
+        """Query the machine state line ("STATUS IDLE ..."), or "" on timeout."""
+        responses = await self.command("STATUS")
+        return responses[-1] if responses else ""
+
+    async def start_splicing(self) -> bool:
+        return self._ok(await self.command("START"))
+
+    async def pause(self) -> bool:
+        return self._ok(await self.command("PAUSE"))
+
+    async def resume(self) -> bool:
+        return self._ok(await self.command("RESUME"))
+
+    async def abort(self) -> bool:
+        return self._ok(await self.command("ABORT"))
+
+    async def set_temperature(self, value: Union[float, str]) -> list[str]:
+        """Send TEMP <value> (a temperature or a TEMP subcommand)."""
+        return await self.command(f"TEMP {value}")
+
+    async def stream(self, mode: str = "SUMMARY", interval_ms: Optional[int] = None) -> bool:
+        """
+        Set the firmware's telemetry stream (STREAM OFF|SUMMARY|VERBOSE).
+
+        Args:
+            mode: Stream mode
+            interval_ms: Optional stream interval (STREAM INTERVAL)
+        """
+        ok = self._ok(await self.command(f"STREAM {mode.upper()}"))
+        if ok and interval_ms is not None:
+            ok = self._ok(await self.command(f"STREAM INTERVAL {int(interval_ms)}"))
+        return ok
+
+    async def upload_recipe(self, recipe: SpliceRecipe,
+                            progress: Optional[Callable[[int, int], None]] = None,
+                            **kwargs) -> UploadResult:
+        """
+        Upload a recipe with the chunked protocol of recipe_upload.
+
+        The uploader runs in a worker thread on an exclusive view of the
+        line stream; other commands wait until it is done.
+
+        Args:
+            recipe: Recipe to upload
+            progress: Optional callback(acknowledged, total), called from
+                the worker thread
+            **kwargs: Further RecipeUploader arguments (window, ...)
+        """
+        async with self._exclusive() as channel:
+            uploader = RecipeUploader(channel, progress=progress, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(
+                None, uploader.upload, recipe)
+
+    @staticmethod
+    def _ok(responses: list[str]) -> bool:
+        return bool(responses) and responses[-1].startswith("OK")
+
+    # --- Unsolicited lines --------------------------------------------------
+
+    def lines(self, maxsize: int = DEFAULT_QUEUE_SIZE) -> LineSubscription:
+        """
+        Iterate over the lines that are not part of a command response.
+
+        Use as "async for line in client.lines(): ..."; the iteration
+        ends when the connection closes or the subscription is closed.
+        """
+        subscription = LineSubscription(self, maxsize)
+        if self._closed:
+            subscription._put(_CLOSED)
+        else:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    async def telemetry(self, maxsize: int = DEFAULT_QUEUE_SIZE) -> AsyncIterator[dict]:
+        """
+        Iterate over STREAM telemetry records (the firmware's JSON lines:
+        telemetry, telemetry_v and heartbeat), decoded.
+        """
+        subscription = self.lines(maxsize)
+        try:
+            async for line in subscription:
+                if not line.startswith("{"):
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.debug(f"{self.name}: malformed telemetry: {line}")
+        finally:
+            subscription.close()
+
+    async def wait_for(self, match: Union[str, Callable[[str], bool]],
+                       timeout: Optional[float] = None) -> str:
+        """
+        Wait for an unsolicited line.
+
+        Args:
+            match: Line prefix, or predicate on the line
+            timeout: Seconds to wait (None: no limit)
+
+        Returns:
+            The first matching line
+
+        Raises:
+            asyncio.TimeoutError: On timeout
+            ConnectionError: If the connection closes first
+        """
+        if not self.connected:
+            raise ConnectionError(f"{self.name}: not connected")
+        predicate = (lambda line: line.startswith(match)) if isinstance(match, str) else match
+        future = asyncio.get_running_loop().create_future()
+        waiter = (predicate, future)
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    # --- Read task ----------------------------------------------------------
+
+    async def _read_loop(self):
+        error: Exception = ConnectionError(f"{self.name}: connection closed")
+        try:
+            while True:
+                raw = await self.reader.readline()
+                if not raw:
+                    break
+                line = raw.decode('utf-8', errors='replace').strip()
+                if line:
+                    self._dispatch(line)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"{self.name}: serial read error: {e}")
+            error = e
+        self._shutdown(error)
+
+    def _dispatch(self, line: str):
+        if self._channel is not None:
+            self._channel.feed(line)
+            return
+
+        if self._pending and not is_unsolicited(line):
+            pending = self._pending[0]
+            pending.lines.append(line)
+            if line.startswith(pending.expect):
+                self._pending.popleft()
+                if not pending.future.done():
+                    pending.future.set_result(pending.lines)
+            return
+
+        for subscription in list(self._subscriptions):
+            subscription._put(line)
+        for predicate, future in list(self._waiters):
+            if not future.done() and predicate(line):
+                future.set_result(line)
+
+    def _shutdown(self, error: Exception):
+        if self._closed:
+            return
+        self._closed = True
+        while self._pending:
+            future = self._pending.popleft().future
+            if not future.done():
+                future.set_exception(error)
+        for _, future in self._waiters:
+            if not future.done():
+                future.set_exception(error)
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+    @asynccontextmanager
+    async def _exclusive(self, timeout: Optional[float] = None):
+        """Route every line to a thread-side LineChannel for the duration."""
+        if not self.connected:
+            raise ConnectionError(f"{self.name}: not connected")
+        while self._channel_done is not None:
+            await asyncio.shield(self._channel_done)
+
+        loop = asyncio.get_running_loop()
+        done = self._channel_done = loop.create_future()
+        try:
+            # Let responses to earlier commands arrive first
+            if self._pending:
+                await asyncio.wait([pending.future for pending in self._pending],
+                                   timeout=self.timeout)
+
+            def write(data: bytes) -> int:
+                loop.call_soon_threadsafe(self.writer.write, data)
+                return len(data)
+
+            self._channel = LineChannel(write, self.timeout if timeout is None else timeout)
+            yield self._channel
+        finally:
+            self._channel = None
+            self._channel_done = None
+            done.set_result(None)
@@ -0,0 +1,480 @@
+"""
+Fake Splice3D Firmware Serial Port
+
+An in-process stand-in for the machine's serial port, for tests and
+benchmarks of the host-side protocols without hardware. It implements
+the subset of pyserial's Serial used by the host tools (write(), flush(),
+readline(), in_waiting, timeout) and answers like the firmware:
+
+- the chunked recipe upload of recipe_upload (RBEGIN / RCHUNK / REND /
+  RABORT), with a receive window and MAX_SEGMENTS limit, answered like
+  firmware/src/serial_recipe.cpp;
+- the legacy single-line RECIPE <json> command, including the firmware's
+  256-byte line buffer that silently truncates long lines;
+- STATUS, START / PAUSE / RESUME / ABORT and STREAM with the firmware's
+  replies (no motion or telemetry is simulated; emit() queues lines
+  such as progress or telemetry), and "ERROR Unknown command" for
+  anything else.
+
+Time is virtual. Every byte takes 10 bit times at the configured baud
+rate in each direction (8N1), the firmware spends processing_s on each
+line, and readline() waits by advancing the clock instead of sleeping.
+So the measured transfer times reflect the link, not the host CPU.
+
+Faults can be injected with a seeded random generator: corrupted or
+dropped host lines and dropped firmware responses.
+
+RealtimeFirmwareSerial plays the same model against the wall clock with a
+blocking, thread-safe readline(), for code that reads from its own thread
+(serial_reader.SerialReader). open_fake_connection() plays it against the
+event loop's clock as an asyncio stream pair (async_serial.AsyncSplice3D).
+"""
+
+import asyncio
+import heapq
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Optional
+
+try:
+    from .recipe_binary import LENGTH_SCALED, RECORD_SIZE, unpack_segments
+    from .recipe_upload import parse_chunk
+except ImportError:  # Imported as a top-level module
+    from recipe_binary import LENGTH_SCALED, RECORD_SIZE, unpack_segments
+    from recipe_upload import parse_chunk
+
+# Limits of the real firmware (state_machine.h, serial_handler.h)
+FIRMWARE_MAX_SEGMENTS = 500
+FIRMWARE_LINE_BUFFER = 256
+
+# Command -> (states it is accepted in, new state, reply)
+_STATE_COMMANDS = {
+    "START": (("READY",), "FEEDING_A", "OK STARTED"),
+    "PAUSE": (None, None, "OK PAUSED"),
+    "RESUME": (None, None, "OK RESUMED"),
+    "ABORT": (None, "IDLE", "OK ABORTED"),
+}
+
+_COLOR = re.compile(r'"color"\s*:\s*(-?\d+)')
+_LENGTH = re.compile(r'"length_mm"\s*:\s*([-+.\deE]+)')
+
+
+class FakeFirmwareSerial:
+    """
+    Simulated serial connection to the Splice3D firmware.
+    """
+
+    def __init__(self,
+                 baud: int = 115200,
+                 timeout: float = 1.0,
+                 window: int = 4,
+                 max_segments: int = FIRMWARE_MAX_SEGMENTS,
+                 processing_s: float = 0.0005,
+                 chunked: bool = True,
+                 corrupt_rate: float = 0.0,
+                 drop_rate: float = 0.0,
+                 response_drop_rate: float = 0.0,
+                 seed: int = 0):
+        """
+        Initialize the fake port.
+
+        Args:
+            baud: Simulated baud rate
+            timeout: readline() timeout in (virtual) seconds
+            window: Receive window advertised in OK RBEGIN
+            max_segments: Largest recipe accepted
+            processing_s: Firmware time per received line
+            chunked: Support the chunked upload (False: firmware without it)
+            corrupt_rate: Probability that a host line has a byte flipped
+            drop_rate: Probability that a host line is lost
+            response_drop_rate: Probability that a firmware line is lost
+            seed: Seed for the fault injection
+        """
+        self.baud = baud
+        self.timeout = timeout
+        self.window = window
+        self.max_segments = max_segments
+        self.processing_s = processing_s
+        self.chunked = chunked
+        self.corrupt_rate = corrupt_rate
+        self.drop_rate = drop_rate
+        self.response_drop_rate = response_drop_rate
+        self.is_open = True
+
+        self._rng = random.Random(seed)
+        self._time = 0.0
+        self._tx_free = 0.0        # Host -> firmware line busy until
+        self._rx_free = 0.0        # Firmware -> host line busy until
+        self._firmware_free = 0.0  # Firmware busy until
+        self._partial = b""
+        self._responses: list[tuple[float, int, bytes]] = []
+        self._sequence = 0
+
+        # Loaded recipe: list of {"color", "length_mm"} dicts
+        self.recipe: list[dict] = []
+        self.state = "IDLE"
+        self.stream_mode = "OFF"
+        # Every line the firmware received intact, for inspection
+        self.received: list[str] = []
+        self._upload: Optional[dict] = None
+        # Segments of the last completed upload, to answer a repeated REND
+        self._loaded_count = 0
+
+    def now(self) -> float:
+        """Current virtual time in seconds."""
+        return self._time
+
+    def emit(self, text: str):
+        """Queue an unsolicited firmware line (progress, DONE, ...) now."""
+        self._respond(text, self._time)
+
+    def _byte_time(self, count: int) -> float:
+        return count * 10 / self.baud
+
+    # --- pyserial interface -------------------------------------------------
+
+    @property
+    def in_waiting(self) -> int:
+        return sum(len(data) for ready, _, data in self._responses if ready <= self._time)
+
+    def write(self, data: bytes) -> int:
+        start = max(self._time, self._tx_free)
+        self._tx_free = start + self._byte_time(len(data))
+
+        self._partial += data
+        *lines, self._partial = self._partial.split(b"\n")
+        for raw in lines:
+            self._receive(raw, self._tx_free)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def readline(self) -> bytes:
+        if self._responses and self._responses[0][0] <= self._time + self.timeout:
+            ready, _, data = heapq.heappop(self._responses)
+            self._time = max(self._time, ready)
+            return data
+        self._time += self.timeout
+        return b""
+
+    def reset_input_buffer(self):
+        self._responses.clear()
+
+    def close(self):
+        self.is_open = False
+
+    # --- Firmware -----------------------------------------------------------
+
+    def _receive(self, raw: bytes, arrival: float):
+        """Handle one line arriving from the host at the given time."""
+        if self._rng.random() < self.drop_rate:
+            return
+        if raw and self._rng.random() < self.corrupt_rate:
+            position = self._rng.randrange(len(raw))
+            raw = raw[:position] + bytes([raw[position] ^ 0x20]) + raw[position + 1:]
+
+        start = max(arrival, self._firmware_free)
+        self._firmware_free = start + self.processing_s
+        # The firmware's line buffer keeps the first 255 characters
+        line = raw[:FIRMWARE_LINE_BUFFER - 1].decode('utf-8', errors='replace').strip()
+        if line:
+            self.received.append(line)
+            for response in self._handle(line):
+                self._respond(response, self._firmware_free)
+
+    def _respond(self, text: str, ready: float):
+        if self._rng.random() < self.response_drop_rate:
+            return
+        data = f"{text}\n".encode('utf-8')
+        start = max(ready, self._rx_free)
+        self._rx_free = start + self._byte_time(len(data))
+        self._sequence += 1
+        heapq.heappush(self._responses, (self._rx_free, self._sequence, data))
+
+    def _handle(self, line: str) -> list[str]:
+        command, _, args = line.partition(' ')
+        command = command.upper()
+        if command == "RECIPE":
+            return self._legacy_recipe(args)
+        if command == "STATUS":
+            return [f"STATUS {self.state}"]
+        if command in _STATE_COMMANDS:
+            return self._state_command(command)
+        if command == "STREAM":
+            return self._stream(args)
+        if self.chunked:
+            if command == "RBEGIN":
+                return self._begin(args)
+            if command == "RCHUNK":
+                return self._chunk(line)
+            if command == "REND":
+                return self._end(args)
+            if command == "RABORT":
+                self._upload = None
+                return ["OK RABORT"]
+        return [f"ERROR Unknown command: {command}"]
+
+    def _state_command(self, command: str) -> list[str]:
+        accepted, state, reply = _STATE_COMMANDS[command]
+        if accepted and self.state not in accepted:
+            return [f"ERROR Cannot {command.lower()}"]
+        self.state = state or self.state
+        return [reply]
+
+    def _stream(self, args: str) -> list[str]:
+        """STREAM, as SerialHandler::handleStream() answers it."""
+        sub, _, rest = args.strip().partition(' ')
+        if not sub:
+            return [f"STREAM mode={self.stream_mode} interval=1000 heartbeat=off"]
+        if sub in ("OFF", "SUMMARY", "VERBOSE"):
+            self.stream_mode = sub
+            return [f"OK stream {sub.lower()}"]
+        if sub == "INTERVAL" and rest:
+            return [f"OK interval={int(rest) if rest.isdigit() else 0}"]
+        return ["ERR unknown STREAM subcommand"]
+
+    def _legacy_recipe(self, args: str) -> list[str]:
+        """RECIPE <json>, scanned like SerialHandler::handleRecipe()."""
+        start = args.find('"segments"')
+        position = args.find('[', start) + 1
+        if start == -1 or position == 0:
+            return ["ERROR Invalid recipe format"]
+
+        segments = []
+        while len(segments) < self.max_segments:
+            opening = args.find('{', position)
+            closing = args.find('}', opening)
+            if opening == -1 or closing == -1:
+                break
+            body = args[opening:closing]
+            color = _COLOR.search(body)
+            length = _LENGTH.search(body)
+            segments.append({"color": int(color.group(1)) if color else 0,
+                             "length_mm": float(length.group(1)) if length else 0.0})
+            position = closing + 1
+            if args[position:position + 1] == ']':
+                break
+
+        if not segments:
+            return ["ERROR No segments parsed"]
+        self.recipe = segments
+        self.state = "READY"
+        return [f"OK RECIPE_LOADED {len(segments)} segments"]
+
+    def _begin(self, args: str) -> list[str]:
+        """RBEGIN, as SerialHandler::handleRecipeBegin() answers it."""
+        try:
+            count, encoding, scale = (int(word) for word in args.split())
+        except ValueError:
+            return ["ERROR Invalid RBEGIN"]
+        if encoding != LENGTH_SCALED or scale < 1:
+            return ["ERROR Unsupported encoding"]
+        if count > self.max_segments:
+            return [f"ERROR RECIPE_TOO_LARGE max={self.max_segments}"]
+        self._upload = {"count": count, "scale": scale, "expected": 0,
+                        "records": bytearray(), "nak_sent": False}
+        self._loaded_count = 0
+        return [f"OK RBEGIN {self.window}"]
+
+    def _chunk(self, line: str) -> list[str]:
+        """RCHUNK, as SerialHandler::handleRecipeChunk() answers it."""
+        upload = self._upload
+        if upload is None:
+            return ["ERROR No upload in progress"]
+        try:
+            seq, records = parse_chunk(line)
+        except ValueError as e:
+            return self._nak(f"BAD_{e}")
+
+        if seq < upload["expected"]:
+            # Duplicate after a lost ACK
+            return [f"ACK {upload['expected'] - 1}"]
+        if seq > upload["expected"]:
+            return self._nak("OUT_OF_ORDER")
+        if len(upload["records"]) + len(records) > upload["count"] * RECORD_SIZE:
+            return self._nak("OVERFLOW")
+
+        upload["records"] += records
+        upload["expected"] += 1
+        upload["nak_sent"] = False
+        return [f"ACK {seq}"]
+
+    def _nak(self, reason: str) -> list[str]:
+        """NAK the first bad chunk of a run; drop the rest silently."""
+        upload = self._upload
+        if upload["nak_sent"]:
+            return []
+        upload["nak_sent"] = True
+        return [f"NAK {upload['expected']} {reason}"]
+
+    def _end(self, args: str) -> list[str]:
+        """REND, as SerialHandler::handleRecipeEnd() answers it."""
+        upload = self._upload
+        if upload is None:
+            # REND repeated after a lost OK: the recipe is already loaded
+            if self._loaded_count:
+                return [f"OK RECIPE_LOADED {self._loaded_count} segments"]
+            return ["ERROR No upload in progress"]
+        records = bytes(upload["records"])
+        if len(records) != upload["count"] * RECORD_SIZE:
+            return [f"ERROR Incomplete recipe {len(records) // RECORD_SIZE}/{upload['count']}"]
+        if args.strip() != f"{zlib.crc32(records):08X}":
+            self._upload = None
+            return ["ERROR Recipe checksum mismatch"]
+        self.recipe = unpack_segments(records, LENGTH_SCALED, upload["scale"])
+        self.state = "READY"
+        self._upload = None
+        self._loaded_count = len(self.recipe)
+        return [f"OK RECIPE_LOADED {len(self.recipe)} segments"]
+
+
+class RealtimeFirmwareSerial:
+    """
+    FakeFirmwareSerial in real time: responses become readable when the
+    wall clock reaches their virtual arrival time, and readline() blocks
+    until then (or until the timeout, or cancel_read()).
+    """
+
+    def __init__(self, firmware: Optional[FakeFirmwareSerial] = None, timeout: float = 1.0):
+        """
+        Initialize the port.
+
+        Args:
+            firmware: Simulated firmware (default: FakeFirmwareSerial())
+            timeout: readline() timeout in seconds
+        """
+        self.firmware = firmware or FakeFirmwareSerial()
+        self.timeout = timeout
+        self.is_open = True
+        self._condition = threading.Condition()
+        self._origin = time.monotonic() - self.firmware.now()
+        self._cancelled = False
+
+    def _sync(self) -> float:
+        """Advance the firmware's clock to the wall clock."""
+        now = time.monotonic() - self._origin
+        self.firmware._time = max(self.firmware._time, now)
+        return now
+
+    @property
+    def in_waiting(self) -> int:
+        with self._condition:
+            self._sync()
+            return self.firmware.in_waiting
+
+    def write(self, data: bytes) -> int:
+        with self._condition:
+            self._sync()
+            written = self.firmware.write(data)
+            self._condition.notify_all()
+        return written
+
+    def emit(self, text: str):
+        """Send an unsolicited firmware line now."""
+        with self._condition:
+            self._sync()
+            self.firmware.emit(text)
+            self._condition.notify_all()
+
+    def flush(self):
+        pass
+
+    def readline(self) -> bytes:
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                now = self._sync()
+                responses = self.firmware._responses
+                if responses and responses[0][0] <= now:
+                    return heapq.heappop(responses)[2]
+                if self._cancelled or not self.is_open:
+                    self._cancelled = False
+                    return b""
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return b""
+                if responses:
+                    remaining = min(remaining, responses[0][0] - now)
+                self._condition.wait(remaining)
+
+    def cancel_read(self):
+        with self._condition:
+            self._cancelled = True
+            self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            self.is_open = False
+            self._condition.notify_all()
+
+
+class FakeFirmwareWriter:
+    """
+    StreamWriter side of open_fake_connection(): lines written here reach
+    the firmware, and its responses are fed to the paired StreamReader at
+    their arrival time on the event loop's clock.
+    """
+
+    def __init__(self, firmware: FakeFirmwareSerial, reader: asyncio.StreamReader):
+        self.firmware = firmware
+        self.reader = reader
+        self._loop = asyncio.get_running_loop()
+        self._origin = self._loop.time() - firmware.now()
+        self._closing = False
+
+    def _sync(self):
+        now = self._loop.time() - self._origin
+        self.firmware._time = max(self.firmware._time, now)
+
+    def _deliver(self):
+        responses = self.firmware._responses
+        while responses:
+            ready, _, data = heapq.heappop(responses)
+            self._loop.call_later(max(0.0, ready - self.firmware._time), self._feed, data)
+
+    def _feed(self, data: bytes):
+        if not self._closing:
+            self.reader.feed_data(data)
+
+    def write(self, data: bytes):
+        if self._closing:
+            return
+        self._sync()
+        self.firmware.write(data)
+        self._deliver()
+
+    def emit(self, text: str):
+        """Send an unsolicited firmware line now."""
+        self._sync()
+        self.firmware.emit(text)
+        self._deliver()
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        if not self._closing:
+            self._closing = True
+            self.reader.feed_eof()
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    async def wait_closed(self):
+        pass
+
+
+async def open_fake_connection(firmware: Optional[FakeFirmwareSerial] = None):
+    """
+    Connect to a simulated firmware with asyncio streams.
+
+    Returns:
+        Tuple of (StreamReader, FakeFirmwareWriter), like
+        asyncio.open_connection()
+    """
+    reader = asyncio.StreamReader()
+    return reader, FakeFirmwareWriter(firmware or FakeFirmwareSerial(), reader)
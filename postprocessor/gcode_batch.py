@@ -0,0 +1,286 @@
+"""
+Batch Post-Processing for Splice3D
+
+Runs the post-processor over many G-code files with a bounded pool of
+worker processes and aggregates the per-file results into one summary.
+Every file is processed independently: a file that cannot be read or
+parsed is recorded as failed and the rest of the batch continues.
+"""
+
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterable, Optional
+
+try:
+    from .gcode_parser import GCodeParser
+    from .gcode_modifier import GCodeModifier
+    from .gcode_io import PLAIN, SUFFIXES, gcode_stem
+    from .gcode_pipeline import process_gcode
+    from .recipe_generator import RecipeGenerator
+    from .result_cache import ResultCache
+except ImportError:  # Imported as a top-level module
+    from gcode_parser import GCodeParser
+    from gcode_modifier import GCodeModifier
+    from gcode_io import PLAIN, SUFFIXES, gcode_stem
+    from gcode_pipeline import process_gcode
+    from recipe_generator import RecipeGenerator
+    from result_cache import ResultCache
+
+# Outputs written next to their inputs; never picked up as inputs
+OUTPUT_SUFFIX = "_modified"
+
+GLOB_CHARS = "*?["
+
+
+def is_batch_input(pattern: str) -> bool:
+    """
+    Check whether an input argument selects batch mode.
+
+    Directories and glob patterns do; an existing file is always a single
+    input, even if its name contains glob characters (``part[1].gcode``).
+    """
+    path = Path(pattern)
+    if path.is_file():
+        return False
+    return path.is_dir() or any(c in pattern for c in GLOB_CHARS)
+
+
+def collect_inputs(pattern: str, output_dir: Optional[str] = None) -> list[Path]:
+    """
+    Resolve a directory, glob pattern or single file to G-code inputs.
+
+    Directories are searched (non-recursively) for ``*.gcode`` and
+    compressed G-code (``*.gcode.gz``, ``*.bgcode``, ...; see gcode_io).
+    Glob patterns support ``**``. Files produced by the post-processor
+    (``*_modified.gcode``, compressed or not) are skipped.
+
+    Args:
+        pattern: Directory, glob pattern or file path
+        output_dir: Output directory of the batch (default: next to each input)
+
+    Returns:
+        Sorted list of input files
+
+    Raises:
+        ValueError: If two inputs would write the same output files
+    """
+    path = Path(pattern)
+    if path.is_file():
+        return [path]
+    if path.is_dir():
+        suffixes = tuple(SUFFIXES.values())
+        candidates = (p for p in path.iterdir() if p.name.lower().endswith(suffixes))
+    elif any(c in pattern for c in GLOB_CHARS):
+        candidates = (Path(p) for p in glob.glob(pattern, recursive=True))
+    else:
+        return [path]
+
+    inputs = sorted(
+        p for p in candidates
+        if p.is_file() and not gcode_stem(p).endswith(OUTPUT_SUFFIX)
+    )
+    check_output_collisions(inputs, output_dir)
+    return inputs
+
+
+def check_output_collisions(inputs: Iterable[Path], output_dir: Optional[str] = None):
+    """
+    Check that no two inputs are written to the same outputs.
+
+    Outputs are named after gcode_stem(), so ``part.gcode`` and
+    ``part.gcode.gz`` collide, as do ``x/part.gcode`` and ``y/part.gcode``
+    when both are written to one output directory.
+
+    Args:
+        inputs: Input files
+        output_dir: Output directory (default: next to each input)
+
+    Raises:
+        ValueError: Listing the inputs of every colliding output name
+    """
+    targets: dict[Path, list[Path]] = {}
+    for source in inputs:
+        target_dir = Path(output_dir) if output_dir else source.parent
+        targets.setdefault(target_dir / gcode_stem(source), []).append(source)
+
+    collisions = [sources for sources in targets.values() if len(sources) > 1]
+    if collisions:
+        groups = "; ".join(", ".join(map(str, sources)) for sources in collisions)
+        raise ValueError(f"Inputs would overwrite each other's outputs: {groups}")
+
+
+def _job_record(input_path: str) -> dict:
+    """Return the record of a job that has not (yet) succeeded."""
+    return {
+        "input": input_path,
+        "ok": False,
+        "recipe": None,
+        "output": None,
+        "segments": 0,
+        "total_length_mm": 0.0,
+        "colors": 0,
+        "layers": 0,
+        "tool_changes_removed": 0,
+        "warnings": [],
+        "errors": [],
+        "elapsed_s": 0.0,
+    }
+
+
+def process_job(input_path: str,
+                output_dir: Optional[str] = None,
+                transition_mm: float = 0.0,
+                min_segment_mm: float = 10.0,
+                add_pause: bool = True,
+                color_names: Optional[dict[int, str]] = None,
+                cache: Optional[ResultCache] = None,
+                compression: str = PLAIN) -> dict:
+    """
+    Post-process one G-code file: write the recipe and the modified G-code.
+
+    Never raises; failures are reported in the returned record.
+
+    Args:
+        input_path: Multi-tool G-code file
+        output_dir: Output directory (default: same as input file)
+        transition_mm: Extra transition length in mm per color change
+        min_segment_mm: Minimum segment length (smaller segments merged)
+        add_pause: Add M0 pause at start of print
+        color_names: Color names for tool indices
+        cache: Optional ResultCache for parse results
+        compression: Codec of the modified G-code (see gcode_io.CODECS)
+
+    Returns:
+        Job record with paths, counts, warnings and errors
+    """
+    start = time.perf_counter()
+    source = Path(input_path)
+    target_dir = Path(output_dir) if output_dir else source.parent
+    stem = gcode_stem(source)
+    recipe_path = target_dir / f"{stem}_splice_recipe.json"
+    modified_path = target_dir / f"{stem}{OUTPUT_SUFFIX}{SUFFIXES[compression]}"
+
+    job = _job_record(str(source))
+
+    try:
+        if not source.is_file():
+            raise FileNotFoundError(f"Input file not found: {source}")
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        parse_result, stats = process_gcode(
+            str(source), str(modified_path),
+            GCodeParser(columnar=True), GCodeModifier(add_pause_at_start=add_pause),
+            cache=cache
+        )
+        job["warnings"] = list(parse_result.warnings)
+        job["errors"] = list(parse_result.errors)
+
+        if not parse_result.errors:
+            generator = RecipeGenerator(
+                color_names=color_names,
+                transition_length_mm=transition_mm,
+                min_segment_length_mm=min_segment_mm
+            )
+            recipe = generator.generate(parse_result, source_file=str(source))
+            generator.save_recipe(recipe, str(recipe_path))
+
+            job.update(
+                ok=True,
+                recipe=str(recipe_path),
+                output=str(modified_path),
+                segments=recipe.segment_count,
+                total_length_mm=recipe.total_length_mm,
+                colors=parse_result.color_count,
+                layers=parse_result.layer_count,
+                tool_changes_removed=stats["tool_changes_removed"],
+            )
+    except Exception as e:
+        job["errors"].append(f"{type(e).__name__}: {e}")
+
+    job["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return job
+
+
+def summarize(jobs: list[dict], elapsed_s: float = 0.0) -> dict:
+    """
+    Aggregate job records into a batch summary.
+
+    Args:
+        jobs: Records from process_job(), in input order
+        elapsed_s: Wall time of the whole batch
+
+    Returns:
+        Summary dict with totals over the successful jobs and all records
+    """
+    succeeded = [job for job in jobs if job["ok"]]
+    return {
+        "files": len(jobs),
+        "succeeded": len(succeeded),
+        "failed": len(jobs) - len(succeeded),
+        "segments": sum(job["segments"] for job in succeeded),
+        "total_length_mm": round(sum(job["total_length_mm"] for job in succeeded), 2),
+        "tool_changes_removed": sum(job["tool_changes_removed"] for job in succeeded),
+        "errors": [
+            {"input": job["input"], "errors": job["errors"]}
+            for job in jobs if job["errors"]
+        ],
+        "elapsed_s": round(elapsed_s, 3),
+        "jobs": jobs,
+    }
+
+
+def run_batch(inputs: Iterable[str],
+              workers: Optional[int] = None,
+              progress=None,
+              **job_options) -> dict:
+    """
+    Post-process many files with a bounded process pool.
+
+    Args:
+        inputs: G-code files to process
+        workers: Maximum worker processes (default: os.cpu_count())
+        progress: Optional callback(job) called as each file finishes
+        **job_options: Keyword arguments for process_job()
+
+    Returns:
+        Batch summary from summarize()
+    """
+    inputs = [str(p) for p in inputs]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(inputs) or 1))
+    start = time.perf_counter()
+    jobs: list[Optional[dict]] = [None] * len(inputs)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(process_job, path, **job_options): index
+            for index, path in enumerate(inputs)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                job = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. killed or out of memory)
+                job = _job_record(inputs[index])
+                job["errors"].append(f"{type(e).__name__}: {e}")
+            jobs[index] = job
+            if progress:
+                progress(job)
+
+    return summarize(jobs, time.perf_counter() - start)
+
+
+def write_summary(summary: dict, filepath: str):
+    """
+    Save a batch summary as JSON.
+
+    Args:
+        summary: Summary from run_batch()
+        filepath: Output file path
+    """
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
@@ -0,0 +1,253 @@
+"""
+Incremental G-code Parsing for Splice3D
+
+Re-parsing a sliced file after a few layers were edited by hand (custom
+pauses, purge tweaks) does not need to start from the first line. While
+parsing, IncrementalParser records a checkpoint at every layer marker:
+the byte offset and line number of the marker, the number of segments
+completed before it, and the parser state (see GCodeParser.get_state()).
+Each layer's bytes are hashed, and the checkpoints are saved with the
+result in an index file next to the output.
+
+On the next run the stored layer hashes are compared with the file in
+order. Parsing resumes at the first layer that changed, from that
+layer's checkpoint, and the segments completed before it are taken from
+the stored result.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Optional
+
+try:
+    from .gcode_parser import GCodeParser, ParseResult, LINE_LAYER, LINE_OTHER
+    from .gcode_io import is_compressed
+    from .result_cache import decode_parse_result, encode_parse_result, parser_settings
+except ImportError:  # Imported as a top-level module
+    from gcode_parser import GCodeParser, ParseResult, LINE_LAYER, LINE_OTHER
+    from gcode_io import is_compressed
+    from result_cache import decode_parse_result, encode_parse_result, parser_settings
+
+# Bump when the parser or the index format changes meaning
+INDEX_VERSION = 1
+
+# Appended to the output path to name its index file
+INDEX_SUFFIX = ".splice3d-index.json"
+
+
+@dataclass
+class Checkpoint:
+    """Parser state at the start of a layer (or of the file)."""
+    offset: int        # Byte offset of the layer's first line
+    line: int          # Lines before that line
+    segments: int      # Segments completed before that line
+    state: dict        # GCodeParser.get_state() before that line
+    length: int = 0    # Bytes up to the next checkpoint (or end of file)
+    sha256: str = ""   # Hash of those bytes
+
+
+_CHECKPOINT_FIELDS = tuple(f.name for f in fields(Checkpoint))
+
+
+def index_path_for(output_path: str) -> str:
+    """Path of the index file stored alongside an output file."""
+    return str(output_path) + INDEX_SUFFIX
+
+
+def _universal_lines(text: str) -> list[str]:
+    """Split on bare CR as well, like reading in text mode."""
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    return lines
+
+
+class IncrementalParser:
+    """
+    Parses G-code files, reusing the unchanged layers of the previous run.
+    """
+
+    def __init__(self, parser: Optional[GCodeParser] = None):
+        """
+        Initialize the incremental parser.
+
+        Args:
+            parser: Parser performing the scan (default: GCodeParser())
+        """
+        self.parser = parser or GCodeParser()
+        # Layers (checkpoints) of the last parse taken from the index
+        self.reused_layers = 0
+        # Bytes of the last parse that were actually scanned
+        self.scanned_bytes = 0
+
+    def parse_file(self, filepath: str, index_path: str) -> ParseResult:
+        """
+        Parse a G-code file, resuming from the index when possible.
+
+        Produces the same ParseResult as GCodeParser.parse_file(). The
+        index is rewritten after every successful parse. Compressed files
+        cannot be resumed at a byte offset; they are always parsed in
+        full, without an index.
+
+        Args:
+            filepath: Path to the G-code file
+            index_path: Index file of the previous run (need not exist)
+
+        Returns:
+            ParseResult with segments and metadata
+        """
+        self.reused_layers = 0
+        self.scanned_bytes = 0
+        if is_compressed(filepath):
+            return self.parser.parse_file(filepath)
+        index = self._load_index(index_path)
+
+        try:
+            with open(filepath, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if index is not None:
+                    resume = self._first_changed(f, size, index)
+                    if resume is None:
+                        self.reused_layers = len(index["checkpoints"])
+                        return decode_parse_result(index["result"], self.parser.columnar)
+                    checkpoints = index["checkpoints"][:resume + 1]
+                    previous = decode_parse_result(index["result"], self.parser.columnar)
+                else:
+                    checkpoints = [Checkpoint(0, 0, 0, GCodeParser().get_state())]
+                    previous = None
+                result, checkpoints = self._scan(f, checkpoints, previous)
+        except IOError as e:
+            result = ParseResult()
+            result.errors.append(f"Failed to read file: {e}")
+            return result
+
+        if not result.errors:
+            self._save_index(index_path, size, checkpoints, result)
+        return result
+
+    def _first_changed(self, f, size: int, index: dict) -> Optional[int]:
+        """
+        Find the first checkpoint whose layer differs from the index.
+
+        Returns:
+            Checkpoint number, or None when the whole file is unchanged
+        """
+        checkpoints = index["checkpoints"]
+        for number, checkpoint in enumerate(checkpoints):
+            f.seek(checkpoint.offset)
+            data = f.read(checkpoint.length)
+            if (len(data) != checkpoint.length
+                    or hashlib.sha256(data).hexdigest() != checkpoint.sha256):
+                return number
+        if size != index["size"]:
+            # Lines were appended to the last layer
+            return len(checkpoints) - 1
+        return None
+
+    def _scan(self, f, checkpoints: list[Checkpoint],
+              previous: Optional[ParseResult]) -> tuple[ParseResult, list[Checkpoint]]:
+        """
+        Parse from the last checkpoint to the end of the file.
+
+        Args:
+            f: Binary file
+            checkpoints: Reused checkpoints; parsing resumes at the last one
+            previous: Result the reused checkpoints belong to
+
+        Returns:
+            Tuple of (ParseResult, checkpoints covering the whole file)
+        """
+        parser = self.parser
+        start = checkpoints[-1]
+        result = parser.begin()
+        if previous is not None:
+            self.reused_layers = len(checkpoints) - 1
+            result.segments.extend(previous.segments[:start.segments])
+            parser.set_state(start.state)
+
+        classify = parser.classify_line
+        apply = parser.apply_line
+        line_num = start.line
+        first = len(checkpoints)
+
+        f.seek(start.offset)
+        for raw in f:
+            text = raw.decode('utf-8', errors='replace')
+            cr = text.find('\r')
+            if cr != -1 and cr < len(text) - 2:
+                # Bare CR: several lines, checkpoints only at line starts
+                for position, line in enumerate(_universal_lines(text)):
+                    line_num += 1
+                    kind, value = classify(line.strip())
+                    if kind != LINE_OTHER:
+                        if kind == LINE_LAYER and position == 0:
+                            self._checkpoint(checkpoints, f.tell() - len(raw), line_num, result)
+                        apply(kind, value, line_num, result)
+                continue
+
+            line_num += 1
+            kind, value = classify(text.strip())
+            if kind != LINE_OTHER:
+                if kind == LINE_LAYER:
+                    self._checkpoint(checkpoints, f.tell() - len(raw), line_num, result)
+                apply(kind, value, line_num, result)
+
+        size = f.tell()
+        ends = [c.offset for c in checkpoints[first:]] + [size]
+        for checkpoint, end in zip(checkpoints[first - 1:], ends):
+            checkpoint.length = end - checkpoint.offset
+            f.seek(checkpoint.offset)
+            checkpoint.sha256 = hashlib.sha256(f.read(checkpoint.length)).hexdigest()
+
+        self.scanned_bytes = size - start.offset
+        return parser.finish(result, line_num), checkpoints
+
+    def _checkpoint(self, checkpoints: list[Checkpoint], offset: int, line_num: int,
+                    result: ParseResult):
+        """Checkpoint the state before the layer line at offset."""
+        if offset > checkpoints[-1].offset:
+            checkpoints.append(Checkpoint(offset, line_num - 1, len(result.segments),
+                                          self.parser.get_state()))
+
+    def _load_index(self, index_path: str) -> Optional[dict]:
+        """Load an index written with the current version and settings."""
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if (index["version"] != INDEX_VERSION
+                    or index["settings"] != parser_settings(self.parser)):
+                return None
+            columns = index["checkpoints"]
+            index["checkpoints"] = [
+                Checkpoint(*row) for row in zip(*(columns[name] for name in _CHECKPOINT_FIELDS))
+            ]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return index
+
+    def _save_index(self, index_path: str, size: int,
+                    checkpoints: list[Checkpoint], result: ParseResult):
+        """Write the index atomically."""
+        index = {
+            "version": INDEX_VERSION,
+            "settings": parser_settings(self.parser),
+            "size": size,
+            # Stored column by column, like the segments
+            "checkpoints": {
+                name: [getattr(c, name) for c in checkpoints] for name in _CHECKPOINT_FIELDS
+            },
+            "result": encode_parse_result(result),
+        }
+        directory = Path(index_path).parent
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(index, separators=(',', ':')))
+            os.replace(temp_path, index_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
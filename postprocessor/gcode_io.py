@@ -0,0 +1,469 @@
+"""
+Compressed G-code I/O for Splice3D
+
+Sliced jobs are often stored compressed. Inputs are recognized by their
+first bytes, whatever their name, and decompressed while they are read;
+outputs are compressed while they are written, with the codec chosen by
+the file suffix:
+
+    Codec    Suffix        Notes
+    plain    .gcode
+    gzip     .gcode.gz
+    bz2      .gcode.bz2
+    xz       .gcode.xz
+    zstd     .gcode.zst    requires the zstandard package
+    bgcode   .bgcode       binary G-code container (see below)
+
+The bgcode codec reads and writes the block container of the binary
+G-code format (libbgcode file format version 1): a "GCDE" file header
+followed by metadata and G-code blocks, each with a CRC32. Blocks are
+stored uncompressed or deflate-compressed. Heatshrink-compressed or
+MeatPack-encoded blocks (the PrusaSlicer defaults) are not supported and
+raise CodecError; export with deflate compression and no encoding instead.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import struct
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Optional, TextIO
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+PLAIN = "plain"
+CODECS = (PLAIN, "gzip", "bz2", "xz", "zstd", "bgcode")
+
+# Output file suffix of each codec
+SUFFIXES = {
+    PLAIN: ".gcode",
+    "gzip": ".gcode.gz",
+    "bz2": ".gcode.bz2",
+    "xz": ".gcode.xz",
+    "zstd": ".gcode.zst",
+    "bgcode": ".bgcode",
+}
+
+# Leading bytes identifying compressed inputs
+MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"GCDE", "bgcode"),
+)
+
+# Compression levels used for outputs
+LEVELS = {"gzip": 6, "bz2": 9, "xz": 6, "zstd": 3}
+
+_MAGIC_BYTES = max(len(magic) for magic, _ in MAGIC)
+_READ_BUFFER_BYTES = 1 << 16
+
+# Binary G-code container
+BGCODE_VERSION = 1
+BGCODE_BLOCK_BYTES = 65536
+BLOCK_FILE_METADATA = 0
+BLOCK_GCODE = 1
+BLOCK_SLICER_METADATA = 2
+BLOCK_PRINTER_METADATA = 3
+BLOCK_PRINT_METADATA = 4
+BLOCK_THUMBNAIL = 5
+COMPRESSION_NONE = 0
+COMPRESSION_DEFLATE = 1
+CHECKSUM_NONE = 0
+CHECKSUM_CRC32 = 1
+
+_FILE_HEADER = struct.Struct("<4sIH")
+_BLOCK_HEADER = struct.Struct("<HHI")
+_COMPRESSED_SIZE = struct.Struct("<I")
+_CRC32 = struct.Struct("<I")
+
+
+class CodecError(IOError):
+    """A compressed input is malformed or uses an unsupported feature."""
+
+
+# Errors raised while reading a (possibly compressed) input
+READ_ERRORS = (OSError, EOFError, lzma.LZMAError, zlib.error)
+if zstandard is not None:
+    READ_ERRORS += (zstandard.ZstdError,)
+
+
+def detect_codec(filepath: str) -> str:
+    """
+    Identify the codec of a file from its first bytes.
+
+    Args:
+        filepath: Path to the file
+
+    Returns:
+        One of CODECS; PLAIN for anything not recognized
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    with open(filepath, 'rb') as f:
+        head = f.read(_MAGIC_BYTES)
+    for magic, codec in MAGIC:
+        if head.startswith(magic):
+            return codec
+    return PLAIN
+
+
+def is_compressed(filepath: str) -> bool:
+    """
+    Check whether a file is compressed.
+
+    Unreadable files count as uncompressed, so that opening them reports
+    the error.
+    """
+    try:
+        return detect_codec(filepath) != PLAIN
+    except OSError:
+        return False
+
+
+def codec_for_path(filepath: str) -> str:
+    """
+    Choose the output codec for a path from its suffix.
+
+    Args:
+        filepath: Output path, e.g. "part.gcode.gz"
+
+    Returns:
+        One of CODECS; PLAIN for unrecognized suffixes
+    """
+    extension = Path(filepath).suffix.lower()
+    for codec, suffix in SUFFIXES.items():
+        if codec != PLAIN and extension == '.' + suffix.rsplit('.', 1)[-1]:
+            return codec
+    return PLAIN
+
+
+def gcode_stem(filepath: str) -> str:
+    """
+    File name without the G-code and codec suffixes.
+
+    "part.gcode", "part.gcode.gz" and "part.bgcode" all give "part".
+    """
+    name = Path(filepath).name
+    for suffix in sorted(SUFFIXES.values(), key=len, reverse=True):
+        if name.lower().endswith(suffix) and len(name) > len(suffix):
+            return name[:-len(suffix)]
+    return Path(name).stem
+
+
+def open_gcode(filepath: str, digest=None) -> TextIO:
+    """
+    Open a G-code file for reading text, decompressing it if needed.
+
+    Plain files are opened exactly like ``open(filepath, 'r',
+    encoding='utf-8', errors='replace')``; compressed files are decoded
+    the same way while they are streamed.
+
+    Args:
+        filepath: Path to the G-code file
+        digest: Optional hashlib object fed the file's bytes (compressed,
+            as stored) while they are read; it covers the whole file once
+            the stream is closed (see DigestFile)
+
+    Returns:
+        Text stream of the G-code lines
+
+    Raises:
+        OSError: If the file cannot be opened
+        CodecError: If the codec is not available
+    """
+    codec = detect_codec(filepath)
+    if digest is None:
+        if codec == PLAIN:
+            return open(filepath, 'r', encoding='utf-8', errors='replace')
+        raw = open(filepath, 'rb')
+    else:
+        raw = io.BufferedReader(DigestFile(filepath, 'r', digest), _READ_BUFFER_BYTES)
+        if codec == PLAIN:
+            return io.TextIOWrapper(raw, encoding='utf-8', errors='replace')
+
+    try:
+        stream = decompress_stream(raw, codec)
+    except BaseException:
+        raw.close()
+        raise
+    return io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+
+
+def decompress_stream(raw: BinaryIO, codec: str) -> BinaryIO:
+    """
+    Wrap a binary stream in a decompressing reader.
+
+    Closing the reader closes raw.
+
+    Args:
+        raw: Compressed input
+        codec: One of CODECS other than PLAIN
+
+    Returns:
+        Binary stream of the decompressed bytes
+    """
+    if codec == "gzip":
+        return _Owning(gzip.GzipFile(fileobj=raw, mode='rb'), raw)
+    if codec == "bz2":
+        return _Owning(bz2.BZ2File(raw, 'rb'), raw)
+    if codec == "xz":
+        return _Owning(lzma.LZMAFile(raw, 'rb'), raw)
+    if codec == "zstd":
+        _require_zstd()
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            raw, read_across_frames=True, closefd=True)
+        return io.BufferedReader(reader, _READ_BUFFER_BYTES)
+    if codec == "bgcode":
+        return io.BufferedReader(BGCodeReader(raw), _READ_BUFFER_BYTES)
+    raise CodecError(f"Unknown codec: {codec}")
+
+
+def compress_stream(raw: BinaryIO, codec: str) -> BinaryIO:
+    """
+    Wrap a binary stream in a compressing writer.
+
+    Closing the writer finishes the compressed data but leaves raw open.
+
+    Args:
+        raw: Output for the compressed bytes
+        codec: One of CODECS other than PLAIN
+
+    Returns:
+        Binary stream accepting uncompressed bytes
+    """
+    if codec == "gzip":
+        # mtime=0 keeps the output identical for identical input
+        return gzip.GzipFile(fileobj=raw, mode='wb', filename='',
+                             compresslevel=LEVELS["gzip"], mtime=0)
+    if codec == "bz2":
+        return bz2.BZ2File(raw, 'wb', compresslevel=LEVELS["bz2"])
+    if codec == "xz":
+        return lzma.LZMAFile(raw, 'wb', preset=LEVELS["xz"])
+    if codec == "zstd":
+        _require_zstd()
+        return zstandard.ZstdCompressor(level=LEVELS["zstd"]).stream_writer(raw, closefd=False)
+    if codec == "bgcode":
+        return BGCodeWriter(raw)
+    raise CodecError(f"Unknown codec: {codec}")
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise CodecError("zstd support requires the zstandard package "
+                         "(pip install zstandard)")
+
+
+class DigestFile(io.FileIO):
+    """
+    Unbuffered file that feeds every byte read or written to a hash.
+
+    Hashing as the bytes go by saves a second pass over the file (see
+    result_cache.hash_file()). Closing a file opened for reading first
+    reads what is left of it, so the digest covers the whole file even
+    when a decompressor stops before the end.
+    """
+
+    def __init__(self, file, mode: str, digest):
+        """
+        Args:
+            file: Path or file descriptor, as for io.FileIO
+            mode: 'r' or 'w', as for io.FileIO
+            digest: hashlib object to update
+        """
+        super().__init__(file, mode)
+        self.digest = digest
+
+    def readinto(self, buffer) -> Optional[int]:
+        count = super().readinto(buffer)
+        if count:
+            self.digest.update(memoryview(buffer)[:count])
+        return count
+
+    def readall(self) -> bytes:
+        data = super().readall()
+        self.digest.update(data)
+        return data
+
+    def write(self, data) -> Optional[int]:
+        count = super().write(data)
+        if count:
+            self.digest.update(memoryview(data)[:count])
+        return count
+
+    def close(self):
+        try:
+            if not self.closed and self.readable():
+                read = super().read
+                for block in iter(lambda: read(_READ_BUFFER_BYTES), b""):
+                    self.digest.update(block)
+        finally:
+            super().close()
+
+
+class _Owning(io.BufferedReader):
+    """Buffered reader that also closes the file under a decompressor."""
+
+    def __init__(self, stream: BinaryIO, raw: BinaryIO):
+        super().__init__(stream, _READ_BUFFER_BYTES)
+        self._owned = raw
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._owned.close()
+
+
+class BGCodeReader(io.RawIOBase):
+    """
+    Reads the G-code text stored in a binary G-code container.
+
+    Metadata and thumbnail blocks are skipped; G-code blocks are
+    decompressed one at a time as they are read.
+    """
+
+    def __init__(self, raw: BinaryIO):
+        """
+        Args:
+            raw: Container file, positioned at its start
+
+        Raises:
+            CodecError: If the file header is invalid
+        """
+        header = raw.read(_FILE_HEADER.size)
+        if len(header) != _FILE_HEADER.size:
+            raise CodecError("Truncated bgcode file header")
+        magic, version, checksum = _FILE_HEADER.unpack(header)
+        if magic != b"GCDE":
+            raise CodecError("Not a bgcode file")
+        if version != BGCODE_VERSION or checksum not in (CHECKSUM_NONE, CHECKSUM_CRC32):
+            raise CodecError(f"Unsupported bgcode version {version} "
+                             f"(checksum type {checksum})")
+        self._raw = raw
+        self._crc = checksum == CHECKSUM_CRC32
+        self._block = b""
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self._position == len(self._block):
+            block = self._next_gcode_block()
+            if block is None:
+                return 0
+            self._block, self._position = block, 0
+
+        count = min(len(buffer), len(self._block) - self._position)
+        buffer[:count] = self._block[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def close(self):
+        if not self.closed:
+            self._raw.close()
+        super().close()
+
+    def _read(self, size: int) -> bytes:
+        data = self._raw.read(size)
+        if len(data) != size:
+            raise CodecError("Truncated bgcode block")
+        return data
+
+    def _next_gcode_block(self) -> Optional[bytes]:
+        """Payload of the next G-code block, or None at the end of the file."""
+        while True:
+            header = self._raw.read(_BLOCK_HEADER.size)
+            if not header:
+                return None
+            if len(header) != _BLOCK_HEADER.size:
+                raise CodecError("Truncated bgcode block")
+            block_type, compression, size = _BLOCK_HEADER.unpack(header)
+            if compression != COMPRESSION_NONE:
+                size_field = self._read(_COMPRESSED_SIZE.size)
+                header += size_field
+                stored = _COMPRESSED_SIZE.unpack(size_field)[0]
+            else:
+                stored = size
+            params = self._read(6 if block_type == BLOCK_THUMBNAIL else 2)
+            data = self._read(stored)
+
+            if self._crc:
+                expected = _CRC32.unpack(self._read(_CRC32.size))[0]
+                if zlib.crc32(data, zlib.crc32(params, zlib.crc32(header))) != expected:
+                    raise CodecError("bgcode block checksum mismatch")
+
+            if block_type != BLOCK_GCODE:
+                continue
+            encoding = struct.unpack("<H", params)[0]
+            if encoding != 0:
+                raise CodecError("MeatPack-encoded bgcode is not supported")
+            if compression == COMPRESSION_DEFLATE:
+                data = zlib.decompress(data)
+            elif compression != COMPRESSION_NONE:
+                raise CodecError("Heatshrink-compressed bgcode is not supported")
+            if len(data) != size:
+                raise CodecError("bgcode block size mismatch")
+            return data
+
+
+class BGCodeWriter(io.RawIOBase):
+    """
+    Writes G-code text into a binary G-code container.
+
+    The text is split into deflate-compressed blocks of up to
+    BGCODE_BLOCK_BYTES, at line boundaries where possible.
+    """
+
+    def __init__(self, raw: BinaryIO, producer: str = "Splice3D"):
+        """
+        Args:
+            raw: Output file; left open by close()
+            producer: Value of the Producer key in the file metadata
+        """
+        self._raw = raw
+        self._pending = bytearray()
+        raw.write(_FILE_HEADER.pack(b"GCDE", BGCODE_VERSION, CHECKSUM_CRC32))
+        self._write_block(BLOCK_FILE_METADATA, f"Producer={producer}\n".encode())
+        # The format requires these blocks before the G-code, even if empty
+        for block_type in (BLOCK_PRINTER_METADATA, BLOCK_PRINT_METADATA,
+                           BLOCK_SLICER_METADATA):
+            self._write_block(block_type, b"")
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._pending += data
+        while len(self._pending) >= BGCODE_BLOCK_BYTES:
+            end = self._pending.rfind(b"\n", 0, BGCODE_BLOCK_BYTES) + 1 or BGCODE_BLOCK_BYTES
+            self._write_block(BLOCK_GCODE, bytes(self._pending[:end]))
+            del self._pending[:end]
+        return len(data)
+
+    def close(self):
+        if not self.closed and self._pending:
+            self._write_block(BLOCK_GCODE, bytes(self._pending))
+            self._pending.clear()
+        super().close()
+
+    def _write_block(self, block_type: int, payload: bytes):
+        """Write one block with its parameters and CRC32."""
+        if payload:
+            data = zlib.compress(payload)
+            header = (_BLOCK_HEADER.pack(block_type, COMPRESSION_DEFLATE, len(payload))
+                      + _COMPRESSED_SIZE.pack(len(data)))
+        else:
+            data = payload
+            header = _BLOCK_HEADER.pack(block_type, COMPRESSION_NONE, 0)
+        params = struct.pack("<H", 0)  # No G-code encoding / INI metadata
+        crc = zlib.crc32(data, zlib.crc32(params, zlib.crc32(header)))
+        self._raw.write(header + params + data + _CRC32.pack(crc))
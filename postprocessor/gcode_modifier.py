@@ -7,8 +7,68 @@ Modifies multi-tool G-code for single-extruder printing:
 3. Adds note about using pre-spliced filament
 """
 
+import io
+import os
 import re
-from typing import Optional
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Generator, Iterable, Iterator, Optional, TextIO
+
+try:
+    from .gcode_io import PLAIN, DigestFile, codec_for_path, compress_stream, open_gcode
+except ImportError:  # Imported as a top-level module
+    from gcode_io import PLAIN, DigestFile, codec_for_path, compress_stream, open_gcode
+
+# Size of the output file buffer
+WRITE_BUFFER_BYTES = 1 << 20
+
+# Output lines handed to the writer at a time by modify_file()
+CHUNK_LINES = 8192
+
+# Permissions for new output files (mkstemp() creates them 0600)
+OUTPUT_FILE_MODE = 0o644
+
+
+@contextmanager
+def open_atomic(output_path: str, buffering: int = WRITE_BUFFER_BYTES,
+                compression: Optional[str] = None, digest=None) -> Iterator[TextIO]:
+    """
+    Open a text file for writing that only appears once it is complete.
+    
+    Output goes to a temporary file in the same directory, which replaces
+    output_path when the block exits normally. On an exception the
+    temporary file is removed and output_path is left untouched.
+    
+    Args:
+        output_path: Final path of the file
+        buffering: Write buffer size in bytes
+        compression: Codec from gcode_io.CODECS (default: chosen by the
+            suffix of output_path, e.g. gzip for ".gz")
+        digest: Optional hashlib object fed the bytes written to the file
+            (compressed, as stored)
+        
+    Yields:
+        The temporary file, opened for UTF-8 text
+    """
+    path = Path(output_path)
+    codec = compression or codec_for_path(output_path)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        os.chmod(temp_path, OUTPUT_FILE_MODE)
+        raw = io.FileIO(fd, 'w') if digest is None else DigestFile(fd, 'w', digest)
+        with io.BufferedWriter(raw, buffering) as buffered:
+            if codec == PLAIN:
+                with io.TextIOWrapper(buffered, encoding='utf-8') as f:
+                    yield f
+            else:
+                with compress_stream(buffered, codec) as stream, \
+                        io.TextIOWrapper(stream, encoding='utf-8') as f:
+                    yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
 
 
 class GCodeModifier:
@@ -31,27 +91,92 @@ class GCodeModifier:
         self.add_pause_at_start = add_pause_at_start
         self.pause_command = pause_command
     
-    def modify_file(self, input_path: str, output_path: str) -> dict:
+    def modify_file(self, input_path: str, output_path: str, digest=None) -> dict:
         """
         Modify a G-code file for single-extruder printing.
         
+        The input is streamed through iter_modified_chunks() into a buffered
+        writer, so memory use does not grow with the size of the G-code.
+        The output file only appears once it is complete (see open_atomic()).
+        Compressed inputs are decompressed as they are read, and the output
+        is compressed according to its suffix (see gcode_io).
+        
         Args:
             input_path: Path to original multi-tool G-code
             output_path: Path for modified G-code
+            digest: Optional hashlib object fed the bytes of the output
+                (see open_atomic())
             
         Returns:
             Dictionary with statistics about modifications
         """
-        with open(input_path, 'r', encoding='utf-8', errors='replace') as f:
-            lines = f.readlines()
+        stats = {}
         
-        modified_lines, stats = self.modify_lines(lines)
+        def capture(lines: Iterable[str]) -> Iterator[list[str]]:
+            stats.update((yield from self.iter_modified_chunks(lines)))
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.writelines(modified_lines)
+        with open_gcode(input_path) as src, open_atomic(output_path, digest=digest) as dst:
+            for chunk in capture(src):
+                dst.writelines(chunk)
         
         return stats
     
+    def iter_modified(self, lines: Iterable[str]) -> Generator[str, None, dict]:
+        """
+        Modify G-code lines lazily for single-extruder printing.
+        
+        Output lines are yielded as the input is consumed. The statistics
+        dict is the generator's return value (``stats = yield from ...``).
+        
+        Args:
+            lines: Original G-code lines (any iterable, e.g. an open file)
+            
+        Yields:
+            Modified G-code lines
+            
+        Returns:
+            Statistics dict, once the input is exhausted
+        """
+        chunks = self.iter_modified_chunks(lines, chunk_lines=1)
+        while True:
+            try:
+                chunk = next(chunks)
+            except StopIteration as done:
+                return done.value
+            yield from chunk
+    
+    def iter_modified_chunks(self, lines: Iterable[str],
+                             chunk_lines: int = CHUNK_LINES) -> Generator[list[str], None, dict]:
+        """
+        Modify G-code lines lazily, yielding output in lists of lines.
+        
+        Cheaper per line than iter_modified() for consumers that write
+        whole chunks (e.g. with writelines()).
+        
+        Args:
+            lines: Original G-code lines (any iterable, e.g. an open file)
+            chunk_lines: Output lines per chunk (the last may be shorter)
+            
+        Yields:
+            Lists of modified G-code lines
+            
+        Returns:
+            Statistics dict, once the input is exhausted
+        """
+        out: list[str] = []
+        stats = self.begin(out)
+        process_line = self.process_line
+        
+        for line in lines:
+            process_line(line, line.strip(), out, stats)
+            if len(out) >= chunk_lines:
+                yield out
+                out = []
+        
+        if out:
+            yield out
+        return stats
+    
     def modify_lines(self, lines: list[str]) -> tuple[list[str], dict]:
         """
         Modify G-code lines for single-extruder printing.
@@ -63,48 +188,79 @@ class GCodeModifier:
             Tuple of (modified lines, statistics dict)
         """
         modified = []
-        stats = {
+        stats = self.begin(modified)
+        
+        for line in lines:
+            self.process_line(line, line.strip(), modified, stats)
+        
+        return modified, stats
+    
+    def begin(self, out: list[str]) -> dict:
+        """
+        Start a modification pass.
+        
+        Appends the header to ``out`` and resets per-file state. Used with
+        process_line() by callers that stream lines themselves.
+        
+        Args:
+            out: List receiving output lines
+            
+        Returns:
+            Statistics dict updated by process_line()
+        """
+        out.extend(self._generate_header())
+        
+        # Track if we've added the start pause
+        self._pause_added = False
+        self._found_start_gcode = False
+        
+        return {
             "tool_changes_removed": 0,
             "lines_modified": 0,
-            "total_lines": len(lines)
+            "total_lines": 0
         }
+    
+    def process_line(self, line: str, stripped: str, out: list[str], stats: dict,
+                     is_tool_change: Optional[bool] = None):
+        """
+        Modify a single G-code line.
         
-        # Add header
-        header = self._generate_header()
-        modified.extend(header)
+        Args:
+            line: Original line, including its newline
+            stripped: The line with surrounding whitespace removed
+            out: List receiving output lines
+            stats: Statistics dict returned by begin()
+            is_tool_change: Precomputed tool change classification, if the
+                caller has already classified the line
+        """
+        stats["total_lines"] += 1
         
-        # Track if we've added the start pause
-        pause_added = False
-        found_start_gcode = False
+        # Detect start of actual printing (after start G-code)
+        if not self._found_start_gcode and stripped.startswith(';'):
+            if 'END_GCODE' in stripped.upper() or 'START_GCODE' in stripped.upper():
+                self._found_start_gcode = True
         
-        for line in lines:
-            stripped = line.strip()
-            
-            # Detect start of actual printing (after start G-code)
-            if not found_start_gcode and stripped.startswith(';'):
-                if 'END_GCODE' in stripped.upper() or 'START_GCODE' in stripped.upper():
-                    found_start_gcode = True
-            
-            # Add pause before first move after start
-            if (self.add_pause_at_start and 
-                not pause_added and 
-                found_start_gcode and
-                (stripped.startswith('G0') or stripped.startswith('G1'))):
-                modified.append(f"\n; === SPLICE3D: Load pre-spliced spool now ===\n")
-                modified.append(f"{self.pause_command} ; Pause for spool loading\n")
-                modified.append(f"; === Press continue when ready ===\n\n")
-                pause_added = True
-            
-            # Remove tool change commands
-            if self.TOOL_CHANGE_PATTERN.match(stripped):
-                # Replace with comment
-                modified.append(f"; SPLICE3D: Removed {stripped}\n")
-                stats["tool_changes_removed"] += 1
-                stats["lines_modified"] += 1
-            else:
-                modified.append(line)
+        # Add pause before first move after start
+        if (self.add_pause_at_start and 
+            not self._pause_added and 
+            self._found_start_gcode and
+            (stripped.startswith('G0') or stripped.startswith('G1'))):
+            out.append(f"\n; === SPLICE3D: Load pre-spliced spool now ===\n")
+            out.append(f"{self.pause_command} ; Pause for spool loading\n")
+            out.append(f"; === Press continue when ready ===\n\n")
+            self._pause_added = True
         
-        return modified, stats
+        if is_tool_change is None:
+            is_tool_change = self.TOOL_CHANGE_PATTERN.match(stripped) is not None
+        
+        # Remove tool change commands
+        if is_tool_change:
+            # Replace with comment
+            out.append(f"; SPLICE3D: Removed {stripped}\n")
+            stats["tool_changes_removed"] += 1
+            stats["lines_modified"] += 1
+        else:
+            out.append(line)
     
     def _generate_header(self) -> list[str]:
         """Generate header comments for modified G-code."""
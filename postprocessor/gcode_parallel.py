@@ -0,0 +1,325 @@
+"""
+Parallel Chunked G-code Parsing for Splice3D
+
+Splits a G-code file at line-aligned byte offsets and scans the chunks in
+a process pool. A chunk cannot know the E position, tool or layer it
+starts with, so each worker reduces its chunk to a short list of replay
+operations that is valid for any incoming state:
+
+- Extrusion runs are folded as far as exactness allows. In absolute mode
+  a run only contributes its maximum. Once a G92 has fixed the E position
+  inside the chunk, the position is tracked exactly and emitted as a
+  single assignment. Only relative-mode runs before the chunk's first
+  G92 are kept value by value, because float addition depends on the
+  unknown starting position.
+- Runs of layer comments collapse to one "set and/or advance" operation.
+- Tool changes, M600, G92 and M82/M83 are kept as they are, with line
+  numbers relative to the chunk.
+
+The incoming E mode does change how runs are folded. Slicers set it once
+in the start G-code, so every chunk is folded for the mode found at the
+top of the file; a chunk whose actual incoming mode turns out different
+is rescanned during stitching. The partials are replayed in order through
+the parser's own state machine, which yields exactly the ParseResult of
+the sequential parser.
+"""
+import mmap
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import reduce
+from itertools import repeat
+from operator import add
+from typing import Any, Iterable, Optional
+
+try:
+    from .gcode_parser import (
+        GCodeParser,
+        ParseResult,
+        LINE_LAYER,
+        LINE_ABSOLUTE_E,
+        LINE_RELATIVE_E,
+        LINE_EXTRUDE,
+        LINE_E_RESET,
+    )
+    from .gcode_scanner import count_lines, needs_text_backend, scan_buffer, scan_events
+except ImportError:  # Imported as a top-level module
+    from gcode_parser import (
+        GCodeParser,
+        ParseResult,
+        LINE_LAYER,
+        LINE_ABSOLUTE_E,
+        LINE_RELATIVE_E,
+        LINE_EXTRUDE,
+        LINE_E_RESET,
+    )
+    from gcode_scanner import count_lines, needs_text_backend, scan_buffer, scan_events
+
+# Replay-only operation kinds, alongside the LINE_* kinds
+OP_SET_E = -1        # value: exact E position
+OP_LAYERS = -2       # value: (layer number or None, layers to advance)
+
+# Files smaller than this are parsed sequentially
+MIN_PARALLEL_BYTES = 4 * 1024 * 1024
+# Leading bytes searched for the start G-code's M82/M83
+PROBE_BYTES = 64 * 1024
+# Chunks per worker, so that uneven chunks still balance
+CHUNKS_PER_WORKER = 4
+
+
+@dataclass
+class ChunkSummary:
+    """Replay operations for the byte range [start, end) of a file."""
+    start: int
+    end: int
+    absolute_e: bool  # Incoming E mode the operations were folded for
+    line_count: int
+    ops: list[tuple[int, Any, int]] = field(default_factory=list)
+
+
+class _PartialState:
+    """Folds the events of one chunk, assuming an incoming E mode."""
+
+    def __init__(self, absolute_e: bool, ops: list):
+        self.absolute_e = absolute_e
+        self.ops = ops
+        # E position once fixed by a G92 in this chunk, else None
+        self.current_e: Optional[float] = None
+        self.e_changed = False
+        self.layer_set: Optional[int] = None
+        self.layer_advance = 0
+
+    def feed(self, kind: int, value: Any, line_num: int):
+        """Fold one event from gcode_scanner.scan_events()."""
+        if kind == LINE_EXTRUDE:
+            self._extrude(value)
+            return
+
+        if kind == LINE_LAYER:
+            if value is not None:
+                self.layer_set = value
+                self.layer_advance = 0
+            else:
+                self.layer_advance += 1
+            return
+
+        # Tool changes, G92 and mode switches observe the folded state
+        self.flush()
+        self.ops.append((kind, value, line_num))
+
+        if kind == LINE_E_RESET:
+            self.current_e = value
+        elif kind == LINE_ABSOLUTE_E:
+            self.absolute_e = True
+        elif kind == LINE_RELATIVE_E:
+            self.absolute_e = False
+
+    def flush(self):
+        """Emit the pending layer and E position operations."""
+        if self.layer_set is not None or self.layer_advance:
+            self.ops.append((OP_LAYERS, (self.layer_set, self.layer_advance), 0))
+            self.layer_set = None
+            self.layer_advance = 0
+        if self.e_changed:
+            self.ops.append((OP_SET_E, self.current_e, 0))
+            self.e_changed = False
+
+    def _extrude(self, values: list[float]):
+        """Fold the E words of a run of moves."""
+        if not values:
+            return
+        if self.absolute_e:
+            peak = max(values)
+            if self.current_e is None:
+                self.ops.append((LINE_EXTRUDE, (peak,), 0))
+            elif peak > self.current_e:
+                self.current_e = peak
+                self.e_changed = True
+        else:
+            deltas = array('d', filter((0.0).__lt__, values))
+            if not deltas:
+                return
+            if self.current_e is None:
+                self.ops.append((LINE_EXTRUDE, deltas, 0))
+            else:
+                self.current_e = reduce(add, deltas, self.current_e)
+                self.e_changed = True
+
+
+def scan_chunk(filepath: str, start: int, end: int,
+               absolute_e: bool = True) -> ChunkSummary:
+    """
+    Summarize the lines in bytes [start, end) of a G-code file.
+
+    Args:
+        filepath: Path to the G-code file
+        start: Offset of the first line of the chunk
+        end: Offset just after the last line of the chunk
+        absolute_e: E mode in effect at the start of the chunk
+
+    Returns:
+        ChunkSummary with the chunk's replay operations
+    """
+    with open(filepath, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        summary = ChunkSummary(start, end, absolute_e, count_lines(mm, start, end))
+        state = _PartialState(absolute_e, summary.ops)
+
+        for kind, value, line_num in scan_events(GCodeParser(), mm, start, end):
+            state.feed(kind, value, line_num)
+
+        state.flush()
+        return summary
+
+
+def predict_mode(mm: mmap.mmap) -> bool:
+    """
+    Guess the E mode in effect after the start G-code.
+
+    Args:
+        mm: Buffer of the whole file
+
+    Returns:
+        True for absolute E (M82, also the default), False for relative (M83)
+    """
+    absolute_e = True
+    probe_end = _next_line_start(mm, PROBE_BYTES)
+    for kind, _, _ in scan_events(GCodeParser(), mm, 0, probe_end):
+        if kind == LINE_ABSOLUTE_E:
+            absolute_e = True
+        elif kind == LINE_RELATIVE_E:
+            absolute_e = False
+    return absolute_e
+
+
+def _next_line_start(mm: mmap.mmap, offset: int) -> int:
+    """Offset of the first line starting at or after offset."""
+    if offset <= 0:
+        return 0
+    newline = mm.find(b'\n', offset - 1)
+    return len(mm) if newline == -1 else newline + 1
+
+
+def split_chunks(mm: mmap.mmap, chunk_count: int) -> list[tuple[int, int]]:
+    """
+    Split a buffer into at most chunk_count line-aligned byte ranges.
+
+    Args:
+        mm: Buffer to split
+        chunk_count: Desired number of chunks
+
+    Returns:
+        List of (start, end) offsets covering the whole buffer
+    """
+    size = len(mm)
+    chunk_size = -(-size // max(1, chunk_count))
+    bounds = [0]
+    for i in range(1, chunk_count):
+        bound = _next_line_start(mm, max(i * chunk_size, bounds[-1] + 1))
+        if bound >= size:
+            break
+        bounds.append(bound)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def stitch(parser: GCodeParser, filepath: str, summaries: Iterable[ChunkSummary]) -> ParseResult:
+    """
+    Replay chunk summaries, in file order, through a parser.
+
+    A summary folded for the wrong incoming E mode is rescanned here.
+
+    Args:
+        parser: Parser whose state machine performs the replay
+        filepath: Path to the G-code file, for rescans
+        summaries: Chunk summaries covering the file, in file order
+
+    Returns:
+        ParseResult identical to parsing the whole file sequentially
+    """
+    result = parser.begin()
+    apply = parser.apply_line
+    line_offset = 0
+
+    for summary in summaries:
+        if summary.absolute_e != parser.absolute_e:
+            summary = scan_chunk(filepath, summary.start, summary.end, parser.absolute_e)
+
+        for kind, value, line_num in summary.ops:
+            if kind == LINE_EXTRUDE:
+                parser.apply_extrusions(value)
+            elif kind == OP_SET_E:
+                parser.current_e = value
+            elif kind == OP_LAYERS:
+                layer, advance = value
+                if layer is not None:
+                    parser.current_layer = layer
+                parser.current_layer += advance
+            else:
+                apply(kind, value, line_num + line_offset, result)
+        line_offset += summary.line_count
+
+    return parser.finish(result, line_offset)
+
+
+def parse_file_parallel(filepath: str,
+                        parser: Optional[GCodeParser] = None,
+                        workers: Optional[int] = None,
+                        chunk_size: Optional[int] = None) -> ParseResult:
+    """
+    Parse a G-code file on several CPU cores.
+
+    Produces the same ParseResult as GCodeParser.parse_file(). Files that
+    need the text backend (non-ASCII bytes, bare CR line endings) are
+    parsed in the calling process, as are files below MIN_PARALLEL_BYTES
+    unless chunk_size is given.
+
+    Args:
+        filepath: Path to the G-code file
+        parser: Parser used for stitching (default: GCodeParser())
+        workers: Worker processes (default: os.cpu_count())
+        chunk_size: Target chunk size in bytes (default: the file split
+            into CHUNKS_PER_WORKER chunks per worker)
+
+    Returns:
+        ParseResult with segments and metadata
+    """
+    parser = parser or GCodeParser()
+    workers = workers or os.cpu_count() or 1
+
+    try:
+        with open(filepath, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                return parser.parse_lines([])
+    except IOError as e:
+        result = ParseResult()
+        result.errors.append(f"Failed to read file: {e}")
+        return result
+
+    with mm:
+        if needs_text_backend(mm):
+            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+                return parser.parse_lines(f)
+
+        size = len(mm)
+        if chunk_size is None:
+            if size < MIN_PARALLEL_BYTES or workers == 1:
+                return scan_buffer(parser, mm)
+            chunk_size = -(-size // (workers * CHUNKS_PER_WORKER))
+        chunks = split_chunks(mm, -(-size // max(1, chunk_size)))
+        absolute_e = predict_mode(mm)
+
+    starts, ends = zip(*chunks)
+    modes = [True] + [absolute_e] * (len(chunks) - 1)
+
+    if workers == 1 or len(chunks) == 1:
+        return stitch(parser, filepath, map(scan_chunk, repeat(filepath), starts, ends, modes))
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        # map() yields in submission order, so stitching overlaps the scan
+        return stitch(parser, filepath,
+                      pool.map(scan_chunk, repeat(filepath), starts, ends, modes))
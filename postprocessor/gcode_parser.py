@@ -9,7 +9,104 @@ Parses multi-tool G-code and extracts:
 
 import re
 from dataclasses import dataclass, field
-from typing import Optional
+from functools import reduce
+from operator import add
+from typing import Iterable, Optional, Union
+
+try:
+    from .gcode_io import READ_ERRORS, is_compressed, open_gcode
+except ImportError:  # Imported as a top-level module
+    from gcode_io import READ_ERRORS, is_compressed, open_gcode
+
+
+# Line kinds returned by GCodeParser.classify_line()
+LINE_OTHER = 0          # Nothing relevant to segment tracking
+LINE_LAYER = 1          # Layer comment (value: layer number or None)
+LINE_ABSOLUTE_E = 2     # M82
+LINE_RELATIVE_E = 3     # M83
+LINE_TOOL_CHANGE = 4    # T<n> (value: tool index)
+LINE_COLOR_CHANGE = 5   # M600
+LINE_EXTRUDE = 6        # G0/G1 with an E word (value: E)
+LINE_E_RESET = 7        # G92 with an E word (value: new E)
+
+_NOT_RELEVANT = (LINE_OTHER, None)
+_DIGITS = '0123456789'
+_NUMBER_CHARS = '0123456789.+-'
+
+
+def _count_digits(text: str, start: int) -> int:
+    """Count consecutive ASCII digits in text beginning at start."""
+    tail = text[start:]
+    return len(tail) - len(tail.lstrip(_DIGITS))
+
+
+def _match_number(text: str) -> Optional[float]:
+    """Match ``[-+]?\\d*\\.?\\d+`` at the start of text, returning its value."""
+    start = 1 if text[:1] in ('+', '-') else 0
+    int_digits = _count_digits(text, start)
+    dot = start + int_digits
+    if text[dot:dot + 1] == '.':
+        frac_digits = _count_digits(text, dot + 1)
+        if frac_digits:
+            return float(text[:dot + 1 + frac_digits])
+    if int_digits:
+        return float(text[:dot])
+    return None
+
+
+def scan_e_word(line: str) -> Optional[float]:
+    """
+    Find the first E word in a line without using a regex.
+    
+    Equivalent to GCodeParser.EXTRUSION_PATTERN.search(line) followed by
+    float() of the captured number: the first 'E' or 'e' followed by
+    ``[-+]?\\d*\\.?\\d+`` wins, anywhere in the line.
+    
+    Args:
+        line: G-code line
+        
+    Returns:
+        The E value, or None if the line has no E word
+    """
+    haystack = line
+    if 'e' in line:
+        if not line.isascii():
+            return _scan_e_word_mixed_case(line)
+        # Same length as line, so indexes can be shared
+        haystack = line.upper()
+    
+    index = haystack.find('E')
+    while index != -1:
+        # Longest run of number characters after the E; float() accepts
+        # exactly the runs the regex would capture whole.
+        rest = line[index + 1:]
+        number = rest[:len(rest) - len(rest.lstrip(_NUMBER_CHARS))]
+        if number:
+            try:
+                return float(number)
+            except ValueError:
+                value = _match_number(number)
+                if value is not None:
+                    return value
+        index = haystack.find('E', index + 1)
+    
+    return None
+
+
+def _scan_e_word_mixed_case(line: str) -> Optional[float]:
+    """scan_e_word() for non-ASCII lines, where upper() may change length."""
+    start = 0
+    while True:
+        upper = line.find('E', start)
+        lower = line.find('e', start)
+        index = upper if lower == -1 or (upper != -1 and upper < lower) else lower
+        if index == -1:
+            return None
+        rest = line[index + 1:]
+        value = _match_number(rest[:len(rest) - len(rest.lstrip(_NUMBER_CHARS))])
+        if value is not None:
+            return value
+        start = index + 1
 
 
 @dataclass
@@ -25,7 +122,12 @@ class Segment:
 
 @dataclass
 class ParseResult:
-    """Result of parsing a G-code file."""
+    """
+    Result of parsing a G-code file.
+    
+    segments is a list, or a segment_table.SegmentTable when the parser
+    was created with columnar=True.
+    """
     segments: list[Segment] = field(default_factory=list)
     total_length_mm: float = 0.0
     color_count: int = 0
@@ -48,14 +150,30 @@ class GCodeParser:
     LAYER_PATTERN = re.compile(r';LAYER:(\d+)|;LAYER_CHANGE', re.IGNORECASE)
     MOVE_PATTERN = re.compile(r'^G[01]\s', re.IGNORECASE)
     
-    def __init__(self, filament_diameter: float = 1.75):
+    # parse_file backends: decoded text lines, a bytes-level memory map,
+    # or memory-mapped chunks scanned in a process pool
+    BACKENDS = ("text", "mmap", "parallel")
+    
+    # Scalar parser state captured by get_state() (besides seen_tools)
+    STATE_FIELDS = ("current_tool", "current_e", "segment_start_e", "segment_start_line",
+                    "current_layer", "segment_start_layer", "absolute_e")
+    
+    def __init__(self, filament_diameter: float = 1.75, backend: str = "text",
+                 columnar: bool = False):
         """
         Initialize the parser.
         
         Args:
             filament_diameter: Filament diameter in mm (default 1.75)
+            backend: parse_file backend, one of BACKENDS (default "text")
+            columnar: Collect segments in an array-backed SegmentTable
+                instead of a list of Segment objects
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown parser backend: {backend}")
         self.filament_diameter = filament_diameter
+        self.backend = backend
+        self.columnar = columnar
         self._reset_state()
     
     def _reset_state(self):
@@ -69,130 +187,291 @@ class GCodeParser:
         self.absolute_e: bool = True  # Track E mode (absolute vs relative)
         self.seen_tools: set[int] = set()
     
+    def get_state(self) -> dict:
+        """
+        Snapshot the parser state as a JSON-serializable dict.
+        
+        Together with the segments completed so far, the snapshot is enough
+        to resume parsing at the next line (see set_state()).
+        """
+        state = {name: getattr(self, name) for name in self.STATE_FIELDS}
+        state["seen_tools"] = sorted(self.seen_tools)
+        return state
+    
+    def set_state(self, state: dict):
+        """Restore parser state saved by get_state()."""
+        for name in self.STATE_FIELDS:
+            setattr(self, name, state[name])
+        self.seen_tools = set(state["seen_tools"])
+    
     def parse_file(self, filepath: str) -> ParseResult:
         """
         Parse a G-code file and extract splice segments.
         
+        The file is streamed line by line, so memory use does not grow
+        with the size of the G-code. With the "mmap" backend the file is
+        scanned as bytes through a memory map (see gcode_scanner); the
+        "parallel" backend spreads that scan over all CPU cores (see
+        gcode_parallel).
+        
+        Compressed files (gzip, bz2, xz, zstd, bgcode; see gcode_io) are
+        recognized by their contents and decompressed while they are
+        streamed, always with the text backend.
+        
         Args:
             filepath: Path to the G-code file
             
         Returns:
             ParseResult with segments and metadata
         """
-        self._reset_state()
-        result = ParseResult()
+        if self.backend != "text" and not is_compressed(filepath):
+            if self.backend == "mmap":
+                try:
+                    from .gcode_scanner import scan_file
+                except ImportError:  # Imported as a top-level module
+                    from gcode_scanner import scan_file
+                return scan_file(self, filepath)
+            try:
+                from .gcode_parallel import parse_file_parallel
+            except ImportError:  # Imported as a top-level module
+                from gcode_parallel import parse_file_parallel
+            return parse_file_parallel(filepath, parser=self)
         
         try:
-            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-                lines = f.readlines()
-        except IOError as e:
+            with open_gcode(filepath) as f:
+                return self.parse_lines(f)
+        except READ_ERRORS as e:
+            result = ParseResult()
             result.errors.append(f"Failed to read file: {e}")
             return result
+    
+    def parse_stream(self, stream: Iterable[Union[str, bytes]],
+                     encoding: str = 'utf-8') -> ParseResult:
+        """
+        Parse G-code from any iterable of lines in constant memory.
+        
+        Accepts text or binary streams (open file handles, gzip streams,
+        socket files). Binary lines are decoded with ``errors='replace'``,
+        matching parse_file.
         
-        return self.parse_lines(lines)
+        Args:
+            stream: Iterable yielding str or bytes lines
+            encoding: Encoding used for bytes lines
+            
+        Returns:
+            ParseResult with segments and metadata
+        """
+        return self.parse_lines(
+            line.decode(encoding, errors='replace') if isinstance(line, bytes) else line
+            for line in stream
+        )
     
-    def parse_lines(self, lines: list[str]) -> ParseResult:
+    def parse_lines(self, lines: Iterable[str]) -> ParseResult:
         """
         Parse G-code lines and extract splice segments.
         
+        Lines are consumed one at a time, so any iterable (including a
+        generator or an open file) can be passed without materializing it.
+        
         Args:
-            lines: List of G-code lines
+            lines: Iterable of G-code lines
             
         Returns:
             ParseResult with segments and metadata
         """
-        self._reset_state()
-        result = ParseResult()
+        result = self.begin()
+        classify = self.classify_line
+        apply = self.apply_line
+        line_num = 0
         
         for line_num, line in enumerate(lines, start=1):
-            line = line.strip()
-            
-            # Skip empty lines and pure comments
-            if not line or line.startswith(';'):
-                # Check for layer comments
-                layer_match = self.LAYER_PATTERN.search(line)
-                if layer_match:
-                    if layer_match.group(1):
-                        self.current_layer = int(layer_match.group(1))
-                    else:
-                        self.current_layer += 1
-                continue
+            kind, value = classify(line.strip())
+            if kind != LINE_OTHER:
+                apply(kind, value, line_num, result)
+        
+        return self.finish(result, line_num)
+    
+    def begin(self) -> ParseResult:
+        """
+        Reset parser state and return an empty result for incremental feeding.
+        
+        Used together with classify_line(), apply_line() and finish() by
+        callers that drive the parser themselves (e.g. the fused pipeline).
+        """
+        self._reset_state()
+        if self.columnar:
+            try:
+                from .segment_table import SegmentTable
+            except ImportError:  # Imported as a top-level module
+                from segment_table import SegmentTable
+            return ParseResult(segments=SegmentTable())
+        return ParseResult()
+    
+    def classify_line(self, line: str) -> tuple[int, Optional[float]]:
+        """
+        Classify a stripped G-code line.
+        
+        Dispatches on the first character so that the common case, a
+        G0/G1 move, needs no regex work; the E word is extracted with
+        scan_e_word(). Results match the TOOL_CHANGE_PATTERN,
+        M600_PATTERN, MOVE_PATTERN and EXTRUSION_PATTERN cascade.
+        
+        Args:
+            line: G-code line with surrounding whitespace removed
             
-            # Check for absolute/relative E mode
+        Returns:
+            Tuple of (LINE_* kind, value). The value is the layer number,
+            tool index or E word, depending on the kind, and None otherwise.
+        """
+        if not line:
+            return _NOT_RELEVANT
+        first = line[0]
+        
+        if first == 'G' or first == 'g':
+            # Moves: ^G[01]\s
+            if len(line) > 2 and line[1] in '01' and line[2].isspace():
+                e_value = scan_e_word(line)
+                if e_value is not None:
+                    return LINE_EXTRUDE, e_value
+            # E reset (G92 E0)
+            elif line.startswith('G92'):
+                e_value = scan_e_word(line)
+                if e_value is not None:
+                    return LINE_E_RESET, e_value
+            return _NOT_RELEVANT
+        
+        # Pure comments only matter for layer tracking
+        if first == ';':
+            # LAYER_PATTERN needs ';L' or ';l'; skip the regex otherwise
+            if ';L' not in line and ';l' not in line:
+                return _NOT_RELEVANT
+            layer_match = self.LAYER_PATTERN.search(line)
+            if layer_match:
+                if layer_match.group(1):
+                    return LINE_LAYER, int(layer_match.group(1))
+                return LINE_LAYER, None
+            return _NOT_RELEVANT
+        
+        if first == 'T' or first == 't':
+            digits = _count_digits(line, 1)
+            if digits:
+                return LINE_TOOL_CHANGE, int(line[1:1 + digits])
+            return _NOT_RELEVANT
+        
+        if first == 'M' or first == 'm':
+            # Absolute/relative E mode
             if line.startswith('M82'):
-                self.absolute_e = True
-                continue
+                return LINE_ABSOLUTE_E, None
             elif line.startswith('M83'):
-                self.absolute_e = False
-                continue
-            
-            # Check for tool change
-            tool_match = self.TOOL_CHANGE_PATTERN.match(line)
-            if tool_match:
-                new_tool = int(tool_match.group(1))
-                
-                # Record segment if we've extruded anything
-                if self.current_e > self.segment_start_e or self.seen_tools:
-                    segment = self._create_segment(line_num - 1)
-                    if segment.length_mm > 0:
-                        result.segments.append(segment)
-                
-                # Start new segment
-                self.current_tool = new_tool
-                self.seen_tools.add(new_tool)
-                self.segment_start_e = self.current_e
-                self.segment_start_line = line_num
-                self.segment_start_layer = self.current_layer
-                continue
-            
-            # Check for M600 color change (alternate to tool change)
-            if self.M600_PATTERN.match(line):
-                # Record current segment
-                if self.current_e > self.segment_start_e:
-                    segment = self._create_segment(line_num - 1)
-                    if segment.length_mm > 0:
-                        result.segments.append(segment)
-                
-                # Toggle to next color (assumes 2-color for M600)
-                self.current_tool = (self.current_tool + 1) % 2
-                self.seen_tools.add(self.current_tool)
-                self.segment_start_e = self.current_e
-                self.segment_start_line = line_num
-                self.segment_start_layer = self.current_layer
-                continue
+                return LINE_RELATIVE_E, None
+            # M600 color change (alternate to tool change)
+            if line[1:4] == '600':
+                return LINE_COLOR_CHANGE, None
+        
+        return _NOT_RELEVANT
+    
+    def apply_line(self, kind: int, value: Optional[float], line_num: int,
+                   result: ParseResult):
+        """
+        Update parser state for a classified line.
+        
+        Args:
+            kind: LINE_* kind from classify_line()
+            value: Value from classify_line()
+            line_num: 1-based line number of the line
+            result: ParseResult receiving completed segments
+        """
+        if kind == LINE_EXTRUDE:
+            if self.absolute_e:
+                # Absolute mode: E value is total extrusion
+                if value > self.current_e:
+                    self.current_e = value
+            else:
+                # Relative mode: E value is delta
+                if value > 0:
+                    self.current_e += value
+        
+        elif kind == LINE_TOOL_CHANGE:
+            # Record segment if we've extruded anything
+            if self.current_e > self.segment_start_e or self.seen_tools:
+                segment = self._create_segment(line_num - 1)
+                if segment.length_mm > 0:
+                    result.segments.append(segment)
             
-            # Check for extrusion moves
-            if self.MOVE_PATTERN.match(line):
-                e_match = self.EXTRUSION_PATTERN.search(line)
-                if e_match:
-                    e_value = float(e_match.group(1))
-                    
-                    if self.absolute_e:
-                        # Absolute mode: E value is total extrusion
-                        if e_value > self.current_e:
-                            self.current_e = e_value
-                    else:
-                        # Relative mode: E value is delta
-                        if e_value > 0:
-                            self.current_e += e_value
+            # Start new segment
+            self.current_tool = value
+            self.seen_tools.add(value)
+            self._start_segment(line_num)
+        
+        elif kind == LINE_COLOR_CHANGE:
+            # Record current segment
+            if self.current_e > self.segment_start_e:
+                segment = self._create_segment(line_num - 1)
+                if segment.length_mm > 0:
+                    result.segments.append(segment)
             
-            # Check for E reset (G92 E0)
-            if line.startswith('G92'):
-                e_match = self.EXTRUSION_PATTERN.search(line)
-                if e_match:
-                    new_e = float(e_match.group(1))
-                    # Adjust segment start to account for reset
-                    self.segment_start_e = self.segment_start_e - self.current_e + new_e
-                    self.current_e = new_e
+            # Toggle to next color (assumes 2-color for M600)
+            self.current_tool = (self.current_tool + 1) % 2
+            self.seen_tools.add(self.current_tool)
+            self._start_segment(line_num)
+        
+        elif kind == LINE_LAYER:
+            if value is not None:
+                self.current_layer = value
+            else:
+                self.current_layer += 1
+        
+        elif kind == LINE_E_RESET:
+            # Adjust segment start to account for reset
+            self.segment_start_e = self.segment_start_e - self.current_e + value
+            self.current_e = value
+        
+        elif kind == LINE_ABSOLUTE_E:
+            self.absolute_e = True
+        
+        elif kind == LINE_RELATIVE_E:
+            self.absolute_e = False
+    
+    def apply_extrusions(self, values: Iterable[float]):
+        """
+        Apply the E words of a run of consecutive move lines.
         
+        Equivalent to apply_line(LINE_EXTRUDE, value, ...) for each value
+        in order, but evaluated in bulk: a running maximum in absolute
+        mode, a left-to-right sum of the positive deltas in relative mode.
+        
+        Args:
+            values: E values of extruding moves, in file order
+        """
+        if self.absolute_e:
+            peak = max(values, default=self.current_e)
+            if peak > self.current_e:
+                self.current_e = peak
+        else:
+            self.current_e = reduce(add, filter((0.0).__lt__, values), self.current_e)
+    
+    def finish(self, result: ParseResult, line_count: int) -> ParseResult:
+        """
+        Close the final segment and compute totals.
+        
+        Args:
+            result: ParseResult returned by begin()
+            line_count: Number of lines fed to the parser
+            
+        Returns:
+            The completed ParseResult
+        """
         # Capture final segment
         if self.current_e > self.segment_start_e:
-            segment = self._create_segment(len(lines))
+            segment = self._create_segment(line_count)
             if segment.length_mm > 0:
                 result.segments.append(segment)
         
         # Calculate totals
-        result.total_length_mm = sum(s.length_mm for s in result.segments)
+        lengths = getattr(result.segments, "length_mm", None)
+        if lengths is None:
+            lengths = (s.length_mm for s in result.segments)
+        result.total_length_mm = sum(lengths)
         result.color_count = len(self.seen_tools) if self.seen_tools else 1
         result.layer_count = self.current_layer + 1
         
@@ -204,6 +483,12 @@ class GCodeParser:
         
         return result
     
+    def _start_segment(self, line_num: int):
+        """Start a new segment at the given line."""
+        self.segment_start_e = self.current_e
+        self.segment_start_line = line_num
+        self.segment_start_layer = self.current_layer
+    
     def _create_segment(self, end_line: int) -> Segment:
         """Create a segment from current state."""
         length = self.current_e - self.segment_start_e
@@ -0,0 +1,126 @@
+"""
+Fused G-code Pipeline for Splice3D
+
+Parses splice segments and writes the modified single-extruder G-code
+in one streaming pass over the input. Each line is read, stripped and
+classified once, and the classification is shared by the parser and
+the modifier. The output only appears once it is complete. Compressed
+inputs and outputs are handled as in GCodeModifier.modify_file().
+"""
+
+import hashlib
+import os
+from typing import Optional
+
+try:
+    from .gcode_parser import GCodeParser, ParseResult, LINE_OTHER, LINE_TOOL_CHANGE
+    from .gcode_modifier import GCodeModifier, open_atomic
+    from .gcode_io import READ_ERRORS, open_gcode
+    from .result_cache import ResultCache, file_identity, hash_file
+except ImportError:  # Imported as a top-level module
+    from gcode_parser import GCodeParser, ParseResult, LINE_OTHER, LINE_TOOL_CHANGE
+    from gcode_modifier import GCodeModifier, open_atomic
+    from gcode_io import READ_ERRORS, open_gcode
+    from result_cache import ResultCache, file_identity, hash_file
+
+
+# Number of output lines buffered before they are written out
+FLUSH_LINES = 8192
+
+
+def process_gcode(input_path: str,
+                  output_path: str,
+                  parser: Optional[GCodeParser] = None,
+                  modifier: Optional[GCodeModifier] = None,
+                  cache: Optional[ResultCache] = None) -> tuple[ParseResult, dict]:
+    """
+    Parse and modify a G-code file in a single pass.
+
+    Produces the same ParseResult as GCodeParser.parse_file() and the same
+    output and statistics as GCodeModifier.modify_file().
+
+    With a cache, an unchanged input is not parsed again: the cached
+    ParseResult is returned, and the modified G-code is only rewritten
+    when the existing output is not the one the cache describes. The
+    input is recognized by its file_identity(); the hashes of the input
+    and output are computed while the pass reads and writes them.
+
+    Args:
+        input_path: Path to original multi-tool G-code
+        output_path: Path for modified G-code
+        parser: Parser to use (default: GCodeParser())
+        modifier: Modifier to use (default: GCodeModifier())
+        cache: Optional ResultCache for parse results and modifier stats
+
+    Returns:
+        Tuple of (ParseResult, modification statistics dict)
+    """
+    parser = parser or GCodeParser()
+    modifier = modifier or GCodeModifier()
+
+    if cache is None:
+        return _process(input_path, output_path, parser, modifier)
+
+    try:
+        identity = file_identity(input_path)
+    except OSError:
+        # Let the uncached pass report the error
+        return _process(input_path, output_path, parser, modifier)
+
+    content_hash = cache.get_content_hash(identity)
+    result = None if content_hash is None else cache.get_parse_result(content_hash, parser)
+    output_digest = hashlib.sha256()
+    if result is None:
+        input_digest = hashlib.sha256()
+        result, stats = _process(input_path, output_path, parser, modifier,
+                                 input_digest, output_digest)
+        if result.errors:
+            return result, stats
+        content_hash = input_digest.hexdigest()
+        cache.put_content_hash(identity, content_hash)
+        cache.put_parse_result(content_hash, parser, result)
+    else:
+        entry = cache.get_modify_stats(content_hash, modifier)
+        if (entry is not None and os.path.exists(output_path)
+                and hash_file(output_path) == entry["output_sha256"]):
+            return result, entry["stats"]
+        stats = modifier.modify_file(input_path, output_path, digest=output_digest)
+
+    cache.put_modify_stats(content_hash, modifier, stats, output_digest.hexdigest())
+    return result, stats
+
+
+def _process(input_path: str, output_path: str, parser: GCodeParser,
+             modifier: GCodeModifier, input_digest=None,
+             output_digest=None) -> tuple[ParseResult, dict]:
+    """Run the fused parse + modify pass, hashing the files into the digests."""
+    result = parser.begin()
+    classify = parser.classify_line
+    apply = parser.apply_line
+    process_line = modifier.process_line
+    line_num = 0
+
+    try:
+        with open_gcode(input_path, input_digest) as src, \
+                open_atomic(output_path, digest=output_digest) as dst:
+            out: list[str] = []
+            stats = modifier.begin(out)
+
+            for line_num, line in enumerate(src, start=1):
+                stripped = line.strip()
+                kind, value = classify(stripped)
+                if kind != LINE_OTHER:
+                    apply(kind, value, line_num, result)
+                process_line(line, stripped, out, stats, kind == LINE_TOOL_CHANGE)
+
+                if len(out) >= FLUSH_LINES:
+                    dst.writelines(out)
+                    out.clear()
+
+            dst.writelines(out)
+    except READ_ERRORS as e:
+        result = ParseResult()
+        result.errors.append(f"Failed to process file: {e}")
+        return result, {}
+
+    return parser.finish(result, line_num), stats
@@ -0,0 +1,229 @@
+"""
+Memory-mapped G-code Scanner for Splice3D
+
+Bytes-level backend for GCodeParser. Instead of classifying the file one
+line at a time, the memory-mapped buffer is searched with two compiled
+patterns:
+
+- CONTROL_PATTERN finds the rare lines that change parser state
+  (T<n>, M600, M82/M83, G92 E, layer comments); these are fed to
+  GCodeParser.apply_line() with their line numbers.
+- MOVE_PATTERN collects the E words of all extruding G0/G1 moves between
+  two control lines in one findall() call; they are applied in bulk with
+  GCodeParser.apply_extrusions().
+
+Both patterns mirror GCodeParser.classify_line() on the stripped line, so
+the result is identical to the text backend. Files whose lines would be
+split or stripped differently once decoded (non-ASCII bytes, bare CR line
+endings, the ASCII separators \\x1c-\\x1f) are handed to the text backend.
+"""
+
+import mmap
+import re
+from typing import Any, Iterator, Optional
+
+try:
+    from .gcode_parser import (
+        GCodeParser,
+        ParseResult,
+        LINE_OTHER,
+        LINE_LAYER,
+        LINE_ABSOLUTE_E,
+        LINE_RELATIVE_E,
+        LINE_TOOL_CHANGE,
+        LINE_COLOR_CHANGE,
+        LINE_EXTRUDE,
+        LINE_E_RESET,
+    )
+except ImportError:  # Imported as a top-level module
+    from gcode_parser import (
+        GCodeParser,
+        ParseResult,
+        LINE_OTHER,
+        LINE_LAYER,
+        LINE_ABSOLUTE_E,
+        LINE_RELATIVE_E,
+        LINE_TOOL_CHANGE,
+        LINE_COLOR_CHANGE,
+        LINE_EXTRUDE,
+        LINE_E_RESET,
+    )
+
+# Leading whitespace removed by bytes.strip() within a line
+_SPACE = rb'[ \t\r\x0b\x0c]'
+# First E word of the line (GCodeParser.EXTRUSION_PATTERN)
+_E_WORD = rb'[^\n]*?[Ee]([-+]?\d*\.?\d+)'
+
+# Each match starts at the newline ending the previous line
+MOVE_PATTERN = re.compile(rb'\n' + _SPACE + rb'*[Gg][01]' + _SPACE + _E_WORD)
+CONTROL_PATTERN = re.compile(
+    rb'\n' + _SPACE + rb'*(?:'
+    rb'[Tt](?P<tool>\d+)'
+    rb'|M8(?P<mode>[23])'
+    rb'|(?P<color>[Mm]600)'
+    rb'|G92[^\n]*?[Ee](?P<reset>[-+]?\d*\.?\d+)'
+    # Leftmost ';' followed by a layer marker (GCodeParser.LAYER_PATTERN)
+    rb'|;(?:[^\n;]*;)*?(?i:LAYER:(?P<layer>\d+)|(?P<layer_change>LAYER_CHANGE))'
+    rb')'
+)
+
+# Bytes the text backend would treat as line breaks or whitespace
+_TEXT_ONLY_BYTES = (b'\x1c', b'\x1d', b'\x1e', b'\x1f')
+_BLOCK = 1 << 20
+
+
+def needs_text_backend(mm: mmap.mmap) -> bool:
+    """Check whether decoding could change how lines are split or stripped."""
+    if any(mm.find(byte) != -1 for byte in _TEXT_ONLY_BYTES):
+        return True
+    if mm.find(b'\r') != -1 and re.search(rb'\r(?!\n)', mm):
+        return True
+    return not all(mm[i:i + _BLOCK].isascii()
+                   for i in range(0, len(mm), _BLOCK))
+
+
+def scan_file(parser: GCodeParser, filepath: str) -> ParseResult:
+    """
+    Parse a G-code file through a memory map.
+
+    Args:
+        parser: Parser whose state machine receives the scanned lines
+        filepath: Path to the G-code file
+
+    Returns:
+        ParseResult identical to parser.parse_lines() on the decoded file
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                return parser.parse_lines([])
+    except IOError as e:
+        result = ParseResult()
+        result.errors.append(f"Failed to read file: {e}")
+        return result
+
+    with mm:
+        if needs_text_backend(mm):
+            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+                return parser.parse_lines(f)
+        return scan_buffer(parser, mm)
+
+
+def count_lines(mm: mmap.mmap, start: int = 0, end: Optional[int] = None) -> int:
+    """
+    Count the lines in mm[start:end] as text iteration would.
+
+    A final line without a trailing newline still counts.
+    """
+    end = len(mm) if end is None else end
+    count = sum(mm[i:min(i + _BLOCK, end)].count(b'\n')
+                for i in range(start, end, _BLOCK))
+    if end > start and mm[end - 1:end] != b'\n':
+        count += 1
+    return count
+
+
+def scan_events(parser: GCodeParser, mm: mmap.mmap, start: int = 0,
+                end: Optional[int] = None) -> Iterator[tuple[int, Any, int]]:
+    """
+    Yield the parser events of the lines in an ASCII buffer.
+
+    Control lines are yielded as (LINE_* kind, value, line number), with
+    line numbers counted from 1 at start. The E words of the extruding
+    moves before each state-changing control line (and before the end of
+    the range) are yielded as (LINE_EXTRUDE, list of values, 0); layer
+    lines do not interrupt a run.
+
+    Args:
+        parser: Parser whose classify_line() handles the first line of a
+            buffer, which has no preceding newline to anchor on
+        mm: Buffer that passed the text-backend check
+        start: Offset of the first line (0 or just after a newline)
+        end: Offset just after the last newline of the range, or the end
+            of the buffer
+
+    Yields:
+        Tuples of (kind, value, line number)
+    """
+    end = len(mm) if end is None else end
+    if start >= end:
+        return
+
+    # Line number at position `counted` (1 + newlines from start to it)
+    line_num = 0
+    if start == 0:
+        first_end = mm.find(b'\n', 0, end)
+        first_line = mm[:first_end if first_end != -1 else end]
+        kind, value = parser.classify_line(first_line.decode('ascii').strip())
+        if kind == LINE_EXTRUDE:
+            yield LINE_EXTRUDE, [value], 0
+        elif kind != LINE_OTHER:
+            yield kind, value, 1
+        if first_end == -1:
+            return
+        start = first_end + 1
+        line_num = 1
+
+    find_moves = MOVE_PATTERN.findall
+    # Matches begin at the newline ending the previous line
+    anchor = start - 1
+    stop = end - 1 if mm[end - 1:end] == b'\n' else end
+    # Start of the move run not yet yielded
+    pending = anchor
+    counted = anchor
+
+    for match in CONTROL_PATTERN.finditer(mm, anchor, stop):
+        begin = match.start()
+        line_num += mm[counted:begin + 1].count(b'\n')
+        counted = begin + 1
+
+        groups = match.groupdict()
+        if groups['layer'] is not None:
+            yield LINE_LAYER, int(groups['layer']), line_num
+            continue
+        if groups['layer_change'] is not None:
+            yield LINE_LAYER, None, line_num
+            continue
+
+        # Everything below depends on the extrusion so far
+        yield LINE_EXTRUDE, list(map(float, find_moves(mm, pending, begin))), 0
+        pending = match.end()
+
+        if groups['tool'] is not None:
+            yield LINE_TOOL_CHANGE, int(groups['tool']), line_num
+        elif groups['mode'] is not None:
+            yield (LINE_ABSOLUTE_E if groups['mode'] == b'2' else LINE_RELATIVE_E,
+                   None, line_num)
+        elif groups['color'] is not None:
+            yield LINE_COLOR_CHANGE, None, line_num
+        else:
+            yield LINE_E_RESET, float(groups['reset']), line_num
+
+    yield LINE_EXTRUDE, list(map(float, find_moves(mm, pending, stop))), 0
+
+
+def scan_buffer(parser: GCodeParser, mm: mmap.mmap) -> ParseResult:
+    """
+    Parse a whole buffer that passed needs_text_backend().
+
+    Args:
+        parser: Parser whose state machine receives the events
+        mm: Buffer holding the complete G-code file
+
+    Returns:
+        ParseResult with segments and metadata
+    """
+    result = parser.begin()
+    apply = parser.apply_line
+    apply_extrusions = parser.apply_extrusions
+
+    for kind, value, line_num in scan_events(parser, mm):
+        if kind == LINE_EXTRUDE:
+            apply_extrusions(value)
+        else:
+            apply(kind, value, line_num, result)
+
+    return parser.finish(result, count_lines(mm))
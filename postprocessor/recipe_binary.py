@@ -0,0 +1,192 @@
+"""
+Binary Recipe Format for Splice3D
+
+A compact alternative to the JSON recipe for transfer to the machine.
+Only what the firmware loads (SpliceSegment: color index and length) is
+stored; color names and metadata stay in the JSON recipe.
+
+Layout (little-endian):
+
+    Header, 16 bytes
+        magic           4 bytes  b"S3DR"
+        version         uint8    1
+        encoding        uint8    LENGTH_FLOAT32 or LENGTH_SCALED
+        color_count     uint8
+        reserved        uint8    0
+        segment_count   uint32
+        scale           uint32   Length units per mm (LENGTH_SCALED), else 0
+    Segments, 5 bytes each
+        color           uint8
+        length          float32 mm, or uint32 in 1/scale mm
+    Trailer, 4 bytes
+        crc32           uint32   CRC-32 (zlib) of header and segments
+
+Recipe lengths are rounded to 0.01 mm, so LENGTH_SCALED with the default
+scale of 100 round-trips them exactly. LENGTH_FLOAT32 matches the
+firmware's in-memory representation.
+"""
+
+import struct
+import zlib
+from typing import Union
+
+try:
+    from .recipe_generator import SpliceRecipe
+except ImportError:  # Imported as a top-level module
+    from recipe_generator import SpliceRecipe
+
+MAGIC = b"S3DR"
+FORMAT_VERSION = 1
+
+# File suffix of binary recipes
+BINARY_SUFFIX = ".s3dr"
+
+LENGTH_FLOAT32 = 0
+LENGTH_SCALED = 1
+
+# Length units per mm for LENGTH_SCALED (0.01 mm, the recipe precision)
+DEFAULT_SCALE = 100
+
+HEADER = struct.Struct("<4sBBBBII")
+CRC = struct.Struct("<I")
+_RECORDS = {
+    LENGTH_FLOAT32: struct.Struct("<Bf"),
+    LENGTH_SCALED: struct.Struct("<BI"),
+}
+RECORD_SIZE = 5
+
+
+def encode_recipe(recipe: SpliceRecipe,
+                  encoding: int = LENGTH_SCALED,
+                  scale: int = DEFAULT_SCALE) -> bytes:
+    """
+    Encode a recipe in the binary format.
+
+    Args:
+        recipe: Recipe to encode
+        encoding: LENGTH_SCALED (default) or LENGTH_FLOAT32
+        scale: Length units per mm for LENGTH_SCALED
+
+    Returns:
+        Encoded recipe
+
+    Raises:
+        ValueError: If the encoding is unknown, or a color or length
+            does not fit its field
+    """
+    records = pack_segments(recipe.segments, encoding, scale)
+    if encoding == LENGTH_FLOAT32:
+        scale = 0
+    color_count = len({segment["color"] for segment in recipe.segments})
+    data = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, encoding, color_count, 0,
+                                 len(recipe.segments), scale))
+    data += records
+    data += CRC.pack(zlib.crc32(data))
+    return bytes(data)
+
+
+def pack_segments(segments: list[dict],
+                  encoding: int = LENGTH_SCALED,
+                  scale: int = DEFAULT_SCALE) -> bytes:
+    """
+    Pack recipe segments into fixed-width records (RECORD_SIZE bytes each).
+
+    Args:
+        segments: Recipe segment dicts ({"color": ..., "length_mm": ...})
+        encoding: LENGTH_SCALED (default) or LENGTH_FLOAT32
+        scale: Length units per mm for LENGTH_SCALED
+
+    Returns:
+        The records, without header or CRC
+
+    Raises:
+        ValueError: If the encoding is unknown, or a color or length
+            does not fit its field
+    """
+    if encoding not in _RECORDS:
+        raise ValueError(f"Unknown length encoding: {encoding}")
+    if encoding == LENGTH_SCALED and scale < 1:
+        raise ValueError(f"Scale must be positive: {scale}")
+
+    colors = [segment["color"] for segment in segments]
+    lengths = [segment["length_mm"] for segment in segments]
+    if colors and not 0 <= min(colors) <= max(colors) <= 255:
+        raise ValueError("Color indices must be in 0-255")
+    if lengths and min(lengths) < 0:
+        raise ValueError("Segment lengths must not be negative")
+    if encoding == LENGTH_SCALED:
+        lengths = [round(length * scale) for length in lengths]
+        if lengths and max(lengths) > 0xFFFFFFFF:
+            raise ValueError(f"Segment lengths must be below {0xFFFFFFFF / scale:g} mm")
+
+    return b"".join(map(_RECORDS[encoding].pack, colors, lengths))
+
+
+def unpack_segments(records: Union[bytes, bytearray, memoryview],
+                    encoding: int = LENGTH_SCALED,
+                    scale: int = DEFAULT_SCALE) -> list[dict]:
+    """
+    Unpack records written by pack_segments().
+
+    Raises:
+        ValueError: If the encoding is unknown or the records are truncated
+    """
+    if encoding not in _RECORDS:
+        raise ValueError(f"Unknown length encoding: {encoding}")
+    if len(records) % RECORD_SIZE:
+        raise ValueError("Binary recipe records are truncated")
+
+    rows = _RECORDS[encoding].iter_unpack(records)
+    if encoding == LENGTH_SCALED:
+        return [{"color": color, "length_mm": length / scale} for color, length in rows]
+    # float32 holds about 7 significant digits: 123.45, not 123.44999694824219
+    return [{"color": color, "length_mm": float(f"{length:.7g}")} for color, length in rows]
+
+
+def decode_recipe(data: Union[bytes, bytearray, memoryview]) -> SpliceRecipe:
+    """
+    Decode a binary recipe.
+
+    Args:
+        data: Output of encode_recipe()
+
+    Returns:
+        SpliceRecipe with segments, totals and color count. Color names
+        are the generic "color_<n>"; metadata records the encoding.
+
+    Raises:
+        ValueError: If the data is truncated, corrupt or not a recipe
+    """
+    data = memoryview(data)
+    if len(data) < HEADER.size + CRC.size:
+        raise ValueError("Binary recipe is truncated")
+    magic, version, encoding, color_count, _, count, scale = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a binary Splice3D recipe")
+    if version != FORMAT_VERSION or encoding not in _RECORDS:
+        raise ValueError(f"Unsupported binary recipe version {version} "
+                         f"(length encoding {encoding})")
+
+    end = HEADER.size + count * RECORD_SIZE
+    if len(data) != end + CRC.size:
+        raise ValueError("Binary recipe is truncated")
+    if zlib.crc32(data[:end]) != CRC.unpack_from(data, end)[0]:
+        raise ValueError("Binary recipe checksum mismatch")
+
+    segments = unpack_segments(data[HEADER.size:end], encoding, scale)
+    used = sorted({segment["color"] for segment in segments})
+    if len(used) != color_count:
+        raise ValueError("Binary recipe color count mismatch")
+    return SpliceRecipe(
+        total_length_mm=round(sum(segment["length_mm"] for segment in segments), 2),
+        segment_count=count,
+        color_count=color_count,
+        segments=segments,
+        colors={str(color): f"color_{color}" for color in used},
+        metadata={"binary_encoding": encoding, "binary_scale": scale},
+    )
+
+
+def is_binary_recipe(data: bytes) -> bool:
+    """Check whether data starts like a binary recipe."""
+    return bytes(data[:len(MAGIC)]) == MAGIC
@@ -1,14 +1,22 @@
 """
 Recipe Generator for Splice3D
 
-Generates splice recipe JSON from parsed G-code data.
+Generates splice recipe JSON (or the compact binary format of
+recipe_binary) from parsed G-code data.
 """
 
 import json
+from array import array
 from dataclasses import dataclass, asdict
+from itertools import islice
 from typing import Optional
 
-from gcode_parser import ParseResult, Segment
+try:
+    from .gcode_parser import ParseResult, Segment
+    from .segment_table import SegmentTable
+except ImportError:  # Imported as a top-level module
+    from gcode_parser import ParseResult, Segment
+    from segment_table import SegmentTable
 
 
 @dataclass
@@ -81,17 +89,24 @@ class RecipeGenerator:
         # Add transition lengths
         adjusted_segments = self._add_transitions(merged_segments)
         
+        if isinstance(adjusted_segments, SegmentTable):
+            color_column = adjusted_segments.color_index
+            pairs = zip(color_column, adjusted_segments.length_mm)
+        else:
+            color_column = [s.color_index for s in adjusted_segments]
+            pairs = ((s.color_index, s.length_mm) for s in adjusted_segments)
+        
         # Build color map
-        used_colors = set(s.color_index for s in adjusted_segments)
+        used_colors = set(color_column)
         colors = {str(i): self.color_names.get(i, f"color_{i}") for i in used_colors}
         
         # Convert segments to simple dicts
         segment_dicts = [
             {
-                "color": s.color_index,
-                "length_mm": s.length_mm
+                "color": color,
+                "length_mm": length
             }
-            for s in adjusted_segments
+            for color, length in pairs
         ]
         
         # Calculate total
@@ -121,6 +136,8 @@ class RecipeGenerator:
         """
         if not segments or self.min_segment_length_mm <= 0:
             return segments
+        if isinstance(segments, SegmentTable):
+            return self._merge_small_columns(segments)
         
         merged = []
         pending: Optional[Segment] = None
@@ -167,10 +184,72 @@ class RecipeGenerator:
         
         return merged
     
+    def _merge_small_columns(self, table: SegmentTable) -> SegmentTable:
+        """
+        Column-wise _merge_small_segments() for a SegmentTable.
+        
+        Same rules, but only the color and length columns are walked: a
+        kept segment is recorded as its color, length and the rows it
+        starts and ends at, and the line and layer columns are gathered
+        from those rows at the end. No Segment objects are created.
+        """
+        minimum = self.min_segment_length_mm
+        colors: list[int] = []
+        lengths: list[float] = []
+        firsts: list[int] = []
+        lasts: list[int] = []
+        
+        color = table.color_index[0]
+        length = table.length_mm[0]
+        first = 0
+        row = 0
+        
+        for next_color, next_length in zip(table.color_index, table.length_mm):
+            if next_length >= minimum and next_color != color:
+                if length >= minimum:
+                    colors.append(color)
+                    lengths.append(length)
+                    firsts.append(first)
+                    lasts.append(row - 1)
+                    length = next_length
+                    first = row
+                else:
+                    # Pending was too small - it starts the next segment
+                    length = next_length + length
+                color = next_color
+            elif row:
+                # Same color, or too small - add to pending
+                length += next_length
+            row += 1
+        
+        colors.append(color)
+        lengths.append(length)
+        firsts.append(first)
+        lasts.append(row - 1)
+        
+        merged = SegmentTable()
+        merged.color_index = array('i', colors)
+        merged.length_mm = array('d', lengths)
+        for name, rows in (("start_line", firsts), ("end_line", lasts),
+                           ("layer_start", firsts), ("layer_end", lasts)):
+            column = getattr(table, name)
+            setattr(merged, name, array('q', [column[i] for i in rows]))
+        return merged
+    
     def _add_transitions(self, segments: list[Segment]) -> list[Segment]:
         """Add transition length to segments for color purging."""
-        if self.transition_length_mm <= 0:
+        if not segments or self.transition_length_mm <= 0:
             return segments
+        if isinstance(segments, SegmentTable):
+            # Only the length column changes
+            transition = self.transition_length_mm
+            last = len(segments) - 1
+            lengths = [round(length + transition, 2)
+                       for length in islice(segments.length_mm, last)]
+            lengths.append(round(segments.length_mm[last], 2))
+            adjusted = segments[:]
+            adjusted.length_mm = array('d', lengths)
+            return adjusted
         
         adjusted = []
         for i, segment in enumerate(segments):
@@ -217,6 +296,35 @@ class RecipeGenerator:
         """
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(self.to_json(recipe))
+    
+    def to_binary(self, recipe: SpliceRecipe, float32: bool = False) -> bytes:
+        """
+        Serialize recipe to the compact binary format (see recipe_binary).
+        
+        Args:
+            recipe: SpliceRecipe to serialize
+            float32: Store lengths as float32 instead of 0.01 mm integers
+            
+        Returns:
+            Encoded recipe
+        """
+        try:
+            from .recipe_binary import LENGTH_FLOAT32, LENGTH_SCALED, encode_recipe
+        except ImportError:  # Imported as a top-level module
+            from recipe_binary import LENGTH_FLOAT32, LENGTH_SCALED, encode_recipe
+        return encode_recipe(recipe, LENGTH_FLOAT32 if float32 else LENGTH_SCALED)
+    
+    def save_recipe_binary(self, recipe: SpliceRecipe, filepath: str, float32: bool = False):
+        """
+        Save recipe to a binary recipe file.
+        
+        Args:
+            recipe: SpliceRecipe to save
+            filepath: Output file path
+            float32: Store lengths as float32 instead of 0.01 mm integers
+        """
+        with open(filepath, 'wb') as f:
+            f.write(self.to_binary(recipe, float32))
 
 
 def generate_recipe(parse_result: ParseResult, 
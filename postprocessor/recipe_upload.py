@@ -0,0 +1,291 @@
+"""
+Chunked Recipe Upload for Splice3D
+
+Sends a recipe to the machine as a series of short, checksummed lines
+instead of one RECIPE <json> line, which overflows the firmware's line
+buffer for all but the smallest recipes. The segments are packed as
+binary records (see recipe_binary), split into chunks of up to
+SEGMENTS_PER_CHUNK segments, and base64-encoded so every line stays
+below the firmware's 256-byte buffer.
+
+Protocol (one command or response per line):
+
+    Host                                     Firmware
+    RBEGIN <segments> <encoding> <scale>     OK RBEGIN <window>
+                                             ERROR <reason>
+    RCHUNK <seq> <base64 records> <crc>      ACK <seq>
+                                             NAK <seq> <reason>
+    REND <crc of all records>                OK RECIPE_LOADED <n> segments
+                                             ERROR <reason>
+    RABORT                                   OK RABORT
+
+<crc> is the CRC-32 (8 hex digits) of the line text before it, so it
+covers the sequence number as well as the payload. Sequence numbers
+count chunks from 0.
+
+The host keeps up to <window> chunks in flight (go-back-N). ACK <seq> is
+cumulative: every chunk up to seq has been stored. The firmware drops
+chunks that fail their CRC or arrive out of order and answers the first
+of them with NAK <seq> naming the chunk it expects; the host then resends
+from that chunk. A duplicate of a stored chunk (after a lost ACK) is
+acknowledged again. When no response arrives within the port's timeout,
+the host resends everything not yet acknowledged.
+
+The firmware side is SerialHandler in firmware/src/serial_recipe.cpp;
+fake_firmware answers the same way for tests without hardware.
+"""
+
+import base64
+import binascii
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+try:
+    from .recipe_binary import DEFAULT_SCALE, LENGTH_SCALED, RECORD_SIZE, pack_segments
+    from .recipe_generator import SpliceRecipe
+except ImportError:  # Imported as a top-level module
+    from recipe_binary import DEFAULT_SCALE, LENGTH_SCALED, RECORD_SIZE, pack_segments
+    from recipe_generator import SpliceRecipe
+
+# Segments per RCHUNK line: 160 bytes of records, 216 base64 characters
+SEGMENTS_PER_CHUNK = 32
+
+# Chunks the host keeps in flight at most (the firmware may ask for fewer)
+DEFAULT_WINDOW = 8
+
+# Consecutive NAKs or timeouts without progress before giving up
+MAX_RETRIES = 8
+
+
+def line_crc(text: str) -> str:
+    """CRC-32 of a protocol line's text, as 8 hex digits."""
+    return f"{zlib.crc32(text.encode('ascii')):08X}"
+
+
+def format_chunk(seq: int, records: bytes) -> bytes:
+    """
+    Build the RCHUNK line carrying one chunk of records.
+
+    Args:
+        seq: Chunk sequence number
+        records: Packed segment records
+
+    Returns:
+        The line, including its newline
+    """
+    text = f"RCHUNK {seq} {base64.b64encode(records).decode('ascii')}"
+    return f"{text} {line_crc(text)}\n".encode('ascii')
+
+
+def parse_chunk(line: str) -> tuple[int, bytes]:
+    """
+    Check and decode an RCHUNK line (the firmware's side of format_chunk()).
+
+    Args:
+        line: The line without its newline
+
+    Returns:
+        Tuple of (sequence number, packed records)
+
+    Raises:
+        ValueError: If the line is malformed or fails its CRC
+    """
+    text, _, crc = line.rpartition(' ')
+    if line_crc(text) != crc:
+        raise ValueError("CRC")
+    command, seq, payload = text.split(' ')
+    if command != "RCHUNK":
+        raise ValueError("FORMAT")
+    try:
+        records = base64.b64decode(payload, validate=True)
+    except binascii.Error:
+        raise ValueError("FORMAT") from None
+    if len(records) % RECORD_SIZE:
+        raise ValueError("FORMAT")
+    return int(seq), records
+
+
+@dataclass
+class UploadResult:
+    """Outcome and statistics of one recipe upload."""
+    ok: bool = False
+    message: str = ""           # Final firmware response (or the failure)
+    unsupported: bool = False   # The firmware does not know RBEGIN
+    segments: int = 0
+    chunks: int = 0
+    resent_chunks: int = 0
+    naks: int = 0
+    timeouts: int = 0
+    payload_bytes: int = 0      # Packed segment records
+    bytes_sent: int = 0         # Everything written to the port
+    elapsed_s: float = 0.0
+
+    @property
+    def throughput_bps(self) -> float:
+        """Effective payload throughput in bytes per second."""
+        return self.payload_bytes / self.elapsed_s if self.elapsed_s else 0.0
+
+
+class RecipeUploader:
+    """
+    Uploads recipes over a serial port with the chunked protocol.
+    """
+
+    def __init__(self,
+                 port,
+                 window: int = DEFAULT_WINDOW,
+                 chunk_segments: int = SEGMENTS_PER_CHUNK,
+                 max_retries: int = MAX_RETRIES,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the uploader.
+
+        Args:
+            port: Open serial port (pyserial Serial or compatible: write(),
+                flush() and readline() returning b"" on timeout)
+            window: Maximum chunks in flight
+            chunk_segments: Segments per chunk (lines must stay below the
+                firmware's 256-byte buffer)
+            max_retries: Consecutive NAKs/timeouts tolerated without progress
+            progress: Optional callback(acknowledged_segments, total_segments)
+            clock: Time source for elapsed_s
+        """
+        self.port = port
+        self.window = window
+        self.chunk_segments = chunk_segments
+        self.max_retries = max_retries
+        self.progress = progress
+        self.clock = clock
+
+    def upload(self, recipe: SpliceRecipe) -> UploadResult:
+        """
+        Upload a recipe.
+
+        Args:
+            recipe: Recipe to upload
+
+        Returns:
+            UploadResult; ok is True once the firmware confirmed the
+            complete recipe. Never raises for protocol failures.
+        """
+        start = self.clock()
+        records = pack_segments(recipe.segments, LENGTH_SCALED, DEFAULT_SCALE)
+        step = self.chunk_segments * RECORD_SIZE
+        chunks = [format_chunk(seq, records[offset:offset + step])
+                  for seq, offset in enumerate(range(0, len(records), step))]
+        result = UploadResult(segments=len(recipe.segments), chunks=len(chunks),
+                              payload_bytes=len(records))
+
+        try:
+            reply = self._request(result, f"RBEGIN {len(recipe.segments)} "
+                                          f"{LENGTH_SCALED} {DEFAULT_SCALE}", "RBEGIN")
+            if reply is None or not reply.startswith("OK"):
+                result.unsupported = reply is not None and "Unknown command" in reply
+                return self._fail(result, reply or "No response to RBEGIN")
+            words = reply.split()
+            window = min(self.window, int(words[2])) if len(words) > 2 else 1
+
+            failure = self._send_chunks(result, chunks, window)
+            if failure:
+                return self._fail(result, failure)
+
+            reply = self._request(result, f"REND {zlib.crc32(records):08X}", "RECIPE_LOADED")
+            if reply is None or not reply.startswith("OK"):
+                return self._fail(result, reply or "No response to REND")
+            result.ok = True
+            result.message = reply
+            return result
+        finally:
+            result.elapsed_s = self.clock() - start
+
+    def _send_chunks(self, result: UploadResult, chunks: list[bytes],
+                     window: int) -> Optional[str]:
+        """Go-back-N transfer of all chunks; returns a failure message or None."""
+        total = result.segments
+        base = 0        # Oldest unacknowledged chunk
+        following = 0   # Next chunk to send
+        retries = 0
+
+        while base < len(chunks):
+            while following < len(chunks) and following < base + window:
+                self._write(result, chunks[following])
+                following += 1
+            self.port.flush()
+
+            line = self._readline()
+            if line is None:
+                result.timeouts += 1
+                retries += 1
+                if retries > self.max_retries:
+                    return f"Upload timed out at chunk {base}"
+                result.resent_chunks += following - base
+                following = base
+                continue
+
+            words = line.split()
+            if len(words) > 1 and not words[1].isdigit():
+                continue
+            if words[0] == "ACK" and len(words) > 1:
+                acked = int(words[1]) + 1
+                if acked > base:
+                    base = acked
+                    following = max(following, base)
+                    retries = 0
+                    if self.progress:
+                        self.progress(min(base * self.chunk_segments, total), total)
+            elif words[0] == "NAK" and len(words) > 1:
+                result.naks += 1
+                retries += 1
+                if retries > self.max_retries:
+                    return f"Upload failed at chunk {base}: {line}"
+                expected = int(words[1])
+                base = max(base, expected)
+                result.resent_chunks += max(0, following - base)
+                following = base
+            elif words[0] == "ERROR":
+                return line
+        return None
+
+    def _request(self, result: UploadResult, command: str, expect: str) -> Optional[str]:
+        """
+        Send a command until a terminal response mentioning expect arrives.
+
+        Returns:
+            The OK/ERROR line, or None after max_retries timeouts
+        """
+        for _ in range(self.max_retries + 1):
+            self._write(result, f"{command}\n".encode('ascii'))
+            self.port.flush()
+            while True:
+                line = self._readline()
+                if line is None:
+                    result.timeouts += 1
+                    break
+                if line.startswith("ERROR") or (line.startswith("OK") and expect in line):
+                    return line
+        return None
+
+    def _fail(self, result: UploadResult, message: str) -> UploadResult:
+        """Abort a partial upload on the firmware and record the failure."""
+        if not result.unsupported:
+            self._write(result, b"RABORT\n")
+            self.port.flush()
+        result.message = message
+        return result
+
+    def _write(self, result: UploadResult, data: bytes):
+        self.port.write(data)
+        result.bytes_sent += len(data)
+
+    def _readline(self) -> Optional[str]:
+        """Next non-empty response line, or None on timeout."""
+        while True:
+            raw = self.port.readline()
+            if not raw:
+                return None
+            line = raw.decode('utf-8', errors='replace').strip()
+            if line:
+                return line
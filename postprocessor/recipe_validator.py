@@ -9,6 +9,11 @@ from dataclasses import dataclass
 from typing import Optional
 import json
 
+try:
+    from .splice_estimator import SimConfig, estimate
+except ImportError:  # Imported as a top-level module
+    from splice_estimator import SimConfig, estimate
+
 
 @dataclass
 class ValidationResult:
@@ -16,6 +21,7 @@ class ValidationResult:
     valid: bool
     errors: list[str]
     warnings: list[str]
+    estimated_time_s: Optional[float] = None   # Machine time of the valid segments
     
     def __str__(self):
         lines = []
@@ -41,6 +47,14 @@ class RecipeValidator:
     MAX_SEGMENTS = 10000             # Memory limit on firmware
     MAX_COLORS = 8                   # Maximum supported colors
     MIN_TOTAL_LENGTH_MM = 50.0       # Minimum useful print
+    MAX_SPLICE_TIME_HOURS = 24.0     # Warn above this estimated machine time
+    
+    def __init__(self, timing: Optional[SimConfig] = None):
+        """
+        Args:
+            timing: Machine timing for the time estimate (default: SimConfig())
+        """
+        self.timing = timing or SimConfig()
     
     def validate(self, recipe: dict) -> ValidationResult:
         """
@@ -72,6 +86,7 @@ class RecipeValidator:
         total_length = 0.0
         colors_used = set()
         very_short_count = 0
+        lengths = []
         
         for i, segment in enumerate(segments):
             # Required fields
@@ -95,6 +110,8 @@ class RecipeValidator:
             
             total_length += length
             colors_used.add(color)
+            if length > 0:
+                lengths.append(length)
         
         # Color count
         if len(colors_used) > self.MAX_COLORS:
@@ -117,15 +134,16 @@ class RecipeValidator:
         if "version" not in recipe:
             warnings.append("Missing 'version' field")
         
-        # Estimate time
-        estimated_time_hours = len(segments) * 45 / 3600  # 45s per splice
-        if estimated_time_hours > 24:
-            warnings.append(f"Long splice time: ~{estimated_time_hours:.1f} hours")
+        # Estimate time (feed, weld cycle and spooling of every segment)
+        estimated = estimate(lengths, config=self.timing)
+        if estimated.total_time_hours > self.MAX_SPLICE_TIME_HOURS:
+            warnings.append(f"Long splice time: ~{estimated.total_time_hours:.1f} hours")
         
         return ValidationResult(
             valid=len(errors) == 0,
             errors=errors,
-            warnings=warnings
+            warnings=warnings,
+            estimated_time_s=estimated.total_time_s
         )
     
     def validate_file(self, filepath: str) -> ValidationResult:
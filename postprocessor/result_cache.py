@@ -0,0 +1,371 @@
+"""
+Content-addressed Result Cache for Splice3D
+
+Stores parse results (and modifier statistics) on disk, keyed by the
+SHA-256 of the input G-code plus the settings that affect the result.
+Re-running the post-processor on an unchanged file with different recipe
+settings (--transition, --min-segment, --colors) then skips the parse.
+
+Entries are small JSON files under the cache directory. Reading an entry
+refreshes its modification time, and writing one evicts the least
+recently used entries until the cache fits in max_bytes.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import fields
+from pathlib import Path
+from typing import Optional
+
+try:
+    from .gcode_parser import GCodeParser, ParseResult, Segment
+    from .gcode_modifier import GCodeModifier
+except ImportError:  # Imported as a top-level module
+    from gcode_parser import GCodeParser, ParseResult, Segment
+    from gcode_modifier import GCodeModifier
+
+# Bump when the parser or the entry format changes meaning
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("SPLICE3D_CACHE_DIR",
+                                        Path.home() / ".cache" / "splice3d"))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_HASH_BLOCK = 1 << 20
+_SEGMENT_FIELDS = tuple(f.name for f in fields(Segment))
+
+
+def hash_file(filepath: str) -> str:
+    """
+    Compute the SHA-256 of a file's contents.
+
+    Args:
+        filepath: Path to the file
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_identity(filepath: str) -> dict:
+    """
+    Identify a file by path, size and modification time.
+
+    Lets ResultCache find the content hash of a file it has seen without
+    reading it; any write to the file changes the identity.
+
+    Raises:
+        OSError: If the file cannot be stat()ed
+    """
+    stat = os.stat(filepath)
+    return {"path": os.path.abspath(filepath), "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns}
+
+
+def parser_settings(parser: GCodeParser) -> dict:
+    """
+    Settings of a parser that are part of its cache key.
+
+    Covers everything that changes the segments: the parser class (a
+    subclass may classify lines differently), its patterns and the
+    filament diameter. The backend and columnar are not included: every
+    backend produces the same result, and columnar only changes the
+    container the segments are returned in.
+    """
+    patterns = {name: getattr(parser, name).pattern
+                for name in dir(parser) if name.endswith("_PATTERN")}
+    return {
+        "class": type(parser).__qualname__,
+        "patterns": patterns,
+        "filament_diameter": parser.filament_diameter,
+    }
+
+
+def encode_parse_result(result: ParseResult) -> dict:
+    """
+    Convert a ParseResult to a JSON-serializable dict.
+
+    Segments are stored column by column: compact, and much faster than
+    asdict().
+    """
+    if hasattr(result.segments, "to_columns"):
+        segments = result.segments.to_columns()
+    else:
+        segments = {
+            name: [getattr(segment, name) for segment in result.segments]
+            for name in _SEGMENT_FIELDS
+        }
+    return {
+        "segments": segments,
+        "total_length_mm": result.total_length_mm,
+        "color_count": result.color_count,
+        "layer_count": result.layer_count,
+        "errors": result.errors,
+        "warnings": result.warnings,
+    }
+
+
+def decode_parse_result(value: dict, columnar: bool = False) -> ParseResult:
+    """
+    Rebuild a ParseResult from encode_parse_result() output.
+
+    Args:
+        value: Encoded result
+        columnar: Return the segments as a SegmentTable instead of a list
+
+    Returns:
+        The ParseResult
+    """
+    columns = value["segments"]
+    if columnar:
+        try:
+            from .segment_table import SegmentTable
+        except ImportError:  # Imported as a top-level module
+            from segment_table import SegmentTable
+        segments = SegmentTable.from_columns(columns)
+    else:
+        rows = zip(*(columns[name] for name in _SEGMENT_FIELDS))
+        segments = [Segment(*row) for row in rows]
+    return ParseResult(
+        segments=segments,
+        total_length_mm=value["total_length_mm"],
+        color_count=value["color_count"],
+        layer_count=value["layer_count"],
+        errors=value["errors"],
+        warnings=value["warnings"],
+    )
+
+
+def modifier_settings(modifier: GCodeModifier) -> dict:
+    """Settings of a modifier that are part of its cache key."""
+    return {
+        "add_pause_at_start": modifier.add_pause_at_start,
+        "pause_command": modifier.pause_command,
+    }
+
+
+class ResultCache:
+    """
+    Size-bounded, least-recently-used on-disk cache.
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory for cache entries (default:
+                $SPLICE3D_CACHE_DIR or ~/.cache/splice3d)
+            max_bytes: Total size the entries may occupy
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+
+    def key(self, kind: str, content_hash: str, settings: dict) -> str:
+        """
+        Build an entry key.
+
+        Args:
+            kind: Entry type ("parse", "modify" or "content")
+            content_hash: hash_file() of the input ("" for "content")
+            settings: Settings that affect the cached value
+
+        Returns:
+            Hex key
+        """
+        material = json.dumps([CACHE_VERSION, kind, content_hash, settings],
+                              sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Load an entry and mark it as recently used.
+
+        Args:
+            key: Entry key
+
+        Returns:
+            The stored value, or None on a miss or unreadable entry
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def put(self, key: str, value: dict):
+        """
+        Store an entry atomically, then evict down to max_bytes.
+
+        Args:
+            key: Entry key
+            value: JSON-serializable value
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(value, separators=(',', ':')))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.evict()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Removed by a concurrent eviction
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        """Total size of all entries in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Remove every entry."""
+        for _, _, path in self._entries():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def get_parse_result(self, content_hash: str,
+                         parser: GCodeParser) -> Optional[ParseResult]:
+        """
+        Look up a cached ParseResult.
+
+        Args:
+            content_hash: hash_file() of the input
+            parser: Parser whose settings the result must match
+
+        Returns:
+            The ParseResult, or None on a miss
+        """
+        value = self.get(self.key("parse", content_hash, parser_settings(parser)))
+        if value is None:
+            return None
+        return decode_parse_result(value, columnar=parser.columnar)
+
+    def put_parse_result(self, content_hash: str, parser: GCodeParser,
+                         result: ParseResult):
+        """
+        Cache a ParseResult. Results with errors are not cached.
+
+        Args:
+            content_hash: hash_file() of the input
+            parser: Parser that produced the result
+            result: The ParseResult
+        """
+        if result.errors:
+            return
+        self.put(self.key("parse", content_hash, parser_settings(parser)),
+                 encode_parse_result(result))
+
+    def get_modify_stats(self, content_hash: str,
+                         modifier: GCodeModifier) -> Optional[dict]:
+        """
+        Look up cached modifier output information.
+
+        Args:
+            content_hash: hash_file() of the input
+            modifier: Modifier whose settings the entry must match
+
+        Returns:
+            Dict with "stats" and "output_sha256", or None on a miss
+        """
+        return self.get(self.key("modify", content_hash, modifier_settings(modifier)))
+
+    def put_modify_stats(self, content_hash: str, modifier: GCodeModifier,
+                         stats: dict, output_sha256: str):
+        """
+        Cache modifier statistics and the hash of the output they describe.
+
+        Args:
+            content_hash: hash_file() of the input
+            modifier: Modifier that wrote the output
+            stats: Statistics returned by the modifier
+            output_sha256: hash_file() of the written output
+        """
+        self.put(self.key("modify", content_hash, modifier_settings(modifier)),
+                 {"stats": stats, "output_sha256": output_sha256})
+
+    def get_content_hash(self, identity: dict) -> Optional[str]:
+        """
+        Look up the content hash recorded for a file identity.
+
+        Args:
+            identity: file_identity() of the file
+
+        Returns:
+            hash_file() of the file, or None on a miss
+        """
+        value = self.get(self.key("content", "", identity))
+        return None if value is None else value["sha256"]
+
+    def put_content_hash(self, identity: dict, content_hash: str):
+        """
+        Record the content hash of a file identity.
+
+        Args:
+            identity: file_identity() of the file, taken before it was read
+            content_hash: hash_file() of the contents that were read
+        """
+        self.put(self.key("content", "", identity), {"sha256": content_hash})
+
+    def parse_file(self, filepath: str,
+                   parser: Optional[GCodeParser] = None) -> ParseResult:
+        """
+        Parse a file, reusing a cached result when the content is unchanged.
+
+        Args:
+            filepath: Path to the G-code file
+            parser: Parser to use on a miss (default: GCodeParser())
+
+        Returns:
+            ParseResult with segments and metadata
+        """
+        parser = parser or GCodeParser()
+        try:
+            content_hash = hash_file(filepath)
+        except OSError:
+            return parser.parse_file(filepath)
+
+        result = self.get_parse_result(content_hash, parser)
+        if result is None:
+            result = parser.parse_file(filepath)
+            self.put_parse_result(content_hash, parser, result)
+        return result
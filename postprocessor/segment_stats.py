@@ -0,0 +1,214 @@
+"""
+Segment Statistics for Splice3D
+
+Computes length statistics for a parse result in one sweep over the
+SegmentTable columns: count, total, min/max/mean/median, percentiles,
+a length histogram with configurable bucket bounds, per-color segment
+counts and length sums, and the number of splices started in each layer.
+
+NumPy is used when it is installed; otherwise an equivalent pure-Python
+engine runs on the same columns. Both engines use the same percentile
+interpolation (NumPy's default "linear" method), so they agree up to
+floating-point summation order.
+"""
+
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+try:
+    from .gcode_parser import Segment
+    from .segment_table import NO_LAYER, SegmentTable
+except ImportError:  # Imported as a top-level module
+    from gcode_parser import Segment
+    from segment_table import NO_LAYER, SegmentTable
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# Upper bounds (mm) of the default histogram buckets: <5, 5-20, 20-100,
+# 100-500 and >=500
+DEFAULT_BUCKETS = (5.0, 20.0, 100.0, 500.0)
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class SegmentStatistics:
+    """Length statistics of a set of segments."""
+    count: int = 0
+    total_mm: float = 0.0
+    min_mm: float = 0.0
+    max_mm: float = 0.0
+    mean_mm: float = 0.0
+    median_mm: float = 0.0
+    percentiles: dict[int, float] = field(default_factory=dict)
+    bucket_bounds: tuple[float, ...] = DEFAULT_BUCKETS
+    bucket_counts: list[int] = field(default_factory=list)
+    extra_bucket_counts: list[list[int]] = field(default_factory=list)   # One per extra_buckets
+    color_counts: dict[int, int] = field(default_factory=dict)
+    color_length_mm: dict[int, float] = field(default_factory=dict)
+    splices_per_layer: dict[int, int] = field(default_factory=dict)
+
+    def histogram(self) -> dict[str, int]:
+        """Bucket counts keyed by bucket_labels()."""
+        return dict(zip(bucket_labels(self.bucket_bounds), self.bucket_counts))
+
+
+def bucket_labels(bounds: Sequence[float]) -> list[str]:
+    """
+    Labels for the histogram buckets delimited by bounds.
+
+    Args:
+        bounds: Ascending bucket upper bounds in mm
+
+    Returns:
+        len(bounds) + 1 labels, e.g. ["<5mm", "5-20mm", ">=20mm"]
+    """
+    if not bounds:
+        return ["all"]
+    labels = [f"<{bounds[0]:g}mm"]
+    labels += [f"{low:g}-{high:g}mm" for low, high in zip(bounds, bounds[1:])]
+    labels.append(f">={bounds[-1]:g}mm")
+    return labels
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """
+    Percentile of sorted values, interpolated like numpy.percentile().
+
+    Args:
+        ordered: Values in ascending order (at least one)
+        q: Percentile in [0, 100]
+
+    Returns:
+        The q-th percentile
+    """
+    position = (len(ordered) - 1) * (q / 100)
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    t = position - lower
+    a, b = ordered[lower], ordered[upper]
+    diff = b - a
+    # Same two-sided lerp as NumPy, so both engines give identical results
+    if t >= 0.5:
+        return b - diff * (1 - t)
+    return a + diff * t
+
+
+def compute_stats(segments: Sequence[Segment],
+                  buckets: Sequence[float] = DEFAULT_BUCKETS,
+                  percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                  use_numpy: Optional[bool] = None,
+                  extra_buckets: Sequence[Sequence[float]] = ()) -> SegmentStatistics:
+    """
+    Compute segment statistics.
+
+    Args:
+        segments: SegmentTable (or any sequence of Segment)
+        buckets: Histogram bucket upper bounds in mm
+        percentiles: Percentiles to report, in [0, 100]
+        use_numpy: Force (True) or disable (False) the NumPy engine;
+            default is to use NumPy when it is installed
+        extra_buckets: Further sets of bucket bounds, counted in the same
+            sweep into extra_bucket_counts
+
+    Returns:
+        SegmentStatistics; all zero/empty for no segments
+
+    Raises:
+        ImportError: If use_numpy is True and NumPy is not installed
+        ValueError: If the bucket bounds are not ascending
+    """
+    bounds = tuple(float(bound) for bound in buckets)
+    extra = [tuple(float(bound) for bound in bucket_set) for bucket_set in extra_buckets]
+    for bucket_set, checked in zip([buckets, *extra_buckets], [bounds, *extra]):
+        if list(checked) != sorted(checked):
+            raise ValueError(f"Histogram buckets must be ascending: {list(bucket_set)}")
+    if use_numpy and np is None:
+        raise ImportError("NumPy is not installed")
+    if use_numpy is None:
+        use_numpy = np is not None
+
+    table = segments if isinstance(segments, SegmentTable) else SegmentTable(segments)
+    stats = SegmentStatistics(bucket_bounds=bounds, bucket_counts=[0] * (len(bounds) + 1),
+                              extra_bucket_counts=[[0] * (len(b) + 1) for b in extra])
+    if not len(table):
+        return stats
+
+    if use_numpy:
+        _fill_numpy(stats, table, percentiles, extra)
+    else:
+        _fill_python(stats, table, percentiles, extra)
+    stats.count = len(table)
+    stats.mean_mm = stats.total_mm / stats.count
+    return stats
+
+
+def _bucket_counts(below: list[int], count: int) -> list[int]:
+    """Bucket counts from the number of values below each bound."""
+    return [high - low for low, high in zip([0] + below, below + [count])]
+
+
+def _fill_numpy(stats: SegmentStatistics, table: SegmentTable,
+                percentiles: Sequence[float], extra: list[tuple[float, ...]]):
+    columns = table.to_numpy()
+    lengths = columns["length_mm"]
+    colors = columns["color_index"]
+    ordered = np.sort(lengths)
+
+    stats.total_mm = float(lengths.sum())
+    stats.min_mm = float(ordered[0])
+    stats.max_mm = float(ordered[-1])
+    stats.median_mm = float(ordered[len(ordered) // 2])
+    stats.percentiles = {
+        q: float(value) for q, value in zip(percentiles, np.percentile(ordered, percentiles))
+    }
+
+    stats.bucket_counts, *stats.extra_bucket_counts = [
+        _bucket_counts(np.searchsorted(ordered, bounds, side='left').tolist(), len(ordered))
+        for bounds in [stats.bucket_bounds, *extra]
+    ]
+
+    counts = np.bincount(colors)
+    sums = np.bincount(colors, weights=lengths)
+    present = np.flatnonzero(counts)
+    stats.color_counts = dict(zip(present.tolist(), counts[present].tolist()))
+    stats.color_length_mm = dict(zip(present.tolist(), sums[present].tolist()))
+
+    # A splice joins each segment to the one before it
+    layers = columns["layer_start"][1:]
+    layers = layers[layers != NO_LAYER]
+    splices = np.bincount(layers) if len(layers) else np.zeros(0, dtype=np.int64)
+    busy = np.flatnonzero(splices)
+    stats.splices_per_layer = dict(zip(busy.tolist(), splices[busy].tolist()))
+
+
+def _fill_python(stats: SegmentStatistics, table: SegmentTable,
+                 percentiles: Sequence[float], extra: list[tuple[float, ...]]):
+    lengths = table.length_mm
+    ordered = sorted(lengths)
+
+    stats.total_mm = sum(lengths)
+    stats.min_mm = ordered[0]
+    stats.max_mm = ordered[-1]
+    stats.median_mm = ordered[len(ordered) // 2]
+    stats.percentiles = {q: percentile(ordered, q) for q in percentiles}
+
+    stats.bucket_counts, *stats.extra_bucket_counts = [
+        _bucket_counts([bisect_left(ordered, bound) for bound in bounds], len(ordered))
+        for bounds in [stats.bucket_bounds, *extra]
+    ]
+
+    color_length_mm: dict[int, float] = {}
+    for color, length in zip(table.color_index, lengths):
+        color_length_mm[color] = color_length_mm.get(color, 0.0) + length
+    stats.color_counts = dict(sorted(Counter(table.color_index).items()))
+    stats.color_length_mm = dict(sorted(color_length_mm.items()))
+
+    # A splice joins each segment to the one before it
+    splices = Counter(table.layer_start[1:])
+    splices.pop(NO_LAYER, None)
+    stats.splices_per_layer = dict(sorted(splices.items()))
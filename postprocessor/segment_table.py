@@ -0,0 +1,171 @@
+"""
+Columnar Segment Storage for Splice3D
+
+SegmentTable keeps parsed segments in parallel typed arrays (one per
+Segment field) instead of a list of Segment objects. A gradient print
+with tens of thousands of segments then costs about 44 bytes per segment
+instead of a dataclass instance and six boxed values, and consumers can
+work on whole columns (or NumPy views of them) at once.
+
+The table is a Sequence of Segment, so code written for
+``ParseResult.segments`` as a list keeps working: indexing and iteration
+materialize Segment objects on demand.
+"""
+
+from array import array
+from collections.abc import Sequence
+from typing import Iterable, Optional, Union
+
+try:
+    from .gcode_parser import Segment
+except ImportError:  # Imported as a top-level module
+    from gcode_parser import Segment
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# Stored in place of a missing layer_start / layer_end
+NO_LAYER = -1
+
+# Segment field -> array typecode
+COLUMN_TYPES = {
+    "color_index": 'i',
+    "length_mm": 'd',
+    "start_line": 'q',
+    "end_line": 'q',
+    "layer_start": 'q',
+    "layer_end": 'q',
+}
+
+
+def _layer(value: int) -> Optional[int]:
+    return None if value == NO_LAYER else value
+
+
+class SegmentTable(Sequence):
+    """
+    Array-backed table of segments with a list-like Segment interface.
+    """
+
+    def __init__(self, segments: Iterable[Segment] = ()):
+        """
+        Initialize the table.
+
+        Args:
+            segments: Segments to copy into the table
+        """
+        self.color_index = array(COLUMN_TYPES["color_index"])
+        self.length_mm = array(COLUMN_TYPES["length_mm"])
+        self.start_line = array(COLUMN_TYPES["start_line"])
+        self.end_line = array(COLUMN_TYPES["end_line"])
+        self.layer_start = array(COLUMN_TYPES["layer_start"])
+        self.layer_end = array(COLUMN_TYPES["layer_end"])
+        self.extend(segments)
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, Iterable]) -> "SegmentTable":
+        """
+        Build a table from one iterable per Segment field.
+
+        Missing layers may be given as None or NO_LAYER.
+
+        Args:
+            columns: Mapping of field name to values
+
+        Returns:
+            New SegmentTable
+        """
+        table = cls()
+        for name, typecode in COLUMN_TYPES.items():
+            values = columns[name]
+            if name.startswith("layer_"):
+                values = (NO_LAYER if v is None else v for v in values)
+            setattr(table, name, array(typecode, values))
+        if len({len(column) for column in table.columns().values()}) > 1:
+            raise ValueError("Segment columns have different lengths")
+        return table
+
+    def append(self, segment: Segment):
+        """Append one segment."""
+        self.color_index.append(segment.color_index)
+        self.length_mm.append(segment.length_mm)
+        self.start_line.append(segment.start_line)
+        self.end_line.append(segment.end_line)
+        self.layer_start.append(NO_LAYER if segment.layer_start is None else segment.layer_start)
+        self.layer_end.append(NO_LAYER if segment.layer_end is None else segment.layer_end)
+
+    def extend(self, segments: Iterable[Segment]):
+        """Append several segments."""
+        if isinstance(segments, SegmentTable):
+            for name, column in segments.columns().items():
+                getattr(self, name).extend(column)
+            return
+        for segment in segments:
+            self.append(segment)
+
+    def to_columns(self) -> dict[str, list]:
+        """
+        Return the columns as lists, with None for missing layers.
+
+        The inverse of from_columns(); used for JSON serialization.
+        """
+        columns = {name: column.tolist() for name, column in self.columns().items()}
+        for name in ("layer_start", "layer_end"):
+            columns[name] = [_layer(value) for value in columns[name]]
+        return columns
+
+    def columns(self) -> dict[str, array]:
+        """Return the underlying arrays, keyed by Segment field name."""
+        return {name: getattr(self, name) for name in COLUMN_TYPES}
+
+    def to_numpy(self) -> dict:
+        """
+        Return zero-copy NumPy views of the columns.
+
+        Raises:
+            ImportError: If NumPy is not installed
+        """
+        if np is None:
+            raise ImportError("NumPy is required for SegmentTable.to_numpy()")
+        return {name: np.frombuffer(column, dtype=column.typecode)
+                for name, column in self.columns().items()}
+
+    def segment(self, index: int) -> Segment:
+        """Materialize the segment at index."""
+        return Segment(
+            color_index=self.color_index[index],
+            length_mm=self.length_mm[index],
+            start_line=self.start_line[index],
+            end_line=self.end_line[index],
+            layer_start=_layer(self.layer_start[index]),
+            layer_end=_layer(self.layer_end[index]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.length_mm)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            table = SegmentTable()
+            for name, column in self.columns().items():
+                setattr(table, name, column[index])
+            return table
+        return self.segment(index)
+
+    def __iter__(self):
+        for color, length, start, end, layer_start, layer_end in zip(
+                self.color_index, self.length_mm, self.start_line,
+                self.end_line, self.layer_start, self.layer_end):
+            yield Segment(color, length, start, end, _layer(layer_start), _layer(layer_end))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SegmentTable):
+            return self.columns() == other.columns()
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"SegmentTable({len(self)} segments)"
@@ -0,0 +1,330 @@
+"""
+Shared Serial Reader for Splice3D
+
+One background thread per serial port blocks in readline() and hands
+every complete line to whoever is waiting for it, so the host tools no
+longer poll in_waiting and sleep between checks:
+
+- request() writes a command and returns a Future that resolves to the
+  response lines once a terminal line arrives. Requests are answered in
+  the order they were sent, as the firmware handles one line at a time.
+- subscribe() registers a callback for lines that do not belong to a
+  request (status, progress, DONE, asynchronous errors). STREAM JSON
+  records are never part of a response and reach subscribers even while
+  a request is pending.
+- exclusive() temporarily routes every line to a single channel with a
+  pyserial-like write()/readline() interface, for protocols that need
+  the raw line stream (recipe_upload.RecipeUploader).
+
+A response is complete at a line starting with OK or ERR(OR), or with
+the command's own name (STATUS answers "STATUS IDLE ..."); request()
+accepts other prefixes for commands that answer differently.
+"""
+
+import concurrent.futures
+import logging
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Response lines that end every command ("ERR" also covers the STREAM
+# handler's "ERR unknown STREAM subcommand")
+TERMINAL_PREFIXES = ("OK", "ERR")
+
+
+def is_unsolicited(line: str) -> bool:
+    """Check whether a line is never part of a response (STREAM JSON)."""
+    return line.startswith("{")
+
+
+def response_prefixes(command: str) -> tuple[str, ...]:
+    """Prefixes of the line that completes the response to a command."""
+    return TERMINAL_PREFIXES + (f"{command.split(' ', 1)[0].upper()} ",)
+
+
+class _Request:
+    """A command waiting for its response lines."""
+
+    def __init__(self, command: str, expect: Sequence[str]):
+        self.command = command
+        self.expect = tuple(expect)
+        self.lines: list[str] = []
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+
+    def is_terminal(self, line: str) -> bool:
+        return line.startswith(self.expect)
+
+
+class LineChannel:
+    """
+    Exclusive view of the line stream, returned by SerialReader.exclusive().
+
+    Implements the part of pyserial's Serial used by the line protocols:
+    write(), flush() and readline() returning b"" after timeout seconds.
+    Lines are fed by the owner of the port, possibly from another thread.
+    """
+
+    def __init__(self, write: Callable[[bytes], int], timeout: float):
+        self._write = write
+        self.timeout = timeout
+        self._lines: "queue.Queue[bytes]" = queue.Queue()
+
+    def feed(self, line: str):
+        """Make a received line readable."""
+        self._lines.put(f"{line}\n".encode('utf-8'))
+
+    def write(self, data: bytes) -> int:
+        return self._write(data)
+
+    def flush(self):
+        pass
+
+    def readline(self) -> bytes:
+        try:
+            return self._lines.get(timeout=self.timeout)
+        except queue.Empty:
+            return b""
+
+
+class SerialReader:
+    """
+    Background line reader shared by everything that talks to one port.
+    """
+
+    def __init__(self,
+                 port,
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 name: str = "splice3d-serial"):
+        """
+        Initialize the reader (call start() to begin reading).
+
+        Args:
+            port: Open serial port (pyserial Serial or compatible). Its
+                timeout bounds how long stop() waits on ports without
+                cancel_read().
+            on_error: Called from the reader thread when reading fails;
+                the reader has stopped and pending requests have failed
+            name: Name of the reader thread
+        """
+        self.port = port
+        self.on_error = on_error
+        self.name = name
+
+        self._lock = threading.Lock()         # Pending requests, subscribers, channel
+        self._write_lock = threading.Lock()   # Keeps write order == request order
+        self._pending: deque[_Request] = deque()
+        self._subscribers: list[Callable[[str], None]] = []
+        self._channel: Optional[LineChannel] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Lifecycle ----------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "SerialReader":
+        """Start the reader thread."""
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        """Stop the reader thread and fail the requests still pending."""
+        self._stop.set()
+        cancel = getattr(self.port, "cancel_read", None)
+        if cancel:
+            try:
+                cancel()
+            except Exception:
+                pass
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        self._fail_pending(ConnectionError("Serial reader stopped"))
+
+    def __enter__(self) -> "SerialReader":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # --- Consumers ----------------------------------------------------------
+
+    def subscribe(self, callback: Callable[[str], None]) -> Callable[[], None]:
+        """
+        Receive every line that is not part of a command response.
+
+        Args:
+            callback: Called with each line (stripped) from the reader
+                thread; it should return quickly
+
+        Returns:
+            A function that removes the subscription
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def write(self, data: bytes) -> int:
+        """Write raw data to the port."""
+        with self._write_lock:
+            written = self.port.write(data)
+            self.port.flush()
+        return written
+
+    def request(self, command: str,
+                expect: Optional[Sequence[str]] = None) -> concurrent.futures.Future:
+        """
+        Send a command and collect its response.
+
+        Args:
+            command: Command line without newline
+            expect: Prefixes of the line that completes the response
+                (default: response_prefixes(command))
+
+        Returns:
+            Future resolving to the response lines, the terminal line last
+        """
+        if expect is None:
+            expect = response_prefixes(command)
+        pending = _Request(command, expect)
+        if not self.running:
+            pending.future.set_exception(ConnectionError("Serial reader is not running"))
+            return pending.future
+
+        with self._write_lock:
+            with self._lock:
+                self._pending.append(pending)
+            try:
+                self.port.write(f"{command}\n".encode('utf-8'))
+                self.port.flush()
+            except Exception as e:
+                self._discard(pending)
+                pending.future.set_exception(e)
+        return pending.future
+
+    def command(self, command: str, timeout: float = 2.0,
+                expect: Optional[Sequence[str]] = None) -> list[str]:
+        """
+        Send a command and wait for its response.
+
+        Returns:
+            The response lines; on timeout or failure, the lines received
+            so far (possibly none)
+        """
+        future = self.request(command, expect)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            pending = self._find(future)
+            if pending is None and future.done():
+                # Completed between the timeout and the lookup
+                return future.result()
+            self._discard(pending)
+            return list(pending.lines) if pending else []
+        except Exception as e:
+            logger.debug(f"Command '{command}' failed: {e}")
+            return []
+
+    @contextmanager
+    def exclusive(self, timeout: float = 1.0) -> Iterator[LineChannel]:
+        """
+        Route every incoming line to one channel for the duration.
+
+        Args:
+            timeout: readline() timeout of the channel in seconds
+        """
+        channel = LineChannel(self.write, timeout)
+        with self._lock:
+            if self._channel is not None:
+                raise RuntimeError("Serial port is already in exclusive use")
+            self._channel = channel
+        try:
+            yield channel
+        finally:
+            with self._lock:
+                self._channel = None
+
+    # --- Reader thread ------------------------------------------------------
+
+    def _run(self):
+        partial = b""
+        while not self._stop.is_set():
+            try:
+                raw = self.port.readline()
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                logger.error(f"Serial read error: {e}")
+                self._fail_pending(e)
+                if self.on_error:
+                    self.on_error(e)
+                return
+
+            # readline() returns what it has on timeout; keep partial lines
+            partial += raw
+            if not partial.endswith(b"\n"):
+                continue
+            line = partial.decode('utf-8', errors='replace').strip()
+            partial = b""
+            if line:
+                self._dispatch(line)
+
+    def _dispatch(self, line: str):
+        completed = None
+        with self._lock:
+            if self._channel is not None:
+                self._channel.feed(line)
+                return
+            if self._pending and not is_unsolicited(line):
+                pending = self._pending[0]
+                pending.lines.append(line)
+                if pending.is_terminal(line):
+                    completed = self._pending.popleft()
+                else:
+                    return
+            else:
+                subscribers = list(self._subscribers)
+
+        if completed:
+            if not completed.future.done():
+                completed.future.set_result(completed.lines)
+            return
+        for callback in subscribers:
+            try:
+                callback(line)
+            except Exception:
+                logger.exception(f"Serial subscriber failed on line: {line}")
+
+    def _find(self, future: concurrent.futures.Future) -> Optional[_Request]:
+        with self._lock:
+            for pending in self._pending:
+                if pending.future is future:
+                    return pending
+        return None
+
+    def _discard(self, pending: Optional[_Request]):
+        with self._lock:
+            if pending in self._pending:
+                self._pending.remove(pending)
+
+    def _fail_pending(self, error: Exception):
+        with self._lock:
+            failed = list(self._pending)
+            self._pending.clear()
+        for pending in failed:
+            if not pending.future.done():
+                pending.future.set_exception(error)
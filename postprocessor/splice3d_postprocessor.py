@@ -6,22 +6,123 @@ Main entry point for processing multi-color G-code.
 
 Usage:
     python splice3d_postprocessor.py input.gcode [options]
+    python splice3d_postprocessor.py jobs/ [options]          # batch mode
+    python splice3d_postprocessor.py "jobs/**/*.gcode" [options]
     
     Options:
         -o, --output DIR        Output directory (default: same as input)
         -t, --transition MM     Transition length in mm (default: 0)
         --no-pause              Don't add pause at start
         -v, --verbose           Verbose output
+        -j, --jobs N            Batch mode: parallel worker processes
+        --summary FILE          Batch mode: write JSON summary to FILE
+        --cache-dir DIR         Parse result cache (default: ~/.cache/splice3d)
+        --no-cache              Always parse, never read or write the cache
+        --incremental           Re-parse only the layers changed since the last run
+        --compress CODEC        Compress the modified G-code (gzip, bz2, xz, zstd, bgcode)
+        --binary-recipe         Also write the recipe in the compact binary format
+
+    Compressed inputs (.gcode.gz, .gcode.zst, .bgcode, ...) are read directly.
 """
 
 import argparse
 import os
 import sys
 from pathlib import Path
+from typing import Optional
+
+try:
+    from .gcode_parser import GCodeParser, parse_gcode
+    from .recipe_generator import RecipeGenerator, generate_recipe
+    from .gcode_modifier import GCodeModifier, modify_gcode
+    from .gcode_pipeline import process_gcode
+    from .gcode_incremental import IncrementalParser, index_path_for
+    from .gcode_batch import collect_inputs, is_batch_input, run_batch, write_summary
+    from .gcode_io import CODECS, PLAIN, SUFFIXES, gcode_stem
+    from .recipe_binary import BINARY_SUFFIX
+    from .result_cache import DEFAULT_MAX_BYTES, ResultCache
+except ImportError:  # Imported as a top-level module
+    from gcode_parser import GCodeParser, parse_gcode
+    from recipe_generator import RecipeGenerator, generate_recipe
+    from gcode_modifier import GCodeModifier, modify_gcode
+    from gcode_pipeline import process_gcode
+    from gcode_incremental import IncrementalParser, index_path_for
+    from gcode_batch import collect_inputs, is_batch_input, run_batch, write_summary
+    from gcode_io import CODECS, PLAIN, SUFFIXES, gcode_stem
+    from recipe_binary import BINARY_SUFFIX
+    from result_cache import DEFAULT_MAX_BYTES, ResultCache
+
+
+def make_cache(args) -> Optional[ResultCache]:
+    """Create the result cache selected on the command line, if any."""
+    if args.no_cache:
+        return None
+    return ResultCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
 
-from gcode_parser import GCodeParser, parse_gcode
-from recipe_generator import RecipeGenerator, generate_recipe
-from gcode_modifier import GCodeModifier, modify_gcode
+
+def run_batch_mode(args) -> int:
+    """
+    Process every file matched by a directory or glob input.
+    
+    Args:
+        args: Parsed command-line arguments
+        
+    Returns:
+        Exit code: 0 if every file succeeded, 1 otherwise
+    """
+    try:
+        inputs = collect_inputs(args.input, args.output)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if not inputs:
+        print(f"Error: No G-code files match: {args.input}", file=sys.stderr)
+        return 1
+    
+    print(f"Splice3D Post-Processor (batch)")
+    print(f"=" * 40)
+    print(f"Inputs: {len(inputs)} files")
+    print()
+    
+    def report(job):
+        status = "OK  " if job["ok"] else "FAIL"
+        print(f"  [{status}] {job['input']}")
+        if args.verbose or not job["ok"]:
+            for error in job["errors"]:
+                print(f"         ERROR: {error}", file=sys.stderr)
+            for warning in job["warnings"]:
+                print(f"         WARNING: {warning}")
+    
+    color_names = None
+    if args.colors:
+        color_names = {i: name for i, name in enumerate(args.colors)}
+    
+    summary = run_batch(
+        inputs,
+        workers=args.jobs,
+        progress=report,
+        output_dir=args.output,
+        transition_mm=args.transition,
+        min_segment_mm=args.min_segment,
+        add_pause=not args.no_pause,
+        color_names=color_names,
+        cache=make_cache(args),
+        compression=args.compress,
+    )
+    
+    print()
+    print("=" * 40)
+    print(f"Processed: {summary['succeeded']}/{summary['files']} files "
+          f"in {summary['elapsed_s']:.1f}s ({summary['failed']} failed)")
+    print(f"  Segments: {summary['segments']}")
+    print(f"  Total filament: {summary['total_length_mm']:.1f} mm")
+    print(f"  Tool changes removed: {summary['tool_changes_removed']}")
+    
+    if args.summary:
+        write_summary(summary, args.summary)
+        print(f"  Summary saved: {args.summary}")
+    
+    return 0 if summary["failed"] == 0 else 1
 
 
 def main():
@@ -30,7 +131,7 @@ def main():
     )
     parser.add_argument(
         "input",
-        help="Input G-code file (multi-tool)"
+        help="Input G-code file (multi-tool), or a directory or glob for batch mode"
     )
     parser.add_argument(
         "-o", "--output",
@@ -64,9 +165,56 @@ def main():
         nargs="+",
         help="Color names for tools (e.g., --colors white black red)"
     )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help="Batch mode: number of worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--summary",
+        help="Batch mode: write an aggregated JSON summary to this file"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory of the parse result cache (default: ~/.cache/splice3d)"
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Size limit of the parse result cache in MB (default: 256)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't read or write the parse result cache"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep per-layer parser checkpoints next to the output and re-parse "
+             "only from the first layer changed since the last run"
+    )
+    parser.add_argument(
+        "--compress",
+        choices=[codec for codec in CODECS if codec != PLAIN],
+        default=PLAIN,
+        help="Write the modified G-code compressed with this codec"
+    )
+    parser.add_argument(
+        "--binary-recipe",
+        action="store_true",
+        help=f"Also write the recipe in the compact binary format ({BINARY_SUFFIX})"
+    )
     
     args = parser.parse_args()
     
+    # Directories and glob patterns select batch mode
+    if is_batch_input(args.input):
+        return run_batch_mode(args)
+    
     # Validate input
     input_path = Path(args.input)
     if not input_path.exists():
@@ -80,19 +228,36 @@ def main():
     else:
         output_dir = input_path.parent
     
-    base_name = input_path.stem
+    base_name = gcode_stem(input_path)
     recipe_path = output_dir / f"{base_name}_splice_recipe.json"
-    modified_gcode_path = output_dir / f"{base_name}_modified.gcode"
+    modified_gcode_path = output_dir / f"{base_name}_modified{SUFFIXES[args.compress]}"
     
     print(f"Splice3D Post-Processor")
     print(f"=" * 40)
     print(f"Input: {input_path}")
     print()
     
-    # Step 1: Parse G-code
+    # Step 1: Parse G-code and write the modified copy in a single pass
     print("Parsing G-code...")
-    gcode_parser = GCodeParser()
-    parse_result = gcode_parser.parse_file(str(input_path))
+    gcode_parser = GCodeParser(columnar=True)
+    modifier = GCodeModifier(
+        add_pause_at_start=not args.no_pause
+    )
+    if args.incremental:
+        incremental = IncrementalParser(gcode_parser)
+        parse_result = incremental.parse_file(
+            str(input_path), index_path_for(modified_gcode_path)
+        )
+        stats = {}
+        if not parse_result.errors:
+            stats = modifier.modify_file(str(input_path), str(modified_gcode_path))
+            if incremental.reused_layers:
+                print(f"  Reused {incremental.reused_layers} unchanged layers from the last run")
+    else:
+        parse_result, stats = process_gcode(
+            str(input_path), str(modified_gcode_path), gcode_parser, modifier,
+            cache=make_cache(args)
+        )
     
     if parse_result.errors:
         for error in parse_result.errors:
@@ -133,18 +298,16 @@ def main():
     recipe_gen.save_recipe(recipe, str(recipe_path))
     
     print(f"  Recipe saved: {recipe_path}")
+    if args.binary_recipe:
+        binary_path = recipe_path.with_suffix(BINARY_SUFFIX)
+        recipe_gen.save_recipe_binary(recipe, str(binary_path))
+        print(f"  Binary recipe saved: {binary_path} ({binary_path.stat().st_size} bytes)")
     print(f"  Final segments: {recipe.segment_count}")
     print(f"  Total filament needed: {recipe.total_length_mm:.1f} mm ({recipe.total_length_mm/1000:.2f} m)")
     
-    # Step 3: Modify G-code
+    # Step 3: Report G-code modified for single-extruder during parsing
     print()
     print("Modifying G-code for single-extruder...")
-    
-    modifier = GCodeModifier(
-        add_pause_at_start=not args.no_pause
-    )
-    stats = modifier.modify_file(str(input_path), str(modified_gcode_path))
-    
     print(f"  Modified G-code saved: {modified_gcode_path}")
     print(f"  Tool changes removed: {stats['tool_changes_removed']}")
     
@@ -0,0 +1,206 @@
+"""
+Splice Time Estimator for Splice3D
+
+Closed-form recipe time and filament estimate for the machine timing in
+SimConfig, without stepping a simulation. Every segment goes through the
+same phases as in the firmware simulator (cli/simulator.py):
+
+    FEEDING_A/B   length / feed_rate (FEEDING_A for color 0)
+    CUTTING       cut_time
+    POSITIONING   position_time
+    HEATING       (weld_temp - start temperature) / heat_rate; the first
+                  segment starts at ambient_temp, later ones at cool_target
+    WELDING       weld_hold
+    COOLING       (weld_temp - cool_target) / cool_rate
+    SPOOLING      length / (feed_rate * spool_speedup)
+
+so the estimate agrees with a simulator run without weld failures up to
+floating-point summation order. The per-phase totals come from one pass
+over the length and color columns (NumPy when installed, else an
+equivalent pure-Python pass); segment_finish_times() gives the timeline
+for progress and ETA.
+"""
+
+from array import array
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# Phases in machine order (simulator State values)
+PHASES = ("FEEDING_A", "FEEDING_B", "CUTTING", "POSITIONING", "HEATING",
+          "WELDING", "COOLING", "SPOOLING")
+
+
+@dataclass
+class SimConfig:
+    """Simulation configuration."""
+    feed_rate_mm_s: float = 50.0      # Filament feed speed
+    weld_temp_c: float = 210.0        # Weld temperature
+    heat_rate_c_s: float = 5.0        # Heating rate
+    cool_rate_c_s: float = 10.0       # Cooling rate
+    cut_time_s: float = 0.5           # Cutter actuation time
+    position_time_s: float = 1.0      # Position alignment time
+    weld_hold_s: float = 3.0          # Weld hold time
+    cool_target_c: float = 50.0       # Cooling target
+    speed_factor: float = 1.0         # Simulation speed multiplier (real-time mode)
+    ambient_temp_c: float = 25.0      # Heater temperature at start
+    spool_speedup: float = 1.5        # Winder speed relative to the feed
+    weld_failure_rate: float = 0.0    # Probability that a weld fails and is redone
+    max_weld_retries: int = 3         # Retries of one splice before the job errors
+
+    def fixed_time_s(self) -> float:
+        """Time of a splice that does not depend on the length (after the first)."""
+        return (self.cut_time_s + self.position_time_s + self.heat_time_s(self.cool_target_c)
+                + self.weld_hold_s + self.cool_time_s())
+
+    def heat_time_s(self, start_c: float) -> float:
+        return max(0.0, (self.weld_temp_c - start_c) / self.heat_rate_c_s)
+
+    def cool_time_s(self) -> float:
+        return max(0.0, (self.weld_temp_c - self.cool_target_c) / self.cool_rate_c_s)
+
+    def seconds_per_mm(self) -> float:
+        """Feed plus spool time per mm of filament."""
+        return (1.0 + 1.0 / self.spool_speedup) / self.feed_rate_mm_s
+
+
+@dataclass
+class RecipeEstimate:
+    """Estimated machine time of a recipe."""
+    segments: int = 0
+    filament_mm: float = 0.0
+    total_time_s: float = 0.0
+    phase_s: dict[str, float] = field(default_factory=dict)   # Seconds per PHASES entry
+    color_length_mm: dict[int, float] = field(default_factory=dict)
+
+    @property
+    def total_time_hours(self) -> float:
+        return self.total_time_s / 3600
+
+    @property
+    def seconds_per_splice(self) -> float:
+        return self.total_time_s / self.segments if self.segments else 0.0
+
+
+def recipe_columns(recipe) -> tuple[Sequence[float], Sequence[int]]:
+    """
+    Length and color columns of a recipe.
+
+    Args:
+        recipe: SpliceRecipe, recipe dict, list of segment dicts
+            ({"color", "length_mm"}) or SegmentTable
+    """
+    if hasattr(recipe, "length_mm") and hasattr(recipe, "color_index"):
+        return recipe.length_mm, recipe.color_index
+    if isinstance(recipe, dict):
+        recipe = recipe.get("segments", [])
+    segments = getattr(recipe, "segments", recipe)
+    return ([segment["length_mm"] for segment in segments],
+            [segment.get("color", 0) for segment in segments])
+
+
+def estimate_recipe(recipe, config: Optional[SimConfig] = None,
+                    use_numpy: Optional[bool] = None) -> RecipeEstimate:
+    """Estimate a recipe (see recipe_columns() for the accepted forms)."""
+    lengths, colors = recipe_columns(recipe)
+    return estimate(lengths, colors, config, use_numpy)
+
+
+def estimate(lengths: Sequence[float],
+             colors: Optional[Sequence[int]] = None,
+             config: Optional[SimConfig] = None,
+             use_numpy: Optional[bool] = None) -> RecipeEstimate:
+    """
+    Estimate machine time and filament for segment columns.
+
+    Args:
+        lengths: Segment lengths in mm
+        colors: Segment color indices (default: all 0)
+        config: Machine timing (default: SimConfig())
+        use_numpy: Force (True) or disable (False) the NumPy engine;
+            None uses NumPy when it is installed
+
+    Returns:
+        RecipeEstimate
+
+    Raises:
+        ImportError: If use_numpy is True and NumPy is not installed
+    """
+    config = config or SimConfig()
+    if use_numpy and np is None:
+        raise ImportError("NumPy is not installed")
+    if use_numpy is None:
+        use_numpy = np is not None
+
+    count = len(lengths)
+    if colors is None:
+        colors = array('i', bytes(4 * count))
+    if len(colors) != count:
+        raise ValueError("lengths and colors differ in length")
+
+    result = RecipeEstimate(segments=count, phase_s={phase: 0.0 for phase in PHASES})
+    if not count:
+        return result
+
+    if use_numpy:
+        length = np.asarray(lengths, dtype=np.float64)
+        color = np.asarray(colors, dtype=np.int64)
+        result.filament_mm = float(length.sum())
+        sums = np.bincount(color, weights=length)
+        feed_a = float(sums[0])
+        used = np.flatnonzero(np.bincount(color))
+        result.color_length_mm = {int(c): float(sums[c]) for c in used}
+    else:
+        by_color: dict[int, float] = {}
+        for value, c in zip(lengths, colors):
+            by_color[c] = by_color.get(c, 0.0) + value
+        result.filament_mm = sum(by_color.values())
+        feed_a = by_color.get(0, 0.0)
+        result.color_length_mm = dict(sorted(by_color.items()))
+
+    phase = result.phase_s
+    phase["FEEDING_A"] = feed_a / config.feed_rate_mm_s
+    phase["FEEDING_B"] = (result.filament_mm - feed_a) / config.feed_rate_mm_s
+    phase["CUTTING"] = count * config.cut_time_s
+    phase["POSITIONING"] = count * config.position_time_s
+    phase["HEATING"] = (config.heat_time_s(config.ambient_temp_c)
+                        + (count - 1) * config.heat_time_s(config.cool_target_c))
+    phase["WELDING"] = count * config.weld_hold_s
+    phase["COOLING"] = count * config.cool_time_s()
+    phase["SPOOLING"] = result.filament_mm / (config.feed_rate_mm_s * config.spool_speedup)
+    result.total_time_s = sum(phase.values())
+    return result
+
+
+def segment_finish_times(lengths: Sequence[float],
+                         config: Optional[SimConfig] = None,
+                         use_numpy: Optional[bool] = None) -> Union[list[float], "np.ndarray"]:
+    """
+    Simulated time at which each segment is finished (spooled).
+
+    Returns:
+        A NumPy array with the NumPy engine, else a list
+    """
+    config = config or SimConfig()
+    if use_numpy and np is None:
+        raise ImportError("NumPy is not installed")
+    if use_numpy is None:
+        use_numpy = np is not None
+
+    # The first heat-up starts from ambient, the others from cool_target
+    first_extra = config.heat_time_s(config.ambient_temp_c) - config.heat_time_s(
+        config.cool_target_c)
+    fixed = config.fixed_time_s()
+    per_mm = config.seconds_per_mm()
+    if use_numpy:
+        durations = np.asarray(lengths, dtype=np.float64) * per_mm + fixed
+        if len(durations):
+            durations[0] += first_extra
+        return np.cumsum(durations)
+    times = accumulate(length * per_mm + fixed for length in lengths)
+    return [t + first_extra for t in times]
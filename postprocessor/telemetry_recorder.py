@@ -0,0 +1,532 @@
+"""
+Telemetry Recorder for Splice3D
+
+Records the firmware's STREAM output (STREAM SUMMARY or VERBOSE, see
+firmware/src/telemetry_stream.cpp) as columnar time series in rolling,
+size-capped files, and reads it back by time range or downsampled.
+
+Every telemetry record becomes one sample of the columns in COLUMNS:
+host time, firmware time, state, temperatures, encoder, splice and error
+flags, plus the segment and segment count from the last PROGRESS or
+STATUS line (progress = segment / segments_total). Samples collect in
+typed arrays and are written in blocks:
+
+    File header
+        magic           4 bytes  b"S3DT"
+        version         uint8    1
+        column_count    uint8
+        reserved        uint16   0
+        columns         column_count x (name 16 bytes, typecode 1 byte)
+    Blocks
+        magic           4 bytes  b"S3TB"
+        sample_count    uint32
+        payload_size    uint32
+        time_first      float64  Host time of the first sample
+        time_last       float64  Host time of the last sample
+        crc32           uint32   CRC-32 (zlib) of the payload
+        payload         zlib of the columns' little-endian arrays, in order
+
+Files are named telemetry-<first sample in ms>.s3dt. A new file starts
+when the current one reaches max_file_bytes; the oldest files are deleted
+when the directory exceeds max_total_bytes. A block torn by a crash ends
+its file for the reader.
+"""
+
+import json
+import logging
+import math
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"S3DT"
+BLOCK_MAGIC = b"S3TB"
+FORMAT_VERSION = 1
+
+# File suffix of telemetry files
+TELEMETRY_SUFFIX = ".s3dt"
+
+FILE_HEADER = struct.Struct("<4sBBH")
+COLUMN_ENTRY = struct.Struct("<16sc")
+BLOCK_HEADER = struct.Struct("<4sIIddI")
+
+# Column name -> array typecode. Floats missing from a record are NaN.
+COLUMNS = {
+    "time": 'd',            # Host time (seconds since the epoch)
+    "fw_ms": 'I',           # Firmware time ("t", ms since boot)
+    "state": 'B',           # Index into STATE_NAMES
+    "temp": 'f',
+    "target": 'f',
+    "segment": 'i',         # Segments done (PROGRESS c/t)
+    "segments_total": 'i',
+    "enc_mm": 'f',
+    "enc_vel": 'f',
+    "slip_mm": 'f',         # VERBOSE only
+    "slip": 'B',
+    "splice_active": 'B',
+    "quality": 'f',
+    "error": 'B',
+}
+
+# Firmware states (StateMachine::getStateString); 0 is anything else
+STATE_NAMES = (
+    "UNKNOWN", "IDLE", "LOADING", "READY", "FEEDING_A", "FEEDING_B", "CUTTING",
+    "POSITIONING", "HEATING", "WELDING", "COOLING", "SPOOLING", "NEXT_SEGMENT",
+    "COMPLETE", "ERROR",
+)
+_STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+
+# How downsample() combines a column within a bucket (floats: mean/min/max)
+_LAST = ("fw_ms", "state", "segment", "segments_total")   # Last value
+_ANY = ("slip", "splice_active", "error")                 # Set in any sample
+
+DEFAULT_BLOCK_SAMPLES = 4096
+DEFAULT_MAX_FILE_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_TOTAL_BYTES = 64 * 1024 * 1024
+
+_NAN = float('nan')
+
+
+def state_name(code: int) -> str:
+    """State name of a "state" column value."""
+    return STATE_NAMES[code] if 0 <= code < len(STATE_NAMES) else STATE_NAMES[0]
+
+
+def _empty_columns() -> dict[str, array]:
+    return {name: array(typecode) for name, typecode in COLUMNS.items()}
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return _NAN
+
+
+class TelemetryRecorder:
+    """
+    Turns STREAM lines into samples and writes them to a directory.
+    """
+
+    def __init__(self,
+                 directory: Path,
+                 block_samples: int = DEFAULT_BLOCK_SAMPLES,
+                 max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+                 max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+                 compresslevel: int = 1,
+                 clock=time.time):
+        """
+        Initialize the recorder.
+
+        Args:
+            directory: Directory of the telemetry files (created if missing)
+            block_samples: Samples per written block
+            max_file_bytes: Size at which a new file is started
+            max_total_bytes: Size of all files above which the oldest go
+            compresslevel: zlib level of the blocks
+            clock: Host time source for sample times
+        """
+        self.directory = Path(directory)
+        self.block_samples = block_samples
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.compresslevel = compresslevel
+        self.clock = clock
+        self.store = TelemetryStore(self.directory)
+
+        self.samples = 0          # Samples recorded
+        self.ignored = 0          # Lines that were not telemetry or progress
+        self._segment = 0
+        self._segments_total = 0
+        self._columns = _empty_columns()
+        self._file: Optional[Path] = None
+        self._lock = threading.Lock()
+
+    # --- Ingest -------------------------------------------------------------
+
+    def feed(self, line: str, now: Optional[float] = None) -> bool:
+        """
+        Take a line received from the machine.
+
+        Telemetry records become samples; PROGRESS, STATUS and DONE lines
+        update the segment columns of later samples.
+
+        Args:
+            line: Line without newline
+            now: Host time of the line (default: clock())
+
+        Returns:
+            True if the line was recorded as a sample
+        """
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                self.ignored += 1
+                return False
+            if isinstance(record, dict) and record.get("type") in ("telemetry", "telemetry_v"):
+                self.record(record, now)
+                return True
+        elif line.startswith(("PROGRESS", "STATUS")):
+            self._track_progress(line)
+            return False
+        elif line.startswith("DONE"):
+            self._segment = self._segments_total
+            return False
+        self.ignored += 1
+        return False
+
+    def record(self, record: dict, now: Optional[float] = None):
+        """Add a decoded telemetry or telemetry_v record as a sample."""
+        temp = record.get("temp")
+        if isinstance(temp, dict):
+            # VERBOSE
+            enc = record.get("enc") or {}
+            splice = record.get("splice") or {}
+            values = (_float(temp.get("current")), _float(temp.get("target")),
+                      _float(enc.get("mm")), _float(enc.get("vel")), _float(enc.get("slip_mm")),
+                      bool(enc.get("slip")), bool(splice.get("active")),
+                      _float(splice.get("quality")))
+        else:
+            values = (_float(temp), _float(record.get("target")),
+                      _float(record.get("pos_mm")), _float(record.get("vel")), _NAN,
+                      bool(record.get("slip")), bool(record.get("splice_active")),
+                      _float(record.get("quality")))
+        temp_current, temp_target, enc_mm, enc_vel, slip_mm, slip, active, quality = values
+
+        with self._lock:
+            c = self._columns
+            c["time"].append(self.clock() if now is None else now)
+            c["fw_ms"].append(int(record.get("t", 0)) & 0xFFFFFFFF)
+            c["state"].append(_STATE_CODES.get(record.get("state"), 0))
+            c["temp"].append(temp_current)
+            c["target"].append(temp_target)
+            c["segment"].append(self._segment)
+            c["segments_total"].append(self._segments_total)
+            c["enc_mm"].append(enc_mm)
+            c["enc_vel"].append(enc_vel)
+            c["slip_mm"].append(slip_mm)
+            c["slip"].append(slip)
+            c["splice_active"].append(active)
+            c["quality"].append(quality)
+            c["error"].append(bool(record.get("error")))
+            self.samples += 1
+            if len(c["time"]) >= self.block_samples:
+                self._write_block()
+
+    def _track_progress(self, line: str):
+        parts = line.replace(':', ' ').split()
+        for key, value in zip(parts, parts[1:]):
+            if key == "PROGRESS" and '/' in value:
+                done, _, total = value.partition('/')
+                try:
+                    self._segment, self._segments_total = int(done), int(total)
+                except ValueError:
+                    pass
+                return
+
+    # --- Files --------------------------------------------------------------
+
+    def flush(self):
+        """Write the samples collected so far."""
+        with self._lock:
+            self._write_block()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self) -> "TelemetryRecorder":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write_block(self):
+        columns = self._columns
+        count = len(columns["time"])
+        if not count:
+            return
+        self._columns = _empty_columns()
+
+        if sys.byteorder != "little":
+            for values in columns.values():
+                values.byteswap()
+        payload = zlib.compress(b"".join(values.tobytes() for values in columns.values()),
+                                self.compresslevel)
+        block = BLOCK_HEADER.pack(BLOCK_MAGIC, count, len(payload), columns["time"][0],
+                                  columns["time"][-1], zlib.crc32(payload)) + payload
+
+        if (self._file is None or not self._file.exists()
+                or self._file.stat().st_size >= self.max_file_bytes):
+            self.directory.mkdir(parents=True, exist_ok=True)
+            name = f"telemetry-{int(columns['time'][0] * 1000):013d}{TELEMETRY_SUFFIX}"
+            self._file = self.directory / name
+            with open(self._file, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(_file_header())
+        with open(self._file, 'ab') as f:
+            f.write(block)
+        self._enforce_cap()
+
+    def _enforce_cap(self):
+        files = self.store.files()
+        total = sum(path.stat().st_size for path in files)
+        for path in files:
+            if total <= self.max_total_bytes or path == self._file:
+                break
+            total -= path.stat().st_size
+            path.unlink()
+            logger.debug(f"Removed old telemetry file {path.name}")
+
+    # --- Queries ------------------------------------------------------------
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              columns: Optional[Sequence[str]] = None) -> dict[str, array]:
+        """TelemetryStore.query(), including samples not yet written."""
+        with self._lock:
+            pending = {name: array(values.typecode, values)
+                       for name, values in self._columns.items()}
+        return self.store.query(start, end, columns, pending)
+
+    def downsample(self, start: float, end: float, points: int = 500,
+                   columns: Optional[Sequence[str]] = None) -> dict[str, list]:
+        """TelemetryStore.downsample(), including samples not yet written."""
+        return _downsample(self.query(start, end, columns), start, end, points)
+
+
+class TelemetryStore:
+    """
+    Reads a directory of telemetry files.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        # Path -> (file size, column layout, [(offset, header fields)])
+        self._index: dict[Path, tuple] = {}
+
+    def files(self) -> list[Path]:
+        """Telemetry files, oldest first."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f"telemetry-*{TELEMETRY_SUFFIX}"))
+
+    def time_range(self) -> Optional[tuple[float, float]]:
+        """Times of the first and last recorded sample, or None."""
+        blocks = [block for path in self.files() for block in self._blocks(path)[1]]
+        if not blocks:
+            return None
+        return min(b[1][3] for b in blocks), max(b[1][4] for b in blocks)
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              columns: Optional[Sequence[str]] = None,
+              pending: Optional[dict[str, array]] = None) -> dict[str, array]:
+        """
+        Samples with start <= time < end.
+
+        Args:
+            start: First time (None: from the beginning)
+            end: End time, exclusive (None: to the end)
+            columns: Columns to return (default: all); "time" is always included
+            pending: Samples not yet in a file, appended last
+
+        Returns:
+            Column name -> array, in time order
+        """
+        names = ["time"] + [name for name in (columns or COLUMNS) if name != "time"]
+        for name in names:
+            if name not in COLUMNS:
+                raise ValueError(f"Unknown telemetry column: {name}")
+        lo = -math.inf if start is None else start
+        hi = math.inf if end is None else end
+
+        result = {name: array(COLUMNS[name]) for name in names}
+        sources = [block for path in self.files() for block in self._read(path, lo, hi)]
+        if pending is not None:
+            sources.append(pending)
+        for block in sources:
+            times = block["time"]
+            first = _bisect(times, lo)
+            last = _bisect(times, hi)
+            if first >= last:
+                continue
+            for name in names:
+                result[name].extend(block[name][first:last])
+        return result
+
+    def downsample(self, start: float, end: float, points: int = 500,
+                   columns: Optional[Sequence[str]] = None) -> dict[str, list]:
+        """
+        A view of [start, end) in at most points time buckets, for plots.
+
+        Float columns give the mean and "<name>_min"/"<name>_max" of each
+        bucket (NaN samples ignored); state, segment and fw_ms the last
+        value; slip, splice_active and error whether any sample had it.
+        Empty buckets are left out.
+
+        Returns:
+            "time" (bucket start), "count" (samples) and the column values,
+            one list entry per bucket
+        """
+        return _downsample(self.query(start, end, columns), start, end, points)
+
+    def _read(self, path: Path, lo: float, hi: float) -> Iterator[dict[str, array]]:
+        layout, blocks = self._blocks(path)
+        if not blocks:
+            return
+        with open(path, 'rb') as f:
+            for offset, header in blocks:
+                _, count, size, first, last, _ = header
+                if last < lo or first >= hi:
+                    continue
+                f.seek(offset + BLOCK_HEADER.size)
+                payload = f.read(size)
+                yield _decode_block(layout, count, payload)
+
+    def _blocks(self, path: Path) -> tuple[list, list]:
+        """Column layout and valid blocks of a file (cached by file size)."""
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return [], []
+        cached = self._index.get(path)
+        if cached and cached[0] == size:
+            return cached[1], cached[2]
+
+        layout, blocks = [], []
+        with open(path, 'rb') as f:
+            data = f.read(FILE_HEADER.size)
+            if len(data) == FILE_HEADER.size:
+                magic, version, column_count, _ = FILE_HEADER.unpack(data)
+                entries = f.read(COLUMN_ENTRY.size * column_count)
+                if (magic == MAGIC and version == FORMAT_VERSION
+                        and len(entries) == COLUMN_ENTRY.size * column_count):
+                    for name, typecode in COLUMN_ENTRY.iter_unpack(entries):
+                        layout.append((name.rstrip(b"\0").decode(), typecode.decode()))
+            offset = f.tell() if layout else size
+            while offset + BLOCK_HEADER.size <= size:
+                f.seek(offset)
+                header = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+                payload = f.read(header[2])
+                if (header[0] != BLOCK_MAGIC or len(payload) != header[2]
+                        or zlib.crc32(payload) != header[5]):
+                    logger.warning(f"{path.name}: bad block at {offset}, ignoring the rest")
+                    break
+                blocks.append((offset, header))
+                offset += BLOCK_HEADER.size + header[2]
+        self._index[path] = (size, layout, blocks)
+        return layout, blocks
+
+
+def _file_header() -> bytes:
+    entries = b"".join(COLUMN_ENTRY.pack(name.encode(), typecode.encode())
+                       for name, typecode in COLUMNS.items())
+    return FILE_HEADER.pack(MAGIC, FORMAT_VERSION, len(COLUMNS), 0) + entries
+
+
+def _decode_block(layout: list, count: int, payload: bytes) -> dict[str, array]:
+    data = zlib.decompress(payload)
+    block = {}
+    offset = 0
+    for name, typecode in layout:
+        values = array(typecode)
+        size = values.itemsize * count
+        values.frombytes(data[offset:offset + size])
+        if sys.byteorder != "little":
+            values.byteswap()
+        offset += size
+        if name in COLUMNS:
+            block[name] = values
+    for name, typecode in COLUMNS.items():
+        # Columns added after the file was written
+        if name not in block:
+            block[name] = array(typecode, [_NAN if typecode in 'fd' else 0]) * count
+    return block
+
+
+def _bisect(times: Sequence[float], value: float) -> int:
+    """Index of the first time >= value."""
+    lo, hi = 0, len(times)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if times[mid] < value:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _downsample(series: dict[str, array], start: float, end: float,
+                points: int) -> dict[str, list]:
+    if points < 1 or end <= start:
+        raise ValueError("downsample needs points >= 1 and end > start")
+    width = (end - start) / points
+    times = series["time"]
+    # Samples are in time order: each bucket is the run between two edges
+    edges = [_bisect(times, start + k * width) for k in range(points)] + [len(times)]
+    buckets = [k for k in range(points) if edges[k] < edges[k + 1]]
+    bounds = [edges[k] for k in buckets]
+    ends = [edges[k + 1] for k in buckets]
+
+    result = {"time": [start + k * width for k in buckets],
+              "count": [e - b for b, e in zip(bounds, ends)]}
+    for name, values in series.items():
+        if name == "time":
+            continue
+        if name in _LAST:
+            result[name] = [values[e - 1] for e in ends]
+        elif name in _ANY:
+            result[name] = [int(any(values[b:e])) for b, e in zip(bounds, ends)]
+        elif np is not None:
+            _float_buckets_numpy(result, name, values, bounds)
+        else:
+            _float_buckets(result, name, values, bounds, ends)
+    return result
+
+
+def _float_buckets(result: dict, name: str, values: array,
+                   bounds: list[int], ends: list[int]):
+    means, lows, highs = [], [], []
+    for b, e in zip(bounds, ends):
+        present = [v for v in values[b:e] if v == v]
+        if present:
+            means.append(sum(present) / len(present))
+            lows.append(min(present))
+            highs.append(max(present))
+        else:
+            means.append(_NAN)
+            lows.append(_NAN)
+            highs.append(_NAN)
+    result[name], result[f"{name}_min"], result[f"{name}_max"] = means, lows, highs
+
+
+def _float_buckets_numpy(result: dict, name: str, values: array, bounds: list[int]):
+    if not bounds:
+        result[name], result[f"{name}_min"], result[f"{name}_max"] = [], [], []
+        return
+    data = np.frombuffer(values, dtype=np.float32 if values.typecode == 'f' else np.float64)
+    data = data.astype(np.float64)
+    present = ~np.isnan(data)
+    idx = np.asarray(bounds)
+    counts = np.add.reduceat(present.astype(np.int64), idx)
+    sums = np.add.reduceat(np.where(present, data, 0.0), idx)
+    lows = np.minimum.reduceat(np.where(present, data, np.inf), idx)
+    highs = np.maximum.reduceat(np.where(present, data, -np.inf), idx)
+    empty = counts == 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    means[empty] = lows[empty] = highs[empty] = np.nan
+    result[name] = means.tolist()
+    result[f"{name}_min"] = lows.tolist()
+    result[f"{name}_max"] = highs.tolist()
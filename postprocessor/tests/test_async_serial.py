@@ -0,0 +1,161 @@
+"""
+Tests for the asyncio serial transport.
+"""
+
+import asyncio
+import json
+import random
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from async_serial import AsyncSplice3D
+from fake_firmware import FakeFirmwareSerial, open_fake_connection
+from recipe_generator import SpliceRecipe
+
+
+async def connect(**kwargs) -> AsyncSplice3D:
+    reader, writer = await open_fake_connection(FakeFirmwareSerial(**kwargs))
+    return AsyncSplice3D(reader, writer, timeout=1.0).start()
+
+
+class TestAsyncSplice3D(unittest.IsolatedAsyncioTestCase):
+    """Tests for AsyncSplice3D against the fake firmware."""
+
+    async def asyncSetUp(self):
+        self.machine = await connect(baud=921600)
+        self.firmware = self.machine.writer.firmware
+
+    async def asyncTearDown(self):
+        await self.machine.close()
+
+    async def test_commands(self):
+        """Test awaitable commands and their terminal lines."""
+        self.assertEqual(await self.machine.status(), "STATUS IDLE")
+        self.assertFalse(await self.machine.start_splicing())
+        self.assertTrue(await self.machine.stream("VERBOSE", interval_ms=200))
+        self.assertEqual(self.firmware.stream_mode, "VERBOSE")
+        self.assertEqual(await self.machine.command("STREAM BOGUS"),
+                         ["ERR unknown STREAM subcommand"])
+        self.assertEqual(await self.machine.command("FROB"), ["ERROR Unknown command: FROB"])
+
+    async def test_concurrent_commands(self):
+        """Test that concurrent callers each get their own response."""
+        commands = ["STATUS", "STREAM SUMMARY", "STREAM", "PAUSE", "RESUME"] * 10
+        random.Random(0).shuffle(commands)
+
+        results = await asyncio.gather(*(self.machine.command(c) for c in commands))
+
+        for command, responses in zip(commands, results):
+            word = command.split()[0]
+            with self.subTest(command=command):
+                self.assertEqual(len(responses), 1)
+                self.assertTrue(responses[0].startswith(("OK", word)), responses)
+
+    async def test_timeout_returns_partial_response(self):
+        """Test that a command without terminal line times out."""
+        self.assertEqual(await self.machine.command("STATUS", timeout=0.05, expect=("NEVER",)),
+                         ["STATUS IDLE"])
+        self.assertEqual(await self.machine.status(), "STATUS IDLE")
+
+    async def test_telemetry_iterators(self):
+        """Test that every iterator sees every telemetry line."""
+        records = [{"type": "telemetry", "t": t, "temp": 200.0 + t} for t in range(20)]
+
+        async def collect():
+            received = []
+            async for record in self.machine.telemetry():
+                received.append(record)
+                if len(received) == len(records):
+                    return received
+
+        consumers = [asyncio.ensure_future(collect()) for _ in range(3)]
+        await asyncio.sleep(0)
+        writer = self.machine.writer
+        writer.emit("PROGRESS 1/5")
+        for record in records:
+            writer.emit(json.dumps(record))
+            writer.emit("{broken")
+
+        for received in await asyncio.wait_for(asyncio.gather(*consumers), 2.0):
+            self.assertEqual(received, records)
+
+    async def test_telemetry_during_command(self):
+        """Test that STREAM JSON arriving before a reply is not swallowed by it."""
+        machine = await connect(baud=9600)
+        self.addAsyncCleanup(machine.close)
+        record = {"type": "telemetry", "t": 1, "temp": 210.0}
+        lines = machine.lines()
+        telemetry = asyncio.ensure_future(machine.telemetry().__anext__())
+        await asyncio.sleep(0)
+
+        # At 9600 baud the record is still on the wire when STATUS is sent,
+        # so it arrives while the command is pending, ahead of the reply
+        machine.writer.emit(json.dumps(record))
+        self.assertEqual(await machine.command("STATUS"), ["STATUS IDLE"])
+        self.assertEqual(await asyncio.wait_for(telemetry, 1.0), record)
+        self.assertEqual(await asyncio.wait_for(lines.__anext__(), 1.0), json.dumps(record))
+
+    async def test_lines_drop_oldest_when_full(self):
+        """Test that a consumer that falls behind loses the oldest lines."""
+        lines = self.machine.lines(maxsize=5)
+        for i in range(20):
+            self.machine.writer.emit(f"PROGRESS {i}/20")
+        await self.machine.wait_for("PROGRESS 19/20", timeout=1.0)
+        lines.close()
+
+        self.assertEqual([line async for line in lines],
+                         [f"PROGRESS {i}/20" for i in range(16, 20)])
+        self.assertEqual(lines.dropped, 16)
+
+    async def test_concurrent_waiters(self):
+        """Test that several tasks can wait for the same line."""
+        waiters = [asyncio.ensure_future(self.machine.wait_for("DONE", timeout=1.0))
+                   for _ in range(5)]
+        other = asyncio.ensure_future(self.machine.wait_for(lambda line: "7/" in line,
+                                                            timeout=1.0))
+        await asyncio.sleep(0)
+        for i in range(10):
+            self.machine.writer.emit(f"PROGRESS {i}/10")
+        self.machine.writer.emit("DONE")
+
+        self.assertEqual(await asyncio.gather(*waiters), ["DONE"] * 5)
+        self.assertEqual(await other, "PROGRESS 7/10")
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.machine.wait_for("NEVER", timeout=0.05)
+
+    async def test_upload_recipe(self):
+        """Test the chunked recipe upload next to concurrent commands."""
+        segments = [{"color": i % 4, "length_mm": round(10 + i * 0.37, 2)} for i in range(300)]
+        progress = []
+
+        upload = self.machine.upload_recipe(SpliceRecipe(segments=segments),
+                                            progress=lambda a, t: progress.append(a))
+        result, status = await asyncio.gather(upload, self.machine.status())
+
+        self.assertTrue(result.ok, result.message)
+        self.assertEqual(self.firmware.recipe, segments)
+        self.assertEqual(progress[-1], 300)
+        self.assertIn(status, ("STATUS IDLE", "STATUS READY"))
+        self.assertTrue(await self.machine.start_splicing())
+
+    async def test_close_ends_everything(self):
+        """Test that closing fails waiters and ends iterators."""
+        lines = self.machine.lines()
+        waiter = asyncio.ensure_future(self.machine.wait_for("DONE"))
+        await asyncio.sleep(0)
+
+        self.machine.writer.close()
+
+        with self.assertRaises(ConnectionError):
+            await asyncio.wait_for(waiter, 1.0)
+        self.assertEqual([line async for line in lines], [])
+        self.assertFalse(self.machine.connected)
+        with self.assertRaises(ConnectionError):
+            await self.machine.status()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+"""
+Tests for change detection and coalescing of bridge MQTT updates.
+"""
+
+import json
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services"))
+
+from bridge_core import (
+    LINE_STATE,
+    STATE_BOTH,
+    STATE_JSON,
+    BridgeStats,
+    MachineState,
+    StatePublisher,
+    apply_serial_line,
+    make_topics,
+    state_payloads,
+)
+
+TOPICS = make_topics("test")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestStatePublisher(unittest.TestCase):
+    """Tests for StatePublisher."""
+
+    def setUp(self):
+        self.sent: list[tuple[str, object]] = []
+        self.scheduled: list[tuple[float, object]] = []
+        self.clock = Clock()
+
+    def publisher(self, **kwargs) -> StatePublisher:
+        return StatePublisher(lambda topic, value: self.sent.append((topic, value)), TOPICS,
+                              schedule=lambda delay, flush: self.scheduled.append((delay, flush)),
+                              clock=self.clock, **kwargs)
+
+    def test_unchanged_values_not_republished(self):
+        """Test that only changed topics are sent."""
+        publisher = self.publisher()
+        state = MachineState(state="IDLE")
+        publisher.update(state_payloads(state, True))
+        self.assertEqual(len(self.sent), 9)
+
+        self.sent.clear()
+        state.temperature_current = 200.5
+        publisher.update(state_payloads(state, True))
+        publisher.update(state_payloads(state, True))
+        self.assertEqual(self.sent, [(TOPICS["temp_current"], 200.5)])
+        self.assertEqual(publisher.counters.published, 10)
+        self.assertEqual(publisher.counters.saved, 17)
+
+    def test_coalescing(self):
+        """Test that values within min_interval are held and the latest sent."""
+        publisher = self.publisher(min_interval=1.0)
+        publisher.update({"temp_current": 20.0})
+        for i, temp in enumerate((21.0, 22.0, 23.0)):
+            self.clock.now = 0.1 * (i + 1)
+            publisher.update({"temp_current": temp})
+
+        self.assertEqual(self.sent, [(TOPICS["temp_current"], 20.0)])
+        self.assertEqual(len(self.scheduled), 1)
+        delay, flush = self.scheduled[0]
+        self.assertAlmostEqual(delay, 0.9)
+
+        self.clock.now = 1.0
+        flush()
+        self.assertEqual(self.sent[-1], (TOPICS["temp_current"], 23.0))
+        self.assertEqual(publisher.counters.coalesced, 2)
+
+    def test_held_value_reverted(self):
+        """Test that a held value is dropped when the topic changes back."""
+        publisher = self.publisher(min_interval=1.0)
+        publisher.update({"progress": 10})
+        publisher.update({"progress": 20})
+        publisher.update({"progress": 10})
+
+        self.clock.now = 2.0
+        self.scheduled[0][1]()
+        self.assertEqual(self.sent, [(TOPICS["progress"], 10)])
+
+    def test_immediate_keys(self):
+        """Test that state and error changes bypass min_interval."""
+        publisher = self.publisher(min_interval=10.0)
+        publisher.update({"state": "IDLE", "error": "OFF", "temp_current": 20.0})
+        self.sent.clear()
+
+        publisher.update({"state": "ERROR", "error": "ON", "temp_current": 25.0})
+        self.assertEqual(self.sent, [(TOPICS["state"], "ERROR"), (TOPICS["error"], "ON")])
+        publisher.update({"temp_current": 30.0}, immediate=True)
+        self.assertEqual(self.sent[-1], (TOPICS["temp_current"], 30.0))
+
+    def test_reset_republishes(self):
+        """Test that reset() sends everything again, as after a reconnect."""
+        publisher = self.publisher()
+        values = state_payloads(MachineState(state="IDLE"), True)
+        publisher.update(values)
+        publisher.reset()
+        publisher.update(values)
+        self.assertEqual(len(self.sent), 18)
+
+    def test_json_state(self):
+        """Test the single JSON state topic."""
+        publisher = self.publisher(min_interval=1.0, state_format=STATE_JSON)
+        state = MachineState(state="SPLICING", temperature_current=210.0)
+        publisher.update(state_payloads(state, True))
+
+        topics = [topic for topic, _ in self.sent]
+        self.assertEqual(topics, [TOPICS["state_json"], TOPICS["online"]])
+        document = json.loads(self.sent[0][1])
+        self.assertEqual(document["state"], "SPLICING")
+        self.assertEqual(document["temp_current"], 210.0)
+
+        # Held back like a field, unless the state changes
+        state.temperature_current = 211.0
+        publisher.update(state_payloads(state, True))
+        self.assertEqual(len(self.sent), 2)
+        state.state = "IDLE"
+        publisher.update(state_payloads(state, True))
+        self.assertEqual(json.loads(self.sent[-1][1])["state"], "IDLE")
+        self.assertEqual(publisher.counters.coalesced, 1)
+
+    def test_both_formats(self):
+        """Test publishing fields and the JSON topic together."""
+        publisher = self.publisher(state_format=STATE_BOTH)
+        publisher.update(state_payloads(MachineState(state="IDLE"), True))
+        self.assertEqual(len(self.sent), 10)
+
+    def test_telemetry_flood(self):
+        """Test that a STREAM VERBOSE flood turns into few messages."""
+        publisher = self.publisher(min_interval=1.0)
+        state, stats = MachineState(state="IDLE"), BridgeStats()
+        publisher.update(state_payloads(state, True))
+
+        # 20 records per second for 10 seconds, slowly heating
+        for i in range(200):
+            self.clock.now = i * 0.05
+            line = json.dumps({"type": "telemetry_v", "t": i * 50, "state": "HEATING",
+                               "temp": {"current": round(20 + i * 0.5, 1), "target": 210.0},
+                               "error": False})
+            self.assertEqual(apply_serial_line(state, stats, line), LINE_STATE)
+            publisher.update(state_payloads(state, True))
+
+        self.assertEqual(state.temperature_target, 210.0)
+        counters = publisher.counters
+        self.assertEqual(counters.offered, 9 * 201)
+        # One heating state change, target once, current about once a second
+        self.assertLess(counters.published, 9 + 2 + 12)
+        self.assertGreater(counters.saved, 1700)
+
+
+class TestTelemetryLines(unittest.TestCase):
+    """Tests for STREAM telemetry in apply_serial_line()."""
+
+    def test_summary_record(self):
+        state = MachineState()
+        line = ('{"type":"telemetry","t":100,"state":"SPLICING","temp":215.5,'
+                '"target":220.0,"error":true}')
+        self.assertEqual(apply_serial_line(state, BridgeStats(), line), LINE_STATE)
+        self.assertEqual(state.state, "SPLICING")
+        self.assertEqual((state.temperature_current, state.temperature_target), (215.5, 220.0))
+        self.assertTrue(state.error)
+
+    def test_other_records_ignored(self):
+        state = MachineState()
+        for line in ('{"type":"heartbeat","t":1,"seq":2}', '{not json'):
+            self.assertIsNone(apply_serial_line(state, BridgeStats(), line))
+        self.assertEqual(state.state, "OFFLINE")
+
+
+if __name__ == "__main__":
+    unittest.main()
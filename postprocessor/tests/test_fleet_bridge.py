@@ -0,0 +1,228 @@
+"""
+Tests for the fleet MQTT bridge, driving many simulated machines at once.
+"""
+
+import asyncio
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services"))
+
+from async_serial import AsyncSplice3D
+from fake_firmware import FakeFirmwareSerial, open_fake_connection
+from fleet_bridge import DeviceConfig, FleetBridge
+from stats_journal import StatsJournal
+
+DEVICES = 100
+
+
+class FakeMQTTClient:
+    """Records what the bridge publishes; delivers messages like paho."""
+
+    def __init__(self):
+        self.published: list[tuple[str, object, bool]] = []
+        self.subscriptions: list[str] = []
+        self.on_connect = None
+        self.on_message = None
+
+    def is_connected(self) -> bool:
+        return True
+
+    def publish(self, topic, payload, retain=False):
+        self.published.append((topic, payload, retain))
+
+    def subscribe(self, topic):
+        self.subscriptions.append(topic)
+
+    def connect_now(self):
+        self.on_connect(self, None, {}, 0, None)
+
+    def deliver(self, topic: str, payload: str):
+        self.on_message(self, None, SimpleNamespace(topic=topic, payload=payload.encode()))
+
+    def retained(self) -> dict:
+        return {topic: payload for topic, payload, retain in self.published if retain}
+
+
+class TestDeviceConfig(unittest.TestCase):
+    """Tests for DeviceConfig."""
+
+    def test_parse(self):
+        """Test NAME=PORT[@BAUD] specs."""
+        self.assertEqual(DeviceConfig.parse("a=/dev/ttyUSB0"), DeviceConfig("a", "/dev/ttyUSB0"))
+        self.assertEqual(DeviceConfig.parse("b=COM3@250000").baud, 250000)
+        for spec in ("/dev/ttyUSB0", "a=", "a/b=/dev/ttyUSB0", "+=/dev/x"):
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    DeviceConfig.parse(spec)
+
+
+class TestFleetBridge(unittest.IsolatedAsyncioTestCase):
+    """Tests for FleetBridge with simulated machines."""
+
+    async def asyncSetUp(self):
+        self.stats_dir = Path(tempfile.mkdtemp())
+        self.firmware = {f"dev{i:03d}": FakeFirmwareSerial(baud=921600) for i in range(DEVICES)}
+        self.connections = {name: 0 for name in self.firmware}
+        self.writers = {}
+        self.client = FakeMQTTClient()
+        self.threads_before = threading.active_count()
+
+        async def connect(device: DeviceConfig) -> AsyncSplice3D:
+            self.connections[device.name] += 1
+            reader, writer = await open_fake_connection(self.firmware[device.name])
+            self.writers[device.name] = writer
+            return AsyncSplice3D(reader, writer, timeout=1.0, name=device.name).start()
+
+        devices = [DeviceConfig(name, f"/dev/fake{name}") for name in self.firmware]
+        self.bridge = FleetBridge(devices, self.client, stats_dir=self.stats_dir,
+                                  poll_interval=0.05, reconnect_delay=0.05, connect=connect)
+        self.stop = asyncio.Event()
+        self.task = asyncio.ensure_future(self.bridge.run(self.stop))
+        self.client.connect_now()
+        await self.settle()
+
+    async def asyncTearDown(self):
+        self.stop.set()
+        await self.task
+        shutil.rmtree(self.stats_dir, ignore_errors=True)
+
+    async def settle(self, condition=lambda: True, timeout: float = 2.0):
+        """Let the bridge run until all machines are connected and condition holds."""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.01)
+            if all(d.connected for d in self.bridge.devices.values()) and condition():
+                return
+        self.fail("Bridge did not settle")
+
+    def topic(self, name: str, path: str) -> str:
+        return f"home/splice3d/{name}/{path}"
+
+    async def test_shared_resources(self):
+        """Test one subscription and no thread per machine."""
+        await self.settle(lambda: all(d.state.state == "IDLE"
+                                      for d in self.bridge.devices.values()))
+        self.assertEqual(self.client.subscriptions, ["home/splice3d/+/command/#"])
+        self.assertLessEqual(threading.active_count(), self.threads_before + 1)
+        retained = self.client.retained()
+        for name in self.firmware:
+            self.assertEqual(retained[self.topic(name, "status/state")], "IDLE")
+            self.assertEqual(retained[self.topic(name, "status/online")], "ON")
+        self.assertEqual(retained["home/splice3d/bridge/online"], "ON")
+
+    async def test_command_routing(self):
+        """Test that a command reaches only the machine of its topic."""
+        self.client.deliver(self.topic("dev042", "command/abort"), "1")
+        self.client.deliver(self.topic("dev007", "command/preheat"), "PLA")
+        self.client.deliver(self.topic("nosuch", "command/abort"), "1")
+        self.client.deliver(self.topic("dev001", "command/explode"), "1")
+
+        await self.settle(lambda: "ABORT" in self.firmware["dev042"].received
+                          and "PREHEAT PLA" in self.firmware["dev007"].received)
+        for name, firmware in self.firmware.items():
+            commands = set(firmware.received) - {"STATUS"}
+            expected = {"dev042": {"ABORT"}, "dev007": {"PREHEAT PLA"}}.get(name, set())
+            self.assertEqual(commands, expected, name)
+
+    async def test_progress_and_stats_per_machine(self):
+        """Test that lines from one machine only change its own topics."""
+        self.writers["dev003"].emit("PROGRESS 5/10")
+        self.writers["dev003"].emit("DONE")
+        self.writers["dev099"].emit("ERROR Filament jam")
+
+        done = self.topic("dev003", "stats/splices_total")
+        failed = self.topic("dev099", "stats/failures_today")
+        await self.settle(lambda: self.client.retained().get(done) == 1
+                          and self.client.retained().get(failed) == 1)
+        retained = self.client.retained()
+        self.assertEqual(retained[self.topic("dev003", "status/progress/percent")], 100)
+        self.assertEqual(retained[self.topic("dev099", "status/error_message")], "Filament jam")
+        self.assertEqual(retained.get(self.topic("dev004", "stats/splices_total"), 0), 0)
+        # Journaled, not yet in a snapshot; a restart replays it
+        self.bridge.journal_writer.flush()
+        self.assertFalse((self.stats_dir / "dev003.json").exists())
+        self.assertEqual(StatsJournal(self.stats_dir / "dev003.json").load().splices_total, 1)
+
+    async def test_reconnect(self):
+        """Test that a lost machine goes offline and is reconnected."""
+        self.writers["dev010"].close()
+
+        await self.settle(lambda: self.connections["dev010"] == 2)
+        states = [payload for topic, payload, _ in self.client.published
+                  if topic == self.topic("dev010", "status/state")]
+        self.assertIn("OFFLINE", states)
+        self.assertEqual(set(self.connections.values()) - {1}, {2})
+
+    async def test_shutdown(self):
+        """Test that stopping publishes every machine and the bridge offline."""
+        self.stop.set()
+        await self.task
+
+        retained = self.client.retained()
+        for name in self.firmware:
+            self.assertEqual(retained[self.topic(name, "status/online")], "OFF")
+        self.assertEqual(retained["home/splice3d/bridge/online"], "OFF")
+        self.assertEqual(len(list(self.stats_dir.glob("*.json"))), DEVICES)
+        self.assertEqual(set(path.stat().st_size for path in self.stats_dir.glob("*.journal")),
+                         {0})
+
+
+class StubbornMachine(AsyncSplice3D):
+    """Never answers STATUS and drops cancellation while waiting, like
+    wait_for(shield(...)) can when the response and the cancel coincide."""
+
+    polling: asyncio.Event
+
+    async def command(self, command, timeout=None, expect=None):
+        if not self.connected:
+            raise ConnectionError(f"{self.name}: not connected")
+        self.polling.set()
+        while self.connected:
+            try:
+                await asyncio.sleep(0.01)
+            except asyncio.CancelledError:
+                pass
+        raise ConnectionError(f"{self.name}: connection closed")
+
+
+class TestFleetShutdown(unittest.IsolatedAsyncioTestCase):
+    """Tests for stopping the bridge during in-flight commands."""
+
+    async def test_stop_during_poll(self):
+        """Test that shutdown closes connections instead of waiting on polls."""
+        stats_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, stats_dir, ignore_errors=True)
+        polling = asyncio.Event()
+
+        async def connect(device: DeviceConfig) -> AsyncSplice3D:
+            reader, writer = await open_fake_connection(FakeFirmwareSerial(baud=921600))
+            machine = StubbornMachine(reader, writer, timeout=1.0, name=device.name)
+            machine.polling = polling
+            return machine.start()
+
+        client = FakeMQTTClient()
+        devices = [DeviceConfig(f"dev{i}", f"/dev/fake{i}") for i in range(3)]
+        bridge = FleetBridge(devices, client, stats_dir=stats_dir, poll_interval=0.01,
+                             reconnect_delay=0.01, connect=connect)
+        stop = asyncio.Event()
+        task = asyncio.ensure_future(bridge.run(stop))
+        client.connect_now()
+        await asyncio.wait_for(polling.wait(), 2.0)
+        # Let the fleet's own STATUS round start as well
+        await asyncio.sleep(0.05)
+
+        stop.set()
+        await asyncio.wait_for(task, 3.0)
+        self.assertEqual(client.retained()["home/splice3d/bridge/online"], "OFF")
+        self.assertFalse(any(device.connected for device in bridge.devices.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Tests for Splice3D batch post-processing.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gcode_batch import collect_inputs, is_batch_input, process_job, run_batch, write_summary
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "samples"
+
+
+class TestGCodeBatch(unittest.TestCase):
+    """Tests for collect_inputs(), process_job() and run_batch()."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = Path(self.temp_dir) / "jobs"
+        shutil.copytree(SAMPLES_DIR, self.input_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_collect_directory_skips_outputs(self):
+        """Test that directories yield inputs but not *_modified outputs."""
+        names = [p.name for p in collect_inputs(str(self.input_dir))]
+
+        self.assertIn("test_multicolor.gcode", names)
+        self.assertNotIn("test_multicolor_modified.gcode", names)
+        self.assertEqual(names, sorted(names))
+
+    def test_collect_glob(self):
+        """Test glob patterns, including recursive ones."""
+        nested = self.input_dir / "night1"
+        nested.mkdir()
+        shutil.copy(SAMPLES_DIR / "test_gradient.gcode", nested / "late.gcode")
+
+        flat = collect_inputs(str(self.input_dir / "test_m*.gcode"))
+        recursive = collect_inputs(str(self.input_dir / "**" / "*.gcode"))
+
+        self.assertEqual([p.name for p in flat],
+                         ["test_m600_colorchange.gcode", "test_multicolor.gcode"])
+        self.assertIn(nested / "late.gcode", recursive)
+
+    def test_existing_file_with_glob_characters(self):
+        """Test that an existing file is a single input, not a pattern."""
+        path = self.input_dir / "part[1].gcode"
+        shutil.copy(SAMPLES_DIR / "test_gradient.gcode", path)
+
+        self.assertFalse(is_batch_input(str(path)))
+        self.assertEqual(collect_inputs(str(path)), [path])
+        self.assertTrue(is_batch_input(str(self.input_dir / "part[1]*.gcode")))
+        self.assertTrue(is_batch_input(str(self.input_dir)))
+
+    def test_collect_rejects_output_collisions(self):
+        """Test that inputs sharing an output name are reported."""
+        for name in ("x", "y"):
+            (self.input_dir / name).mkdir()
+            shutil.copy(SAMPLES_DIR / "test_gradient.gcode", self.input_dir / name / "part.gcode")
+        recursive = str(self.input_dir / "**" / "part.gcode")
+
+        # Separate directories are fine while outputs stay next to the inputs
+        self.assertEqual(len(collect_inputs(recursive)), 2)
+        with self.assertRaisesRegex(ValueError, "part.gcode"):
+            collect_inputs(recursive, output_dir=str(Path(self.temp_dir) / "out"))
+
+        # A plain and a compressed copy of the same stem collide in place
+        shutil.copy(SAMPLES_DIR / "test_gradient.gcode", self.input_dir / "x" / "part.gcode.gz")
+        with self.assertRaisesRegex(ValueError, "part.gcode.gz"):
+            collect_inputs(str(self.input_dir / "x"))
+
+    def test_process_job(self):
+        """Test that a job writes the recipe and modified G-code."""
+        job = process_job(str(self.input_dir / "test_multicolor.gcode"))
+
+        self.assertTrue(job["ok"])
+        self.assertTrue(os.path.exists(job["recipe"]))
+        self.assertTrue(os.path.exists(job["output"]))
+        with open(job["recipe"]) as f:
+            recipe = json.load(f)
+        self.assertEqual(job["segments"], recipe["segment_count"])
+        self.assertGreater(job["tool_changes_removed"], 0)
+
+    def test_bad_file_does_not_abort_batch(self):
+        """Test that a failing input is reported and the others complete."""
+        inputs = collect_inputs(str(self.input_dir))
+        missing = str(self.input_dir / "missing.gcode")
+        output_dir = Path(self.temp_dir) / "out"
+        seen = []
+
+        summary = run_batch(inputs + [missing], workers=2,
+                            progress=seen.append, output_dir=str(output_dir))
+
+        self.assertEqual(summary["files"], len(inputs) + 1)
+        self.assertEqual(summary["succeeded"], len(inputs))
+        self.assertEqual(summary["failed"], 1)
+        self.assertEqual(summary["errors"][0]["input"], missing)
+        self.assertEqual(len(seen), len(inputs) + 1)
+        self.assertEqual([job["input"] for job in summary["jobs"]],
+                         [str(p) for p in inputs] + [missing])
+        self.assertEqual(summary["segments"],
+                         sum(job["segments"] for job in summary["jobs"]))
+        for path in inputs:
+            self.assertTrue((output_dir / f"{path.stem}_splice_recipe.json").exists())
+
+    def test_write_summary(self):
+        """Test that the summary is written as JSON."""
+        summary = run_batch([self.input_dir / "test_gradient.gcode"], workers=1)
+        path = os.path.join(self.temp_dir, "summary.json")
+
+        write_summary(summary, path)
+
+        with open(path) as f:
+            self.assertEqual(json.load(f), summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
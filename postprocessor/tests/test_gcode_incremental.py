@@ -0,0 +1,151 @@
+"""
+Tests for incremental Splice3D G-code parsing.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gcode_parser import GCodeParser
+from gcode_incremental import IncrementalParser, index_path_for
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "samples"
+
+
+def layered_gcode(layers: int, eol: str = "\n") -> list[str]:
+    """Lines of a two-color print with a tool change in every layer."""
+    lines = ["M83", "G92 E0"]
+    for layer in range(layers):
+        lines += [f";LAYER:{layer}", "T0", "G1 X1 E2.5", "G1 X2 E1.5",
+                  "T1", "G1 X3 E3", "G1 X4 E0.25"]
+    return [line + eol for line in lines]
+
+
+class TestIncrementalParser(unittest.TestCase):
+    """Tests for IncrementalParser."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "print.gcode")
+        self.index = index_path_for(os.path.join(self.temp_dir, "print_modified.gcode"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, lines: list[str]):
+        with open(self.path, "w", newline="") as f:
+            f.writelines(lines)
+
+    def assertParsesLikeFullParse(self, incremental: IncrementalParser):
+        result = incremental.parse_file(self.path, self.index)
+        self.assertEqual(result, GCodeParser().parse_file(self.path))
+        return result
+
+    def test_samples(self):
+        """Test that first and repeated runs match a full parse."""
+        for sample in sorted(SAMPLES_DIR.glob("*.gcode")):
+            with self.subTest(sample=sample.name):
+                shutil.copy(sample, self.path)
+                if os.path.exists(self.index):
+                    os.unlink(self.index)
+                incremental = IncrementalParser()
+
+                self.assertParsesLikeFullParse(incremental)
+                self.assertParsesLikeFullParse(incremental)
+                self.assertEqual(incremental.scanned_bytes, 0)
+
+    def test_resumes_at_first_changed_layer(self):
+        """Test that an edit re-scans only from the edited layer."""
+        lines = layered_gcode(50)
+        self._write(lines)
+        incremental = IncrementalParser()
+        incremental.parse_file(self.path, self.index)
+
+        lines.insert(lines.index(";LAYER:40\n") + 3, "M0 ; manual pause\n")
+        lines[lines.index(";LAYER:45\n") + 2] = "G1 X1 E7\n"
+        self._write(lines)
+
+        self.assertParsesLikeFullParse(incremental)
+        self.assertEqual(incremental.reused_layers, 41)  # Start G-code + layers 0-39
+        self.assertLess(incremental.scanned_bytes, os.path.getsize(self.path) // 4)
+
+        # The rewritten index describes the edited file
+        self.assertParsesLikeFullParse(incremental)
+        self.assertEqual(incremental.scanned_bytes, 0)
+
+    def test_edits_anywhere(self):
+        """Test edits in the start G-code, inserted layers and appended lines."""
+        edits = [
+            lambda lines: lines.insert(0, "M82\n"),
+            lambda lines: lines.__setitem__(slice(30, 30), layered_gcode(2)[2:]),
+            lambda lines: lines.__delitem__(slice(20, 60)),
+            lambda lines: lines.append("T0\n"),
+            lambda lines: lines.append("G1 X9 E4\n"),
+            lambda lines: lines.__setitem__(slice(-1, None), []),
+        ]
+        lines = layered_gcode(20)
+        self._write(lines)
+        incremental = IncrementalParser(GCodeParser(columnar=True))
+        incremental.parse_file(self.path, self.index)
+
+        for number, edit in enumerate(edits):
+            with self.subTest(edit=number):
+                edit(lines)
+                self._write(lines)
+                self.assertParsesLikeFullParse(incremental)
+
+    def test_line_endings(self):
+        """Test CRLF files and bare CR line breaks."""
+        lines = layered_gcode(10, eol="\r\n")
+        lines[30] = "G1 X1 E1\rT1\r;LAYER:99\r"
+        self._write(lines)
+        incremental = IncrementalParser()
+        self.assertParsesLikeFullParse(incremental)
+
+        lines[50] = "T0\r\n"
+        self._write(lines)
+        self.assertParsesLikeFullParse(incremental)
+        self.assertGreater(incremental.reused_layers, 0)
+
+    def test_settings_and_corrupt_index(self):
+        """Test that a mismatched or unreadable index means a full parse."""
+        self._write(layered_gcode(10))
+        IncrementalParser().parse_file(self.path, self.index)
+
+        incremental = IncrementalParser(GCodeParser(filament_diameter=2.85))
+        incremental.parse_file(self.path, self.index)
+        self.assertEqual(incremental.reused_layers, 0)
+
+        with open(self.index, "w") as f:
+            f.write("{truncated")
+        incremental = IncrementalParser()
+        self.assertParsesLikeFullParse(incremental)
+        self.assertEqual(incremental.reused_layers, 0)
+
+    def test_missing_file(self):
+        """Test that a missing input is reported and no index is written."""
+        result = IncrementalParser().parse_file("/nonexistent/file.gcode", self.index)
+
+        self.assertTrue(result.errors)
+        self.assertFalse(os.path.exists(self.index))
+
+    def test_parser_state_round_trip(self):
+        """Test GCodeParser.get_state() / set_state()."""
+        parser = GCodeParser()
+        parser.parse_lines(layered_gcode(3))
+        state = parser.get_state()
+
+        other = GCodeParser()
+        other.set_state(state)
+
+        self.assertEqual(other.get_state(), state)
+        self.assertEqual(other.seen_tools, {0, 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,240 @@
+"""
+Tests for Splice3D compressed G-code I/O.
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gcode_parser import GCodeParser
+from gcode_modifier import GCodeModifier, open_atomic
+from gcode_pipeline import process_gcode
+from gcode_incremental import IncrementalParser
+from gcode_batch import collect_inputs, process_job
+from gcode_io import (
+    CODECS,
+    PLAIN,
+    SUFFIXES,
+    BGCodeWriter,
+    CodecError,
+    codec_for_path,
+    detect_codec,
+    gcode_stem,
+    open_gcode,
+    zstandard,
+)
+
+SAMPLE = Path(__file__).parent.parent.parent / "samples" / "test_multicolor.gcode"
+
+AVAILABLE = [codec for codec in CODECS if codec != "zstd" or zstandard is not None]
+
+
+class TestCodecs(unittest.TestCase):
+    """Tests for reading and writing each codec."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with open(SAMPLE, 'r', encoding='utf-8') as f:
+            self.text = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, codec: str, text: str) -> str:
+        path = os.path.join(self.temp_dir, "print" + SUFFIXES[codec])
+        with open_atomic(path) as f:
+            f.write(text)
+        return path
+
+    def test_round_trip(self):
+        """Test that every codec reads back what was written."""
+        for codec in AVAILABLE:
+            with self.subTest(codec=codec):
+                path = self._write(codec, self.text)
+
+                self.assertEqual(detect_codec(path), codec)
+                with open_gcode(path) as f:
+                    self.assertEqual(f.read(), self.text)
+
+    def test_compressed_outputs_are_smaller(self):
+        """Test that repetitive G-code actually gets compressed."""
+        text = self.text * 20
+        plain_size = os.path.getsize(self._write(PLAIN, text))
+        for codec in AVAILABLE[1:]:
+            with self.subTest(codec=codec):
+                self.assertLess(os.path.getsize(self._write(codec, text)), plain_size / 5)
+
+    def test_gzip_output_is_reproducible(self):
+        """Test that gzip outputs do not embed a timestamp or file name."""
+        path = self._write("gzip", self.text)
+        with open(path, 'rb') as f:
+            first = f.read()
+        os.utime(path, (0, 0))
+        path = self._write("gzip", self.text)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), first)
+
+    def test_bgcode_blocks(self):
+        """Test the bgcode container layout and block splitting."""
+        text = "G1 X1 E0.5\n" * 20000  # More than one 64 KiB block
+        path = self._write("bgcode", text)
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, checksum = struct.unpack_from("<4sIH", data)
+        self.assertEqual((magic, version, checksum), (b"GCDE", 1, 1))
+
+        offset, gcode_blocks = 10, []
+        while offset < len(data):
+            block_type, compression, size = struct.unpack_from("<HHI", data, offset)
+            header = 8
+            stored = size
+            if compression:
+                stored = struct.unpack_from("<I", data, offset + 8)[0]
+                header = 12
+            payload = data[offset + header + 2:offset + header + 2 + stored]
+            if block_type == 1:
+                gcode_blocks.append(zlib.decompress(payload) if compression else payload)
+            offset += header + 2 + stored + 4
+
+        self.assertEqual(offset, len(data))
+        self.assertGreater(len(gcode_blocks), 1)
+        self.assertTrue(all(block.endswith(b"\n") for block in gcode_blocks))
+        self.assertEqual(b"".join(gcode_blocks).decode(), text)
+
+    def test_bgcode_errors(self):
+        """Test corrupt and unsupported bgcode inputs."""
+        path = self._write("bgcode", self.text)
+        with open(path, 'rb') as f:
+            data = bytearray(f.read())
+
+        data[-10] ^= 0xFF
+        corrupt = os.path.join(self.temp_dir, "corrupt.bgcode")
+        with open(corrupt, 'wb') as f:
+            f.write(data)
+        with self.assertRaises(CodecError):
+            with open_gcode(corrupt) as f:
+                f.read()
+
+        meatpack = os.path.join(self.temp_dir, "meatpack.bgcode")
+        with open(meatpack, 'wb') as f:
+            writer = BGCodeWriter(f)
+            header = struct.pack("<HHI", 1, 0, 3)
+            params = struct.pack("<H", 1)  # MeatPack encoding
+            crc = zlib.crc32(b"abc", zlib.crc32(params, zlib.crc32(header)))
+            f.write(header + params + b"abc" + struct.pack("<I", crc))
+            writer.close()
+        with self.assertRaises(CodecError):
+            with open_gcode(meatpack) as f:
+                f.read()
+
+    @unittest.skipIf(zstandard is not None, "zstandard is installed")
+    def test_zstd_requires_package(self):
+        """Test that zstd fails clearly without the zstandard package."""
+        with self.assertRaises(CodecError):
+            self._write("zstd", self.text)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_names(self):
+        """Test codec selection by suffix and stems without codec suffixes."""
+        self.assertEqual(codec_for_path("part.gcode.gz"), "gzip")
+        self.assertEqual(codec_for_path("PART.GCODE.ZST"), "zstd")
+        self.assertEqual(codec_for_path("part.bgcode"), "bgcode")
+        self.assertEqual(codec_for_path("part.gcode"), PLAIN)
+        self.assertEqual(codec_for_path("part.txt"), PLAIN)
+        self.assertEqual(gcode_stem("jobs/part.gcode.gz"), "part")
+        self.assertEqual(gcode_stem("part.v2.bgcode"), "part.v2")
+        self.assertEqual(gcode_stem("part.gcode"), "part")
+        self.assertEqual(gcode_stem("part.nc"), "part")
+
+
+class TestCompressedProcessing(unittest.TestCase):
+    """Tests for compressed files in the parser, modifier and batch mode."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.expected = GCodeParser().parse_file(str(SAMPLE))
+        self.inputs = {}
+        for codec in AVAILABLE:
+            # One stem per codec: inputs sharing a stem share their outputs
+            path = os.path.join(self.temp_dir, f"sample_{codec}" + SUFFIXES[codec])
+            with open(SAMPLE, 'r', encoding='utf-8') as src, open_atomic(path) as dst:
+                shutil.copyfileobj(src, dst)
+            self.inputs[codec] = path
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_parse_all_backends(self):
+        """Test that every backend parses compressed inputs."""
+        for codec, path in self.inputs.items():
+            for backend in GCodeParser.BACKENDS:
+                with self.subTest(codec=codec, backend=backend):
+                    self.assertEqual(GCodeParser(backend=backend).parse_file(path),
+                                     self.expected)
+
+    def test_truncated_input(self):
+        """Test that a truncated compressed input is reported, not raised."""
+        path = os.path.join(self.temp_dir, "truncated.gcode.gz")
+        with open(self.inputs["gzip"], 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(data[:len(data) // 2])
+
+        self.assertTrue(GCodeParser().parse_file(path).errors)
+        result, _ = process_gcode(path, os.path.join(self.temp_dir, "out.gcode"))
+        self.assertTrue(result.errors)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, "out.gcode")))
+
+    def test_modify_between_codecs(self):
+        """Test that the modified G-code is the same for any pair of codecs."""
+        reference = os.path.join(self.temp_dir, "reference.gcode")
+        expected_stats = GCodeModifier().modify_file(str(SAMPLE), reference)
+        with open(reference, 'r', encoding='utf-8') as f:
+            expected = f.read()
+
+        for codec, path in self.inputs.items():
+            output = os.path.join(self.temp_dir, "out" + SUFFIXES["gzip" if codec == PLAIN
+                                                                  else PLAIN])
+            with self.subTest(codec=codec):
+                stats = GCodeModifier().modify_file(path, output)
+                self.assertEqual(stats, expected_stats)
+                with open_gcode(output) as f:
+                    self.assertEqual(f.read(), expected)
+
+                result, stats = process_gcode(path, output)
+                self.assertEqual(result, self.expected)
+                self.assertEqual(stats, expected_stats)
+
+    def test_incremental_parses_compressed_in_full(self):
+        """Test that compressed inputs bypass the incremental index."""
+        index = os.path.join(self.temp_dir, "index.json")
+        incremental = IncrementalParser()
+
+        self.assertEqual(incremental.parse_file(self.inputs["gzip"], index), self.expected)
+        self.assertFalse(os.path.exists(index))
+
+    def test_batch(self):
+        """Test batch discovery and naming of compressed files."""
+        inputs = collect_inputs(self.temp_dir)
+        self.assertEqual(sorted(map(str, inputs)), sorted(self.inputs.values()))
+
+        job = process_job(self.inputs["gzip"], compression="bgcode")
+        self.assertTrue(job["ok"], job["errors"])
+        self.assertEqual(Path(job["output"]).name, "sample_gzip_modified.bgcode")
+        self.assertEqual(Path(job["recipe"]).name, "sample_gzip_splice_recipe.json")
+        self.assertEqual(detect_codec(job["output"]), "bgcode")
+
+        # Compressed outputs are not picked up as inputs
+        self.assertEqual(len(collect_inputs(self.temp_dir)), len(self.inputs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,8 @@ Tests for the gcode modifier module.
 import unittest
 import tempfile
 import os
-from postprocessor.gcode_modifier import GCodeModifier, modify_gcode
+import stat
+from postprocessor.gcode_modifier import OUTPUT_FILE_MODE, GCodeModifier, modify_gcode
 
 
 class TestGCodeModifier(unittest.TestCase):
@@ -227,6 +228,103 @@ class TestModifyGcodeFunction(unittest.TestCase):
         self.assertEqual(stats["tool_changes_removed"], 2)
 
 
+class TestStreamingModifier(unittest.TestCase):
+    """Tests for the generator-based modifier and atomic file output."""
+
+    LINES = [
+        "; START_GCODE\n",
+        "G28\n",
+        "T0\n",
+        "G1 X10 E5\n",
+        "T1\n",
+        "G1 X20 E9\n",
+    ] * 50
+
+    def setUp(self):
+        self.modifier = GCodeModifier()
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.temp_dir, "input.gcode")
+        self.output_path = os.path.join(self.temp_dir, "output.gcode")
+        with open(self.input_path, 'w') as f:
+            f.writelines(self.LINES)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_iter_modified_matches_modify_lines(self):
+        """Test that the generator yields modify_lines() output and returns stats."""
+        expected, expected_stats = self.modifier.modify_lines(self.LINES)
+
+        generator = self.modifier.iter_modified(iter(self.LINES))
+        output = []
+        while True:
+            try:
+                output.append(next(generator))
+            except StopIteration as done:
+                stats = done.value
+                break
+
+        self.assertEqual(output, expected)
+        self.assertEqual(stats, expected_stats)
+
+    def test_iter_modified_is_lazy(self):
+        """Test that output is yielded before the input is exhausted."""
+        consumed = []
+
+        def lines():
+            for line in self.LINES:
+                consumed.append(line)
+                yield line
+
+        generator = self.modifier.iter_modified(lines())
+        for _ in range(20):
+            next(generator)
+
+        self.assertLess(len(consumed), len(self.LINES))
+
+    def test_chunks(self):
+        """Test that chunks concatenate to the full output."""
+        expected, _ = self.modifier.modify_lines(self.LINES)
+
+        chunks = list(self.modifier.iter_modified_chunks(self.LINES, chunk_lines=7))
+
+        self.assertEqual([line for chunk in chunks for line in chunk], expected)
+        self.assertTrue(all(len(chunk) >= 7 for chunk in chunks[:-1]))
+
+    def test_modify_file_matches_modify_lines(self):
+        """Test that streamed file output equals the in-memory output."""
+        expected, expected_stats = self.modifier.modify_lines(self.LINES)
+
+        stats = self.modifier.modify_file(self.input_path, self.output_path)
+
+        with open(self.output_path, 'r') as f:
+            self.assertEqual(f.read(), ''.join(expected))
+        self.assertEqual(stats, expected_stats)
+
+    def test_failed_write_leaves_no_partial_output(self):
+        """Test that an error mid-stream keeps the previous output intact."""
+        with open(self.output_path, 'w') as f:
+            f.write("previous\n")
+
+        def fail(*args, **kwargs):
+            raise RuntimeError("disk on fire")
+
+        self.modifier.process_line = fail
+        with self.assertRaises(RuntimeError):
+            self.modifier.modify_file(self.input_path, self.output_path)
+
+        with open(self.output_path, 'r') as f:
+            self.assertEqual(f.read(), "previous\n")
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["input.gcode", "output.gcode"])
+
+    def test_output_permissions(self):
+        """Test that the output gets normal file permissions, not 0600."""
+        self.modifier.modify_file(self.input_path, self.output_path)
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.output_path).st_mode), OUTPUT_FILE_MODE)
+
+
 class TestEdgeCases(unittest.TestCase):
     """Tests for edge cases in G-code modification."""
 
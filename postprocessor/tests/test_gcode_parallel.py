@@ -0,0 +1,148 @@
+"""
+Tests for parallel chunked G-code parsing.
+"""
+
+import mmap
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gcode_parser import GCodeParser
+from gcode_parallel import parse_file_parallel, split_chunks
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "samples"
+
+# Chunk sizes small enough to cut the samples into many pieces
+CHUNK_SIZES = (1, 64, 257, 1024)
+
+
+def _synthetic_gcode(seed: int, relative: bool, lines: int = 2000) -> str:
+    """Build multi-tool G-code with G92 resets, retractions and layers."""
+    rng = random.Random(seed)
+    out = ["M83" if relative else "M82", "G92 E0"]
+    e = 0.0
+    layer = 0
+    for _ in range(lines):
+        roll = rng.random()
+        if roll < 0.02:
+            out.append(f"T{rng.randrange(4)}")
+        elif roll < 0.03:
+            layer += 1
+            out.append(f";LAYER:{layer}" if rng.random() < 0.5 else ";LAYER_CHANGE")
+        elif roll < 0.04:
+            e = round(rng.uniform(0, 2), 3)
+            out.append(f"G92 E{e}")
+        elif roll < 0.05:
+            out.append("; comment")
+        else:
+            step = round(rng.uniform(-0.8, 1.5), 5)
+            if relative:
+                out.append(f"G1 X{rng.random():.3f} E{step}")
+            else:
+                e = round(e + step, 5)
+                out.append(f"G1 X{rng.random():.3f} E{e}")
+    return "\n".join(out) + "\n"
+
+
+class TestParseFileParallel(unittest.TestCase):
+    """Tests that the chunked parse matches the sequential parser."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, text: str) -> str:
+        path = os.path.join(self.temp_dir, "test.gcode")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return path
+
+    def assertMatchesSequential(self, path: str, workers: int = 1):
+        expected = GCodeParser().parse_file(path)
+        for chunk_size in CHUNK_SIZES:
+            with self.subTest(chunk_size=chunk_size, workers=workers):
+                result = parse_file_parallel(path, workers=workers, chunk_size=chunk_size)
+                self.assertEqual(result, expected)
+
+    def test_samples(self):
+        """Test that every sample file matches the sequential parser."""
+        for sample in sorted(SAMPLES_DIR.glob("*.gcode")):
+            with self.subTest(sample=sample.name):
+                self.assertMatchesSequential(str(sample))
+
+    def test_samples_process_pool(self):
+        """Test the samples through a real process pool."""
+        for sample in sorted(SAMPLES_DIR.glob("*.gcode")):
+            with self.subTest(sample=sample.name):
+                expected = GCodeParser().parse_file(str(sample))
+                result = parse_file_parallel(str(sample), workers=2, chunk_size=512)
+                self.assertEqual(result, expected)
+
+    def test_relative_and_absolute_synthetic(self):
+        """Test files whose chunks start with unknown E position."""
+        for seed in range(5):
+            for relative in (False, True):
+                with self.subTest(seed=seed, relative=relative):
+                    self.assertMatchesSequential(self._write(_synthetic_gcode(seed, relative)))
+
+    def test_mode_switch_mid_file(self):
+        """Test chunks whose incoming E mode differs from the start G-code."""
+        text = (_synthetic_gcode(1, relative=True)
+                + "M82\n" + _synthetic_gcode(2, relative=False)
+                + "M83\nG1 E1\nT1\nG1 E2\n")
+        self.assertMatchesSequential(self._write(text))
+
+    def test_crlf_and_no_trailing_newline(self):
+        """Test line counting across chunk boundaries."""
+        text = _synthetic_gcode(3, relative=True).replace("\n", "\r\n").rstrip()
+        self.assertMatchesSequential(self._write(text))
+
+    def test_text_fallback(self):
+        """Test that non-ASCII files are parsed through the text backend."""
+        path = self._write("T0\nG1 X1 E5 ; 220°C\nT1\nG1 X1 E9\n")
+        self.assertMatchesSequential(path)
+
+    def test_empty_and_missing(self):
+        """Test empty and missing files."""
+        self.assertMatchesSequential(self._write(""))
+        result = parse_file_parallel("/nonexistent/file.gcode")
+        self.assertEqual(len(result.errors), 1)
+
+    def test_parallel_backend(self):
+        """Test the parser's "parallel" backend."""
+        sample = str(SAMPLES_DIR / "test_multicolor.gcode")
+        self.assertEqual(GCodeParser(backend="parallel").parse_file(sample),
+                         GCodeParser().parse_file(sample))
+
+
+class TestSplitChunks(unittest.TestCase):
+    """Tests for split_chunks()."""
+
+    def test_chunks_are_line_aligned_and_cover_file(self):
+        """Test that chunks tile the file and start at line starts."""
+        data = _synthetic_gcode(0, relative=False).encode()
+        with tempfile.TemporaryFile() as f:
+            f.write(data)
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for count in (1, 2, 7, 100, len(data) * 2):
+                    with self.subTest(count=count):
+                        chunks = split_chunks(mm, count)
+                        self.assertLessEqual(len(chunks), count)
+                        self.assertEqual(chunks[0][0], 0)
+                        self.assertEqual(chunks[-1][1], len(data))
+                        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+                            self.assertEqual(end, start)
+                            self.assertEqual(data[start - 1:start], b"\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
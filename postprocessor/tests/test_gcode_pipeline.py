@@ -0,0 +1,68 @@
+"""
+Tests for the fused Splice3D parse + modify pipeline.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gcode_parser import GCodeParser
+from gcode_modifier import GCodeModifier
+from gcode_pipeline import process_gcode
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "samples"
+
+
+class TestProcessGcode(unittest.TestCase):
+    """Tests for process_gcode()."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_matches_separate_passes(self):
+        """Test that the fused pass matches parse_file + modify_file on all samples."""
+        for sample in sorted(SAMPLES_DIR.glob("*.gcode")):
+            with self.subTest(sample=sample.name):
+                fused_path = os.path.join(self.temp_dir, "fused.gcode")
+                separate_path = os.path.join(self.temp_dir, "separate.gcode")
+
+                result, stats = process_gcode(str(sample), fused_path)
+                expected_result = GCodeParser().parse_file(str(sample))
+                expected_stats = GCodeModifier().modify_file(str(sample), separate_path)
+
+                self.assertEqual(result, expected_result)
+                self.assertEqual(stats, expected_stats)
+                with open(fused_path) as fused, open(separate_path) as separate:
+                    self.assertEqual(fused.read(), separate.read())
+
+    def test_modifier_options_are_used(self):
+        """Test that the supplied modifier configuration is honoured."""
+        output_path = os.path.join(self.temp_dir, "out.gcode")
+        modifier = GCodeModifier(add_pause_at_start=False)
+
+        process_gcode(str(SAMPLES_DIR / "test_multicolor.gcode"), output_path,
+                      modifier=modifier)
+
+        with open(output_path) as f:
+            self.assertNotIn("Pause for spool loading", f.read())
+
+    def test_missing_input(self):
+        """Test that a missing input file is reported as a parse error."""
+        output_path = os.path.join(self.temp_dir, "out.gcode")
+
+        result, stats = process_gcode("/nonexistent/file.gcode", output_path)
+
+        self.assertEqual(len(result.errors), 1)
+        self.assertEqual(stats, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
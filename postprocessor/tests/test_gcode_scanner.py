@@ -0,0 +1,121 @@
+"""
+Tests for the memory-mapped Splice3D G-code scanner backend.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gcode_parser import GCodeParser, LINE_ABSOLUTE_E, LINE_RELATIVE_E, LINE_EXTRUDE
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "samples"
+
+
+class TestMmapBackend(unittest.TestCase):
+    """Tests that the mmap backend matches the text backend."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, data: bytes) -> str:
+        path = os.path.join(self.temp_dir, "test.gcode")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def assertBackendsMatch(self, path: str):
+        text = GCodeParser(backend="text").parse_file(path)
+        mapped = GCodeParser(backend="mmap").parse_file(path)
+        self.assertEqual(mapped, text)
+        return mapped
+
+    def test_samples(self):
+        """Test that every sample file parses identically."""
+        for sample in sorted(SAMPLES_DIR.glob("*.gcode")):
+            with self.subTest(sample=sample.name):
+                self.assertBackendsMatch(str(sample))
+
+    def test_edge_cases(self):
+        """Test line endings, whitespace, case and comment variants."""
+        cases = {
+            "first line tool change": b"T1\nG1 X1 E5\nT0\nG1 X2 E9",
+            "crlf": b"T0\r\nG1 X1 E5\r\nT1\r\nG1 X2 E9\r\n",
+            "leading whitespace": b"T0\n  G1 X1 E5\n\tT1\n \x0bG1 X2 E9\n",
+            "lowercase": b"t0\ng1 x1 e5\nt1\nm600\ng0 e9\n",
+            "relative with reset": b"M83\nT0\nG1 E2\nG1 E-1\nG92 E0\nT1\nG1 E3.5\n",
+            "absolute reset": b"M82\nT0\nG1 E10\nG92 E0\nG1 E4\nT1\nG92 E2\nG1 E6\n",
+            "e in comments": b"T0\nG1 X1 ; E99\nG1 Ex E4\n; E50\nT1\nG1 E.5\nG10 E20\n",
+            "layers": b";LAYER:0\nT0\nG1 E1\n; x ;layer:7\nT1\n;LAYER_CHANGE\n;a;LAYER:;LAYER:9\nG1 E3\n",
+            "no trailing newline": b"T0\nG1 E5\nT1\nG1 E9",
+            "single line": b"G1 X1 E5",
+        }
+        for name, data in cases.items():
+            with self.subTest(case=name):
+                self.assertBackendsMatch(self._write(data))
+
+    def test_text_fallback(self):
+        """Test files that must be decoded before splitting into lines."""
+        cases = {
+            "bare cr": b"T0\rG1 X1 E5\rT1\rG1 X1 E9\r",
+            "non-ascii": "T0\nG1 X1 E5 ; 220°C\nT1\n G1 X1 E9\n".encode("utf-8"),
+            "invalid utf-8": b"T0\nG1 X1 E5 ; \xff\xfe\nT1\nG1\xff E9\n",
+            "separator": b"T0\nG1 X1 E5\x1cT1\nG1 E9\n",
+        }
+        for name, data in cases.items():
+            with self.subTest(case=name):
+                result = self.assertBackendsMatch(self._write(data))
+                self.assertGreater(len(result.segments), 0)
+
+    def test_empty_file(self):
+        """Test that an empty file gives the empty-input result."""
+        result = self.assertBackendsMatch(self._write(b""))
+        self.assertEqual(len(result.segments), 0)
+
+    def test_missing_file(self):
+        """Test that a missing file is reported as an error."""
+        result = GCodeParser(backend="mmap").parse_file("/nonexistent/file.gcode")
+        self.assertEqual(len(result.errors), 1)
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend is rejected."""
+        with self.assertRaises(ValueError):
+            GCodeParser(backend="bogus")
+
+
+class TestApplyExtrusions(unittest.TestCase):
+    """Tests for GCodeParser.apply_extrusions()."""
+
+    def test_matches_apply_line(self):
+        """Test that bulk application matches line-by-line application."""
+        values = [0.1, 0.2, -0.3, 0.7, 0.7, 0.05, 1e-9, 2.5, -4.0]
+        for mode in (LINE_ABSOLUTE_E, LINE_RELATIVE_E):
+            with self.subTest(mode=mode):
+                bulk = GCodeParser()
+                single = GCodeParser()
+                bulk.apply_line(mode, None, 1, None)
+                single.apply_line(mode, None, 1, None)
+
+                bulk.apply_extrusions(iter(values))
+                for value in values:
+                    single.apply_line(LINE_EXTRUDE, value, 2, None)
+
+                self.assertEqual(bulk.current_e, single.current_e)
+
+    def test_empty_run(self):
+        """Test that an empty run leaves the E position unchanged."""
+        parser = GCodeParser()
+        parser.current_e = 3.0
+        parser.apply_extrusions([])
+        self.assertEqual(parser.current_e, 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
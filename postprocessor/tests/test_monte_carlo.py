@@ -0,0 +1,72 @@
+"""
+Tests for the Monte Carlo throughput simulation.
+"""
+
+import random
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "cli"))
+
+from monte_carlo import Variation, run_monte_carlo, run_trial
+from simulator import SimConfig
+from splice_estimator import estimate_recipe
+
+
+def random_segments(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [{"color": rng.randrange(2), "length_mm": round(rng.uniform(5, 200), 2)}
+            for _ in range(count)]
+
+
+class TestMonteCarlo(unittest.TestCase):
+    """Tests for run_monte_carlo()."""
+
+    def setUp(self):
+        self.queue = [random_segments(20, seed=1), random_segments(5, seed=2)]
+
+    def test_fixed_machine(self):
+        """Test that without spread every trial takes the estimated time."""
+        still = Variation(heat_rate_cv=0, cool_rate_cv=0, weld_failure_rate=0)
+        report = run_monte_carlo(self.queue, trials=20, variation=still, workers=1)
+
+        expected = [estimate_recipe(segments).total_time_s for segments in self.queue]
+        self.assertAlmostEqual(report.completion_p50_s, sum(expected))
+        self.assertAlmostEqual(report.completion_p95_s, sum(expected))
+        for actual, wanted in zip(report.recipe_p95_s, expected):
+            self.assertAlmostEqual(actual, wanted)
+        self.assertEqual((report.recipes, report.splices, report.failed_trials), (2, 25, 0))
+        self.assertAlmostEqual(report.splices_per_hour_p50, 25 * 3600 / sum(expected))
+
+    def test_spread_and_retries(self):
+        """Test that sampled timing and failed welds widen the distribution."""
+        report = run_monte_carlo(self.queue, trials=300, workers=1,
+                                 variation=Variation(weld_failure_rate=0.05))
+        self.assertGreater(report.completion_p95_s, report.completion_p50_s)
+        self.assertLess(report.splices_per_hour_p95, report.splices_per_hour_p50)
+        # About 25 * 0.05 redone welds per pass
+        self.assertGreater(report.weld_retries_mean, 0.5)
+        self.assertLess(report.weld_retries_mean, 2.5)
+
+    def test_failed_recipe(self):
+        """Test that a recipe with exhausted retries counts as failed."""
+        config = SimConfig(max_weld_retries=0)
+        result = run_trial(self.queue, config, Variation(weld_failure_rate=1.0), seed=0, trial=0)
+        self.assertEqual((result.failed_recipes, result.splices), (2, 0))
+        self.assertEqual(len(result.recipe_times_s), 2)
+
+    def test_workers_do_not_change_result(self):
+        """Test that the process pool reproduces the inline run."""
+        inline = run_monte_carlo(self.queue, trials=40, seed=7, workers=1)
+        pooled = run_monte_carlo(self.queue, trials=40, seed=7, workers=2)
+        self.assertEqual(inline, pooled)
+        self.assertNotEqual(inline, run_monte_carlo(self.queue, trials=40, seed=8, workers=1))
+
+        with self.assertRaises(ValueError):
+            run_monte_carlo(self.queue, trials=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,8 @@
 Tests for Splice3D G-code Parser
 """
 
+import gzip
+import io
 import unittest
 from pathlib import Path
 import sys
@@ -9,7 +11,11 @@ import sys
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from gcode_parser import GCodeParser, parse_gcode, Segment
+from gcode_parser import (
+    GCodeParser, parse_gcode, scan_e_word, Segment,
+    LINE_OTHER, LINE_LAYER, LINE_TOOL_CHANGE, LINE_COLOR_CHANGE,
+    LINE_EXTRUDE, LINE_E_RESET, LINE_ABSOLUTE_E, LINE_RELATIVE_E,
+)
 
 
 class TestGCodeParser(unittest.TestCase):
@@ -135,6 +141,117 @@ class TestGCodeParser(unittest.TestCase):
         self.assertIn("No extrusion", result.warnings[0])
 
 
+class TestStreamingParse(unittest.TestCase):
+    """Tests for parsing from iterables and streams."""
+    
+    LINES = [
+        "T0\n",
+        "G1 X10 Y10 E5.0 F1200\n",
+        "T1\n",
+        "G1 X20 Y10 E8.0 F1200\n",
+        "; trailing comment\n",
+    ]
+    
+    def test_generator_matches_list(self):
+        """Test that a one-shot generator gives the same result as a list."""
+        from_list = GCodeParser().parse_lines(self.LINES)
+        from_gen = GCodeParser().parse_lines(line for line in self.LINES)
+        
+        self.assertEqual(from_gen, from_list)
+    
+    def test_final_segment_end_line(self):
+        """Test that the final segment ends on the last line without len()."""
+        result = GCodeParser().parse_lines(iter(self.LINES))
+        
+        self.assertEqual(result.segments[-1].end_line, len(self.LINES))
+    
+    def test_parse_stream_gzip(self):
+        """Test parsing a binary gzip stream."""
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as gz:
+            gz.write("".join(self.LINES).encode('utf-8'))
+        buffer.seek(0)
+        
+        with gzip.GzipFile(fileobj=buffer, mode='rb') as gz:
+            result = GCodeParser().parse_stream(gz)
+        
+        self.assertEqual(result, GCodeParser().parse_lines(self.LINES))
+    
+    def test_parse_file_matches_parse_lines(self):
+        """Test that streaming parse_file matches parsing readlines()."""
+        sample_path = Path(__file__).parent.parent.parent / "samples" / "test_multicolor.gcode"
+        
+        with open(sample_path, 'r', encoding='utf-8') as f:
+            expected = GCodeParser().parse_lines(f.readlines())
+        
+        self.assertEqual(GCodeParser().parse_file(str(sample_path)), expected)
+    
+    def test_parse_file_missing(self):
+        """Test that a missing file is reported as an error."""
+        result = GCodeParser().parse_file("/nonexistent/file.gcode")
+        
+        self.assertEqual(len(result.errors), 1)
+
+
+class TestFastPathClassifier(unittest.TestCase):
+    """Tests for the regex-free line classifier."""
+    
+    E_WORD_CASES = [
+        "G1 X10 Y10 E1.5 F1200",
+        "G1 E-0.8 F2400 ; retract",
+        "G1 X1 e.5",
+        "G1 X1 E+2",
+        "G1 X1 E5.",
+        "G1 X1 E1.2.3",
+        "G1 X1 E- E3",
+        "G1 X1 E. F1 E7",
+        "G1 X1 EX E4",
+        "G1 X1 ; note: E5",
+        "G1 X1 ; relative e2 here",
+        "G1 X1 E",
+        "G1 X1 Y2",
+        "G1 X1 E1-2",
+        "G1 X1 ; Temperatur\u00e9 E9",
+    ]
+    
+    def test_scan_e_word_matches_regex(self):
+        """Test that scan_e_word agrees with EXTRUSION_PATTERN."""
+        for line in self.E_WORD_CASES:
+            with self.subTest(line=line):
+                match = GCodeParser.EXTRUSION_PATTERN.search(line)
+                expected = float(match.group(1)) if match else None
+                self.assertEqual(scan_e_word(line), expected)
+    
+    def test_classify_line(self):
+        """Test classification of each relevant line kind."""
+        parser = GCodeParser()
+        cases = [
+            ("", (LINE_OTHER, None)),
+            ("; just a comment", (LINE_OTHER, None)),
+            (";LAYER:12", (LINE_LAYER, 12)),
+            (";layer_change", (LINE_LAYER, None)),
+            ("M82", (LINE_ABSOLUTE_E, None)),
+            ("M83 ; relative", (LINE_RELATIVE_E, None)),
+            ("m83", (LINE_OTHER, None)),
+            ("T3", (LINE_TOOL_CHANGE, 3)),
+            ("t12 ; tool", (LINE_TOOL_CHANGE, 12)),
+            ("TX", (LINE_OTHER, None)),
+            ("M600", (LINE_COLOR_CHANGE, None)),
+            ("m600 ; change", (LINE_COLOR_CHANGE, None)),
+            ("G1 X10 E2.5", (LINE_EXTRUDE, 2.5)),
+            ("g0\tE1", (LINE_EXTRUDE, 1.0)),
+            ("G1 X10 Y10", (LINE_OTHER, None)),
+            ("G10 E5", (LINE_OTHER, None)),
+            ("G1", (LINE_OTHER, None)),
+            ("G92 E0", (LINE_E_RESET, 0.0)),
+            ("G92 X0", (LINE_OTHER, None)),
+            ("g92 E0", (LINE_OTHER, None)),
+        ]
+        for line, expected in cases:
+            with self.subTest(line=line):
+                self.assertEqual(parser.classify_line(line), expected)
+
+
 class TestParseGcodeFunction(unittest.TestCase):
     """Tests for the convenience parse_gcode function."""
     
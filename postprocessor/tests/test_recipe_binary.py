@@ -0,0 +1,143 @@
+"""
+Tests for the Splice3D binary recipe format.
+"""
+
+import json
+import os
+import random
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gcode_parser import GCodeParser
+from recipe_generator import RecipeGenerator, SpliceRecipe
+from recipe_binary import (
+    HEADER,
+    LENGTH_FLOAT32,
+    LENGTH_SCALED,
+    decode_recipe,
+    encode_recipe,
+    is_binary_recipe,
+)
+
+SAMPLE = Path(__file__).parent.parent.parent / "samples" / "test_multicolor.gcode"
+
+
+def random_recipe(count: int, seed: int = 0) -> SpliceRecipe:
+    rng = random.Random(seed)
+    segments = [{"color": rng.randrange(4), "length_mm": round(rng.uniform(0.01, 5000.0), 2)}
+                for _ in range(count)]
+    return SpliceRecipe(
+        total_length_mm=round(sum(s["length_mm"] for s in segments), 2),
+        segment_count=count,
+        color_count=len({s["color"] for s in segments}),
+        segments=segments,
+    )
+
+
+class TestBinaryRecipe(unittest.TestCase):
+    """Tests for encode_recipe() / decode_recipe()."""
+
+    def test_scaled_round_trip_is_exact(self):
+        """Test that 0.01 mm integer lengths decode to the original values."""
+        recipe = random_recipe(5000)
+
+        decoded = decode_recipe(encode_recipe(recipe))
+
+        self.assertEqual(decoded.segments, recipe.segments)
+        self.assertEqual(decoded.total_length_mm, recipe.total_length_mm)
+        self.assertEqual(decoded.segment_count, 5000)
+        self.assertEqual(decoded.color_count, recipe.color_count)
+
+    def test_float32_round_trip(self):
+        """Test float32 lengths against the recipe precision."""
+        recipe = random_recipe(1000, seed=1)
+
+        decoded = decode_recipe(encode_recipe(recipe, LENGTH_FLOAT32))
+
+        for original, segment in zip(recipe.segments, decoded.segments):
+            self.assertEqual(segment["color"], original["color"])
+            self.assertAlmostEqual(segment["length_mm"], original["length_mm"], places=3)
+        self.assertEqual(decode_recipe(encode_recipe(random_recipe(0), LENGTH_FLOAT32)).segments,
+                         [])
+
+    def test_size(self):
+        """Test the fixed-width layout: 5 bytes per segment."""
+        recipe = random_recipe(5000)
+        data = encode_recipe(recipe)
+        compact_json = json.dumps({"segments": recipe.segments}, separators=(',', ':'))
+
+        self.assertEqual(len(data), HEADER.size + 5 * 5000 + 4)
+        self.assertLess(len(data) * 4, len(compact_json))
+        self.assertTrue(is_binary_recipe(data))
+        self.assertFalse(is_binary_recipe(compact_json.encode()))
+
+    def test_corruption_detected(self):
+        """Test that flipped bits, truncation and bad headers are rejected."""
+        data = encode_recipe(random_recipe(100))
+
+        for position in (0, 5, HEADER.size + 7, len(data) - 1):
+            corrupt = bytearray(data)
+            corrupt[position] ^= 0x10
+            with self.subTest(position=position):
+                with self.assertRaises(ValueError):
+                    decode_recipe(corrupt)
+
+        for length in (0, 10, HEADER.size, len(data) - 1):
+            with self.subTest(length=length):
+                with self.assertRaises(ValueError):
+                    decode_recipe(data[:length])
+
+        future = bytearray(data[:-4])
+        future[4] = 2
+        future += struct.pack("<I", zlib.crc32(future))
+        with self.assertRaises(ValueError):
+            decode_recipe(future)
+
+    def test_invalid_values(self):
+        """Test values that do not fit their fields."""
+        for segments in ([{"color": 256, "length_mm": 1.0}],
+                         [{"color": -1, "length_mm": 1.0}],
+                         [{"color": 0, "length_mm": -1.0}],
+                         [{"color": 0, "length_mm": 5e7}]):
+            with self.subTest(segments=segments):
+                with self.assertRaises(ValueError):
+                    encode_recipe(SpliceRecipe(segments=segments), LENGTH_SCALED)
+        with self.assertRaises(ValueError):
+            encode_recipe(SpliceRecipe(), encoding=7)
+
+
+class TestRecipeGeneratorBinary(unittest.TestCase):
+    """Tests for RecipeGenerator.to_binary() / save_recipe_binary()."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_sample_recipe(self):
+        """Test that a generated recipe survives the binary round trip."""
+        generator = RecipeGenerator(transition_length_mm=2.5)
+        recipe = generator.generate(GCodeParser().parse_file(str(SAMPLE)))
+        path = os.path.join(self.temp_dir, "recipe.s3dr")
+
+        generator.save_recipe_binary(recipe, path)
+        with open(path, 'rb') as f:
+            decoded = decode_recipe(f.read())
+
+        self.assertEqual(decoded.segments, recipe.segments)
+        self.assertEqual(decoded.total_length_mm, recipe.total_length_mm)
+        self.assertEqual(decoded.color_count, recipe.color_count)
+        self.assertEqual(decode_recipe(generator.to_binary(recipe, float32=True)).segment_count,
+                         recipe.segment_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+Tests for the chunked recipe upload against the fake firmware.
+"""
+
+import json
+import random
+import unittest
+import zlib
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from recipe_generator import SpliceRecipe
+from recipe_upload import RecipeUploader, format_chunk, parse_chunk
+from fake_firmware import FIRMWARE_LINE_BUFFER, FakeFirmwareSerial
+
+
+def random_recipe(count: int, seed: int = 0) -> SpliceRecipe:
+    rng = random.Random(seed)
+    segments = [{"color": rng.randrange(4), "length_mm": round(rng.uniform(0.5, 300.0), 2)}
+                for _ in range(count)]
+    return SpliceRecipe(segment_count=count, segments=segments)
+
+
+def upload(recipe: SpliceRecipe, port: FakeFirmwareSerial, **kwargs):
+    progress = []
+    uploader = RecipeUploader(port, clock=port.now,
+                              progress=lambda acked, total: progress.append((acked, total)),
+                              **kwargs)
+    return uploader.upload(recipe), progress
+
+
+class TestChunkLines(unittest.TestCase):
+    """Tests for format_chunk() / parse_chunk()."""
+
+    def test_round_trip(self):
+        """Test that a chunk line decodes to its sequence number and records."""
+        records = bytes(range(160))
+        line = format_chunk(42, records)
+
+        self.assertTrue(line.endswith(b"\n"))
+        self.assertLess(len(line), FIRMWARE_LINE_BUFFER)
+        self.assertEqual(parse_chunk(line.decode().strip()), (42, records))
+
+    def test_corruption_detected(self):
+        """Test that a changed sequence number or payload fails the CRC."""
+        line = format_chunk(7, bytes(20)).decode().strip()
+
+        for bad in (line.replace("RCHUNK 7", "RCHUNK 8"),
+                    line[:12] + ("B" if line[12] != "B" else "C") + line[13:],
+                    line[:-1]):
+            with self.subTest(bad=bad):
+                with self.assertRaises(ValueError):
+                    parse_chunk(bad)
+
+    def test_bad_payload_reason(self):
+        """Test that a payload that is not base64 is a FORMAT error."""
+        text = "RCHUNK 3 !!!!"
+        line = f"{text} {zlib.crc32(text.encode()):08X}"
+        with self.assertRaisesRegex(ValueError, "^FORMAT$"):
+            parse_chunk(line)
+        port = FakeFirmwareSerial()
+        port._handle("RBEGIN 10 1 100")
+        self.assertEqual(port._handle(line), ["NAK 0 BAD_FORMAT"])
+
+    def test_rend_after_abort(self):
+        """Test that a repeated REND only confirms a completed upload."""
+        port = FakeFirmwareSerial()
+        result, _ = upload(random_recipe(40), port)
+        self.assertTrue(result.ok)
+        self.assertEqual(port._handle("REND 0"), ["OK RECIPE_LOADED 40 segments"])
+
+        port._handle("RBEGIN 10 1 100")
+        port._handle("RABORT")
+        self.assertEqual(port._handle("REND 0"), ["ERROR No upload in progress"])
+
+
+class TestRecipeUploader(unittest.TestCase):
+    """Tests for RecipeUploader."""
+
+    def test_clean_upload(self):
+        """Test that the firmware ends up with exactly the recipe."""
+        recipe = random_recipe(500)
+        port = FakeFirmwareSerial()
+
+        result, progress = upload(recipe, port)
+
+        self.assertTrue(result.ok, result.message)
+        self.assertEqual(result.message, "OK RECIPE_LOADED 500 segments")
+        self.assertEqual(port.recipe, recipe.segments)
+        self.assertEqual(result.resent_chunks, 0)
+        self.assertEqual(progress[-1], (500, 500))
+        self.assertEqual([acked for acked, _ in progress],
+                         sorted(acked for acked, _ in progress))
+
+    def test_lines_fit_firmware_buffer(self):
+        """Test that no line the host sends is truncated by the firmware."""
+        port = FakeFirmwareSerial()
+        sent = []
+        write = port.write
+        port.write = lambda data: sent.append(data) or write(data)
+
+        result, _ = upload(random_recipe(200), port)
+
+        self.assertTrue(result.ok)
+        lines = b"".join(sent).split(b"\n")
+        self.assertLess(max(len(line) for line in lines), FIRMWARE_LINE_BUFFER)
+
+    def test_recovers_from_faults(self):
+        """Test corrupted and lost lines in both directions."""
+        recipe = random_recipe(500, seed=3)
+        resent = 0
+        for seed in range(5):
+            port = FakeFirmwareSerial(corrupt_rate=0.05, drop_rate=0.03,
+                                      response_drop_rate=0.05, seed=seed)
+            with self.subTest(seed=seed):
+                result, progress = upload(recipe, port)
+
+                self.assertTrue(result.ok, result.message)
+                self.assertEqual(port.recipe, recipe.segments)
+                self.assertEqual(progress[-1], (500, 500))
+            resent += result.resent_chunks
+        self.assertGreater(resent, 0)
+
+    def test_gives_up_on_dead_link(self):
+        """Test that a silent port fails after the retry limit."""
+        port = FakeFirmwareSerial(drop_rate=1.0)
+
+        result, _ = upload(random_recipe(10), port, max_retries=2)
+
+        self.assertFalse(result.ok)
+        self.assertFalse(result.unsupported)
+        self.assertEqual(result.timeouts, 3)
+
+    def test_recipe_too_large(self):
+        """Test that the firmware's segment limit is reported, not truncated."""
+        port = FakeFirmwareSerial()
+
+        result, progress = upload(random_recipe(501), port)
+
+        self.assertFalse(result.ok)
+        self.assertIn("RECIPE_TOO_LARGE", result.message)
+        self.assertEqual(progress, [])
+        self.assertEqual(port.recipe, [])
+
+    def test_unsupported_firmware(self):
+        """Test that firmware without the chunked upload is detected."""
+        port = FakeFirmwareSerial(chunked=False)
+
+        result, _ = upload(random_recipe(10), port)
+
+        self.assertFalse(result.ok)
+        self.assertTrue(result.unsupported)
+        self.assertNotIn("RABORT", port.received)
+
+    def test_legacy_line_truncates(self):
+        """Test the failure the chunked upload avoids: a long RECIPE line is cut."""
+        recipe = random_recipe(100)
+        port = FakeFirmwareSerial(chunked=False)
+        compact = json.dumps({"segments": recipe.segments}, separators=(',', ':'))
+
+        port.write(f"RECIPE {compact}\n".encode())
+
+        reply = port.readline().decode().strip()
+        self.assertTrue(reply.startswith("OK RECIPE_LOADED"))
+        self.assertLess(len(port.recipe), 100)
+        self.assertEqual(port.recipe, recipe.segments[:len(port.recipe)])
+
+    def test_throughput_near_baud_ceiling(self):
+        """Test that windowing keeps the link busy despite slow responses."""
+        recipe = random_recipe(500)
+        times = {}
+        for window in (1, 8):
+            port = FakeFirmwareSerial(window=window, processing_s=0.005)
+            result, _ = upload(recipe, port, window=window)
+            self.assertTrue(result.ok)
+            times[window] = result.elapsed_s
+
+        ceiling = 115200 / 10
+        self.assertLess(times[8], times[1])
+        # base64 and framing leave about 70% of the link for records
+        self.assertGreater(2500 / times[8], 0.5 * ceiling)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+"""
+Tests for the Splice3D content-addressed result cache.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gcode_parser import GCodeParser
+from gcode_modifier import GCodeModifier
+import gcode_pipeline
+from gcode_pipeline import process_gcode
+from result_cache import ResultCache, file_identity, hash_file
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "samples"
+SAMPLE = SAMPLES_DIR / "test_multicolor.gcode"
+
+
+class TestResultCache(unittest.TestCase):
+    """Tests for ResultCache."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ResultCache(os.path.join(self.temp_dir, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_parse_result_round_trip(self):
+        """Test that cached results equal freshly parsed ones."""
+        for sample in sorted(SAMPLES_DIR.glob("*.gcode")):
+            with self.subTest(sample=sample.name):
+                expected = GCodeParser().parse_file(str(sample))
+                content_hash = hash_file(str(sample))
+
+                self.cache.put_parse_result(content_hash, GCodeParser(), expected)
+
+                self.assertEqual(self.cache.get_parse_result(content_hash, GCodeParser()),
+                                 expected)
+
+    def test_parse_file_hits_cache(self):
+        """Test that an unchanged file is not parsed twice."""
+        first = self.cache.parse_file(str(SAMPLE))
+
+        with mock.patch.object(GCodeParser, "parse_file") as parse_file:
+            second = self.cache.parse_file(str(SAMPLE))
+
+        parse_file.assert_not_called()
+        self.assertEqual(second, first)
+
+    def test_key_includes_content_and_settings(self):
+        """Test that content and parser settings select different entries."""
+        path = os.path.join(self.temp_dir, "in.gcode")
+        shutil.copy(SAMPLE, path)
+        self.cache.parse_file(path)
+
+        content_hash = hash_file(path)
+        self.assertIsNone(self.cache.get_parse_result(
+            content_hash, GCodeParser(filament_diameter=2.85)))
+        self.assertIsNotNone(self.cache.get_parse_result(
+            content_hash, GCodeParser(backend="mmap")))
+
+        class PrusaLayers(GCodeParser):
+            LAYER_PATTERN = re.compile(r';LAYER_CHANGE')
+        self.assertIsNone(self.cache.get_parse_result(content_hash, PrusaLayers()))
+
+        with open(path, "a") as f:
+            f.write("T0\nG1 X1 E999\n")
+        self.assertIsNone(self.cache.get_parse_result(hash_file(path), GCodeParser()))
+
+    def test_errors_are_not_cached(self):
+        """Test that failed parses are not stored."""
+        self.cache.parse_file("/nonexistent/file.gcode")
+        self.assertEqual(self.cache.size(), 0)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entries are evicted first."""
+        value = {"data": "x" * 1000}
+        keys = [self.cache.key("test", str(i), {}) for i in range(3)]
+        for age, key in enumerate(keys):
+            self.cache.put(key, value)
+            # Oldest first: keys[0] gets the earliest timestamp
+            os.utime(self.cache._path(key), (1000 + age, 1000 + age))
+
+        self.cache.get(keys[0])  # Now the most recently used
+        self.cache.max_bytes = self.cache.size() - 1
+        self.cache.evict()
+
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+        self.assertLessEqual(self.cache.size(), self.cache.max_bytes)
+
+    def test_corrupt_entry_is_a_miss(self):
+        """Test that unreadable entries are treated as misses."""
+        key = self.cache.key("test", "abc", {})
+        self.cache.put(key, {"a": 1})
+        with open(self.cache._path(key), "w") as f:
+            f.write("{truncated")
+
+        self.assertIsNone(self.cache.get(key))
+
+
+class TestProcessGcodeWithCache(unittest.TestCase):
+    """Tests for process_gcode() with a ResultCache."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ResultCache(os.path.join(self.temp_dir, "cache"))
+        self.output = os.path.join(self.temp_dir, "out.gcode")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_second_run_skips_parse_and_write(self):
+        """Test that a re-run reuses the parse result and existing output."""
+        expected = process_gcode(str(SAMPLE), self.output, cache=self.cache)
+        mtime = os.stat(self.output).st_mtime_ns
+
+        with mock.patch.object(GCodeParser, "begin") as begin:
+            again = process_gcode(str(SAMPLE), self.output, cache=self.cache)
+
+        begin.assert_not_called()
+        self.assertEqual(again, expected)
+        self.assertEqual(os.stat(self.output).st_mtime_ns, mtime)
+
+    def test_hashes_computed_in_the_pass(self):
+        """Test that a miss hashes input and output without extra passes."""
+        source = os.path.join(self.temp_dir, "in.gcode")
+        shutil.copy(SAMPLE, source)
+        output = os.path.join(self.temp_dir, "out.gcode.gz")
+
+        with mock.patch.object(gcode_pipeline, "hash_file", wraps=hash_file) as hashed:
+            process_gcode(source, output, cache=self.cache)
+        hashed.assert_not_called()
+
+        content_hash = self.cache.get_content_hash(file_identity(source))
+        self.assertEqual(content_hash, hash_file(source))
+        entry = self.cache.get_modify_stats(content_hash, GCodeModifier())
+        self.assertEqual(entry["output_sha256"], hash_file(output))
+
+        # An edited input is parsed again
+        with open(source, "a") as f:
+            f.write("T0\nG1 X1 E999\n")
+        result, _ = process_gcode(source, output, cache=self.cache)
+        self.assertEqual(result, GCodeParser().parse_file(source))
+        self.assertEqual(self.cache.get_content_hash(file_identity(source)), hash_file(source))
+
+    def test_missing_output_is_rewritten(self):
+        """Test that the modified G-code is rewritten when it is gone."""
+        expected = process_gcode(str(SAMPLE), self.output, cache=self.cache)
+        with open(self.output) as f:
+            expected_text = f.read()
+        os.unlink(self.output)
+
+        again = process_gcode(str(SAMPLE), self.output, cache=self.cache)
+
+        self.assertEqual(again, expected)
+        with open(self.output) as f:
+            self.assertEqual(f.read(), expected_text)
+
+    def test_modifier_settings_are_keyed(self):
+        """Test that different modifier settings rewrite the output."""
+        process_gcode(str(SAMPLE), self.output, cache=self.cache)
+
+        process_gcode(str(SAMPLE), self.output,
+                      modifier=GCodeModifier(add_pause_at_start=False), cache=self.cache)
+
+        with open(self.output) as f:
+            self.assertNotIn("Pause for spool loading", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Tests for Splice3D segment statistics.
+"""
+
+import random
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gcode_parser import GCodeParser, Segment
+from segment_stats import bucket_labels, compute_stats, np, percentile
+from segment_table import SegmentTable
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "samples"
+
+
+def random_table(count: int, seed: int) -> SegmentTable:
+    rng = random.Random(seed)
+    return SegmentTable(
+        Segment(rng.randrange(5), round(rng.expovariate(1 / 40), 2), i, i + 1,
+                None if rng.random() < 0.05 else i // 7, i // 7)
+        for i in range(count)
+    )
+
+
+class TestSegmentStats(unittest.TestCase):
+    """Tests for compute_stats() with the pure-Python engine."""
+
+    def test_matches_direct_computation(self):
+        """Test every statistic against a straightforward computation."""
+        table = random_table(1000, seed=1)
+        lengths = sorted(table.length_mm)
+
+        stats = compute_stats(table, buckets=(5, 20, 100), use_numpy=False)
+
+        self.assertEqual(stats.count, 1000)
+        self.assertEqual(stats.total_mm, sum(table.length_mm))
+        self.assertEqual(stats.min_mm, lengths[0])
+        self.assertEqual(stats.max_mm, lengths[-1])
+        self.assertEqual(stats.median_mm, lengths[500])
+        self.assertEqual(stats.bucket_counts, [
+            sum(1 for x in lengths if x < 5),
+            sum(1 for x in lengths if 5 <= x < 20),
+            sum(1 for x in lengths if 20 <= x < 100),
+            sum(1 for x in lengths if x >= 100),
+        ])
+        for color in range(5):
+            mine = [s.length_mm for s in table if s.color_index == color]
+            self.assertEqual(stats.color_counts[color], len(mine))
+            self.assertAlmostEqual(stats.color_length_mm[color], sum(mine))
+        splices = [s.layer_start for s in table][1:]
+        self.assertEqual(sum(stats.splices_per_layer.values()),
+                         len([layer for layer in splices if layer is not None]))
+
+    def test_percentile_interpolation(self):
+        """Test linear percentile interpolation."""
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 50), 2.5)
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 0), 1.0)
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 100), 4.0)
+        self.assertAlmostEqual(percentile([0.0, 10.0], 90), 9.0)
+        self.assertEqual(percentile([7.0], 99), 7.0)
+
+    def test_histogram_labels(self):
+        """Test bucket labels and the histogram mapping."""
+        self.assertEqual(bucket_labels((5, 20.5)), ["<5mm", "5-20.5mm", ">=20.5mm"])
+        stats = compute_stats([Segment(0, 1.0, 1, 2), Segment(1, 30.0, 3, 4)],
+                              buckets=(5,), use_numpy=False)
+        self.assertEqual(stats.histogram(), {"<5mm": 1, ">=5mm": 1})
+
+    def test_extra_buckets(self):
+        """Test that extra bucket sets count like separate histograms."""
+        table = random_table(1000, seed=2)
+        stats = compute_stats(table, buckets=(10, 50), use_numpy=False,
+                              extra_buckets=((5, 20, 100, 500), (1,)))
+
+        self.assertEqual(stats.bucket_counts,
+                         compute_stats(table, buckets=(10, 50), use_numpy=False).bucket_counts)
+        self.assertEqual(stats.extra_bucket_counts, [
+            compute_stats(table, buckets=bounds, use_numpy=False).bucket_counts
+            for bounds in ((5, 20, 100, 500), (1,))
+        ])
+
+    def test_empty_and_invalid(self):
+        """Test empty input and unsorted buckets."""
+        stats = compute_stats([], use_numpy=False)
+        self.assertEqual(stats.count, 0)
+        self.assertEqual(stats.bucket_counts, [0, 0, 0, 0, 0])
+        self.assertEqual(compute_stats([], extra_buckets=((1,),)).extra_bucket_counts, [[0, 0]])
+        with self.assertRaises(ValueError):
+            compute_stats([], buckets=(20, 5))
+        with self.assertRaises(ValueError):
+            compute_stats([], extra_buckets=((20, 5),))
+
+    def test_samples(self):
+        """Test that sample files give consistent statistics."""
+        for sample in sorted(SAMPLES_DIR.glob("*.gcode")):
+            with self.subTest(sample=sample.name):
+                result = GCodeParser(columnar=True).parse_file(str(sample))
+                stats = compute_stats(result.segments, use_numpy=False)
+                self.assertEqual(stats.count, len(result.segments))
+                self.assertEqual(sum(stats.bucket_counts), stats.count)
+                self.assertEqual(sum(stats.color_counts.values()), stats.count)
+
+    @unittest.skipIf(np is not None, "NumPy is installed")
+    def test_numpy_required_when_forced(self):
+        """Test that forcing the NumPy engine without NumPy fails clearly."""
+        with self.assertRaises(ImportError):
+            compute_stats([], use_numpy=True)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_engines_agree(self):
+        """Test that the NumPy and pure-Python engines agree."""
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                table = random_table(5000, seed)
+                fast = compute_stats(table, use_numpy=True, extra_buckets=((1, 10),))
+                slow = compute_stats(table, use_numpy=False, extra_buckets=((1, 10),))
+
+                self.assertAlmostEqual(fast.total_mm, slow.total_mm, places=6)
+                self.assertEqual(fast.percentiles, slow.percentiles)
+                self.assertEqual(
+                    (fast.min_mm, fast.max_mm, fast.median_mm, fast.bucket_counts,
+                     fast.extra_bucket_counts, fast.color_counts, fast.color_length_mm, fast.splices_per_layer),
+                    (slow.min_mm, slow.max_mm, slow.median_mm, slow.bucket_counts,
+                     slow.extra_bucket_counts, slow.color_counts, slow.color_length_mm, slow.splices_per_layer))
+
+
+if __name__ == "__main__":
+    unittest.main()
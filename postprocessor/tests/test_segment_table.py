@@ -0,0 +1,143 @@
+"""
+Tests for columnar Splice3D segment storage.
+"""
+
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gcode_parser import GCodeParser, Segment
+from recipe_generator import RecipeGenerator
+from result_cache import ResultCache, hash_file
+from segment_table import SegmentTable
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "samples"
+
+
+def random_segments(count: int, seed: int) -> list[Segment]:
+    """Gradient-like segments: many short runs, repeated colors, missing layers."""
+    rng = random.Random(seed)
+    segments = []
+    line = 1
+    for i in range(count):
+        length = round(rng.choice([rng.uniform(0.1, 12), rng.uniform(5, 300)]), 2)
+        layer = None if rng.random() < 0.05 else i // 10
+        segments.append(Segment(rng.randrange(4), length, line, line + 7, layer, layer))
+        line += 8
+    return segments
+
+
+class TestSegmentTable(unittest.TestCase):
+    """Tests for SegmentTable."""
+
+    def test_sequence_interface(self):
+        """Test indexing, slicing, iteration and equality with lists."""
+        segments = random_segments(50, seed=1)
+        table = SegmentTable(segments)
+
+        self.assertEqual(len(table), 50)
+        self.assertEqual(table[0], segments[0])
+        self.assertEqual(table[-1], segments[-1])
+        self.assertEqual(list(table), segments)
+        self.assertEqual(table, segments)
+        self.assertEqual(segments, table)
+        self.assertEqual(table[5:20], segments[5:20])
+        self.assertIsInstance(table[5:20], SegmentTable)
+        self.assertNotEqual(table, segments[:-1])
+        with self.assertRaises(IndexError):
+            table[50]
+
+    def test_missing_layers(self):
+        """Test that None layers survive the round trip."""
+        table = SegmentTable([Segment(1, 2.5, 3, 4)])
+
+        self.assertIsNone(table[0].layer_start)
+        self.assertIsNone(table[0].layer_end)
+
+    def test_columns_round_trip(self):
+        """Test to_columns() / from_columns()."""
+        table = SegmentTable(random_segments(100, seed=2))
+
+        self.assertEqual(SegmentTable.from_columns(table.to_columns()), table)
+
+        columns = table.to_columns()
+        columns["length_mm"].pop()
+        with self.assertRaises(ValueError):
+            SegmentTable.from_columns(columns)
+
+
+class TestColumnarParsing(unittest.TestCase):
+    """Tests for GCodeParser(columnar=True) and its consumers."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_samples_match_list_results(self):
+        """Test that every backend produces the same segments as a table."""
+        for sample in sorted(SAMPLES_DIR.glob("*.gcode")):
+            expected = GCodeParser().parse_file(str(sample))
+            for backend in GCodeParser.BACKENDS:
+                with self.subTest(sample=sample.name, backend=backend):
+                    result = GCodeParser(backend=backend, columnar=True).parse_file(str(sample))
+                    self.assertIsInstance(result.segments, SegmentTable)
+                    self.assertEqual(result, expected)
+
+    def test_merge_matches_list_merge(self):
+        """Test that the column-wise merge matches the Segment merge."""
+        for seed in range(20):
+            for minimum in (0.5, 10.0, 50.0):
+                with self.subTest(seed=seed, minimum=minimum):
+                    segments = random_segments(300, seed)
+                    generator = RecipeGenerator(min_segment_length_mm=minimum)
+                    # Copied first: the list merge updates its input in place
+                    table = SegmentTable(segments)
+                    merged = generator._merge_small_segments(table)
+                    expected = generator._merge_small_segments(segments)
+                    self.assertIsInstance(merged, SegmentTable)
+                    self.assertEqual(merged, expected)
+
+    def test_recipe_matches_list_recipe(self):
+        """Test that recipes from a columnar parse are unchanged."""
+        generator = RecipeGenerator(transition_length_mm=5.0)
+        for sample in sorted(SAMPLES_DIR.glob("*.gcode")):
+            with self.subTest(sample=sample.name):
+                expected = generator.generate(GCodeParser().parse_file(str(sample)))
+                recipe = generator.generate(
+                    GCodeParser(columnar=True).parse_file(str(sample)))
+                self.assertEqual(recipe, expected)
+
+    def test_recipe_without_segments(self):
+        """Test that an empty columnar parse gives an empty recipe."""
+        path = Path(self.temp_dir) / "empty.gcode"
+        path.write_text("G28\nG1 X10\n")
+        result = GCodeParser(columnar=True).parse_file(str(path))
+        self.assertIsInstance(result.segments, SegmentTable)
+
+        recipe = RecipeGenerator(transition_length_mm=5.0).generate(result)
+
+        self.assertEqual(recipe.segments, [])
+        self.assertEqual(recipe.total_length_mm, 0)
+
+    def test_cache_returns_table(self):
+        """Test that a columnar parser gets a SegmentTable from the cache."""
+        cache = ResultCache(self.temp_dir)
+        sample = str(SAMPLES_DIR / "test_gradient.gcode")
+        expected = cache.parse_file(sample, GCodeParser(columnar=True))
+
+        result = cache.get_parse_result(hash_file(sample), GCodeParser(columnar=True))
+
+        self.assertIsInstance(result.segments, SegmentTable)
+        self.assertEqual(result, expected)
+        self.assertEqual(cache.get_parse_result(hash_file(sample), GCodeParser()), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+"""
+Tests for the shared serial reader.
+"""
+
+import queue
+import random
+import threading
+import time
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fake_firmware import FakeFirmwareSerial, RealtimeFirmwareSerial
+from recipe_generator import SpliceRecipe
+from recipe_upload import RecipeUploader
+from serial_reader import SerialReader
+
+
+class ScriptedPort:
+    """Blocking port whose responses are scripted per command."""
+
+    def __init__(self, responses: dict, timeout: float = 0.05):
+        self.responses = responses
+        self.timeout = timeout
+        self.written: list[bytes] = []
+        self._incoming: "queue.Queue" = queue.Queue()
+
+    def write(self, data: bytes) -> int:
+        self.written.append(data)
+        for line in self.responses.get(data.decode().strip(), []):
+            self.feed(f"{line}\n".encode())
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def feed(self, data):
+        """Make data (bytes, or an exception to raise) readable."""
+        self._incoming.put(data)
+
+    def readline(self) -> bytes:
+        try:
+            data = self._incoming.get(timeout=self.timeout)
+        except queue.Empty:
+            return b""
+        if isinstance(data, Exception):
+            raise data
+        return data
+
+    def cancel_read(self):
+        self._incoming.put(b"")
+
+
+class TestSerialReader(unittest.TestCase):
+    """Tests for SerialReader."""
+
+    def test_command_response(self):
+        """Test that a command gets its lines up to the terminal line."""
+        port = ScriptedPort({"START": ["Starting", "OK STARTED"]})
+        with SerialReader(port) as reader:
+            self.assertEqual(reader.command("START", timeout=1.0), ["Starting", "OK STARTED"])
+        self.assertEqual(port.written, [b"START\n"])
+
+    def test_named_response_is_terminal(self):
+        """Test that STATUS completes at its STATUS line without waiting."""
+        port = ScriptedPort({"STATUS": ["STATUS IDLE TEMP 21.0/0.0"]})
+        with SerialReader(port) as reader:
+            start = time.monotonic()
+            responses = reader.command("STATUS", timeout=5.0)
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(responses, ["STATUS IDLE TEMP 21.0/0.0"])
+        self.assertLess(elapsed, 1.0)
+
+    def test_unsolicited_lines_go_to_subscribers(self):
+        """Test that lines outside a response reach subscribers."""
+        port = ScriptedPort({"PAUSE": ["OK PAUSED"]})
+        received = queue.Queue()
+
+        with SerialReader(port) as reader:
+            unsubscribe = reader.subscribe(received.put)
+            port.feed(b"PROGRESS:10\n")
+            self.assertEqual(received.get(timeout=1.0), "PROGRESS:10")
+            self.assertEqual(reader.command("PAUSE", timeout=1.0), ["OK PAUSED"])
+            port.feed(b"DONE\n")
+            self.assertEqual(received.get(timeout=1.0), "DONE")
+            unsubscribe()
+
+        self.assertTrue(received.empty())
+
+    def test_stream_json_during_request(self):
+        """Test that STREAM JSON before a reply goes to subscribers, not the reply."""
+        record = '{"type":"telemetry","t":1}'
+        port = ScriptedPort({"STATUS": [record, "STATUS IDLE"]})
+        received = queue.Queue()
+
+        with SerialReader(port) as reader:
+            reader.subscribe(received.put)
+            self.assertEqual(reader.command("STATUS", timeout=1.0), ["STATUS IDLE"])
+            self.assertEqual(received.get(timeout=1.0), record)
+
+        self.assertTrue(received.empty())
+
+    def test_concurrent_requests(self):
+        """Test that requests from several threads get their own responses."""
+        responses = {f"TEMP {i}": [f"OK TEMP {i}"] for i in range(20)}
+        port = ScriptedPort(responses)
+        results = {}
+
+        with SerialReader(port) as reader:
+            def send(i):
+                results[i] = reader.command(f"TEMP {i}", timeout=2.0)
+            threads = [threading.Thread(target=send, args=(i,)) for i in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results, {i: [f"OK TEMP {i}"] for i in range(20)})
+
+    def test_timeout_returns_partial_response(self):
+        """Test that a command without terminal line returns what arrived."""
+        port = ScriptedPort({"HELP": ["Splice3D Commands:"], "STATUS": ["STATUS IDLE"]})
+        with SerialReader(port) as reader:
+            self.assertEqual(reader.command("HELP", timeout=0.2), ["Splice3D Commands:"])
+            self.assertEqual(reader.command("STATUS", timeout=1.0), ["STATUS IDLE"])
+
+    def test_partial_lines_reassembled(self):
+        """Test that a line split across readline() timeouts is kept whole."""
+        port = ScriptedPort({})
+        received = queue.Queue()
+        with SerialReader(port) as reader:
+            reader.subscribe(received.put)
+            port.feed(b"TEMP:20")
+            port.feed(b"0/210\n")
+            self.assertEqual(received.get(timeout=1.0), "TEMP:200/210")
+
+    def test_read_error(self):
+        """Test that a failing port fails pending requests and reports the error."""
+        port = ScriptedPort({})
+        errors = []
+        reported = threading.Event()
+        reader = SerialReader(port, on_error=lambda e: (errors.append(e), reported.set()))
+        reader.start()
+
+        future = reader.request("STATUS")
+        port.feed(OSError("device disconnected"))
+
+        self.assertTrue(reported.wait(1.0))
+        with self.assertRaises(OSError):
+            future.result(1.0)
+        self.assertFalse(reader.running)
+        self.assertEqual(reader.command("STATUS", timeout=0.1), [])
+        reader.stop()
+
+    def test_exclusive_channel_upload(self):
+        """Test a chunked recipe upload through the exclusive channel."""
+        rng = random.Random(0)
+        segments = [{"color": rng.randrange(4), "length_mm": round(rng.uniform(1, 100), 2)}
+                    for _ in range(100)]
+        port = RealtimeFirmwareSerial(FakeFirmwareSerial(baud=921600))
+        received = []
+
+        with SerialReader(port) as reader:
+            reader.subscribe(received.append)
+            with reader.exclusive(timeout=1.0) as channel:
+                result = RecipeUploader(channel).upload(SpliceRecipe(segments=segments))
+            status = reader.command("STATUS", timeout=1.0)
+
+        self.assertTrue(result.ok, result.message)
+        self.assertEqual(port.firmware.recipe, segments)
+        self.assertEqual(status, ["STATUS READY"])
+        self.assertEqual(received, [])
+
+    def test_round_trip_near_wire_time(self):
+        """Test that responses are delivered as soon as they arrive."""
+        port = RealtimeFirmwareSerial(FakeFirmwareSerial(baud=115200, processing_s=0.0))
+        with SerialReader(port) as reader:
+            reader.command("STATUS", timeout=1.0)
+            start = time.monotonic()
+            for _ in range(20):
+                self.assertEqual(reader.command("STATUS", timeout=1.0), ["STATUS IDLE"])
+            mean = (time.monotonic() - start) / 20
+
+        # 7 bytes out and 12 back take 1.6 ms at 115200 baud
+        self.assertLess(mean, 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
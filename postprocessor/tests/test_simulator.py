@@ -0,0 +1,305 @@
+"""
+Tests for the discrete-event firmware simulator.
+"""
+
+import json
+import random
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "cli"))
+
+from simulator import (
+    FIRMWARE_OVERLAPS,
+    EventScheduler,
+    FirmwareSimulator,
+    PipelineSimulator,
+    RealtimePacer,
+    SimConfig,
+    State,
+    ThermalModel,
+    compare_thermal,
+    format_event,
+    parse_overlaps,
+)
+
+SAMPLE_RECIPE = Path(__file__).parent.parent.parent / "samples" / "test_multicolor_splice_recipe.json"
+
+
+def random_segments(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [{"color": rng.randrange(2), "length_mm": round(rng.uniform(5, 200), 2)}
+            for _ in range(count)]
+
+
+class TestEventScheduler(unittest.TestCase):
+    """Tests for EventScheduler."""
+
+    def test_time_order(self):
+        """Test that events run in time order, ties in scheduling order."""
+        scheduler = EventScheduler()
+        seen = []
+        scheduler.schedule(2.0, lambda: seen.append(("b", scheduler.now)))
+        scheduler.schedule(1.0, lambda: seen.append(("a", scheduler.now)))
+        scheduler.schedule(2.0, lambda: seen.append(("c", scheduler.now)))
+
+        self.assertEqual(scheduler.run(), 3)
+        self.assertEqual(seen, [("a", 1.0), ("b", 2.0), ("c", 2.0)])
+
+    def test_run_until(self):
+        """Test stopping at a simulated time."""
+        scheduler = EventScheduler()
+        seen = []
+        for delay in (1.0, 5.0):
+            scheduler.schedule(delay, seen.append, delay)
+        scheduler.run(until=3.0)
+        self.assertEqual((seen, scheduler.now, len(scheduler)), ([1.0], 3.0, 1))
+
+
+class TestFirmwareSimulator(unittest.TestCase):
+    """Tests for FirmwareSimulator."""
+
+    def test_sample_recipe(self):
+        """Test the totals of the sample recipe."""
+        sim = FirmwareSimulator()
+        self.assertTrue(sim.load_recipe(str(SAMPLE_RECIPE)))
+        self.assertTrue(sim.run())
+
+        segments = json.loads(SAMPLE_RECIPE.read_text())["segments"]
+        lengths = sum(segment["length_mm"] for segment in segments)
+        config = sim.config
+        # First heat-up from ambient, later ones from the cooling target
+        heat = ((config.weld_temp_c - config.ambient_temp_c)
+                + (len(segments) - 1) * (config.weld_temp_c - config.cool_target_c))
+        expected = (lengths / config.feed_rate_mm_s
+                    + lengths / (config.feed_rate_mm_s * config.spool_speedup)
+                    + len(segments) * (config.cut_time_s + config.position_time_s
+                                       + config.weld_hold_s)
+                    + heat / config.heat_rate_c_s
+                    + len(segments) * (config.weld_temp_c - config.cool_target_c)
+                    / config.cool_rate_c_s)
+
+        result = sim.result
+        self.assertTrue(result.completed)
+        self.assertEqual(sim.state, State.COMPLETE)
+        self.assertAlmostEqual(result.total_time_s, expected)
+        self.assertAlmostEqual(sum(result.time_in_state.values()), expected)
+        self.assertAlmostEqual(result.total_filament_mm, lengths)
+        self.assertEqual(result.splices_completed, len(segments))
+
+    def test_structured_log(self):
+        """Test the log events and their text form."""
+        events = []
+        sim = FirmwareSimulator(SimConfig(), log=events.append)
+        sim.load_segments([{"color": 0, "length_mm": 50.0}, {"color": 1, "length_mm": 25.0}])
+        sim.run()
+
+        kinds = [event.kind for event in events]
+        self.assertEqual(kinds[:3], ["load", "start", "state"])
+        self.assertEqual(kinds[-1], "done")
+        self.assertEqual(kinds.count("state"), 14)
+        self.assertEqual(kinds.count("segment"), 1)
+        times = [event.time_s for event in events]
+        self.assertEqual(times, sorted(times))
+
+        feed = events[2]
+        self.assertEqual((feed.state, feed.duration_s), ("FEEDING_A", 1.0))
+        self.assertEqual(format_event(feed), "[FEED_A] Feeding 50.0mm of color 0 (1.0s)")
+        self.assertAlmostEqual(events[-1].time_s, sim.result.total_time_s)
+
+    def test_empty_recipe(self):
+        """Test that a recipe without segments completes at once."""
+        sim = FirmwareSimulator()
+        sim.load_segments([])
+        self.assertTrue(sim.run())
+        self.assertEqual(sim.result.total_time_s, 0.0)
+
+    def test_not_loaded(self):
+        """Test that running without a recipe fails."""
+        self.assertFalse(FirmwareSimulator().run())
+
+    def test_large_recipe_speed(self):
+        """Test that 10,000 segments simulate at CPU speed."""
+        sim = FirmwareSimulator()
+        sim.load_segments(random_segments(10000))
+        start = time.perf_counter()
+        self.assertTrue(sim.run())
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(sim.result.splices_completed, 10000)
+        # Days of machine time
+        self.assertGreater(sim.result.total_time_s, 86400)
+        self.assertLess(elapsed, 2.0)
+
+    def test_weld_retry(self):
+        """Test that a failed weld is cooled, cut off and spliced again."""
+        rng = mock.Mock()
+        rng.random.side_effect = [0.0, 0.99]      # Fail, then succeed
+        events = []
+        config = SimConfig(weld_failure_rate=0.5)
+        sim = FirmwareSimulator(config, log=events.append, rng=rng)
+        sim.load_segments([{"color": 0, "length_mm": 50.0}])
+        self.assertTrue(sim.run())
+
+        plain = FirmwareSimulator(SimConfig())
+        plain.load_segments([{"color": 0, "length_mm": 50.0}])
+        plain.run()
+        redo = (config.cut_time_s + config.position_time_s + config.heat_time_s(config.cool_target_c)
+                + config.weld_hold_s + config.cool_time_s())
+        self.assertAlmostEqual(sim.result.total_time_s, plain.result.total_time_s + redo)
+        self.assertEqual((sim.result.splices_completed, sim.result.weld_retries), (1, 1))
+        retry = [event for event in events if event.kind == "retry"]
+        self.assertEqual(format_event(retry[0]), "[RETRY] Weld failed, splicing again (1/3)")
+
+    def test_weld_retries_exhausted(self):
+        """Test that a splice that keeps failing stops the job."""
+        sim = FirmwareSimulator(SimConfig(weld_failure_rate=1.0, max_weld_retries=2))
+        sim.load_segments(random_segments(3))
+        self.assertFalse(sim.run())
+        self.assertEqual(sim.state, State.ERROR)
+        self.assertEqual((sim.result.splices_completed, sim.result.weld_retries), (0, 2))
+
+    def test_preheat(self):
+        """Test that heating overlaps feeding, limited by the lead time."""
+        segments = [{"color": 0, "length_mm": 500.0}, {"color": 0, "length_mm": 50.0}]
+        config = SimConfig()
+        sim = FirmwareSimulator(config, thermal=ThermalModel(preheat=True, preheat_lead_s=5.0))
+        sim.load_segments(segments)
+        sim.run()
+
+        # 185°C from ambient, then 160°C per splice; 5 s of each preheated
+        self.assertAlmostEqual(sim.result.time_in_state["HEATING"], (185 - 25 + 160 - 25) / 5.0)
+        self.assertEqual(sim.result.preheats, 2)
+        self.assertAlmostEqual(sim.result.preheat_s, 10.0)
+
+        # Without a lead limit the heater runs through feed, cut and position
+        # (and the spool of the previous segment)
+        sim = FirmwareSimulator(config, thermal=ThermalModel(preheat=True, preheat_lead_s=None))
+        sim.load_segments(segments)
+        sim.run()
+        setup = config.cut_time_s + config.position_time_s
+        first = 500.0 / 50.0 + setup
+        second = 500.0 / 75.0 + 50.0 / 50.0 + setup
+        self.assertAlmostEqual(sim.result.preheat_s, first + second)
+
+    def test_heat_reuse(self):
+        """Test partial cool-downs between splices of close weld temperatures."""
+        segments = [{"color": color, "length_mm": 50.0} for color in (0, 1, 2, 0)]
+        thermal = ThermalModel(heat_reuse=True, weld_temps_c={1: 220.0, 2: 250.0})
+        events = []
+        sim = FirmwareSimulator(thermal=thermal, log=events.append)
+        sim.load_segments(segments)
+        sim.run()
+
+        cooling = [(event.detail["target_c"], event.duration_s) for event in events
+                   if event.state == "COOLING" and event.kind == "state"]
+        # 210 -> 220 reuses heat, 220 -> 250 and 250 -> 210 do not, the last splice cools fully
+        self.assertEqual(cooling, [(170.0, 4.0), (50.0, 17.0), (50.0, 20.0), (50.0, 16.0)])
+        heating = [event.duration_s for event in events
+                   if event.state == "HEATING" and event.kind == "state"]
+        self.assertEqual(heating, [37.0, 10.0, 40.0, 32.0])
+        self.assertEqual(sim.result.thermal_cycles_avoided, 1)
+
+    def test_compare_thermal(self):
+        """Test the cycle time saved on a recipe."""
+        savings = compare_thermal(random_segments(100, seed=4))
+        self.assertGreater(savings.saved_s, 0)
+        self.assertAlmostEqual(savings.saved_s, savings.heating_saved_s + savings.cooling_saved_s)
+        self.assertEqual(savings.thermal_cycles_avoided, 99)
+        self.assertAlmostEqual(savings.saved_percent, 100 * savings.saved_s / savings.baseline_s)
+
+        plain = FirmwareSimulator()
+        plain.load_segments(random_segments(100, seed=4))
+        plain.run()
+        self.assertAlmostEqual(savings.baseline_s, plain.result.total_time_s)
+
+    def test_realtime_pacing(self):
+        """Test that real-time mode sleeps simulated time / speed factor."""
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        sim = FirmwareSimulator()
+        sim.load_segments(random_segments(3))
+        sim.run(pacer=RealtimePacer(10.0, clock=lambda: now[0], sleep=sleep))
+
+        self.assertAlmostEqual(sum(sleeps), sim.total_time_s / 10.0)
+
+
+class TestPipelineSimulator(unittest.TestCase):
+    """Tests for the overlapped-operation schedule."""
+
+    def test_no_overlap_is_sequential(self):
+        """Test that an empty matrix reproduces the state machine."""
+        segments = random_segments(300, seed=5)
+        sim = FirmwareSimulator()
+        sim.load_segments(segments)
+        sim.run()
+
+        result = PipelineSimulator(overlaps=parse_overlaps("none")).run(segments)
+        self.assertAlmostEqual(result.total_time_s, sim.result.total_time_s, places=6)
+        self.assertAlmostEqual(result.sequential_time_s, result.total_time_s, places=6)
+        self.assertAlmostEqual(result.overlap_ratio, 0.0)
+        self.assertEqual(len(result.cycles), 300)
+
+    def test_firmware_overlaps(self):
+        """Test the firmware rules: the cut does not wait for a long preheat."""
+        config = SimConfig()
+        segments = [{"color": 0, "length_mm": 100.0}, {"color": 1, "length_mm": 200.0}]
+        result = PipelineSimulator(config, FIRMWARE_OVERLAPS).run(segments)
+
+        # Positioning (1 s) runs during the first heat-up, then during the
+        # previous weld's cooling; the feed and cut come before the heat-up
+        self.assertAlmostEqual(result.overlap_saved_s, 2.0)
+        first, second = result.cycles
+        self.assertAlmostEqual(first.overlap_saved_s, 1.0)
+        self.assertAlmostEqual(second.overlap_saved_s, 1.0)
+        self.assertAlmostEqual(first.total_s + second.total_s, result.total_time_s)
+        self.assertAlmostEqual(second.total_s, 4 + 0.5 + 32 + 3 + 16 + 200 / 75)
+        self.assertAlmostEqual(result.overlap_ratio, 2.0 / result.total_time_s)
+
+    def test_each_firmware_overlap_shortens_schedule(self):
+        """Test that every firmware overlap pair can actually be scheduled."""
+        segments = [{"color": i % 2, "length_mm": length} for i, length in
+                    enumerate((100.0, 500.0, 200.0, 500.0))]
+        cases = {
+            # A 4 s heat-up fits in the 10 s feed of a 500 mm segment
+            ("HEATING", "FEEDING"): SimConfig(heat_rate_c_s=40.0),
+            # Heat-up hidden in the feed: positioning can only hide in cooling
+            ("COOLING", "POSITIONING"): SimConfig(heat_rate_c_s=100.0, position_time_s=3.0),
+            # Positioning outlasts the 16 s cooling
+            ("HEATING", "POSITIONING"): SimConfig(position_time_s=20.0),
+        }
+        self.assertEqual({frozenset(pair) for pair in cases}, set(FIRMWARE_OVERLAPS))
+        for pair, config in cases.items():
+            with self.subTest(pair="+".join(pair)):
+                full = PipelineSimulator(config, FIRMWARE_OVERLAPS).run(segments)
+                without = PipelineSimulator(
+                    config, FIRMWARE_OVERLAPS - {frozenset(pair)}).run(segments)
+                self.assertLess(full.total_time_s, without.total_time_s - 1.0)
+
+    def test_custom_overlaps(self):
+        """Test that more overlap pairs never slow the schedule down."""
+        segments = random_segments(100, seed=6)
+        wider = ("HEATING+FEEDING,HEATING+POSITIONING,COOLING+POSITIONING,"
+                 "HEATING+SPOOLING,SPOOLING+FEEDING")
+        times = [PipelineSimulator(overlaps=parse_overlaps(matrix)).run(segments).total_time_s
+                 for matrix in ("none", "firmware", wider)]
+        self.assertGreater(times[0], times[1])
+        self.assertGreater(times[1], times[2])
+
+        with self.assertRaises(ValueError):
+            parse_overlaps("HEATING+HEATING")
+        with self.assertRaises(ValueError):
+            parse_overlaps("HEATING+WARPING")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests for the closed-form splice time estimator.
+"""
+
+import random
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "cli"))
+
+import splice_estimator
+from recipe_validator import RecipeValidator
+from segment_table import SegmentTable
+from simulator import FirmwareSimulator
+from splice_estimator import PHASES, SimConfig, estimate, estimate_recipe, segment_finish_times
+
+SAMPLE_RECIPE = Path(__file__).parent.parent.parent / "samples" / "test_multicolor_splice_recipe.json"
+
+
+def random_segments(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [{"color": rng.randrange(4), "length_mm": round(rng.uniform(5, 200), 2)}
+            for _ in range(count)]
+
+
+def engines() -> list:
+    """NumPy module (when installed) and None for the pure-Python pass."""
+    return [None] if splice_estimator.np is None else [None, splice_estimator.np]
+
+
+class TestSpliceEstimator(unittest.TestCase):
+    """Tests for estimate() against the firmware simulator."""
+
+    def simulate(self, segments: list[dict], config: SimConfig):
+        sim = FirmwareSimulator(config)
+        sim.load_segments(segments)
+        self.assertTrue(sim.run())
+        return sim.result
+
+    def assert_matches(self, estimated, simulated):
+        self.assertAlmostEqual(estimated.total_time_s, simulated.total_time_s, places=6)
+        self.assertAlmostEqual(estimated.filament_mm, simulated.total_filament_mm, places=6)
+        for phase in PHASES:
+            self.assertAlmostEqual(estimated.phase_s[phase],
+                                   simulated.time_in_state.get(phase, 0.0), places=6, msg=phase)
+
+    def test_matches_simulator(self):
+        """Test totals and phase breakdown for several timings, both engines."""
+        segments = random_segments(500)
+        configs = [
+            SimConfig(),
+            SimConfig(feed_rate_mm_s=20.0, heat_rate_c_s=2.5, spool_speedup=2.0),
+            # Ambient above the weld temperature: no first heat-up
+            SimConfig(weld_temp_c=180.0, ambient_temp_c=190.0, cool_target_c=60.0),
+        ]
+        for config in configs:
+            simulated = self.simulate(segments, config)
+            for engine in engines():
+                with mock.patch.object(splice_estimator, "np", engine):
+                    estimated = estimate_recipe(segments, config)
+                self.assert_matches(estimated, simulated)
+                self.assertEqual(estimated.segments, 500)
+
+    def test_sample_recipe(self):
+        """Test a recipe file's dict form against the simulator."""
+        sim = FirmwareSimulator()
+        self.assertTrue(sim.load_recipe(str(SAMPLE_RECIPE)))
+        sim.run()
+        self.assert_matches(estimate_recipe({"segments": sim.segments}), sim.result)
+
+    def test_segment_table_and_colors(self):
+        """Test column input and per-color lengths."""
+        table = SegmentTable()
+        for color, length in ((0, 10.0), (2, 5.0), (0, 2.5)):
+            table.color_index.append(color)
+            table.length_mm.append(length)
+
+        for engine in engines():
+            with mock.patch.object(splice_estimator, "np", engine):
+                estimated = estimate_recipe(table)
+            self.assertEqual(estimated.color_length_mm, {0: 12.5, 2: 5.0})
+            self.assertAlmostEqual(estimated.phase_s["FEEDING_A"], 12.5 / 50.0)
+            self.assertAlmostEqual(estimated.phase_s["FEEDING_B"], 5.0 / 50.0)
+
+    def test_finish_times(self):
+        """Test the segment timeline against the simulator's segment events."""
+        segments = random_segments(50, seed=3)
+        events = []
+        sim = FirmwareSimulator(log=events.append)
+        sim.load_segments(segments)
+        sim.run()
+        finished = [event.time_s for event in events if event.kind in ("segment", "done")]
+
+        for engine in engines():
+            with mock.patch.object(splice_estimator, "np", engine):
+                times = segment_finish_times([s["length_mm"] for s in segments])
+            self.assertEqual(len(times), 50)
+            for expected, actual in zip(finished, times):
+                self.assertAlmostEqual(float(actual), expected, places=6)
+
+    def test_empty_and_errors(self):
+        """Test an empty recipe and mismatched columns."""
+        estimated = estimate([])
+        self.assertEqual((estimated.total_time_s, estimated.seconds_per_splice), (0.0, 0.0))
+        with self.assertRaises(ValueError):
+            estimate([1.0, 2.0], [0], use_numpy=False)
+        if splice_estimator.np is None:
+            with self.assertRaises(ImportError):
+                estimate([1.0], use_numpy=True)
+
+    def test_validator_uses_estimate(self):
+        """Test that the validator reports the estimated machine time."""
+        segments = random_segments(100)
+        recipe = {"version": "1.0", "segments": segments}
+        config = SimConfig(weld_hold_s=10.0)
+
+        result = RecipeValidator(timing=config).validate(recipe)
+        self.assertAlmostEqual(result.estimated_time_s,
+                               self.simulate(segments, config).total_time_s, places=6)
+
+        # Slow heater: 100 splices take more than a day
+        result = RecipeValidator(timing=SimConfig(heat_rate_c_s=0.1)).validate(recipe)
+        self.assertTrue(any("Long splice time" in w for w in result.warnings))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests for the bridge statistics journal.
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services"))
+
+from stats_journal import EVENT_FAILURE, EVENT_SPLICE, JournalWriter, StatsJournal
+
+
+class TestStatsJournal(unittest.TestCase):
+    """Tests for StatsJournal."""
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.path = self.dir / "stats.json"
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def record(self, journal: StatsJournal, splices: int, failures: int = 0):
+        for _ in range(splices):
+            journal.stats.record_splice()
+            journal.record(EVENT_SPLICE)
+        for _ in range(failures):
+            journal.stats.record_failure()
+            journal.record(EVENT_FAILURE)
+
+    def test_replay_after_crash(self):
+        """Test that events without a snapshot are recovered."""
+        journal = StatsJournal(self.path)
+        journal.load()
+        self.record(journal, 3, 1)
+        self.assertFalse(self.path.exists())
+
+        stats = StatsJournal(self.path).load()
+        self.assertEqual((stats.splices_total, stats.splices_today), (3, 3))
+        self.assertEqual((stats.failures_total, stats.failures_today), (1, 1))
+        # Loading compacts the journal into a snapshot
+        self.assertEqual(self.path.with_suffix(".journal").stat().st_size, 0)
+        self.assertEqual(json.loads(self.path.read_text())["splices_total"], 3)
+
+    def test_compaction(self):
+        """Test periodic snapshots keep the journal short."""
+        journal = StatsJournal(self.path, compact_every=10)
+        journal.load()
+        self.record(journal, 25)
+
+        lines = self.path.with_suffix(".journal").read_text().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(self.path.read_text())["journal_seq"], 20)
+        self.assertEqual(StatsJournal(self.path).load().splices_total, 25)
+
+    def test_crash_between_snapshot_and_truncate(self):
+        """Test that events already in the snapshot are not counted twice."""
+        journal = StatsJournal(self.path)
+        journal.load()
+        self.record(journal, 4)
+        lines = self.path.with_suffix(".journal").read_text()
+        journal.close()
+        self.path.with_suffix(".journal").write_text(lines)
+
+        self.assertEqual(StatsJournal(self.path).load().splices_total, 4)
+
+    def test_torn_line_skipped(self):
+        """Test that a partly written last line is ignored."""
+        journal = StatsJournal(self.path)
+        journal.load()
+        self.record(journal, 2)
+        with open(self.path.with_suffix(".journal"), 'a') as f:
+            f.write('{"seq": 3, "ev')
+
+        with self.assertLogs('splice3d-bridge', 'WARNING'):
+            self.assertEqual(StatsJournal(self.path).load().splices_total, 2)
+
+    def test_earlier_days_only_count_in_totals(self):
+        """Test that replayed events of another day leave today's counters alone."""
+        self.path.with_suffix(".journal").write_text(
+            '{"seq": 1, "event": "splice", "date": "2020-01-01"}\n'
+            f'{{"seq": 2, "event": "splice", "date": "{date.today().isoformat()}"}}\n')
+
+        stats = StatsJournal(self.path).load()
+        self.assertEqual((stats.splices_total, stats.splices_today), (2, 1))
+
+    def test_snapshot_keeps_daily_counters(self):
+        """Test that today's counters survive a restart."""
+        journal = StatsJournal(self.path)
+        journal.load()
+        self.record(journal, 2, 1)
+        journal.close()
+
+        stats = StatsJournal(self.path).load()
+        self.assertEqual((stats.splices_today, stats.failures_today), (2, 1))
+
+    def test_shared_writer(self):
+        """Test one writer thread serving several journals."""
+        writer = JournalWriter().start()
+        journals = [StatsJournal(self.dir / f"m{i}.json", writer, compact_every=7)
+                    for i in range(5)]
+        for journal in journals:
+            journal.load()
+        for _ in range(20):
+            for i, journal in enumerate(journals):
+                self.record(journal, i)
+        for journal in journals:
+            journal.close()
+        writer.stop()
+
+        for i in range(5):
+            stats = StatsJournal(self.dir / f"m{i}.json").load()
+            self.assertEqual(stats.splices_total, 20 * i)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Tests for the STREAM telemetry recorder.
+"""
+
+import json
+import math
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import telemetry_recorder
+from telemetry_recorder import TelemetryRecorder, TelemetryStore, state_name
+
+
+def summary(t: int, temp: float, state: str = "HEATING", **extra) -> str:
+    record = {"type": "telemetry", "t": t, "state": state, "temp": temp, "target": 210.0,
+              "pos_mm": t / 100, "vel": 12.5, "slip": False, "splice_active": True,
+              "quality": 0, "error": False}
+    record.update(extra)
+    return json.dumps(record)
+
+
+def verbose(t: int, temp: float) -> str:
+    return json.dumps({
+        "type": "telemetry_v", "t": t, "state": "WELDING",
+        "temp": {"current": temp, "target": 220.0, "stage": 2, "fault": False},
+        "enc": {"mm": 1.5, "vel": 3.0, "slip_mm": 0.25, "slip": True},
+        "motors": {"a_mm": 10.0, "b_mm": 20.0},
+        "splice": {"active": True, "elapsed": 100, "remaining": 900, "quality": 87},
+        "pos": {"drift": 0.0, "cum_drift": 0.0},
+        "error": False,
+    })
+
+
+class TestTelemetryRecorder(unittest.TestCase):
+    """Tests for TelemetryRecorder and TelemetryStore."""
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_records_both_stream_modes(self):
+        """Test that SUMMARY and VERBOSE records become samples."""
+        recorder = TelemetryRecorder(self.dir)
+        self.assertFalse(recorder.feed("PROGRESS 3/10", now=0.5))
+        self.assertTrue(recorder.feed(summary(1000, 205.5), now=1.0))
+        self.assertTrue(recorder.feed(verbose(1100, 219.0), now=1.1))
+        self.assertFalse(recorder.feed('{"type":"heartbeat","t":1200,"seq":1}', now=1.2))
+        self.assertFalse(recorder.feed("OK stream verbose", now=1.3))
+
+        columns = recorder.query()
+        self.assertEqual(list(columns["time"]), [1.0, 1.1])
+        self.assertEqual(list(columns["fw_ms"]), [1000, 1100])
+        self.assertEqual([state_name(code) for code in columns["state"]], ["HEATING", "WELDING"])
+        self.assertEqual(list(columns["temp"]), [205.5, 219.0])
+        self.assertEqual(list(columns["target"]), [210.0, 220.0])
+        self.assertEqual(list(columns["segment"]), [3, 3])
+        self.assertEqual(list(columns["segments_total"]), [10, 10])
+        self.assertEqual(list(columns["quality"]), [0.0, 87.0])
+        self.assertEqual(list(columns["slip"]), [0, 1])
+        self.assertTrue(math.isnan(columns["slip_mm"][0]))
+        self.assertEqual(columns["slip_mm"][1], 0.25)
+        self.assertEqual(recorder.ignored, 2)
+
+    def test_query_range_across_blocks(self):
+        """Test range queries over written blocks and unwritten samples."""
+        recorder = TelemetryRecorder(self.dir, block_samples=100)
+        for i in range(1050):
+            recorder.feed(summary(i, 20.0 + i), now=float(i))
+
+        columns = recorder.query(95, 1020, columns=["temp"])
+        self.assertEqual(set(columns), {"time", "temp"})
+        self.assertEqual(list(columns["time"]), [float(i) for i in range(95, 1020)])
+
+        # Written blocks only, read back by a separate store
+        stored = TelemetryStore(self.dir).query(start=990)
+        self.assertEqual(stored["time"][-1], 999.0)
+        self.assertEqual(TelemetryStore(self.dir).time_range(), (0.0, 999.0))
+
+        with self.assertRaises(ValueError):
+            recorder.query(columns=["nope"])
+
+    def test_rolling_size_cap(self):
+        """Test that files roll over and the oldest are removed."""
+        recorder = TelemetryRecorder(self.dir, block_samples=200, compresslevel=0,
+                                     max_file_bytes=20_000, max_total_bytes=60_000)
+        for i in range(5000):
+            recorder.feed(summary(i, 20.0 + i), now=1000.0 + i)
+        recorder.close()
+
+        files = recorder.store.files()
+        self.assertGreater(len(files), 1)
+        self.assertLessEqual(sum(path.stat().st_size for path in files), 60_000)
+        first, last = recorder.store.time_range()
+        self.assertGreater(first, 1000.0)
+        self.assertEqual(last, 5999.0)
+        self.assertEqual(len(recorder.query()["time"]), 6000 - first)
+
+    def test_torn_block_ignored(self):
+        """Test that a block cut short by a crash ends the file."""
+        with TelemetryRecorder(self.dir, block_samples=10) as recorder:
+            for i in range(25):
+                recorder.feed(summary(i, 20.0), now=float(i))
+        path = recorder.store.files()[0]
+        path.write_bytes(path.read_bytes()[:-5])
+
+        with self.assertLogs('telemetry_recorder', 'WARNING'):
+            columns = TelemetryStore(self.dir).query()
+        self.assertEqual(len(columns["time"]), 20)
+
+    def test_downsample(self):
+        """Test bucketed views, with and without NumPy."""
+        recorder = TelemetryRecorder(self.dir, block_samples=64)
+        for i in range(1000):
+            error = 500 <= i < 505
+            recorder.feed(summary(i, float(i % 10), state="IDLE" if i < 600 else "COOLING",
+                                  error=error), now=i / 10)
+
+        engines = [None] if telemetry_recorder.np is None else [None, telemetry_recorder.np]
+        views = []
+        for engine in engines:
+            with mock.patch.object(telemetry_recorder, "np", engine):
+                views.append(recorder.downsample(0.0, 200.0, points=20))
+        for view in views:
+            # 100 s of samples in 10 s buckets; no samples in the second half
+            self.assertEqual(view["time"], [10.0 * k for k in range(10)])
+            self.assertEqual(view["count"], [100] * 10)
+            self.assertEqual(view["temp"], [4.5] * 10)
+            self.assertEqual(view["temp_min"], [0.0] * 10)
+            self.assertEqual(view["temp_max"], [9.0] * 10)
+            self.assertEqual(view["error"], [0, 0, 0, 0, 0, 1, 0, 0, 0, 0])
+            self.assertEqual([state_name(code) for code in view["state"]][5:7],
+                             ["IDLE", "COOLING"])
+            self.assertTrue(all(math.isnan(value) for value in view["slip_mm"]))
+        if len(views) == 2:
+            self.assertEqual(views[0].keys(), views[1].keys())
+
+    def test_throughput(self):
+        """Test that recording keeps up with thousands of samples per second."""
+        lines = [verbose(i, 200.0 + i % 50) for i in range(20000)]
+        recorder = TelemetryRecorder(self.dir)
+        start = time.perf_counter()
+        for i, line in enumerate(lines):
+            recorder.feed(line, now=i / 1000)
+        recorder.close()
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(recorder.samples, 20000)
+        self.assertLess(elapsed, 4.0)
+        size = sum(path.stat().st_size for path in recorder.store.files())
+        self.assertLess(size / 20000, 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Splice3D Compressed G-code Benchmark
+
+Scales samples/test_multicolor.gcode up to a large file, stores it with
+every available codec (see postprocessor/gcode_io.py) and reports, per
+codec: compressed size and ratio, compression throughput, parse
+throughput (GCodeParser.parse_file) and post-processing throughput
+(parse + modify in one pass, writing plain G-code). Throughputs are in
+MB/s of uncompressed G-code, so they are directly comparable.
+
+The scaled sample repeats one short print and compresses far better
+than real jobs do; pass --input to measure a sliced file of your own.
+
+Usage:
+    python scripts/benchmarks/bench_codecs.py [--lines 2000000] [--repeat 3]
+    python scripts/benchmarks/bench_codecs.py --input job.gcode
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "postprocessor"))
+
+from gcode_parser import GCodeParser  # noqa: E402
+from gcode_modifier import open_atomic  # noqa: E402
+from gcode_pipeline import process_gcode  # noqa: E402
+from gcode_io import CODECS, SUFFIXES, zstandard  # noqa: E402
+
+SAMPLE = REPO_ROOT / "samples" / "test_multicolor.gcode"
+
+
+def build_scaled_file(path: str, target_lines: int) -> int:
+    """Write the sample repeatedly until it has at least target_lines lines."""
+    with open(SAMPLE, 'r', encoding='utf-8') as f:
+        block = f.read()
+    block_lines = block.count('\n')
+    repeats = max(1, -(-target_lines // block_lines))
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(repeats):
+            f.write(block)
+    return repeats * block_lines
+
+
+def best_time(func, repeat: int) -> float:
+    """Return the best wall time of func() over several runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compress(source: str, target: str):
+    """Store a plain G-code file with the codec chosen by target's suffix."""
+    with open(source, 'r', encoding='utf-8') as src, open_atomic(target) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compressed G-code I/O")
+    parser.add_argument("--lines", type=int, default=2_000_000,
+                        help="Approximate number of lines (default: 2M)")
+    parser.add_argument("--input",
+                        help="Plain G-code file to benchmark instead of the scaled sample")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per measurement; the best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        plain = os.path.join(work_dir, "bench" + SUFFIXES["plain"])
+        if args.input:
+            shutil.copyfile(args.input, plain)
+            source = Path(args.input).name
+        else:
+            build_scaled_file(plain, args.lines)
+            source = SAMPLE.name
+        size = os.path.getsize(plain)
+        mb = size / 1e6
+        print(f"Input: {mb:.0f} MB from {source}")
+        expected = GCodeParser().parse_file(plain)
+        output = os.path.join(work_dir, "out.gcode")
+
+        print(f"  {'codec':<8}{'size':>10}{'ratio':>8}{'compress':>12}"
+              f"{'parse':>12}{'process':>12}")
+        for codec in CODECS:
+            if codec == "zstd" and zstandard is None:
+                print(f"  {codec:<8}  skipped (pip install zstandard)")
+                continue
+            path = os.path.join(work_dir, "bench" + SUFFIXES[codec])
+            if codec == "plain":
+                write_s = 0.0
+            else:
+                write_s = best_time(lambda: compress(plain, path), args.repeat)
+            stored = os.path.getsize(path)
+
+            assert GCodeParser().parse_file(path) == expected, f"{codec} disagrees"
+            parse_s = best_time(lambda: GCodeParser().parse_file(path), args.repeat)
+            process_s = best_time(lambda: process_gcode(path, output), args.repeat)
+
+            compress_rate = f"{mb / write_s:.0f} MB/s" if write_s else "-"
+            print(f"  {codec:<8}{stored / 1e6:>8.2f}MB{size / stored:>7.1f}x"
+                  f"{compress_rate:>12}{mb / parse_s:>7.0f} MB/s{mb / process_s:>7.0f} MB/s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
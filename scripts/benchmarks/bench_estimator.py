@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Splice3D Splice Time Estimator Benchmark
+
+Times the closed-form estimate of postprocessor/splice_estimator.py
+(NumPy and pure-Python passes) against a full discrete-event run of
+cli/simulator.py on the same random recipe, and prints both totals.
+
+Usage:
+    python scripts/benchmarks/bench_estimator.py [--segments 100000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from array import array
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "postprocessor"))
+sys.path.insert(0, str(REPO_ROOT / "cli"))
+
+import splice_estimator  # noqa: E402
+from simulator import FirmwareSimulator  # noqa: E402
+
+
+def timed(run):
+    start = time.perf_counter()
+    value = run()
+    return value, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--segments", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lengths = array('d', (rng.uniform(5, 200) for _ in range(args.segments)))
+    colors = array('i', (rng.randrange(4) for _ in range(args.segments)))
+
+    sim = FirmwareSimulator()
+    sim.load_segments([{"color": c, "length_mm": length} for c, length in zip(colors, lengths)])
+    _, sim_s = timed(sim.run)
+    print(f"simulator      {sim_s * 1e3:10.1f} ms  total {sim.result.total_time_s:.3f} s")
+
+    engines = [("pure Python", False)]
+    if splice_estimator.np is not None:
+        engines.append(("NumPy", True))
+    for label, use_numpy in engines:
+        estimate, seconds = timed(
+            lambda: splice_estimator.estimate(lengths, colors, use_numpy=use_numpy))
+        print(f"{label:<14} {seconds * 1e3:10.1f} ms  total {estimate.total_time_s:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
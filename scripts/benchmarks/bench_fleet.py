@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Splice3D Fleet Bridge Benchmark
+
+Runs services/fleet_bridge.py against N simulated machines (fake firmware
+over asyncio streams, a recording stand-in for the MQTT client) and
+reports the memory, threads and MQTT connections per fleet size, and the
+time of one STATUS round over all machines.
+
+Usage:
+    python scripts/benchmarks/bench_fleet.py [--sizes 1 10 100 1000]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "postprocessor"))
+sys.path.insert(0, str(REPO_ROOT / "services"))
+
+from async_serial import AsyncSplice3D  # noqa: E402
+from fake_firmware import FakeFirmwareSerial, open_fake_connection  # noqa: E402
+from fleet_bridge import DeviceConfig, FleetBridge  # noqa: E402
+
+
+class NullMQTTClient:
+    """Counts publications instead of sending them."""
+
+    def __init__(self):
+        self.published = 0
+        self.on_connect = self.on_message = None
+
+    def is_connected(self):
+        return True
+
+    def publish(self, topic, payload, retain=False):
+        self.published += 1
+
+    def subscribe(self, topic):
+        pass
+
+
+async def connect(device: DeviceConfig) -> AsyncSplice3D:
+    reader, writer = await open_fake_connection(FakeFirmwareSerial(baud=device.baud))
+    return AsyncSplice3D(reader, writer, name=device.name).start()
+
+
+async def measure(size: int) -> dict:
+    threads = threading.active_count()
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as stats_dir:
+        devices = [DeviceConfig(f"m{i}", f"/dev/fake{i}", 921600) for i in range(size)]
+        bridge = FleetBridge(devices, NullMQTTClient(), stats_dir=Path(stats_dir),
+                             poll_interval=3600, connect=connect)
+        stop = asyncio.Event()
+        task = asyncio.ensure_future(bridge.run(stop))
+        while not all(d.state.state == "IDLE" for d in bridge.devices.values()):
+            await asyncio.sleep(0.01)
+        memory = tracemalloc.get_traced_memory()[0]
+        extra_threads = threading.active_count() - threads
+
+        start = time.perf_counter()
+        await asyncio.gather(*(d.poll() for d in bridge.devices.values()))
+        poll = time.perf_counter() - start
+
+        stop.set()
+        await task
+    tracemalloc.stop()
+    return {"memory": memory, "threads": extra_threads, "poll": poll}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fleet bridge")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000],
+                        help="Fleet sizes (default: 1 10 100 1000)")
+    args = parser.parse_args()
+
+    print("One MQTT connection and one subscription for every fleet size")
+    print(f"  {'machines':>9}{'memory':>11}{'per machine':>13}{'threads':>9}{'STATUS round':>14}")
+    for size in args.sizes:
+        result = asyncio.run(measure(size))
+        print(f"  {size:>9}{result['memory'] / 1024:>9.0f}KB"
+              f"{result['memory'] / size / 1024:>11.1f}KB{result['threads']:>9}"
+              f"{result['poll'] * 1000:>12.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Splice3D G-code Parser Benchmark
+
+Scales samples/test_multicolor.gcode up to a large file and reports
+parse throughput (lines/sec) for the regex-cascade line classifier, the
+first-character fast-path classifier, the memory-mapped bytes backend and
+the parallel chunked backend (one worker process per CPU core).
+
+Usage:
+    python scripts/benchmarks/bench_parser.py [--lines 10000000] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "postprocessor"))
+
+from gcode_parser import (  # noqa: E402
+    GCodeParser,
+    LINE_ABSOLUTE_E,
+    LINE_COLOR_CHANGE,
+    LINE_E_RESET,
+    LINE_EXTRUDE,
+    LINE_LAYER,
+    LINE_OTHER,
+    LINE_RELATIVE_E,
+    LINE_TOOL_CHANGE,
+)
+
+SAMPLE = REPO_ROOT / "samples" / "test_multicolor.gcode"
+
+
+class RegexCascadeParser(GCodeParser):
+    """Parser using the previous per-line regex cascade, for comparison."""
+
+    def classify_line(self, line):
+        if not line or line.startswith(';'):
+            layer_match = self.LAYER_PATTERN.search(line)
+            if layer_match:
+                if layer_match.group(1):
+                    return LINE_LAYER, int(layer_match.group(1))
+                return LINE_LAYER, None
+            return LINE_OTHER, None
+        if line.startswith('M82'):
+            return LINE_ABSOLUTE_E, None
+        elif line.startswith('M83'):
+            return LINE_RELATIVE_E, None
+        tool_match = self.TOOL_CHANGE_PATTERN.match(line)
+        if tool_match:
+            return LINE_TOOL_CHANGE, int(tool_match.group(1))
+        if self.M600_PATTERN.match(line):
+            return LINE_COLOR_CHANGE, None
+        if self.MOVE_PATTERN.match(line):
+            e_match = self.EXTRUSION_PATTERN.search(line)
+            if e_match:
+                return LINE_EXTRUDE, float(e_match.group(1))
+            return LINE_OTHER, None
+        if line.startswith('G92'):
+            e_match = self.EXTRUSION_PATTERN.search(line)
+            if e_match:
+                return LINE_E_RESET, float(e_match.group(1))
+        return LINE_OTHER, None
+
+
+def build_scaled_file(path: str, target_lines: int) -> int:
+    """Write the sample repeatedly until it has at least target_lines lines."""
+    with open(SAMPLE, 'r', encoding='utf-8') as f:
+        block = f.read()
+    block_lines = block.count('\n')
+    repeats = max(1, -(-target_lines // block_lines))
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(repeats):
+            f.write(block)
+    return repeats * block_lines
+
+
+def time_parse(parser: GCodeParser, path: str, repeat: int) -> float:
+    """Return the best wall time of parse_file over several runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse_file(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Splice3D G-code parser")
+    parser.add_argument("--lines", type=int, default=10_000_000,
+                        help="Approximate number of lines to parse (default: 10M)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per parser; the best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".gcode")
+    os.close(fd)
+    try:
+        lines = build_scaled_file(path, args.lines)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"Input: {lines:,} lines ({size_mb:.0f} MB) from {SAMPLE.name}, "
+              f"{os.cpu_count()} CPU cores")
+
+        parsers = [
+            ("regex cascade", RegexCascadeParser()),
+            ("fast path", GCodeParser()),
+            ("mmap bytes", GCodeParser(backend="mmap")),
+            ("parallel", GCodeParser(backend="parallel")),
+        ]
+        expected = parsers[0][1].parse_file(path)
+        for name, gcode_parser in parsers[1:]:
+            assert gcode_parser.parse_file(path) == expected, f"{name} disagrees"
+
+        baseline = None
+        for name, gcode_parser in parsers:
+            elapsed = time_parse(gcode_parser, path, args.repeat)
+            baseline = baseline or elapsed
+            print(f"  {name + ':':<15}{lines / elapsed:>12,.0f} lines/sec "
+                  f"({elapsed:.2f}s, {baseline / elapsed:.2f}x)")
+    finally:
+        os.unlink(path)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
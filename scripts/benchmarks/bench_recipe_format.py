@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Splice3D Recipe Format Benchmark
+
+Builds a gradient-like recipe (many short segments) and compares the JSON
+recipe with the binary format of postprocessor/recipe_binary.py: size on
+the wire, transfer time over serial (8N1, 10 bits per byte) and encode /
+decode time.
+
+The JSON wire size is that of the RECIPE command sent by
+cli/splice3d_cli.py (compact JSON of the whole recipe).
+
+Usage:
+    python scripts/benchmarks/bench_recipe_format.py [--segments 5000] [--baud 115200]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "postprocessor"))
+
+from recipe_generator import SpliceRecipe  # noqa: E402
+from recipe_binary import (  # noqa: E402
+    LENGTH_FLOAT32,
+    LENGTH_SCALED,
+    decode_recipe,
+    encode_recipe,
+)
+
+
+def build_recipe(count: int) -> SpliceRecipe:
+    """Gradient-like recipe: 0.5-300mm segments cycling through four colors."""
+    rng = random.Random(0)
+    segments = [{"color": i % 4, "length_mm": round(rng.uniform(0.5, 300.0), 2)}
+                for i in range(count)]
+    return SpliceRecipe(
+        total_length_mm=round(sum(s["length_mm"] for s in segments), 2),
+        segment_count=count,
+        color_count=4,
+        segments=segments,
+        colors={str(i): f"color_{i}" for i in range(4)},
+        metadata={"source_file": "gradient.gcode", "transition_length_mm": 0.0,
+                  "original_segments": count, "merged_segments": 0},
+    )
+
+
+def best_time(func, repeat: int) -> float:
+    """Return the best wall time of func() over several runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def json_wire(recipe: SpliceRecipe) -> bytes:
+    """The RECIPE command line sent by Splice3DCli.send_recipe()."""
+    compact = json.dumps(asdict(recipe), separators=(',', ':'))
+    return f"RECIPE {compact}\n".encode('utf-8')
+
+
+def json_load(wire: bytes) -> SpliceRecipe:
+    return SpliceRecipe(**json.loads(wire[len(b"RECIPE "):]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recipe formats")
+    parser.add_argument("--segments", type=int, default=5000,
+                        help="Segments in the recipe (default: 5000)")
+    parser.add_argument("--baud", type=int, default=115200,
+                        help="Serial baud rate (default: 115200)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Runs per measurement; the best time is reported (default: 5)")
+    args = parser.parse_args()
+
+    recipe = build_recipe(args.segments)
+    formats = [
+        ("json", json_wire, json_load),
+        ("binary int", lambda r: encode_recipe(r, LENGTH_SCALED), decode_recipe),
+        ("binary f32", lambda r: encode_recipe(r, LENGTH_FLOAT32), decode_recipe),
+    ]
+
+    print(f"Recipe: {args.segments:,} segments, serial at {args.baud} baud")
+    print(f"  {'format':<12}{'bytes':>10}{'transfer':>11}{'vs json':>9}"
+          f"{'encode':>10}{'decode':>10}")
+    baseline = None
+    for name, encode, decode in formats:
+        wire = encode(recipe)
+        assert decode(wire).segment_count == args.segments
+        transfer = len(wire) * 10 / args.baud
+        baseline = baseline or transfer
+        encode_ms = best_time(lambda: encode(recipe), args.repeat) * 1000
+        decode_ms = best_time(lambda: decode(wire), args.repeat) * 1000
+        print(f"  {name:<12}{len(wire):>10,}{transfer:>10.2f}s{baseline / transfer:>8.1f}x"
+              f"{encode_ms:>8.1f}ms{decode_ms:>8.1f}ms")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Splice3D Segment Storage Benchmark
+
+Builds a gradient-like segment list (many short segments, frequent color
+changes) and compares a list of Segment objects with a columnar
+SegmentTable: memory held, recipe generation (small-segment merging and
+transitions) in RecipeGenerator, and the length statistics computed by
+cli/analyze_gcode.py.
+
+Usage:
+    python scripts/benchmarks/bench_segments.py [--segments 500000] [--repeat 3]
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "postprocessor"))
+
+from gcode_parser import ParseResult, Segment  # noqa: E402
+from recipe_generator import RecipeGenerator  # noqa: E402
+from segment_table import SegmentTable  # noqa: E402
+
+
+def build_segments(count: int) -> list[Segment]:
+    """Gradient-like segments: 0.5-30mm, cycling through four colors."""
+    rng = random.Random(0)
+    return [
+        Segment(rng.randrange(4), round(rng.uniform(0.5, 30.0), 2),
+                i * 10 + 1, i * 10 + 10, i // 50, i // 50)
+        for i in range(count)
+    ]
+
+
+def measure_memory(build) -> int:
+    """Bytes still allocated after build() returns."""
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return size
+
+
+def best_time(func, repeat: int, setup=lambda: ()) -> float:
+    """Return the best wall time of func(*setup()) over several runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def list_stats(segments):
+    """Per-segment statistics, as analyze_gcode computed them on lists."""
+    lengths = [s.length_mm for s in segments]
+    buckets = [0] * 5
+    for length in lengths:
+        buckets[(length >= 5) + (length >= 20) + (length >= 100) + (length >= 500)] += 1
+    return sorted(lengths), buckets, Counter(s.color_index for s in segments)
+
+
+def table_stats(table):
+    """Column statistics, as analyze_gcode computes them on a SegmentTable."""
+    lengths = sorted(table.length_mm)
+    bounds = [bisect_left(lengths, bound) for bound in (5, 20, 100, 500)]
+    return lengths, bounds, Counter(table.color_index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Splice3D segment storage")
+    parser.add_argument("--segments", type=int, default=500_000,
+                        help="Number of segments (default: 500k)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per measurement; the best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    segments = build_segments(args.segments)
+    table = SegmentTable(segments)
+    generator = RecipeGenerator(min_segment_length_mm=10.0, transition_length_mm=5.0)
+    print(f"Input: {args.segments:,} segments")
+
+    list_bytes = measure_memory(lambda: build_segments(args.segments))
+    table_bytes = measure_memory(lambda: SegmentTable(build_segments(args.segments)))
+    print(f"  memory:  list {list_bytes / len(segments):6.1f} B/segment, "
+          f"table {table_bytes / len(segments):6.1f} B/segment "
+          f"({list_bytes / table_bytes:.1f}x smaller)")
+
+    # The list merge updates its input in place, so each run gets a fresh copy
+    rows = [tuple(vars(s).values()) for s in segments]
+    list_recipe = best_time(generator.generate, args.repeat,
+                            setup=lambda: (ParseResult([Segment(*row) for row in rows]),))
+    table_recipe = best_time(generator.generate, args.repeat,
+                             setup=lambda: (ParseResult(table),))
+    print(f"  recipe:  list {list_recipe:.3f}s, table {table_recipe:.3f}s "
+          f"({list_recipe / table_recipe:.1f}x)")
+
+    list_time = best_time(lambda: list_stats(segments), args.repeat)
+    table_time = best_time(lambda: table_stats(table), args.repeat)
+    print(f"  stats:   list {list_time:.3f}s, table {table_time:.3f}s "
+          f"({list_time / table_time:.1f}x)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Splice3D Serial Round-Trip Benchmark
+
+Measures command round-trip latency against the real-time fake firmware
+(postprocessor/fake_firmware.py) for the former polling loop of
+Splice3DCli.send_command (check in_waiting, sleep 10 ms) and for
+postprocessor/serial_reader.SerialReader, which blocks in readline() on
+its own thread. The wire time (8N1 at the given baud rate) is the floor.
+
+Usage:
+    python scripts/benchmarks/bench_serial_latency.py [--baud 115200] [--commands 100]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "postprocessor"))
+
+from fake_firmware import FakeFirmwareSerial, RealtimeFirmwareSerial  # noqa: E402
+from serial_reader import SerialReader  # noqa: E402
+
+
+def polled_command(port, command: str, timeout: float = 1.0) -> list[str]:
+    """The former send_command(): poll in_waiting, sleep 10 ms in between."""
+    port.write(f"{command}\n".encode('utf-8'))
+    port.flush()
+    responses = []
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        if port.in_waiting:
+            line = port.readline().decode('utf-8', errors='replace').strip()
+            if line:
+                responses.append(line)
+                if line.startswith('OK') or line.startswith('ERROR') or line.startswith('STATUS'):
+                    break
+        else:
+            time.sleep(0.01)
+    return responses
+
+
+def measure(send, count: int) -> list[float]:
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        assert send("STATUS")
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial command round trips")
+    parser.add_argument("--baud", type=int, default=115200,
+                        help="Simulated baud rate (default: 115200)")
+    parser.add_argument("--commands", type=int, default=100,
+                        help="Commands per method (default: 100)")
+    args = parser.parse_args()
+
+    def port():
+        return RealtimeFirmwareSerial(FakeFirmwareSerial(baud=args.baud, processing_s=0.0))
+
+    wire = (len("STATUS\n") + len("STATUS IDLE\n")) * 10 / args.baud
+    polled = port()
+    results = [("polling", measure(lambda c: polled_command(polled, c), args.commands))]
+    with SerialReader(port()) as reader:
+        results.append(("reader", measure(lambda c: reader.command(c, timeout=1.0),
+                                          args.commands)))
+
+    print(f"STATUS round trip at {args.baud} baud, wire time {wire * 1000:.2f} ms")
+    print(f"  {'method':<10}{'mean':>10}{'p50':>10}{'max':>10}")
+    for name, times in results:
+        print(f"  {name:<10}{statistics.mean(times) * 1000:>8.2f}ms"
+              f"{statistics.median(times) * 1000:>8.2f}ms{max(times) * 1000:>8.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Splice3D Statistics Persistence Benchmark
+
+Time spent in the serial handling path per DONE line: rewriting the
+statistics file (bridge_core.save_stats) versus journaling the event
+(stats_journal.StatsJournal with a JournalWriter thread), and the time
+until the journal is on disk.
+
+Usage:
+    python scripts/benchmarks/bench_stats_journal.py [--events 1000] [--dir /path]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "services"))
+
+from bridge_core import BridgeStats, save_stats  # noqa: E402
+from stats_journal import EVENT_SPLICE, JournalWriter, StatsJournal  # noqa: E402
+
+
+def bench_rewrite(path: Path, events: int) -> list[float]:
+    stats = BridgeStats()
+    times = []
+    for _ in range(events):
+        start = time.perf_counter()
+        stats.record_splice()
+        save_stats(stats, path)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def bench_journal(path: Path, events: int) -> tuple[list[float], float]:
+    writer = JournalWriter().start()
+    journal = StatsJournal(path, writer)
+    journal.load()
+    times = []
+    start_all = time.perf_counter()
+    for _ in range(events):
+        start = time.perf_counter()
+        journal.stats.record_splice()
+        journal.record(EVENT_SPLICE)
+        times.append(time.perf_counter() - start)
+    journal.close()
+    writer.stop()
+    durable = time.perf_counter() - start_all
+    assert StatsJournal(path).load().splices_total == events
+    return times, durable
+
+
+def report(name: str, times: list[float]):
+    times = sorted(times)
+    print(f"{name:<24} mean {statistics.mean(times) * 1e6:9.1f} us   "
+          f"p99 {times[int(len(times) * 0.99)] * 1e6:9.1f} us   "
+          f"max {times[-1] * 1e6:9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--dir", type=Path, help="Directory to write in (default: a temp dir)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        directory = Path(directory)
+        print(f"{args.events} events in {directory}")
+        report("save_stats per event", bench_rewrite(directory / "rewrite.json", args.events))
+        times, durable = bench_journal(directory / "journal.json", args.events)
+        report("journal record", times)
+        print(f"journal on disk after {durable * 1e3:.1f} ms "
+              f"({durable / args.events * 1e6:.1f} us per event)")
+
+
+if __name__ == "__main__":
+    main()
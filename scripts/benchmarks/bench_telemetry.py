@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Splice3D Telemetry Recorder Benchmark
+
+Feeds synthetic STREAM VERBOSE records (as the firmware prints them)
+through postprocessor/telemetry_recorder.py and reports the ingest rate,
+bytes on disk per sample, and the time of range and downsampled queries.
+
+Usage:
+    python scripts/benchmarks/bench_telemetry.py [--samples 200000]
+"""
+
+import argparse
+import json
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "postprocessor"))
+
+import telemetry_recorder  # noqa: E402
+from telemetry_recorder import TelemetryRecorder  # noqa: E402
+
+
+def stream_lines(count: int, interval_s: float):
+    for i in range(count):
+        t = i * interval_s
+        yield t, json.dumps({
+            "type": "telemetry_v", "t": int(t * 1000), "state": "HEATING",
+            "temp": {"current": round(200 + 10 * math.sin(t / 5), 1), "target": 210.0,
+                     "stage": 2, "fault": False},
+            "enc": {"mm": round(t * 12.5, 2), "vel": 12.5, "slip_mm": 0.0, "slip": False},
+            "motors": {"a_mm": round(t * 12.5, 2), "b_mm": 0.0},
+            "splice": {"active": True, "elapsed": int(t * 1000) % 4000,
+                       "remaining": 4000 - int(t * 1000) % 4000, "quality": 90},
+            "pos": {"drift": 0.01, "cum_drift": 0.2},
+            "error": False,
+        }, separators=(',', ':'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=200000)
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between samples")
+    args = parser.parse_args()
+
+    lines = list(stream_lines(args.samples, args.interval))
+    wire = sum(len(line) + 1 for _, line in lines)
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = TelemetryRecorder(Path(directory))
+        start = time.perf_counter()
+        for now, line in lines:
+            recorder.feed(line, now)
+        recorder.flush()
+        elapsed = time.perf_counter() - start
+
+        size = sum(path.stat().st_size for path in recorder.store.files())
+        print(f"NumPy: {'yes' if telemetry_recorder.np is not None else 'no'}")
+        print(f"ingest         {args.samples / elapsed:10.0f} samples/s")
+        print(f"on disk        {size / args.samples:10.1f} bytes/sample "
+              f"(stream {wire / args.samples:.0f} bytes/line)")
+
+        span = args.samples * args.interval
+        for label, run in (
+            ("query 10%", lambda: recorder.store.query(span * 0.45, span * 0.55)),
+            ("query all", lambda: recorder.store.query()),
+            ("downsample 500", lambda: recorder.store.downsample(0, span, points=500)),
+        ):
+            start = time.perf_counter()
+            run()
+            print(f"{label:<14} {(time.perf_counter() - start) * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
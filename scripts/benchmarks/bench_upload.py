@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Splice3D Recipe Upload Benchmark
+
+Uploads a recipe with the chunked protocol of postprocessor/recipe_upload.py
+to the fake firmware of postprocessor/fake_firmware.py and reports the
+effective payload throughput against the serial ceiling (baud / 10 bytes
+per second, 8N1) for several baud rates and window sizes.
+
+Time is the fake port's virtual clock, so the numbers describe the link
+and the protocol, not this machine.
+
+Usage:
+    python scripts/benchmarks/bench_upload.py [--segments 500] [--faults 0.02]
+"""
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "postprocessor"))
+
+from recipe_generator import SpliceRecipe  # noqa: E402
+from recipe_upload import RecipeUploader  # noqa: E402
+from fake_firmware import FakeFirmwareSerial  # noqa: E402
+
+BAUD_RATES = (57600, 115200, 250000, 921600)
+WINDOWS = (1, 4, 8)
+
+
+def build_recipe(count: int) -> SpliceRecipe:
+    """Gradient-like recipe: 0.5-300mm segments cycling through four colors."""
+    rng = random.Random(0)
+    segments = [{"color": i % 4, "length_mm": round(rng.uniform(0.5, 300.0), 2)}
+                for i in range(count)]
+    return SpliceRecipe(segment_count=count, segments=segments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the chunked recipe upload")
+    parser.add_argument("--segments", type=int, default=500,
+                        help="Segments in the recipe (default: 500, the firmware limit)")
+    parser.add_argument("--faults", type=float, default=0.0,
+                        help="Probability of corrupting or losing each line (default: 0)")
+    parser.add_argument("--processing-ms", type=float, default=1.0,
+                        help="Firmware time per received line (default: 1.0)")
+    args = parser.parse_args()
+
+    recipe = build_recipe(args.segments)
+    print(f"Recipe: {args.segments:,} segments, line fault rate {args.faults:g}")
+    print(f"  {'baud':>7}{'window':>8}{'time':>9}{'B/s':>9}{'ceiling':>9}"
+          f"{'of ceiling':>12}{'resent':>8}")
+    for baud in BAUD_RATES:
+        ceiling = baud / 10
+        for window in WINDOWS:
+            port = FakeFirmwareSerial(baud=baud, window=window,
+                                      max_segments=max(args.segments, 500),
+                                      processing_s=args.processing_ms / 1000,
+                                      corrupt_rate=args.faults, drop_rate=args.faults,
+                                      response_drop_rate=args.faults)
+            result = RecipeUploader(port, window=window, clock=port.now).upload(recipe)
+            if not result.ok:
+                print(f"  {baud:>7}{window:>8}  failed: {result.message}")
+                continue
+            print(f"  {baud:>7}{window:>8}{result.elapsed_s:>8.3f}s"
+                  f"{result.throughput_bps:>9.0f}{ceiling:>9.0f}"
+                  f"{result.throughput_bps / ceiling:>11.0%}{result.resent_chunks:>8}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,530 @@
+"""
+Splice3D Bridge Core
+
+Machine state, statistics, MQTT topic layout and serial line handling
+shared by the single-machine bridge (mqtt_bridge.py) and the fleet
+bridge (fleet_bridge.py). Nothing here touches serial ports or MQTT
+clients, so it imports without pyserial or paho-mqtt.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger('splice3d-bridge')
+
+
+# MQTT Topic Configuration
+TOPIC_PREFIX = "home/splice3d"
+
+# Topic key -> path below the machine's prefix
+TOPIC_PATHS = {
+    # Status topics (published by bridge)
+    "state": "status/state",
+    "progress": "status/progress/percent",
+    "temp_current": "status/temperature/current",
+    "temp_target": "status/temperature/target",
+    "online": "status/online",
+    "segment": "status/segment/current",
+    "segments_total": "status/segment/total",
+    "error": "status/error",
+    "error_message": "status/error_message",
+    # All status fields in one JSON document (state_format "json"/"both")
+    "state_json": "status/json",
+
+    # Statistics topics
+    "splices_today": "stats/splices_today",
+    "splices_total": "stats/splices_total",
+    "failures_today": "stats/failures_today",
+    "uptime": "stats/uptime_seconds",
+    "messages_saved": "stats/mqtt_messages_saved",
+
+    # Command topics (subscribed by bridge)
+    "cmd_start": "command/start",
+    "cmd_pause": "command/pause",
+    "cmd_resume": "command/resume",
+    "cmd_abort": "command/abort",
+    "cmd_preheat": "command/preheat",
+    "cmd_cooldown": "command/cooldown",
+}
+
+# Command topic key -> serial command
+COMMANDS = {
+    "cmd_start": "START",
+    "cmd_pause": "PAUSE",
+    "cmd_resume": "RESUME",
+    "cmd_abort": "ABORT",
+    "cmd_preheat": "PREHEAT",
+    "cmd_cooldown": "COOLDOWN",
+}
+
+
+def make_topics(prefix: str = TOPIC_PREFIX) -> dict[str, str]:
+    """Full topic names for a machine publishing below prefix."""
+    return {key: f"{prefix}/{path}" for key, path in TOPIC_PATHS.items()}
+
+
+def command_for(topic_key: str, payload: str) -> Optional[str]:
+    """
+    Serial command for a message on a command topic.
+
+    Args:
+        topic_key: Key of the command topic ("cmd_start", ...)
+        payload: Message payload; anything but "" or "1" becomes an argument
+
+    Returns:
+        The command line, or None for an unknown topic
+    """
+    command = COMMANDS.get(topic_key)
+    if command and payload and payload != "1":
+        command = f"{command} {payload}"
+    return command
+
+
+@dataclass
+class BridgeStats:
+    """Statistics tracking for the bridge."""
+    splices_today: int = 0
+    splices_total: int = 0
+    failures_today: int = 0
+    failures_total: int = 0
+    last_reset_date: str = field(default_factory=lambda: date.today().isoformat())
+    start_time: float = field(default_factory=time.time)
+
+    def reset_daily(self):
+        """Reset daily counters if date has changed."""
+        today = date.today().isoformat()
+        if today != self.last_reset_date:
+            logger.info(f"Resetting daily stats (was {self.last_reset_date}, now {today})")
+            self.splices_today = 0
+            self.failures_today = 0
+            self.last_reset_date = today
+
+    def record_splice(self):
+        """Record a successful splice."""
+        self.reset_daily()
+        self.splices_today += 1
+        self.splices_total += 1
+
+    def record_failure(self):
+        """Record a failure."""
+        self.reset_daily()
+        self.failures_today += 1
+        self.failures_total += 1
+
+    @property
+    def uptime_seconds(self) -> int:
+        """Get uptime in seconds."""
+        return int(time.time() - self.start_time)
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for persistence."""
+        return {
+            "splices_today": self.splices_today,
+            "splices_total": self.splices_total,
+            "failures_today": self.failures_today,
+            "failures_total": self.failures_total,
+            "last_reset_date": self.last_reset_date,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BridgeStats":
+        """Create from dictionary."""
+        stats = cls()
+        stats.splices_total = data.get("splices_total", 0)
+        stats.failures_total = data.get("failures_total", 0)
+        stats.splices_today = data.get("splices_today", 0)
+        stats.failures_today = data.get("failures_today", 0)
+        stats.last_reset_date = data.get("last_reset_date", date.today().isoformat())
+        # Daily stats of an earlier day are reset on load
+        stats.reset_daily()
+        return stats
+
+
+def load_stats(path: Path) -> BridgeStats:
+    """Load statistics from file (fresh statistics if it is missing or bad)."""
+    try:
+        if path.exists():
+            with open(path) as f:
+                return BridgeStats.from_dict(json.load(f))
+    except Exception as e:
+        logger.warning(f"Could not load stats: {e}")
+    return BridgeStats()
+
+
+def save_stats(stats: BridgeStats, path: Path):
+    """Save statistics to file."""
+    try:
+        write_json_atomic(path, stats.to_dict())
+    except Exception as e:
+        logger.error(f"Could not save stats: {e}")
+
+
+def write_json_atomic(path: Path, data: dict):
+    """
+    Replace path with data so that a crash leaves the old or the new file,
+    never a partial one (temporary file, fsync, rename).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        # Make the rename itself durable
+        fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return  # Not possible on every platform (Windows)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@dataclass
+class MachineState:
+    """Current state of the Splice3D machine."""
+    state: str = "OFFLINE"
+    progress: int = 0
+    current_segment: int = 0
+    total_segments: int = 0
+    temperature_current: float = 0.0
+    temperature_target: float = 0.0
+    error: bool = False
+    error_message: str = ""
+    last_update: float = field(default_factory=time.time)
+
+
+# Results of apply_serial_line()
+LINE_IGNORED = None
+LINE_STATE = "state"      # State changed
+LINE_DONE = "done"        # A splice run completed (stats changed)
+LINE_ERROR = "error"      # The machine reported an error (stats changed)
+
+
+def parse_status_line(state: MachineState, line: str):
+    """
+    Parse a status line from the machine and update state.
+
+    Understands the key:value form (STATE:IDLE TEMP:200/210 PROGRESS:0
+    SEGMENT:0/0) and the firmware's STATUS reply (STATUS IDLE PROGRESS 3/10
+    TEMP 200.0/210.0 ...).
+    """
+    parts = line.split()
+
+    if parts and parts[0] == "STATUS" and len(parts) > 1 and ':' not in parts[1]:
+        state.state = parts[1]
+        # Remaining words come in key/value pairs
+        for key, value in zip(parts[2::2], parts[3::2]):
+            _apply_status_value(state, key.upper(), value)
+        state.last_update = time.time()
+        return
+
+    for part in parts:
+        if ':' not in part:
+            continue
+
+        key, value = part.split(':', 1)
+        _apply_status_value(state, key.upper(), value)
+
+    state.last_update = time.time()
+
+
+def _apply_status_value(state: MachineState, key: str, value: str):
+    try:
+        if key == "STATE":
+            state.state = value
+        elif key == "TEMP":
+            if '/' in value:
+                current, target = value.split('/')
+                state.temperature_current = float(current)
+                state.temperature_target = float(target)
+        elif key == "PROGRESS":
+            if '/' in value:
+                # Firmware form: segments done / total
+                current, total = value.split('/')
+                state.current_segment = int(current)
+                state.total_segments = int(total)
+                state.progress = int(100 * state.current_segment / state.total_segments) \
+                    if state.total_segments else 0
+            else:
+                state.progress = int(value)
+        elif key == "SEGMENT":
+            if '/' in value:
+                current, total = value.split('/')
+                state.current_segment = int(current)
+                state.total_segments = int(total)
+        elif key == "ERROR":
+            state.error = True
+            state.error_message = value
+    except ValueError:
+        logger.debug(f"Bad status value {key}={value}")
+
+
+def apply_serial_line(state: MachineState, stats: BridgeStats, line: str) -> Optional[str]:
+    """
+    Update machine state and statistics from a line received from serial.
+
+    Returns:
+        LINE_IGNORED, LINE_STATE, LINE_DONE or LINE_ERROR
+    """
+    if line.startswith("STATUS:") or line.startswith("STATUS ") or "STATE:" in line:
+        parse_status_line(state, line)
+        return LINE_STATE
+
+    if line.startswith("PROGRESS:") or line.startswith("PROGRESS "):
+        _apply_status_value(state, "PROGRESS", line[len("PROGRESS:"):].strip())
+        return LINE_STATE
+
+    if line.startswith("DONE"):
+        state.state = "IDLE"
+        state.progress = 100
+        stats.record_splice()
+        return LINE_DONE
+
+    if line.startswith("ERROR"):
+        state.error = True
+        state.error_message = line[6:].strip() if len(line) > 6 else "Unknown error"
+        state.state = "ERROR"
+        stats.record_failure()
+        return LINE_ERROR
+
+    if line.startswith("{"):
+        return _apply_telemetry(state, line)
+
+    if line.startswith("TEMP:"):
+        # Temperature update: TEMP:200/210
+        try:
+            temps = line[5:].split('/')
+            state.temperature_current = float(temps[0])
+            if len(temps) > 1:
+                state.temperature_target = float(temps[1])
+            return LINE_STATE
+        except (ValueError, IndexError):
+            pass
+
+    return LINE_IGNORED
+
+
+def _apply_telemetry(state: MachineState, line: str) -> Optional[str]:
+    """Apply a STREAM SUMMARY/VERBOSE record ({"type":"telemetry",...})."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return LINE_IGNORED
+    if not isinstance(record, dict) or record.get("type") not in ("telemetry", "telemetry_v"):
+        return LINE_IGNORED
+
+    state.state = record.get("state", state.state)
+    temp = record.get("temp")
+    if isinstance(temp, dict):
+        # VERBOSE: "temp": {"current": ..., "target": ...}
+        state.temperature_current = temp.get("current", state.temperature_current)
+        state.temperature_target = temp.get("target", state.temperature_target)
+    elif temp is not None:
+        state.temperature_current = temp
+        state.temperature_target = record.get("target", state.temperature_target)
+    if "error" in record:
+        state.error = bool(record["error"])
+    state.last_update = time.time()
+    return LINE_STATE
+
+
+def state_payloads(state: MachineState, online: bool) -> dict[str, object]:
+    """Values of the status topics, by topic key."""
+    return {
+        "state": state.state,
+        "progress": state.progress,
+        "temp_current": state.temperature_current,
+        "temp_target": state.temperature_target,
+        "segment": state.current_segment,
+        "segments_total": state.total_segments,
+        "error": "ON" if state.error else "OFF",
+        "error_message": state.error_message,
+        # Online status - only ON when connected
+        "online": "ON" if online and state.state != "OFFLINE" else "OFF",
+    }
+
+
+def stats_payloads(stats: BridgeStats) -> dict[str, object]:
+    """Values of the statistics topics, by topic key."""
+    stats.reset_daily()
+    return {
+        "splices_today": stats.splices_today,
+        "splices_total": stats.splices_total,
+        "failures_today": stats.failures_today,
+        "uptime": stats.uptime_seconds,
+    }
+
+
+# State formats of StatePublisher
+STATE_FIELDS = "fields"   # One retained topic per field (default)
+STATE_JSON = "json"       # One retained JSON document (topic key state_json)
+STATE_BOTH = "both"
+STATE_FORMATS = (STATE_FIELDS, STATE_JSON, STATE_BOTH)
+
+# Fields published as soon as they change, never held back by min_interval
+IMMEDIATE_KEYS = frozenset({"state", "online", "error", "error_message"})
+
+
+@dataclass
+class PublishCounters:
+    """What a StatePublisher sent, compared to publishing every value."""
+    offered: int = 0      # Topic values handed to the publisher
+    published: int = 0    # MQTT messages actually sent
+    unchanged: int = 0    # Values dropped because the topic already had them
+    coalesced: int = 0    # Values replaced by a newer one within min_interval
+
+    @property
+    def saved(self) -> int:
+        """Messages not sent compared to publishing every offered value."""
+        return max(0, self.offered - self.published)
+
+
+class StatePublisher:
+    """
+    Publishes topic values only when they change, at most once per
+    min_interval per topic.
+
+    A value that arrives within min_interval of the topic's previous
+    message is held back; newer values replace it, and the latest one is
+    sent when the interval has passed (via schedule). IMMEDIATE_KEYS skip
+    the interval. In STATE_JSON format the status fields go out together
+    as one JSON document instead, under the same rules.
+    """
+
+    def __init__(self,
+                 publish: Callable[[str, object], None],
+                 topics: dict[str, str],
+                 min_interval: float = 0.0,
+                 state_format: str = STATE_FIELDS,
+                 schedule: Optional[Callable[[float, Callable[[], None]], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the publisher.
+
+        Args:
+            publish: Sends one retained message (topic, value)
+            topics: Topic names by key (make_topics())
+            min_interval: Minimum seconds between messages on one topic
+            state_format: STATE_FIELDS, STATE_JSON or STATE_BOTH
+            schedule: schedule(delay, callback) runs callback later, e.g.
+                loop.call_later; without it, held-back values go out with
+                the next update() or flush()
+            clock: Time source
+        """
+        if state_format not in STATE_FORMATS:
+            raise ValueError(f"Unknown state format: {state_format}")
+        self._publish = publish
+        self.topics = topics
+        self.min_interval = min_interval
+        self.state_format = state_format
+        self._schedule = schedule
+        self._clock = clock
+        self.counters = PublishCounters()
+
+        self._lock = threading.Lock()
+        self._sent: dict[str, object] = {}        # Topic -> last value sent
+        self._sent_at: dict[str, float] = {}      # Topic -> time of last message
+        self._held: dict[str, object] = {}        # Topic -> value waiting for its interval
+        self._document_urgent: dict[str, object] = {}
+        self._flush_scheduled = False
+
+    def update(self, values: dict[str, object], immediate: bool = False):
+        """
+        Offer new values by topic key (state_payloads(), stats_payloads()).
+
+        Args:
+            values: Topic key -> value
+            immediate: Ignore min_interval for these values
+        """
+        with self._lock:
+            messages = {}
+            fields = values
+            if self.state_format != STATE_FIELDS and "state" in values:
+                # The document is urgent when one of its IMMEDIATE_KEYS changed
+                document = json.dumps(values, sort_keys=True, separators=(',', ':'))
+                urgent = {key: value for key, value in values.items() if key in IMMEDIATE_KEYS}
+                messages[self.topics["state_json"]] = (
+                    document, immediate or urgent != self._document_urgent)
+                self._document_urgent = urgent
+                if self.state_format == STATE_JSON:
+                    # Availability stays a topic of its own
+                    fields = {key: value for key, value in values.items() if key == "online"}
+            for key, value in fields.items():
+                messages[self.topics[key]] = (value, immediate or key in IMMEDIATE_KEYS)
+
+            self.counters.offered += len(values)
+            now = self._clock()
+            due = {}
+            for topic, (value, urgent) in messages.items():
+                if topic in self._held:
+                    del self._held[topic]
+                    self.counters.coalesced += 1
+                if self._sent.get(topic, _UNSENT) == value:
+                    self.counters.unchanged += 1
+                elif urgent or now - self._sent_at.get(topic, -1e300) >= self.min_interval:
+                    due[topic] = value
+                else:
+                    self._held[topic] = value
+            due.update(self._take_due(now))
+            self._mark_sent(due, now)
+            delay = self._flush_delay(now)
+        self._send(due)
+        if delay is not None:
+            self._schedule(delay, self.flush)
+
+    def flush(self, force: bool = False):
+        """Send held-back values whose interval has passed (all if force)."""
+        with self._lock:
+            self._flush_scheduled = False
+            now = self._clock()
+            due = self._take_due(now, force)
+            self._mark_sent(due, now)
+            delay = self._flush_delay(now)
+        self._send(due)
+        if delay is not None:
+            self._schedule(delay, self.flush)
+
+    def reset(self):
+        """Forget what was sent, so the next update() republishes everything."""
+        with self._lock:
+            self._sent.clear()
+            self._sent_at.clear()
+            self._document_urgent = {}
+
+    def _take_due(self, now: float, force: bool = False) -> dict[str, object]:
+        due = {topic: value for topic, value in self._held.items()
+               if force or now - self._sent_at.get(topic, -1e300) >= self.min_interval}
+        for topic in due:
+            del self._held[topic]
+        return due
+
+    def _mark_sent(self, due: dict[str, object], now: float):
+        for topic, value in due.items():
+            self._sent[topic] = value
+            self._sent_at[topic] = now
+        self.counters.published += len(due)
+
+    def _flush_delay(self, now: float) -> Optional[float]:
+        """Delay of the flush to schedule, or None if none is needed."""
+        if not self._held or self._schedule is None or self._flush_scheduled:
+            return None
+        self._flush_scheduled = True
+        return max(0.0, min(self._sent_at.get(topic, now) + self.min_interval - now
+                            for topic in self._held))
+
+    def _send(self, due: dict[str, object]):
+        for topic, value in due.items():
+            self._publish(topic, value)
+
+
+_UNSENT = object()
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Splice3D Fleet Bridge Service
+
+Bridges many Splice3D machines to MQTT from one process. Each machine
+gets its own topic namespace below the prefix, named after the machine:
+
+    home/splice3d/<name>/status/...     (as mqtt_bridge.py, per machine)
+    home/splice3d/<name>/stats/...
+    home/splice3d/<name>/command/...
+    home/splice3d/bridge/online         (bridge availability, MQTT will)
+
+All machines share one MQTT connection and one wildcard subscription for
+their command topics. Status topics are only published when they change
+(bridge_core.StatePublisher), at most every --min-interval seconds per
+topic. Every machine is served by an asyncio connection
+(async_serial.AsyncSplice3D) in the same event loop, so a machine costs a
+read task and its state, not a thread, a lock and a broker connection.
+
+Usage:
+    python fleet_bridge.py --device splicer1=/dev/ttyUSB0 --device splicer2=/dev/ttyUSB1
+    python fleet_bridge.py --devices-file /etc/splice3d/devices.json --mqtt-host broker
+
+The devices file maps names to ports: {"splicer1": "/dev/ttyUSB0", ...},
+or lists {"name": ..., "port": ..., "baud": ...} objects.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "postprocessor"))
+
+from async_serial import AsyncSplice3D, LineSubscription
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bridge_core import (
+    LINE_DONE,
+    LINE_ERROR,
+    LINE_STATE,
+    STATE_FIELDS,
+    STATE_FORMATS,
+    TOPIC_PATHS,
+    TOPIC_PREFIX,
+    MachineState,
+    StatePublisher,
+    apply_serial_line,
+    command_for,
+    make_topics,
+    state_payloads,
+    stats_payloads,
+)
+from stats_journal import EVENT_FAILURE, EVENT_SPLICE, JournalWriter, StatsJournal
+
+logger = logging.getLogger('splice3d-fleet')
+
+# Characters that cannot appear in an MQTT topic level
+_RESERVED = set("/+#")
+
+# Command topic path ("command/start") -> topic key ("cmd_start")
+_COMMAND_PATHS = {path: key for key, path in TOPIC_PATHS.items() if key.startswith("cmd_")}
+
+# Seconds shutdown waits for the machine tasks after closing their connections
+SHUTDOWN_TIMEOUT = 5.0
+
+
+@dataclass
+class DeviceConfig:
+    """One machine of the fleet."""
+    name: str
+    port: str
+    baud: int = 115200
+
+    def __post_init__(self):
+        if not self.name or _RESERVED & set(self.name):
+            raise ValueError(f"Invalid device name (used as an MQTT topic level): {self.name!r}")
+
+    @classmethod
+    def parse(cls, spec: str) -> "DeviceConfig":
+        """Parse NAME=PORT[@BAUD]."""
+        name, sep, port = spec.partition('=')
+        if not sep or not port:
+            raise ValueError(f"Expected NAME=PORT[@BAUD], got {spec!r}")
+        port, _, baud = port.partition('@')
+        return cls(name.strip(), port.strip(), int(baud) if baud else 115200)
+
+
+def load_devices_file(path: Path) -> list[DeviceConfig]:
+    """Read devices from a JSON file (name -> port map, or list of objects)."""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [DeviceConfig(name, port) for name, port in data.items()]
+    return [DeviceConfig(**entry) for entry in data]
+
+
+class DeviceBridge:
+    """
+    State, statistics and serial connection of one machine in the fleet.
+    """
+
+    def __init__(self, config: DeviceConfig, fleet: "FleetBridge"):
+        self.config = config
+        self.fleet = fleet
+        self.topics = make_topics(f"{fleet.prefix}/{config.name}")
+        self.stats_file = fleet.stats_dir / f"{config.name}.json"
+        self.journal = StatsJournal(self.stats_file, fleet.journal_writer)
+        self.stats = self.journal.load()
+        self.state = MachineState()
+        self.machine: Optional[AsyncSplice3D] = None
+        self._lines: Optional[LineSubscription] = None
+        self._stopping = False
+        self.publisher = StatePublisher(fleet.publish, self.topics, fleet.min_interval,
+                                        fleet.state_format, schedule=fleet.schedule)
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    @property
+    def connected(self) -> bool:
+        return self.machine is not None and self.machine.connected
+
+    async def run(self):
+        """Connect, handle lines until the connection drops, reconnect (until stop())."""
+        while not self._stopping:
+            try:
+                machine = await self.fleet.connect(self.config)
+            except Exception as e:
+                logger.error(f"{self.name}: serial connection failed: {e}")
+                await asyncio.sleep(self.fleet.reconnect_delay)
+                continue
+            self.machine = machine
+            if self._stopping:
+                await machine.close()
+                break
+
+            logger.info(f"{self.name}: connected to {self.config.port}")
+            self._lines = machine.lines()
+            await self.poll()
+            async for line in self._lines:
+                self.handle_line(line)
+            if self._stopping:
+                break
+
+            logger.warning(f"{self.name}: serial connection lost")
+            await self.machine.close()
+            self.state.state = "OFFLINE"
+            self.publish_state()
+            await asyncio.sleep(self.fleet.reconnect_delay)
+
+    async def stop(self):
+        """
+        End run(): close the line subscription and the connection, which
+        also fails an in-flight command (cancelling the task alone can be
+        lost while a command awaits its response).
+        """
+        self._stopping = True
+        if self._lines:
+            self._lines.close()
+        if self.machine:
+            await self.machine.close()
+
+    async def close(self):
+        if self.machine:
+            await self.machine.close()
+        self.state.state = "OFFLINE"
+        self.publish_state()
+        self.publisher.flush(force=True)
+        self.journal.compact()
+
+    def handle_line(self, line: str):
+        """Handle a line received from serial."""
+        logger.debug(f"{self.name}: {line}")
+
+        result = apply_serial_line(self.state, self.stats, line)
+        if result == LINE_STATE:
+            self.publish_state()
+        elif result in (LINE_DONE, LINE_ERROR):
+            self.journal.record(EVENT_SPLICE if result == LINE_DONE else EVENT_FAILURE)
+            self.publish_state(immediate=True)
+            self.publish_stats(immediate=True)
+            if result == LINE_DONE:
+                logger.info(f"{self.name}: splice completed successfully")
+            else:
+                logger.error(f"{self.name}: machine error: {self.state.error_message}")
+
+    async def command(self, command: str) -> list[str]:
+        """Send a command to the machine and return its response lines."""
+        if not self.connected:
+            logger.error(f"{self.name}: serial port not connected")
+            return []
+        try:
+            responses = await self.machine.command(command)
+        except ConnectionError as e:
+            logger.error(f"{self.name}: {e}")
+            return []
+        logger.debug(f"{self.name}: command '{command}' -> {responses}")
+        return responses
+
+    async def poll(self):
+        """Query STATUS and apply the response."""
+        for line in await self.command("STATUS"):
+            self.handle_line(line)
+
+    def publish_state(self, immediate: bool = False):
+        self.publisher.update(state_payloads(self.state, self.connected), immediate)
+
+    def publish_stats(self, immediate: bool = False):
+        payloads = stats_payloads(self.stats)
+        payloads["messages_saved"] = self.publisher.counters.saved
+        self.publisher.update(payloads, immediate)
+
+
+class FleetBridge:
+    """
+    MQTT bridge for a fleet of Splice3D machines sharing one MQTT client.
+    """
+
+    def __init__(self,
+                 devices: list[DeviceConfig],
+                 mqtt_client,
+                 prefix: str = TOPIC_PREFIX,
+                 stats_dir: Path = Path("/var/lib/splice3d"),
+                 poll_interval: float = 5.0,
+                 stats_interval: float = 60.0,
+                 reconnect_delay: float = 5.0,
+                 min_interval: float = 1.0,
+                 state_format: str = STATE_FIELDS,
+                 connect: Optional[Callable[[DeviceConfig], Awaitable[AsyncSplice3D]]] = None):
+        """
+        Initialize the bridge.
+
+        Args:
+            devices: Machines to bridge (unique names)
+            mqtt_client: paho-mqtt Client (or compatible); the bridge sets
+                its on_connect/on_message callbacks
+            prefix: Topic prefix; machine topics go below prefix/<name>
+            stats_dir: Directory of the per-machine statistics files
+            poll_interval: Seconds between STATUS polls
+            stats_interval: Seconds between statistics publications
+            reconnect_delay: Seconds between serial reconnection attempts
+            min_interval: Minimum seconds between updates of one topic
+                (state changes and errors are sent at once)
+            state_format: bridge_core.STATE_FIELDS, STATE_JSON or STATE_BOTH
+            connect: Opens a machine connection (default: serial port via
+                AsyncSplice3D.open_serial)
+        """
+        names = [device.name for device in devices]
+        if len(set(names)) != len(names):
+            raise ValueError("Device names must be unique")
+
+        self.prefix = prefix
+        self.stats_dir = stats_dir
+        self.poll_interval = poll_interval
+        self.stats_interval = stats_interval
+        self.reconnect_delay = reconnect_delay
+        self.min_interval = min_interval
+        self.state_format = state_format
+        self.connect = connect or (lambda device: AsyncSplice3D.open_serial(device.port,
+                                                                            device.baud))
+        self.availability_topic = f"{prefix}/bridge/online"
+        self.command_filter = f"{prefix}/+/command/#"
+
+        self.mqtt_client = mqtt_client
+        mqtt_client.on_connect = self._on_mqtt_connect
+        mqtt_client.on_message = self._on_mqtt_message
+
+        # One thread writes the statistics journals of all machines
+        self.journal_writer = JournalWriter()
+        self.devices = {device.name: DeviceBridge(device, self) for device in devices}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: list[asyncio.Task] = []
+        self._polls: set[asyncio.Task] = set()
+
+    # --- MQTT ---------------------------------------------------------------
+
+    def publish(self, topic: str, value):
+        """Publish a retained value (dropped while MQTT is disconnected)."""
+        if not self.mqtt_client.is_connected():
+            return
+        try:
+            self.mqtt_client.publish(topic, value, retain=True)
+        except Exception as e:
+            logger.error(f"Error publishing {topic}: {e}")
+
+    def schedule(self, delay: float, callback: Callable[[], None]):
+        """Run a delayed StatePublisher flush in the event loop."""
+        self._loop.call_later(delay, callback)
+
+    def _on_mqtt_connect(self, client, userdata, flags, rc, properties=None):
+        """Handle MQTT connection (called from the MQTT client's thread)."""
+        if rc == 0:
+            logger.info("Connected to MQTT broker")
+            client.subscribe(self.command_filter)
+            if self._loop:
+                self._loop.call_soon_threadsafe(self._publish_all)
+        else:
+            logger.error(f"MQTT connection failed with code {rc}")
+
+    def _on_mqtt_message(self, client, userdata, msg):
+        """Handle a command message (called from the MQTT client's thread)."""
+        payload = msg.payload.decode('utf-8', errors='replace').strip()
+        if self._loop:
+            self._loop.call_soon_threadsafe(self.dispatch_command, msg.topic, payload)
+
+    def dispatch_command(self, topic: str, payload: str) -> Optional[asyncio.Task]:
+        """
+        Route a command topic message to its machine (in the event loop).
+
+        Returns:
+            The task sending the command, or None if the topic is unknown
+        """
+        if not topic.startswith(f"{self.prefix}/"):
+            return None
+        name, _, path = topic[len(self.prefix) + 1:].partition('/')
+        device = self.devices.get(name)
+        command = command_for(_COMMAND_PATHS.get(path, ""), payload)
+        if device is None or command is None:
+            logger.debug(f"Ignoring message on {topic}")
+            return None
+
+        logger.info(f"{name}: received command {command}")
+        return asyncio.get_running_loop().create_task(device.command(command))
+
+    def _publish_all(self):
+        self.publish(self.availability_topic, "ON")
+        for device in self.devices.values():
+            # The broker may have lost the retained values; send everything
+            device.publisher.reset()
+            device.publish_state()
+            device.publish_stats()
+
+    # --- Main loop ----------------------------------------------------------
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """
+        Run until stop is set (or forever).
+
+        Args:
+            stop: Event that ends the bridge
+        """
+        self._loop = asyncio.get_running_loop()
+        stop = stop or asyncio.Event()
+        self.journal_writer.start()
+        self._tasks = [self._loop.create_task(device.run()) for device in self.devices.values()]
+        logger.info(f"Fleet bridge running with {len(self.devices)} machines")
+        self._publish_all()
+
+        last_stats = self._loop.time()
+        stopped = self._loop.create_task(stop.wait())
+        try:
+            while not stop.is_set():
+                await asyncio.wait((stopped,), timeout=self.poll_interval)
+                if stop.is_set():
+                    break
+
+                # One STATUS round for all machines; they answer in parallel.
+                # A stop ends the wait; shutdown() ends the round.
+                round_ = self._loop.create_task(self._poll_all())
+                self._polls.add(round_)
+                round_.add_done_callback(self._polls.discard)
+                await asyncio.wait((round_, stopped), return_when=asyncio.FIRST_COMPLETED)
+
+                if self._loop.time() - last_stats >= self.stats_interval:
+                    for device in self.devices.values():
+                        device.publish_stats()
+                    last_stats = self._loop.time()
+        finally:
+            stopped.cancel()
+            await self.shutdown()
+
+    async def _poll_all(self):
+        await asyncio.gather(*(device.poll() for device in self.devices.values()
+                               if device.connected))
+
+    async def shutdown(self):
+        """Stop serving machines, publish them offline and save statistics."""
+        await asyncio.gather(*(device.stop() for device in self.devices.values()))
+        tasks = self._tasks + list(self._polls)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=SHUTDOWN_TIMEOUT)
+            if pending:
+                logger.warning(f"{len(pending)} machine tasks did not stop "
+                               f"within {SHUTDOWN_TIMEOUT}s")
+        self._tasks = []
+        await asyncio.gather(*(device.close() for device in self.devices.values()))
+        self.publish(self.availability_topic, "OFF")
+        # Final snapshots, written off the event loop
+        await self._loop.run_in_executor(None, self.journal_writer.stop)
+
+
+def create_mqtt_client(args, availability_topic: str):
+    """Create and connect the shared paho-mqtt client."""
+    try:
+        import paho.mqtt.client as mqtt
+    except ImportError:
+        print("Error: paho-mqtt not installed. Run: pip install paho-mqtt")
+        sys.exit(1)
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=args.mqtt_client_id)
+    if args.mqtt_username:
+        client.username_pw_set(args.mqtt_username, args.mqtt_password)
+    # Last Will Testament (LWT) for offline detection of the whole bridge
+    client.will_set(availability_topic, "OFF", retain=True)
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Splice3D Fleet Bridge - many machines, one MQTT connection"
+    )
+    parser.add_argument(
+        "-d", "--device",
+        action="append",
+        default=[],
+        metavar="NAME=PORT[@BAUD]",
+        help="Machine to bridge (repeatable)"
+    )
+    parser.add_argument(
+        "--devices-file",
+        type=Path,
+        default=os.environ.get("SPLICE3D_DEVICES_FILE"),
+        help="JSON file of machines (default: $SPLICE3D_DEVICES_FILE)"
+    )
+    parser.add_argument(
+        "--prefix",
+        default=os.environ.get("SPLICE3D_TOPIC_PREFIX", TOPIC_PREFIX),
+        help=f"Topic prefix (default: {TOPIC_PREFIX})"
+    )
+    parser.add_argument(
+        "--mqtt-host",
+        default=os.environ.get("MQTT_HOST", "localhost"),
+        help="MQTT broker host (default: $MQTT_HOST or localhost)"
+    )
+    parser.add_argument(
+        "--mqtt-port",
+        type=int,
+        default=int(os.environ.get("MQTT_PORT", "1883")),
+        help="MQTT broker port (default: 1883)"
+    )
+    parser.add_argument(
+        "--mqtt-username",
+        default=os.environ.get("MQTT_USERNAME"),
+        help="MQTT username (default: $MQTT_USERNAME)"
+    )
+    parser.add_argument(
+        "--mqtt-password",
+        default=os.environ.get("MQTT_PASSWORD"),
+        help="MQTT password (default: $MQTT_PASSWORD)"
+    )
+    parser.add_argument(
+        "--mqtt-client-id",
+        default="splice3d-fleet-bridge",
+        help="MQTT client id (default: splice3d-fleet-bridge)"
+    )
+    parser.add_argument(
+        "--stats-dir",
+        type=Path,
+        default=Path(os.environ.get("SPLICE3D_STATS_DIR", "/var/lib/splice3d")),
+        help="Directory of per-machine statistics files"
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=float(os.environ.get("SPLICE3D_MIN_INTERVAL", "1.0")),
+        help="Minimum seconds between updates of one topic; state changes and "
+             "errors are sent at once (default: 1.0)"
+    )
+    parser.add_argument(
+        "--state-format",
+        choices=STATE_FORMATS,
+        default=STATE_FIELDS,
+        help="Publish machine status as one topic per field, one JSON topic "
+             "(<prefix>/<name>/status/json) or both (default: fields)"
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Enable verbose logging"
+    )
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        devices = [DeviceConfig.parse(spec) for spec in args.device]
+        if args.devices_file:
+            devices += load_devices_file(args.devices_file)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Error: {e}")
+        return 1
+    if not devices:
+        print("Error: no machines. Use --device NAME=PORT or --devices-file.")
+        return 1
+
+    availability_topic = f"{args.prefix}/bridge/online"
+    client = create_mqtt_client(args, availability_topic)
+
+    async def serve() -> int:
+        try:
+            bridge = FleetBridge(devices, client, prefix=args.prefix, stats_dir=args.stats_dir,
+                                 min_interval=args.min_interval,
+                                 state_format=args.state_format)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+
+        try:
+            client.connect(args.mqtt_host, args.mqtt_port, keepalive=60)
+        except Exception as e:
+            logger.error(f"MQTT connection failed: {e}")
+            return 1
+        client.loop_start()
+        try:
+            await bridge.run(stop)
+        finally:
+            client.loop_stop()
+            client.disconnect()
+        logger.info("Shutdown complete")
+        return 0
+
+    return asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
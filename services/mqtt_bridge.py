@@ -11,15 +11,12 @@ Usage:
 """
 
 import argparse
-import json
 import logging
 import os
 import signal
 import sys
 import time
 import threading
-from dataclasses import dataclass, field
-from datetime import datetime, date
 from pathlib import Path
 from typing import Optional
 
@@ -36,6 +33,31 @@ except ImportError:
     print("Error: paho-mqtt not installed. Run: pip install paho-mqtt")
     sys.exit(1)
 
+# Add parent to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "postprocessor"))
+
+from serial_reader import SerialReader
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bridge_core import (
+    LINE_DONE,
+    LINE_ERROR,
+    LINE_STATE,
+    STATE_FIELDS,
+    STATE_FORMATS,
+    TOPIC_PREFIX,
+    BridgeStats,
+    MachineState,
+    StatePublisher,
+    apply_serial_line,
+    command_for,
+    make_topics,
+    state_payloads,
+    stats_payloads,
+)
+from stats_journal import EVENT_FAILURE, EVENT_SPLICE, JournalWriter, StatsJournal
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -44,106 +66,7 @@ logging.basicConfig(
 logger = logging.getLogger('splice3d-bridge')
 
 
-# MQTT Topic Configuration
-TOPIC_PREFIX = "home/splice3d"
-TOPICS = {
-    # Status topics (published by bridge)
-    "state": f"{TOPIC_PREFIX}/status/state",
-    "progress": f"{TOPIC_PREFIX}/status/progress/percent",
-    "temp_current": f"{TOPIC_PREFIX}/status/temperature/current",
-    "temp_target": f"{TOPIC_PREFIX}/status/temperature/target",
-    "online": f"{TOPIC_PREFIX}/status/online",
-    "segment": f"{TOPIC_PREFIX}/status/segment/current",
-    "segments_total": f"{TOPIC_PREFIX}/status/segment/total",
-    "error": f"{TOPIC_PREFIX}/status/error",
-    "error_message": f"{TOPIC_PREFIX}/status/error_message",
-
-    # Statistics topics
-    "splices_today": f"{TOPIC_PREFIX}/stats/splices_today",
-    "splices_total": f"{TOPIC_PREFIX}/stats/splices_total",
-    "failures_today": f"{TOPIC_PREFIX}/stats/failures_today",
-    "uptime": f"{TOPIC_PREFIX}/stats/uptime_seconds",
-
-    # Command topics (subscribed by bridge)
-    "cmd_start": f"{TOPIC_PREFIX}/command/start",
-    "cmd_pause": f"{TOPIC_PREFIX}/command/pause",
-    "cmd_resume": f"{TOPIC_PREFIX}/command/resume",
-    "cmd_abort": f"{TOPIC_PREFIX}/command/abort",
-    "cmd_preheat": f"{TOPIC_PREFIX}/command/preheat",
-    "cmd_cooldown": f"{TOPIC_PREFIX}/command/cooldown",
-}
-
-
-@dataclass
-class BridgeStats:
-    """Statistics tracking for the bridge."""
-    splices_today: int = 0
-    splices_total: int = 0
-    failures_today: int = 0
-    failures_total: int = 0
-    last_reset_date: str = field(default_factory=lambda: date.today().isoformat())
-    start_time: float = field(default_factory=time.time)
-
-    def reset_daily(self):
-        """Reset daily counters if date has changed."""
-        today = date.today().isoformat()
-        if today != self.last_reset_date:
-            logger.info(f"Resetting daily stats (was {self.last_reset_date}, now {today})")
-            self.splices_today = 0
-            self.failures_today = 0
-            self.last_reset_date = today
-
-    def record_splice(self):
-        """Record a successful splice."""
-        self.reset_daily()
-        self.splices_today += 1
-        self.splices_total += 1
-
-    def record_failure(self):
-        """Record a failure."""
-        self.reset_daily()
-        self.failures_today += 1
-        self.failures_total += 1
-
-    @property
-    def uptime_seconds(self) -> int:
-        """Get uptime in seconds."""
-        return int(time.time() - self.start_time)
-
-    def to_dict(self) -> dict:
-        """Convert to dictionary for persistence."""
-        return {
-            "splices_today": self.splices_today,
-            "splices_total": self.splices_total,
-            "failures_today": self.failures_today,
-            "failures_total": self.failures_total,
-            "last_reset_date": self.last_reset_date,
-        }
-
-    @classmethod
-    def from_dict(cls, data: dict) -> "BridgeStats":
-        """Create from dictionary."""
-        stats = cls()
-        stats.splices_total = data.get("splices_total", 0)
-        stats.failures_total = data.get("failures_total", 0)
-        stats.last_reset_date = data.get("last_reset_date", date.today().isoformat())
-        # Daily stats are reset on load
-        stats.reset_daily()
-        return stats
-
-
-@dataclass
-class MachineState:
-    """Current state of the Splice3D machine."""
-    state: str = "OFFLINE"
-    progress: int = 0
-    current_segment: int = 0
-    total_segments: int = 0
-    temperature_current: float = 0.0
-    temperature_target: float = 0.0
-    error: bool = False
-    error_message: str = ""
-    last_update: float = field(default_factory=time.time)
+TOPICS = make_topics(TOPIC_PREFIX)
 
 
 class Splice3DMQTTBridge:
@@ -159,10 +82,13 @@ class Splice3DMQTTBridge:
         mqtt_password: Optional[str] = None,
         mqtt_client_id: str = "splice3d-bridge",
         stats_file: Optional[Path] = None,
+        min_interval: float = 1.0,
+        state_format: str = STATE_FIELDS,
     ):
         self.serial_port = serial_port
         self.serial_baud = serial_baud
         self.serial: Optional[serial.Serial] = None
+        self.reader: Optional[SerialReader] = None
 
         self.mqtt_host = mqtt_host
         self.mqtt_port = mqtt_port
@@ -172,31 +98,26 @@ class Splice3DMQTTBridge:
         self.mqtt_client: Optional[mqtt.Client] = None
 
         self.stats_file = stats_file or Path("/var/lib/splice3d/stats.json")
+        # Splices and failures are journaled by a writer thread
+        self.journal_writer = JournalWriter()
+        self.journal = StatsJournal(self.stats_file, self.journal_writer)
         self.stats = self._load_stats()
         self.state = MachineState()
+        # Only changed values go out, each topic at most every min_interval
+        self.publisher = StatePublisher(self._publish, TOPICS, min_interval,
+                                        state_format, schedule=self._schedule_flush)
 
         self.running = False
         self.reconnect_delay = 5
-        self._serial_lock = threading.Lock()
+        self._serial_lost = threading.Event()
 
     def _load_stats(self) -> BridgeStats:
-        """Load statistics from file."""
-        try:
-            if self.stats_file.exists():
-                with open(self.stats_file) as f:
-                    return BridgeStats.from_dict(json.load(f))
-        except Exception as e:
-            logger.warning(f"Could not load stats: {e}")
-        return BridgeStats()
+        """Load statistics from file, replaying the journal."""
+        return self.journal.load()
 
     def _save_stats(self):
-        """Save statistics to file."""
-        try:
-            self.stats_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.stats_file, 'w') as f:
-                json.dump(self.stats.to_dict(), f, indent=2)
-        except Exception as e:
-            logger.error(f"Could not save stats: {e}")
+        """Save a statistics snapshot and wait for it to be written."""
+        self.journal.close()
 
     def _on_mqtt_connect(self, client, userdata, flags, rc, properties=None):
         """Handle MQTT connection."""
@@ -208,8 +129,10 @@ class Splice3DMQTTBridge:
                     topic = TOPICS[topic_key]
                     client.subscribe(topic)
                     logger.debug(f"Subscribed to {topic}")
-            # Publish online status
+            # Publish online status (everything again, the broker may be new)
+            self.publisher.reset()
             self._publish_state()
+            self._publish_stats()
         else:
             logger.error(f"MQTT connection failed with code {rc}")
 
@@ -225,166 +148,66 @@ class Splice3DMQTTBridge:
         logger.info(f"Received command: {topic} = {payload}")
 
         # Map topics to commands
-        topic_to_cmd = {
-            TOPICS["cmd_start"]: "START",
-            TOPICS["cmd_pause"]: "PAUSE",
-            TOPICS["cmd_resume"]: "RESUME",
-            TOPICS["cmd_abort"]: "ABORT",
-            TOPICS["cmd_preheat"]: "PREHEAT",
-            TOPICS["cmd_cooldown"]: "COOLDOWN",
-        }
-
-        if topic in topic_to_cmd:
-            cmd = topic_to_cmd[topic]
-            # Add payload as argument if present
-            if payload and payload != "1":
-                cmd = f"{cmd} {payload}"
-            self._send_serial_command(cmd)
+        topic_keys = {TOPICS[key]: key for key in TOPICS if key.startswith("cmd_")}
+
+        if topic in topic_keys:
+            self._send_serial_command(command_for(topic_keys[topic], payload))
 
     def _send_serial_command(self, command: str) -> list[str]:
         """Send command to serial port and return responses."""
-        if not self.serial or not self.serial.is_open:
+        if not self.reader or not self.reader.running:
             logger.error("Serial port not connected")
             return []
 
-        with self._serial_lock:
-            try:
-                self.serial.write(f"{command}\n".encode('utf-8'))
-                self.serial.flush()
-
-                responses = []
-                start_time = time.time()
-                timeout = 2.0
-
-                while time.time() - start_time < timeout:
-                    if self.serial.in_waiting:
-                        line = self.serial.readline().decode('utf-8', errors='replace').strip()
-                        if line:
-                            responses.append(line)
-                            if line.startswith('OK') or line.startswith('ERROR'):
-                                break
-                    else:
-                        time.sleep(0.01)
-
-                logger.debug(f"Command '{command}' -> {responses}")
-                return responses
-
-            except serial.SerialException as e:
-                logger.error(f"Serial error: {e}")
-                return []
-
-    def _parse_status_line(self, line: str):
-        """Parse a status line from the machine and update state."""
-        # Status format: STATE:IDLE TEMP:200/210 PROGRESS:0 SEGMENT:0/0
-        parts = line.split()
-
-        for part in parts:
-            if ':' not in part:
-                continue
-
-            key, value = part.split(':', 1)
-            key = key.upper()
-
-            if key == "STATE":
-                self.state.state = value
-            elif key == "TEMP":
-                if '/' in value:
-                    current, target = value.split('/')
-                    self.state.temperature_current = float(current)
-                    self.state.temperature_target = float(target)
-            elif key == "PROGRESS":
-                self.state.progress = int(value)
-            elif key == "SEGMENT":
-                if '/' in value:
-                    current, total = value.split('/')
-                    self.state.current_segment = int(current)
-                    self.state.total_segments = int(total)
-            elif key == "ERROR":
-                self.state.error = True
-                self.state.error_message = value
-
-        self.state.last_update = time.time()
+        responses = self.reader.command(command, timeout=2.0)
+        logger.debug(f"Command '{command}' -> {responses}")
+        return responses
 
     def _handle_serial_line(self, line: str):
         """Handle a line received from serial."""
         logger.debug(f"Serial: {line}")
 
-        if line.startswith("STATUS:") or "STATE:" in line:
-            self._parse_status_line(line)
-            self._publish_state()
-
-        elif line.startswith("PROGRESS:"):
-            try:
-                self.state.progress = int(line.split(':')[1])
-                self._publish_state()
-            except ValueError:
-                pass
-
-        elif line.startswith("DONE"):
-            self.state.state = "IDLE"
-            self.state.progress = 100
-            self.stats.record_splice()
-            self._save_stats()
-            self._publish_state()
-            self._publish_stats()
-            logger.info("Splice completed successfully")
-
-        elif line.startswith("ERROR"):
-            self.state.error = True
-            self.state.error_message = line[6:].strip() if len(line) > 6 else "Unknown error"
-            self.state.state = "ERROR"
-            self.stats.record_failure()
-            self._save_stats()
+        result = apply_serial_line(self.state, self.stats, line)
+        if result == LINE_STATE:
             self._publish_state()
-            self._publish_stats()
-            logger.error(f"Machine error: {self.state.error_message}")
-
-        elif line.startswith("TEMP:"):
-            # Temperature update: TEMP:200/210
-            try:
-                temps = line[5:].split('/')
-                self.state.temperature_current = float(temps[0])
-                if len(temps) > 1:
-                    self.state.temperature_target = float(temps[1])
-                self._publish_state()
-            except (ValueError, IndexError):
-                pass
-
-    def _publish_state(self):
-        """Publish current state to MQTT."""
+        elif result in (LINE_DONE, LINE_ERROR):
+            self.journal.record(EVENT_SPLICE if result == LINE_DONE else EVENT_FAILURE)
+            self._publish_state(immediate=True)
+            self._publish_stats(immediate=True)
+            if result == LINE_DONE:
+                logger.info("Splice completed successfully")
+            else:
+                logger.error(f"Machine error: {self.state.error_message}")
+
+    def _publish_state(self, immediate: bool = False):
+        """Publish the changed parts of the current state to MQTT."""
         if not self.mqtt_client or not self.mqtt_client.is_connected():
             return
 
-        try:
-            self.mqtt_client.publish(TOPICS["state"], self.state.state, retain=True)
-            self.mqtt_client.publish(TOPICS["progress"], self.state.progress, retain=True)
-            self.mqtt_client.publish(TOPICS["temp_current"], self.state.temperature_current, retain=True)
-            self.mqtt_client.publish(TOPICS["temp_target"], self.state.temperature_target, retain=True)
-            self.mqtt_client.publish(TOPICS["segment"], self.state.current_segment, retain=True)
-            self.mqtt_client.publish(TOPICS["segments_total"], self.state.total_segments, retain=True)
-            self.mqtt_client.publish(TOPICS["error"], "ON" if self.state.error else "OFF", retain=True)
-            self.mqtt_client.publish(TOPICS["error_message"], self.state.error_message, retain=True)
-
-            # Online status - only published when connected
-            online = self.serial and self.serial.is_open and self.state.state != "OFFLINE"
-            self.mqtt_client.publish(TOPICS["online"], "ON" if online else "OFF", retain=True)
-
-        except Exception as e:
-            logger.error(f"Error publishing state: {e}")
+        online = bool(self.serial and self.serial.is_open)
+        self.publisher.update(state_payloads(self.state, online), immediate)
 
-    def _publish_stats(self):
-        """Publish statistics to MQTT."""
+    def _publish_stats(self, immediate: bool = False):
+        """Publish the changed statistics to MQTT."""
         if not self.mqtt_client or not self.mqtt_client.is_connected():
             return
 
+        payloads = stats_payloads(self.stats)
+        payloads["messages_saved"] = self.publisher.counters.saved
+        self.publisher.update(payloads, immediate)
+
+    def _publish(self, topic: str, value):
+        """Publish one retained value (called by the StatePublisher)."""
         try:
-            self.stats.reset_daily()
-            self.mqtt_client.publish(TOPICS["splices_today"], self.stats.splices_today, retain=True)
-            self.mqtt_client.publish(TOPICS["splices_total"], self.stats.splices_total, retain=True)
-            self.mqtt_client.publish(TOPICS["failures_today"], self.stats.failures_today, retain=True)
-            self.mqtt_client.publish(TOPICS["uptime"], self.stats.uptime_seconds, retain=True)
+            self.mqtt_client.publish(topic, value, retain=True)
         except Exception as e:
-            logger.error(f"Error publishing stats: {e}")
+            logger.error(f"Error publishing {topic}: {e}")
+
+    def _schedule_flush(self, delay: float, flush):
+        """Run a delayed StatePublisher flush on a timer thread."""
+        timer = threading.Timer(delay, flush)
+        timer.daemon = True
+        timer.start()
 
     def _connect_serial(self) -> bool:
         """Connect to serial port."""
@@ -392,7 +215,7 @@ class Splice3DMQTTBridge:
             self.serial = serial.Serial(
                 port=self.serial_port,
                 baudrate=self.serial_baud,
-                timeout=0.1
+                timeout=1.0
             )
             # Wait for Arduino reset
             time.sleep(2)
@@ -403,6 +226,11 @@ class Splice3DMQTTBridge:
 
             logger.info(f"Connected to serial port {self.serial_port}")
 
+            self._serial_lost.clear()
+            self.reader = SerialReader(self.serial, on_error=self._on_serial_error)
+            self.reader.subscribe(self._handle_serial_line)
+            self.reader.start()
+
             # Query initial status
             self._send_serial_command("STATUS")
 
@@ -441,34 +269,31 @@ class Splice3DMQTTBridge:
             logger.error(f"MQTT connection failed: {e}")
             return False
 
-    def _serial_read_loop(self):
-        """Background thread for reading serial data."""
+    def _on_serial_error(self, error: Exception):
+        """Handle a failed serial read (called from the reader thread)."""
+        self.state.state = "OFFLINE"
+        self._publish_state()
+        if self.serial:
+            try:
+                self.serial.close()
+            except Exception:
+                pass
+            self.serial = None
+        self.reader = None
+        self._serial_lost.set()
+
+    def _serial_reconnect_loop(self):
+        """Background thread that reconnects the serial port when it is lost."""
         while self.running:
-            if not self.serial or not self.serial.is_open:
-                time.sleep(self.reconnect_delay)
-                if self.running:
-                    logger.info("Attempting serial reconnection...")
-                    self._connect_serial()
+            if self.serial and self.serial.is_open:
+                # Lines are handled by the reader thread; sleep until it fails
+                self._serial_lost.wait(1.0)
                 continue
 
-            try:
-                if self.serial.in_waiting:
-                    with self._serial_lock:
-                        line = self.serial.readline().decode('utf-8', errors='replace').strip()
-                    if line:
-                        self._handle_serial_line(line)
-                else:
-                    time.sleep(0.01)
-            except serial.SerialException as e:
-                logger.error(f"Serial read error: {e}")
-                self.state.state = "OFFLINE"
-                self._publish_state()
-                if self.serial:
-                    try:
-                        self.serial.close()
-                    except:
-                        pass
-                    self.serial = None
+            time.sleep(self.reconnect_delay)
+            if self.running:
+                logger.info("Attempting serial reconnection...")
+                self._connect_serial()
 
     def _status_poll_loop(self):
         """Background thread for periodic status polling."""
@@ -511,9 +336,10 @@ class Splice3DMQTTBridge:
             return 1
 
         self.running = True
+        self.journal_writer.start()
 
         # Start background threads
-        serial_thread = threading.Thread(target=self._serial_read_loop, daemon=True)
+        serial_thread = threading.Thread(target=self._serial_reconnect_loop, daemon=True)
         poll_thread = threading.Thread(target=self._status_poll_loop, daemon=True)
 
         serial_thread.start()
@@ -535,15 +361,22 @@ class Splice3DMQTTBridge:
         # Publish offline status
         self.state.state = "OFFLINE"
         self._publish_state()
+        self.publisher.flush(force=True)
+        counters = self.publisher.counters
+        logger.info(f"MQTT messages: {counters.published} published, {counters.saved} saved")
 
         # Save stats
         self._save_stats()
+        self.journal_writer.stop()
 
         # Disconnect
         if self.mqtt_client:
             self.mqtt_client.loop_stop()
             self.mqtt_client.disconnect()
 
+        if self.reader:
+            self.reader.stop()
+
         if self.serial and self.serial.is_open:
             self.serial.close()
 
@@ -593,6 +426,20 @@ def main():
         default=Path(os.environ.get("SPLICE3D_STATS_FILE", "/var/lib/splice3d/stats.json")),
         help="Path to statistics file"
     )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=float(os.environ.get("SPLICE3D_MIN_INTERVAL", "1.0")),
+        help="Minimum seconds between updates of one topic; state changes and "
+             "errors are sent at once (default: 1.0)"
+    )
+    parser.add_argument(
+        "--state-format",
+        choices=STATE_FORMATS,
+        default=STATE_FIELDS,
+        help="Publish status as one topic per field, one JSON topic "
+             f"({TOPIC_PREFIX}/status/json) or both (default: fields)"
+    )
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
@@ -623,6 +470,8 @@ def main():
         mqtt_username=args.mqtt_username,
         mqtt_password=args.mqtt_password,
         stats_file=args.stats_file,
+        min_interval=args.min_interval,
+        state_format=args.state_format,
     )
 
     return bridge.run()
@@ -0,0 +1,271 @@
+"""
+Splice3D Statistics Journal
+
+Crash-safe persistence of BridgeStats without rewriting the statistics
+file on every splice. Each splice or failure appends one line to a
+journal next to the statistics file:
+
+    stats.json       snapshot (BridgeStats.to_dict() plus "journal_seq")
+    stats.journal    {"seq": 42, "event": "splice", "date": "2026-10-17"}
+
+Every compact_every events (and on close) the statistics are written to
+the snapshot atomically and the journal is truncated. On startup the
+snapshot is loaded and the journal events after its journal_seq are
+replayed, so a crash loses at most the events not yet written by the
+JournalWriter thread; a torn last line is skipped.
+
+Writes happen on a JournalWriter thread, off the serial handling path.
+One writer serves any number of journals (the fleet bridge shares one),
+and each batch of queued lines costs a single fsync per journal.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Optional
+
+from bridge_core import BridgeStats, load_stats, write_json_atomic
+
+logger = logging.getLogger('splice3d-bridge')
+
+# Journal events
+EVENT_SPLICE = "splice"
+EVENT_FAILURE = "failure"
+
+# Events between snapshots
+DEFAULT_COMPACT_EVERY = 500
+
+_STOP = object()
+
+
+class JournalWriter:
+    """
+    Background thread that appends journal lines and writes snapshots.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "JournalWriter":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stats-journal",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Write everything queued, then end the thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        self._drain()
+
+    def flush(self):
+        """Wait until everything queued so far is written."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+        else:
+            self._drain()
+
+    def submit(self, journal: "StatsJournal", item):
+        self._queue.put((journal, item))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Take whatever else is queued: one fsync per journal per batch
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in batch
+            self._write([entry for entry in batch if entry is not _STOP])
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not _STOP:
+                batch.append(entry)
+            self._queue.task_done()
+        self._write(batch)
+
+    @staticmethod
+    def _write(batch: list):
+        dirty = {}
+        for journal, item in batch:
+            try:
+                if journal._write(item):
+                    dirty[id(journal)] = journal
+            except Exception as e:
+                logger.error(f"Could not write stats journal {journal.journal_path}: {e}")
+        for journal in dirty.values():
+            try:
+                journal._sync()
+            except Exception as e:
+                logger.error(f"Could not sync stats journal {journal.journal_path}: {e}")
+
+
+class StatsJournal:
+    """
+    BridgeStats persisted as a snapshot plus an append-only event journal.
+    """
+
+    def __init__(self,
+                 path: Path,
+                 writer: Optional[JournalWriter] = None,
+                 compact_every: int = DEFAULT_COMPACT_EVERY):
+        """
+        Initialize the journal (call load() before recording events).
+
+        Args:
+            path: Snapshot file; the journal is the same name with suffix .journal
+            writer: Writer thread; without one, events are written synchronously
+            compact_every: Events between snapshots
+        """
+        self.path = path
+        self.journal_path = path.with_suffix(".journal")
+        self.writer = writer
+        self.compact_every = compact_every
+        self.stats = BridgeStats()
+        self._seq = 0            # Last event number
+        self._since_snapshot = 0
+        self._file = None
+
+    def load(self) -> BridgeStats:
+        """
+        Load the snapshot and replay the journal events after it.
+
+        Returns:
+            The recovered statistics (also self.stats)
+        """
+        self.stats = load_stats(self.path)
+        self._seq = _snapshot_seq(self.path)
+        replayed = 0
+        for event in self._read_journal():
+            if event["seq"] > self._seq:
+                _replay(self.stats, event)
+                self._seq = event["seq"]
+                replayed += 1
+        self.stats.reset_daily()
+        if replayed:
+            logger.info(f"Replayed {replayed} events from {self.journal_path}")
+        if self.journal_path.exists():
+            # Start from a clean snapshot, whatever state the journal was in
+            self._write(self._snapshot())
+            self._since_snapshot = 0
+        return self.stats
+
+    def record(self, event: str):
+        """
+        Journal an event already applied to self.stats (EVENT_SPLICE or
+        EVENT_FAILURE; BridgeStats.record_splice() or record_failure()).
+        """
+        self._seq += 1
+        self._submit(json.dumps({"seq": self._seq, "event": event,
+                                 "date": self.stats.last_reset_date}))
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Write a snapshot of self.stats and truncate the journal."""
+        self._since_snapshot = 0
+        self._submit(self._snapshot())
+
+    def close(self):
+        """Write a final snapshot and wait for it."""
+        self.compact()
+        if self.writer is not None:
+            self.writer.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _snapshot(self) -> dict:
+        # Taken on the thread that changes the statistics, so it matches _seq
+        data = self.stats.to_dict()
+        data["journal_seq"] = self._seq
+        return data
+
+    def _submit(self, item):
+        if self.writer is not None:
+            self.writer.submit(self, item)
+        elif self._write(item):
+            self._sync()
+
+    def _write(self, item) -> bool:
+        """Write a journal line (str) or snapshot (dict); True if a sync is due."""
+        if isinstance(item, dict):
+            write_json_atomic(self.path, item)
+            # Every event so far is in the snapshot
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            with open(self.journal_path, 'w'):
+                pass
+            return False
+        if self._file is None:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.journal_path, 'a')
+        self._file.write(item + "\n")
+        return True
+
+    def _sync(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _read_journal(self) -> list[dict]:
+        events = []
+        try:
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                        events.append({"seq": int(event["seq"]), "event": event["event"],
+                                       "date": event["date"]})
+                    except (ValueError, KeyError, TypeError):
+                        # A line torn by a crash
+                        logger.warning(f"Skipping bad stats journal line: {line.strip()!r}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not read stats journal: {e}")
+        return events
+
+
+def _snapshot_seq(path: Path) -> int:
+    try:
+        with open(path) as f:
+            return int(json.load(f).get("journal_seq", 0))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return 0
+
+
+def _replay(stats: BridgeStats, event: dict):
+    """Apply a journal event as of its own date."""
+    if event["date"] > stats.last_reset_date:
+        stats.splices_today = 0
+        stats.failures_today = 0
+        stats.last_reset_date = event["date"]
+    today = event["date"] == stats.last_reset_date
+    if event["event"] == EVENT_SPLICE:
+        stats.splices_total += 1
+        stats.splices_today += today
+    elif event["event"] == EVENT_FAILURE:
+        stats.failures_total += 1
+        stats.failures_today += today